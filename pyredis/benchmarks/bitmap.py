@@ -0,0 +1,83 @@
+import argparse
+import os
+import random
+import time
+
+from pyredis.bitmap import BitOp, bit_count, bit_op, bit_pos, get_bit, set_bit
+
+POPCOUNT = bytes(bin(byte).count("1") for byte in range(256))
+
+
+def timed(function, *args) -> tuple[float, object]:
+    start = time.perf_counter()
+    result = function(*args)
+    return (time.perf_counter() - start) * 1000, result
+
+
+def per_byte_count(data: bytes | bytearray) -> int:
+    """The loop BITCOUNT replaces: one table lookup per byte."""
+    return sum(POPCOUNT[byte] for byte in data)
+
+
+def bench_bits(bits: int, updates: int):
+    rng = random.Random(0)
+    offsets = [rng.randrange(bits) for _ in range(updates)]
+    bitmap = bytearray(bits // 8)
+
+    start = time.perf_counter()
+    for offset in offsets:
+        set_bit(bitmap, offset, 1)
+    setbit = updates / (time.perf_counter() - start)
+    start = time.perf_counter()
+    for offset in offsets:
+        get_bit(bitmap, offset)
+    getbit = updates / (time.perf_counter() - start)
+    print(f"SETBIT {setbit:,.0f} ops/s, GETBIT {getbit:,.0f} ops/s")
+
+
+def bench_words(bits: int):
+    size = bits // 8
+    a, b = bytearray(os.urandom(size)), bytearray(os.urandom(size))
+    last = bits - 1
+    print(f"{bits:,} bits, {size / 1024 / 1024:.1f} MB per bitmap")
+
+    elapsed, count = timed(bit_count, a, 0, last)
+    loop_elapsed, loop_count = timed(per_byte_count, a)
+    assert count == loop_count
+    print(
+        f"{'BITCOUNT':<22} {elapsed:>9.1f} ms  per byte loop {loop_elapsed:,.0f} ms, "
+        f"{loop_elapsed / elapsed:,.0f}x"
+    )
+    elapsed, _ = timed(bit_count, a, 3, last - 3)
+    print(f"{'BITCOUNT BIT range':<22} {elapsed:>9.1f} ms")
+
+    sparse = bytearray(size)
+    set_bit(sparse, last, 1)
+    elapsed, _ = timed(bit_pos, sparse, 1, 0, last)
+    print(f"{'BITPOS 1, last bit':<22} {elapsed:>9.1f} ms")
+    elapsed, _ = timed(bit_pos, a, 1, 0, last)
+    print(f"{'BITPOS 1, random':<22} {elapsed:>9.3f} ms")
+
+    for op in (BitOp.AND, BitOp.OR, BitOp.XOR):
+        elapsed, _ = timed(bit_op, op, [a, b])
+        print(f"{'BITOP ' + op:<22} {elapsed:>9.1f} ms")
+    elapsed, _ = timed(bit_op, BitOp.NOT, [a])
+    print(f"{'BITOP NOT':<22} {elapsed:>9.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Measure the bitmap commands in process on large bitmaps."
+    )
+    parser.add_argument("-b", "--bits", type=int, default=100_000_000)
+    parser.add_argument(
+        "-n", "--updates", type=int, default=1_000_000, help="SETBIT/GETBIT calls"
+    )
+    args = parser.parse_args()
+
+    bench_bits(args.bits, args.updates)
+    bench_words(args.bits)
+
+
+if __name__ == "__main__":
+    main()
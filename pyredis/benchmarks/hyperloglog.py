@@ -0,0 +1,88 @@
+import argparse
+import sys
+import time
+
+from pyredis.hyperloglog import (
+    HLL_REGISTERS,
+    add_elements,
+    cardinality,
+    encoding,
+    from_registers,
+    max_registers,
+    new_hyperloglog,
+    to_registers,
+)
+
+CARDINALITIES = (100, 1_000, 10_000, 100_000, 1_000_000)
+
+
+def elements(count: int, prefix: str) -> list[bytes]:
+    return [f"{prefix}:{i}".encode() for i in range(count)]
+
+
+def set_usage(members: list[bytes]) -> int:
+    """What a set of the same members costs, the structure HyperLogLog replaces."""
+    members = set(members)
+    return sys.getsizeof(members) + sum(sys.getsizeof(member) for member in members)
+
+
+def bench_accuracy(batch: int):
+    print(
+        f"{'cardinality':>12} {'estimate':>10} {'error':>7} {'encoding':>8} "
+        f"{'bytes':>6} {'set bytes':>11} {'adds/s':>10} {'count us':>9}"
+    )
+    for count in CARDINALITIES:
+        members = elements(count, "visitor")
+        hll = new_hyperloglog()
+        start = time.perf_counter()
+        for i in range(0, count, batch):
+            hll, _ = add_elements(hll, members[i : i + batch])
+        adds = count / (time.perf_counter() - start)
+
+        start = time.perf_counter()
+        estimate = cardinality(hll)
+        count_us = (time.perf_counter() - start) * 1_000_000
+        error = (estimate - count) / count * 100
+        print(
+            f"{count:>12,} {estimate:>10,} {error:>+6.2f}% {encoding(hll):>8} "
+            f"{len(hll):>6,} {set_usage(members):>11,} {adds:>10,.0f} {count_us:>9,.0f}"
+        )
+
+
+def bench_merge(keys: int):
+    """PFMERGE of dense HyperLogLogs, the union of disjoint member sets."""
+    hlls = [
+        add_elements(new_hyperloglog(), elements(20_000, f"page:{page}"))[0]
+        for page in range(keys)
+    ]
+    start = time.perf_counter()
+    registers = bytearray(HLL_REGISTERS)
+    for hll in hlls:
+        registers = max_registers(registers, to_registers(hll))
+    merged = from_registers(registers)
+    elapsed_us = (time.perf_counter() - start) * 1_000_000
+    error = (cardinality(merged) - keys * 20_000) / (keys * 20_000) * 100
+    print(
+        f"PFMERGE of {keys} dense keys: {elapsed_us:,.0f} us, "
+        f"{elapsed_us / keys:,.0f} us per key, error {error:+.2f}%"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Measure HyperLogLog accuracy, memory and throughput in process."
+    )
+    parser.add_argument(
+        "-b", "--batch", type=int, default=100, help="elements per PFADD"
+    )
+    parser.add_argument(
+        "-k", "--keys", type=int, default=10, help="keys merged by PFMERGE"
+    )
+    args = parser.parse_args()
+
+    bench_accuracy(args.batch)
+    bench_merge(args.keys)
+
+
+if __name__ == "__main__":
+    main()
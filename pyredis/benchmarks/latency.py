@@ -0,0 +1,90 @@
+import argparse
+import asyncio
+import statistics
+import time
+
+from pyredis.client.connection import AsyncConnection, Connection
+from pyredis.config import HOST, PORT
+
+UNIXSOCKET = "/tmp/pyredis.sock"
+ROUNDS = 10
+
+
+def percentile(samples: list[float], fraction: float) -> float:
+    return samples[min(int(len(samples) * fraction), len(samples) - 1)]
+
+
+def round_trips(connection: Connection, requests: int, *command) -> list[float]:
+    """Microseconds per request, one request in flight."""
+    samples = []
+    for _ in range(requests):
+        start = time.perf_counter()
+        connection.execute(*command)
+        samples.append((time.perf_counter() - start) * 1e6)
+    return samples
+
+
+async def connect_storm(connection_kwargs: dict, clients: int) -> float:
+    """Milliseconds for `clients` connections opened at once to each get a PONG back."""
+    connections = [AsyncConnection(**connection_kwargs) for _ in range(clients)]
+    start = time.perf_counter()
+    await asyncio.gather(*(connection.execute("PING") for connection in connections))
+    elapsed = (time.perf_counter() - start) * 1000
+    await asyncio.gather(*(connection.disconnect() for connection in connections))
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compare request latency and connection storms over loopback TCP and the Unix socket "
+        "of a server started with --unixsocket."
+    )
+    parser.add_argument("-a", "--address", type=str, default=HOST)
+    parser.add_argument("-p", "--port", type=int, default=PORT)
+    parser.add_argument("-s", "--unixsocket", type=str, default=UNIXSOCKET)
+    parser.add_argument("-n", "--requests", type=int, default=20000)
+    parser.add_argument(
+        "-c", "--clients", type=int, default=500, help="connections of the storm"
+    )
+    args = parser.parse_args()
+
+    transports = {
+        "tcp": {"host": args.address, "port": args.port},
+        "unix": {"unix_socket_path": args.unixsocket},
+    }
+    commands = (("PING",), ("GET", "latency:key"))
+    connections = {name: Connection(**kwargs) for name, kwargs in transports.items()}
+    samples = {(name, command[0]): [] for name in transports for command in commands}
+    for connection in connections.values():
+        connection.execute("SET", "latency:key", "x" * 64)
+        round_trips(connection, 1000, "PING")  # warm up
+    # The transports take turns, so a slow spell of the machine doesn't land on one of them only.
+    for _ in range(ROUNDS):
+        for name, connection in connections.items():
+            for command in commands:
+                samples[name, command[0]].extend(
+                    round_trips(connection, args.requests // ROUNDS, *command)
+                )
+    for connection in connections.values():
+        connection.disconnect()
+
+    print(
+        f"{'':<5} {'command':<8} {'mean us':>8} {'p50 us':>8} {'p99 us':>8} {'p99.9 us':>9}"
+    )
+    for (name, command), timings in samples.items():
+        timings.sort()
+        print(
+            f"{name:<5} {command:<8} {statistics.fmean(timings):>8.1f} "
+            f"{percentile(timings, 0.5):>8.1f} {percentile(timings, 0.99):>8.1f} "
+            f"{percentile(timings, 0.999):>9.1f}"
+        )
+    storms = {
+        name: asyncio.run(connect_storm(kwargs, args.clients))
+        for name, kwargs in transports.items()
+    }
+    for name, elapsed in storms.items():
+        print(f"{name:<5} {args.clients} connections at once: {elapsed:,.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
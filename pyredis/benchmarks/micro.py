@@ -0,0 +1,361 @@
+import argparse
+import contextlib
+import functools
+import json
+import os
+import platform
+import random
+import sys
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Callable
+
+from pyredis.hotkeys import HotKeys
+from pyredis.protocol import (
+    Array,
+    BulkString,
+    Double,
+    Error,
+    Integer,
+    Map,
+    Null,
+    Push,
+    PyRedisData,
+    Set,
+    SimpleString,
+    parse_frame,
+)
+from pyredis.store import DataStoreWithLock
+
+BASELINE = Path(__file__).with_name("baseline.json")
+# 10M keys take a few GB, ask for them with --sizes.
+STORE_SIZES = (1_000, 100_000, 1_000_000)
+STORE_OPS = 100_000  # distinct keys touched by a store benchmark run
+RUN_SECONDS = 0.02
+REPEAT = 5
+# A benchmark regresses when it gets slower than its baseline by more than this fraction, after scaling
+# the baseline by the calibration loop to the speed of the current machine.
+DEFAULT_TOLERANCE = 0.5
+
+
+@dataclass
+class Benchmark:
+    name: str
+    run: Callable[[int], None]  # does `number` operations
+    # Untimed, before every run of `number` operations.
+    setup: Callable[[int], None] | None = None
+
+    def measure(self, repeat=REPEAT, run_seconds=RUN_SECONDS) -> float:
+        """Nanoseconds per operation, the best of `repeat` runs of at least `run_seconds`."""
+        number = 1
+        while True:
+            elapsed = self._time(number)
+            if elapsed >= run_seconds * 1e9 or number >= 10_000_000:
+                break
+            number *= 10 if elapsed < run_seconds * 1e8 else 2
+        best = elapsed
+        for _ in range(repeat - 1):
+            best = min(best, self._time(number))
+        return best / number
+
+    def _time(self, number: int) -> int:
+        if self.setup is not None:
+            self.setup(number)
+        start = time.perf_counter_ns()
+        self.run(number)
+        return time.perf_counter_ns() - start
+
+
+def calibrate() -> float:
+    """A fixed pure python workload, to compare timings taken on different machines."""
+
+    def run(number: int):
+        for _ in range(number):
+            total = 0
+            for i in range(100):
+                total += i * i
+
+    return Benchmark("calibration", run).measure()
+
+
+def _size_name(size: int) -> str:
+    if size >= 1_000_000:
+        return f"{size // 1_000_000}M"
+    if size >= 1_000:
+        return f"{size // 1_000}K"
+    return str(size)
+
+
+def _bytes_name(size: int) -> str:
+    if size >= 2**20:
+        return f"{size // 2**20}MB"
+    if size >= 2**10:
+        return f"{size // 2**10}KB"
+    return f"{size}B"
+
+
+def sample_frames() -> dict[str, PyRedisData]:
+    """One frame of every RESP type, strings and aggregates at several sizes."""
+    frames: dict[str, PyRedisData] = {
+        "simple_string": SimpleString(b"OK"),
+        "error": Error(b"ERR wrong number of arguments"),
+        "integer": Integer(b"1234567890"),
+        "double": Double(3.14159),
+        "null": Null(),
+    }
+    for size in (16, 2**10, 2**16, 2**20):
+        frames[f"bulk_string.{_bytes_name(size)}"] = BulkString(b"x" * size)
+    for count in (10, 1000):
+        frames[f"array.{count}"] = Array(
+            [BulkString(b"item:%i" % i) for i in range(count)]
+        )
+    frames["map.100"] = Map(
+        [(BulkString(b"field:%i" % i), Integer(b"%i" % i)) for i in range(100)]
+    )
+    frames["set.100"] = Set([BulkString(b"member:%i" % i) for i in range(100)])
+    frames["push.3"] = Push(
+        [BulkString(b"message"), BulkString(b"channel"), BulkString(b"payload")]
+    )
+    for depth in (8, 64):
+        frame = Array([BulkString(b"leaf")])
+        for _ in range(depth - 1):
+            frame = Array([frame, Integer(b"1")])
+        frames[f"deep_array.{depth}"] = frame
+    return frames
+
+
+def protocol_benchmarks() -> list[Benchmark]:
+    benchmarks = []
+    for name, frame in sample_frames().items():
+        data = frame.serialize()
+
+        def parse(number: int, data=data):
+            for _ in range(number):
+                parse_frame(data)
+
+        def serialize(number: int, frame=frame):
+            for _ in range(number):
+                frame.serialize()
+
+        benchmarks.append(Benchmark(f"protocol.parse.{name}", parse))
+        benchmarks.append(Benchmark(f"protocol.serialize.{name}", serialize))
+    return benchmarks
+
+
+def _cycle(values: list, number: int):
+    # Runs longer than the list go over it again.
+    for start in range(0, number, len(values)):
+        yield from values[: number - start]
+
+
+@functools.lru_cache(maxsize=1)
+def populated(size: int) -> DataStoreWithLock:
+    """A datastore of `size` short string keys, for the benchmarks of that size, which run in a row."""
+    datastore = DataStoreWithLock()
+    for i in range(size):
+        datastore.set(f"key:{i}", b"value")
+    return datastore
+
+
+def store_benchmarks(size: int) -> list[Benchmark]:
+    """GET, SET and expiry on a keyspace of `size` keys, touching keys spread over all of it."""
+    rng = random.Random(size)
+    keys = [f"key:{rng.randrange(size)}" for _ in range(min(size, STORE_OPS))]
+    missing = [f"missing:{i}" for i in range(len(keys))]
+    expiry = datetime.now() + timedelta(hours=1)
+    expired = datetime.now() - timedelta(hours=1)
+    prefix = f"store.{_size_name(size)}"
+
+    def get(number: int):
+        datastore = populated(size)
+        for key in _cycle(keys, number):
+            datastore.get(key)
+
+    def get_missing(number: int):
+        datastore = populated(size)
+        for key in _cycle(missing, number):
+            datastore.get(key)
+
+    def set_existing(number: int):
+        datastore = populated(size)
+        for key in _cycle(keys, number):
+            datastore.set(key, b"value")
+
+    def set_with_expiry(number: int):
+        datastore = populated(size)
+        for key in _cycle(keys, number):
+            datastore.set(key, b"value", expiry)
+
+    def add_expired(number: int):
+        datastore = populated(size)
+        for i in range(number):
+            datastore.set(f"expired:{i}", b"value", expired)
+
+    def get_expired(number: int):
+        # Every read finds the key expired and deletes it, like a client reading a stale key.
+        datastore = populated(size)
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            for i in range(number):
+                datastore.get(f"expired:{i}", touch=False)
+
+    def sample_expired(number: int):
+        # One probe of the active expiry cycle: a random key, read without counting an access.
+        datastore = populated(size)
+        for _ in range(number):
+            datastore.get(datastore.get_random_key(), touch=False)
+
+    return [
+        Benchmark(f"{prefix}.get", get),
+        Benchmark(f"{prefix}.get_missing", get_missing),
+        Benchmark(f"{prefix}.set", set_existing),
+        Benchmark(f"{prefix}.set_expiry", set_with_expiry),
+        Benchmark(f"{prefix}.expire_lazy", get_expired, setup=add_expired),
+        Benchmark(f"{prefix}.expire_cycle_probe", sample_expired),
+    ]
+
+
+def hotkeys_benchmarks() -> list[Benchmark]:
+    """Counting an access in the hot key sketch, and what it costs a command at the default sample rate."""
+    rng = random.Random(0)
+    keys = [b"key:%d" % rng.randrange(1_000_000) for _ in range(STORE_OPS)]
+    every, sampled = HotKeys(sample_rate=1), HotKeys()
+
+    def add(number: int):
+        for key in _cycle(keys, number):
+            every.add(key)
+
+    def command(number: int):
+        for key in _cycle(keys, number):
+            if sampled.sample():
+                sampled.add(key)
+
+    return [
+        Benchmark("hotkeys.add", add),
+        Benchmark("hotkeys.command", command),
+    ]
+
+
+def all_benchmarks(sizes=STORE_SIZES) -> list[Benchmark]:
+    benchmarks = protocol_benchmarks()
+    for size in sizes:
+        benchmarks.extend(store_benchmarks(size))
+    benchmarks.extend(hotkeys_benchmarks())
+    return benchmarks
+
+
+def run(benchmarks: list[Benchmark], repeat=REPEAT) -> dict[str, float]:
+    results = {}
+    for benchmark in benchmarks:
+        results[benchmark.name] = ns = benchmark.measure(repeat)
+        print(f"{benchmark.name:<45} {ns:>14,.1f} ns/op")
+    return results
+
+
+def load_baseline(path=BASELINE) -> dict:
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_baseline(results: dict[str, float], calibration: float, path=BASELINE):
+    baseline = {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "calibration_ns": round(calibration, 1),
+        "results": {name: round(ns, 1) for name, ns in results.items()},
+    }
+    with open(path, "w") as f:
+        json.dump(baseline, f, indent=2)
+        f.write("\n")
+
+
+def regression(
+    name: str,
+    ns: float,
+    baseline: dict,
+    calibration: float,
+    tolerance=DEFAULT_TOLERANCE,
+) -> str | None:
+    """A description of the regression of a benchmark against the baseline, None when within tolerance."""
+    expected = baseline["results"][name] * calibration / baseline["calibration_ns"]
+    if ns <= expected * (1 + tolerance):
+        return None
+    return f"{name}: {ns:,.1f} ns/op, expected at most {expected * (1 + tolerance):,.1f} ({ns / expected:.2f}x)"
+
+
+def compare(
+    benchmark: Benchmark,
+    baseline: dict,
+    calibration: float,
+    tolerance=DEFAULT_TOLERANCE,
+    repeat=REPEAT,
+) -> tuple[float, str | None]:
+    """Measure a benchmark of the baseline, and its regression if any. A slow benchmark is measured a
+    second time before it counts, so that one noisy measure does not fail the check."""
+    ns = benchmark.measure(repeat)
+    if regression(benchmark.name, ns, baseline, calibration, tolerance):
+        ns = min(ns, benchmark.measure(repeat))
+    return ns, regression(benchmark.name, ns, baseline, calibration, tolerance)
+
+
+def check(
+    benchmarks: list[Benchmark],
+    baseline: dict,
+    tolerance=DEFAULT_TOLERANCE,
+    repeat=REPEAT,
+) -> list[str]:
+    """The regressions of the benchmarks found in the baseline."""
+    calibration = calibrate()
+    regressions = []
+    for benchmark in benchmarks:
+        if benchmark.name not in baseline["results"]:
+            continue
+        ns, found = compare(benchmark, baseline, calibration, tolerance, repeat)
+        print(f"{benchmark.name:<45} {ns:>14,.1f} ns/op {'REGRESSED' if found else ''}")
+        if found:
+            regressions.append(found)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Micro-benchmarks of the RESP parser and serializer and of the datastore."
+    )
+    parser.add_argument(
+        "--sizes",
+        type=int,
+        nargs="+",
+        default=STORE_SIZES,
+        help="keyspace sizes of the store benchmarks, e.g. 1000 10000000",
+    )
+    parser.add_argument("-k", "--filter", default="", help="only names containing this")
+    parser.add_argument("-r", "--repeat", type=int, default=REPEAT)
+    parser.add_argument(
+        "--save", action="store_true", help=f"write the results to {BASELINE.name}"
+    )
+    parser.add_argument(
+        "--check", action="store_true", help="fail on regressions against the baseline"
+    )
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    parser.add_argument("--baseline", type=Path, default=BASELINE)
+    args = parser.parse_args()
+
+    benchmarks = [b for b in all_benchmarks(args.sizes) if args.filter in b.name]
+    if args.check:
+        regressions = check(
+            benchmarks, load_baseline(args.baseline), args.tolerance, args.repeat
+        )
+        for found in regressions:
+            print(found)
+        sys.exit(1 if regressions else 0)
+
+    calibration = calibrate()
+    print(f"{'calibration':<45} {calibration:>14,.1f} ns/op")
+    results = run(benchmarks, args.repeat)
+    if args.save:
+        save_baseline(results, calibration, args.baseline)
+
+
+if __name__ == "__main__":
+    main()
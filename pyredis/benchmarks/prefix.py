@@ -0,0 +1,93 @@
+import argparse
+import asyncio
+import contextlib
+import gc
+import os
+import time
+
+from pyredis.commands import Command
+from pyredis.prefix import PrefixIndex
+from pyredis.protocol import Array, BulkString
+from pyredis.store import DataStoreWithLock
+
+NAMESPACES = 10_000
+
+
+def request(*args: str) -> Array:
+    return Array([BulkString(arg.encode()) for arg in args])
+
+
+def timed(function, *args) -> tuple[float, object]:
+    start = time.perf_counter()
+    result = function(*args)
+    return (time.perf_counter() - start) * 1000, result
+
+
+def execute(datastore: DataStoreWithLock, *args: str):
+    # Handlers print every command they run.
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        return asyncio.run(Command(request(*args), datastore, None).exec())
+
+
+def scan_all(datastore: DataStoreWithLock, pattern: str, count: int) -> int:
+    found, cursor = 0, "0"
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+
+        async def scan():
+            nonlocal found, cursor
+            while True:
+                reply = await Command(
+                    request("SCAN", cursor, "MATCH", pattern, "COUNT", str(count)),
+                    datastore,
+                    None,
+                ).exec()
+                cursor = reply.data[0].decode()
+                found += len(reply.data[1].data)
+                if cursor == "0":
+                    return
+
+        asyncio.run(scan())
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compare KEYS, SCAN MATCH and DELPREFIX with and without the prefix index."
+    )
+    parser.add_argument("-n", "--keys", type=int, default=10_000_000)
+    parser.add_argument("-c", "--count", type=int, default=1000, help="SCAN COUNT")
+    args = parser.parse_args()
+
+    # Keys spread over 10000 namespaces, ns42: holds keys / 10000 of them.
+    keys = [f"ns{i % NAMESPACES}:{i}" for i in range(args.keys)]
+    datastore = DataStoreWithLock()
+    elapsed, _ = timed(lambda: [datastore.set(key, b"v") for key in keys])
+    print(f"{args.keys:,} keys, {args.keys // NAMESPACES:,} under ns42:")
+    print(f"{'SET without index':<28} {elapsed * 1e6 / args.keys:>10,.0f} ns/key")
+
+    index = PrefixIndex()
+    elapsed, _ = timed(lambda: [index.add(key) for key in keys])
+    print(f"{'index insert':<28} {elapsed * 1e6 / args.keys:>10,.0f} ns/key")
+    print(f"{'index memory':<28} {index.memory_usage() / 2**20:>10,.1f} MB")
+    del keys
+    # A full collection walks all the records, it would land in whichever command runs at the time.
+    gc.collect()
+    gc.freeze()
+
+    pattern = "ns42:*"
+    for name, prefix_index in (("without index", None), ("with index", index)):
+        datastore.prefix_index = prefix_index
+        elapsed, reply = timed(execute, datastore, "KEYS", pattern)
+        print(f"{'KEYS ' + name:<28} {elapsed:>10,.1f} ms  {len(reply.data):,} keys")
+        elapsed, found = timed(scan_all, datastore, pattern, args.count)
+        print(f"{'SCAN MATCH ' + name:<28} {elapsed:>10,.1f} ms  {found:,} keys")
+
+    elapsed, reply = timed(execute, datastore, "DELPREFIX", "ns42:")
+    print(f"{'DELPREFIX with index':<28} {elapsed:>10,.1f} ms  {reply.data:,} keys")
+    datastore.prefix_index = None
+    elapsed, reply = timed(execute, datastore, "DELPREFIX", "ns43:")
+    print(f"{'DELPREFIX without index':<28} {elapsed:>10,.1f} ms  {reply.data:,} keys")
+
+
+if __name__ == "__main__":
+    main()
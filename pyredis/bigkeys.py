@@ -0,0 +1,238 @@
+import argparse
+import heapq
+from dataclasses import dataclass
+from typing import Iterable, Iterator
+
+from pyredis.client.client import Client
+from pyredis.config import HOST, PORT
+from pyredis.persist import iter_frames
+from pyredis.protocol import Array, Integer, Map, parse_frame
+
+SCAN_COUNT = 1000
+OTHER_PREFIX = "(other)"
+
+
+@dataclass
+class KeyStats:
+    type: str
+    length: int  # bytes of a string, elements of a list or stream
+    size: int  # bytes of the payload
+
+
+def _value_stats(value) -> KeyStats:
+    match value:
+        case Array():
+            return KeyStats(
+                "list", len(value.data), sum(len(item.data) for item in value.data)
+            )
+        case Map():
+            entries = dict((key.data, item) for key, item in value.data)[b"entries"]
+            return KeyStats(
+                "stream",
+                len(entries.data),
+                sum(
+                    len(field.data)
+                    for entry in entries.data
+                    for field in entry.data[1].data
+                ),
+            )
+        case Integer():
+            size = len(str(value.data))
+            return KeyStats("string", size, size)
+        case _:
+            return KeyStats("string", len(value.data), len(value.data))
+
+
+def _xadd_id(args: list[bytes]) -> int:
+    """The position of the entry ID in XADD, after the NOMKSTREAM and trim options."""
+    i = 2
+    while i < len(args):
+        option = bytes(args[i]).upper()
+        if option == b"NOMKSTREAM":
+            i += 1
+        elif option in (b"MAXLEN", b"MINID"):
+            i += 3 if args[i + 1] in (b"=", b"~") else 2
+            if bytes(args[i]).upper() == b"LIMIT":
+                i += 2
+        else:
+            return i
+    return i
+
+
+def replay_aof(frames: Iterable[Array]) -> dict[str, KeyStats]:
+    """Rebuild the type and size of every key from an AOF without keeping the values.
+
+    Keys written with a relative expiry are kept, the log does not say when they were written.
+    """
+    keys: dict[str, KeyStats] = {}
+    for frame in frames:
+        args = [part.data for part in frame.data]
+        if len(args) < 2:
+            if args and bytes(args[0]).upper() in (b"FLUSHDB", b"FLUSHALL"):
+                keys.clear()
+            continue
+
+        name, key = bytes(args[0]).upper(), bytes(args[1]).decode()
+        stats = keys.get(key)
+        match name:
+            case b"SET" if len(args) >= 3:
+                if stats is None or b"NX" not in (
+                    bytes(arg).upper() for arg in args[3:]
+                ):
+                    keys[key] = KeyStats("string", len(args[2]), len(args[2]))
+            case b"APPEND" if len(args) == 3:
+                if stats is None:
+                    keys[key] = KeyStats("string", 0, 0)
+                stats = keys[key]
+                stats.length += len(args[2])
+                stats.size = stats.length
+            case b"SETRANGE" if len(args) == 4:
+                length = int(args[2]) + len(args[3])
+                if stats is None:
+                    keys[key] = KeyStats("string", length, length)
+                elif length > stats.length:
+                    stats.length = stats.size = length
+            case b"INCR" | b"DECR":
+                # The counter itself is not tracked, its digits barely change its size.
+                if stats is None:
+                    keys[key] = KeyStats("string", 1, 1)
+            case b"LPUSH" | b"RPUSH":
+                if stats is None:
+                    stats = keys[key] = KeyStats("list", 0, 0)
+                stats.length += len(args) - 2
+                stats.size += sum(len(arg) for arg in args[2:])
+            case b"LPOP" | b"RPOP" | b"LMOVE" if stats is not None:
+                # Popped values are not in the log, an average element is taken off.
+                element = stats.size // max(stats.length, 1)
+                stats.length -= 1
+                stats.size -= element
+                if stats.length <= 0:
+                    del keys[key]
+                if name == b"LMOVE" and len(args) >= 3:
+                    target = keys.setdefault(
+                        bytes(args[2]).decode(), KeyStats("list", 0, 0)
+                    )
+                    target.length += 1
+                    target.size += element
+            case b"XADD" if len(args) >= 5:
+                # Trims are not followed, the length is an upper bound for capped streams.
+                if stats is None:
+                    stats = keys[key] = KeyStats("stream", 0, 0)
+                stats.length += 1
+                stats.size += sum(len(arg) for arg in args[_xadd_id(args) + 1 :])
+            case b"DEL" | b"UNLINK":
+                for arg in args[1:]:
+                    keys.pop(bytes(arg).decode(), None)
+            case b"DELPREFIX":
+                for name in [name for name in keys if name.startswith(key)]:
+                    del keys[name]
+            case b"RESTORE" if len(args) >= 4:
+                value, _ = parse_frame(args[3])
+                if value is not None:
+                    keys[key] = _value_stats(value)
+            case b"FLUSHDB" | b"FLUSHALL":
+                keys.clear()
+    return keys
+
+
+def scan_server(client: Client, count=SCAN_COUNT) -> Iterator[tuple[str, KeyStats]]:
+    """Walk a live server with SCAN, sizing each batch with pipelined TYPE and MEMORY USAGE calls."""
+    cursor = 0
+    while True:
+        cursor, batch = client.scan(cursor, count=count)
+        cursor = int(cursor)
+        pipe = client.pipeline()
+        for key in batch:
+            pipe.type(key)
+            pipe.memory_usage(key)
+        replies = pipe.execute(raise_on_error=False)
+        for key, key_type, usage in zip(batch, replies[::2], replies[1::2]):
+            if key_type == b"none" or usage is None:
+                continue
+            yield key.decode(), KeyStats(key_type.decode(), 0, usage)
+        if cursor == 0:
+            return
+
+
+def key_prefix(key: str, delimiter: str, depth: int) -> str:
+    parts = key.split(delimiter, depth)
+    if len(parts) <= depth:
+        return OTHER_PREFIX
+    return delimiter.join(parts[:depth]) + delimiter + "*"
+
+
+@dataclass
+class Report:
+    top: int
+    delimiter: str
+    depth: int
+
+    def __post_init__(self):
+        self.biggest: dict[str, list[tuple[int, str, KeyStats]]] = {}
+        self.types: dict[str, list[int]] = {}
+        self.prefixes: dict[str, list[int]] = {}
+
+    def add(self, key: str, stats: KeyStats):
+        heap = self.biggest.setdefault(stats.type, [])
+        if len(heap) < self.top:
+            heapq.heappush(heap, (stats.size, key, stats))
+        elif stats.size > heap[0][0]:
+            heapq.heapreplace(heap, (stats.size, key, stats))
+
+        for totals, name in (
+            (self.types, stats.type),
+            (self.prefixes, key_prefix(key, self.delimiter, self.depth)),
+        ):
+            total = totals.setdefault(name, [0, 0])
+            total[0] += 1
+            total[1] += stats.size
+
+    def lines(self) -> Iterator[str]:
+        for key_type, heap in sorted(self.biggest.items()):
+            yield f"Biggest {key_type} keys"
+            for size, key, stats in sorted(heap, reverse=True):
+                length = f" {stats.length:>12,}" if stats.length else ""
+                yield f"  {size:>14,} bytes{length}  {key}"
+        yield ""
+        yield f"{'type':<20} {'keys':>12} {'bytes':>16}"
+        for name, (keys, size) in sorted(self.types.items()):
+            yield f"{name:<20} {keys:>12,} {size:>16,}"
+        yield ""
+        yield f"{'prefix':<40} {'keys':>12} {'bytes':>16}"
+        for name, (keys, size) in sorted(
+            self.prefixes.items(), key=lambda item: item[1][1], reverse=True
+        )[: self.top]:
+            yield f"{name:<40} {keys:>12,} {size:>16,}"
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Find the biggest keys and the key prefixes holding the most data, "
+        "from an AOF file or from a running server."
+    )
+    parser.add_argument("aof", nargs="?", help="Read this AOF instead of a server.")
+    parser.add_argument("-a", "--address", type=str, default=HOST)
+    parser.add_argument("-p", "--port", type=int, default=PORT)
+    parser.add_argument("-n", "--top", type=int, default=10, help="Keys per type")
+    parser.add_argument("-d", "--delimiter", type=str, default=":")
+    parser.add_argument(
+        "--depth", type=int, default=1, help="Delimited parts kept in a prefix"
+    )
+    args = parser.parse_args()
+
+    report = Report(args.top, args.delimiter, args.depth)
+    if args.aof:
+        with open(args.aof, "rb") as f:
+            for key, stats in replay_aof(iter_frames(f)).items():
+                report.add(key, stats)
+    else:
+        with Client(args.address, args.port, max_connections=1) as client:
+            for key, stats in scan_server(client):
+                report.add(key, stats)
+
+    for line in report.lines():
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+import operator
+from functools import reduce
+
+# Bits are numbered from the most significant bit of the first byte, as in Redis. Bytes are read as big
+# endian ints a chunk at a time, so counting and searching run in int.bit_count and int.bit_length rather
+# than in a python loop per bit or byte. Chunks bound the temporary ints, and let BITPOS stop early.
+BITMAP_CHUNK_BYTES = 64 * 1024
+
+
+class BitOp:
+    AND = "AND"
+    OR = "OR"
+    XOR = "XOR"
+    NOT = "NOT"
+
+
+_OPERATORS = {BitOp.AND: operator.and_, BitOp.OR: operator.or_, BitOp.XOR: operator.xor}
+
+
+def normalize_range(start: int, end: int, length: int) -> tuple[int, int] | None:
+    """The inclusive range for Redis style indexes, negative ones count from the end, None when empty."""
+    if start < 0:
+        start = max(length + start, 0)
+    if end < 0:
+        end = max(length + end, 0)
+    end = min(end, length - 1)
+    return (start, end) if start <= end else None
+
+
+def get_bit(data: bytes | bytearray, offset: int) -> int:
+    pos = offset >> 3
+    if pos >= len(data):
+        return 0
+    return (data[pos] >> (7 - (offset & 7))) & 1
+
+
+def set_bit(buffer: bytearray, offset: int, bit: int) -> int:
+    """Set or clear a bit, growing the buffer with zero bytes, returns the previous bit."""
+    pos, mask = offset >> 3, 0x80 >> (offset & 7)
+    if pos >= len(buffer):
+        buffer.extend(bytes(pos + 1 - len(buffer)))
+    previous = buffer[pos] & mask
+    if bit:
+        buffer[pos] |= mask
+    else:
+        buffer[pos] &= ~mask & 0xFF
+    return int(previous != 0)
+
+
+def _chunks(data: bytes | bytearray, first: int, last: int):
+    """(byte position, byte count, big endian int) for the bytes holding bits first to last."""
+    view = memoryview(data)
+    end = (last >> 3) + 1
+    for pos in range(first >> 3, end, BITMAP_CHUNK_BYTES):
+        chunk = view[pos : min(pos + BITMAP_CHUNK_BYTES, end)]
+        yield pos, len(chunk), int.from_bytes(chunk, "big")
+
+
+def bit_count(data: bytes | bytearray, first: int, last: int) -> int:
+    """The number of set bits from bit first to bit last, inclusive."""
+    if first > last:
+        return 0
+    total = sum(word.bit_count() for _, _, word in _chunks(data, first, last))
+    # The edge bytes are counted whole, drop the bits before first and after last.
+    total -= (data[first >> 3] >> (8 - (first & 7))).bit_count()
+    total -= (data[last >> 3] & ((1 << (7 - (last & 7))) - 1)).bit_count()
+    return total
+
+
+def bit_pos(data: bytes | bytearray, bit: int, first: int, last: int) -> int:
+    """The position of the first bit set to `bit` from bit first to bit last, -1 when there is none."""
+    if first > last:
+        return -1
+    first_pos, last_end = first >> 3, (last >> 3) + 1
+    for pos, size, word in _chunks(data, first, last):
+        width = size * 8
+        if not bit:
+            word ^= (1 << width) - 1
+        if pos == first_pos:
+            word &= (1 << (width - (first & 7))) - 1
+        if pos + size == last_end:
+            word &= ~((1 << (7 - (last & 7))) - 1)
+        if word:
+            return pos * 8 + width - word.bit_length()
+    return -1
+
+
+def bit_op(op: str, values: list[bytes | bytearray]) -> bytearray:
+    """AND, OR and XOR of values zero padded to the longest one, or NOT of a single value."""
+    length = max(map(len, values), default=0)
+    words = []
+    for value in values:
+        word = int.from_bytes(value, "big")
+        # Shifting by 0 still copies the int, only shorter values are padded.
+        words.append(
+            word << (8 * (length - len(value))) if len(value) < length else word
+        )
+    if op == BitOp.NOT:
+        result = words[0] ^ ((1 << (8 * length)) - 1)
+    else:
+        result = reduce(_OPERATORS[op], words)
+    return bytearray(result.to_bytes(length, "big"))
@@ -0,0 +1,134 @@
+import asyncio
+import heapq
+import itertools
+from collections import deque
+from typing import Callable, TypeVar
+
+T = TypeVar("T")
+
+
+class Waiter:
+    """A client blocked on keys, its future gets the key that was signalled, or None at its deadline."""
+
+    __slots__ = ("keys", "future", "deadline", "done")
+
+    def __init__(self, keys: list[str], future: asyncio.Future):
+        self.keys = keys
+        self.future = future
+        self.deadline: float | None = None
+        self.done = False
+
+
+class BlockingKeys:
+    """The clients blocked on each key, in the order they blocked, like Redis' db->blocking_keys.
+
+    A client keeps its place in the queues of its keys until it is served or times out: woken up to find
+    that another client took the data, it goes back to waiting ahead of the clients that blocked after it.
+
+    Deadlines share one heap and a single timer set for the earliest of them, rather than a timer per
+    blocked client. Entries of clients served before their deadline are dropped lazily.
+    """
+
+    def __init__(self):
+        self._waiters: dict[str, deque[Waiter]] = {}
+        self._deadlines: list[tuple[float, int, Waiter]] = []
+        self._sequence = itertools.count()
+        self._timer: asyncio.TimerHandle | None = None
+        self.blocked_clients = 0
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._waiters
+
+    def keys(self) -> list[str]:
+        return list(self._waiters)
+
+    async def wait(
+        self, keys: list[str], timeout: float | None, ready: Callable[[str], T]
+    ) -> T | None:
+        """Block until `ready(key)` gives a result other than None once `key`, one of `keys`, is signalled.
+
+        Returns None after `timeout` seconds. A timeout of None blocks until served, or until the waiting
+        task is cancelled.
+        """
+        loop = asyncio.get_running_loop()
+        waiter = Waiter(keys, loop.create_future())
+        for key in keys:
+            self._waiters.setdefault(key, deque()).append(waiter)
+        if timeout is not None:
+            waiter.deadline = loop.time() + timeout
+            heapq.heappush(
+                self._deadlines, (waiter.deadline, next(self._sequence), waiter)
+            )
+            self._schedule(loop)
+
+        self.blocked_clients += 1
+        served = False
+        try:
+            while True:
+                key = await waiter.future
+                if key is None:
+                    return None
+                # The deadline can pass between the signal and the retry.
+                if waiter.deadline is not None and loop.time() >= waiter.deadline:
+                    return None
+                result = ready(key)
+                if result is not None:
+                    served = True
+                    return result
+                waiter.future = loop.create_future()
+        finally:
+            self.blocked_clients -= 1
+            waiter.done = True
+            self._discard(waiter)
+            future = waiter.future
+            if (
+                not served
+                and future.done()
+                and not future.cancelled()
+                and future.result()
+            ):
+                # Woken but not served, the data is left for the next client in line.
+                self.signal(future.result(), 1)
+
+    def signal(self, key: str, count: int | None = None):
+        """Wake the first `count` clients waiting on key, or all of them, in the order they blocked."""
+        for waiter in self._waiters.get(key, ()):
+            if count is not None and count <= 0:
+                return
+            if not waiter.future.done():
+                waiter.future.set_result(key)
+                if count is not None:
+                    count -= 1
+
+    def _discard(self, waiter: Waiter):
+        for key in waiter.keys:
+            waiters = self._waiters.get(key)
+            if waiters is None:
+                continue
+            try:
+                waiters.remove(waiter)
+            except ValueError:
+                pass
+            if not waiters:
+                del self._waiters[key]
+        if len(self._deadlines) > 2 * self.blocked_clients + 64:
+            self._deadlines = [entry for entry in self._deadlines if not entry[2].done]
+            heapq.heapify(self._deadlines)
+
+    def _schedule(self, loop: asyncio.AbstractEventLoop):
+        deadline = self._deadlines[0][0]
+        if self._timer is not None:
+            if self._timer.when() <= deadline:
+                return
+            self._timer.cancel()
+        self._timer = loop.call_at(deadline, self._expire, loop)
+
+    def _expire(self, loop: asyncio.AbstractEventLoop):
+        self._timer = None
+        now = loop.time()
+        while self._deadlines and self._deadlines[0][0] <= now:
+            _, _, waiter = heapq.heappop(self._deadlines)
+            if not waiter.done and not waiter.future.done():
+                waiter.future.set_result(None)
+        if self._deadlines:
+            self._schedule(loop)
@@ -0,0 +1,23 @@
+from pyredis.client.client import AsyncClient, Client
+from pyredis.client.connection import (
+    AsyncConnection,
+    Connection,
+    ConnectionError,
+    ResponseError,
+)
+from pyredis.client.pipeline import AsyncPipeline, Pipeline
+from pyredis.client.pool import AsyncConnectionPool, ConnectionPool, PoolTimeoutError
+
+__all__ = [
+    "AsyncClient",
+    "AsyncConnection",
+    "AsyncConnectionPool",
+    "AsyncPipeline",
+    "Client",
+    "Connection",
+    "ConnectionError",
+    "ConnectionPool",
+    "Pipeline",
+    "PoolTimeoutError",
+    "ResponseError",
+]
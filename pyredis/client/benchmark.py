@@ -0,0 +1,60 @@
+import argparse
+import asyncio
+import time
+
+from pyredis.client.client import AsyncClient, Client
+from pyredis.config import HOST, PORT
+
+IN_FLIGHT = (1, 10, 100)
+
+
+def bench_sync(client: Client, requests: int, in_flight: int) -> float:
+    start = time.perf_counter()
+    for batch in range(0, requests, in_flight):
+        if in_flight == 1:
+            client.set(f"bench:{batch}", batch)
+            continue
+        pipe = client.pipeline()
+        for i in range(batch, min(batch + in_flight, requests)):
+            pipe.set(f"bench:{i}", i)
+        pipe.execute()
+    return requests / (time.perf_counter() - start)
+
+
+async def bench_async(client: AsyncClient, requests: int, in_flight: int) -> float:
+    start = time.perf_counter()
+    for batch in range(0, requests, in_flight):
+        if in_flight == 1:
+            await client.set(f"bench:{batch}", batch)
+            continue
+        pipe = client.pipeline()
+        for i in range(batch, min(batch + in_flight, requests)):
+            pipe.set(f"bench:{i}", i)
+        await pipe.execute()
+    return requests / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Measure client throughput with 1, 10 and 100 commands in flight."
+    )
+    parser.add_argument("-a", "--address", type=str, default=HOST)
+    parser.add_argument("-p", "--port", type=int, default=PORT)
+    parser.add_argument("-n", "--requests", type=int, default=10000)
+    args = parser.parse_args()
+
+    print(f"{'in flight':>10} {'sync ops/s':>12} {'async ops/s':>12}")
+    with Client(args.address, args.port, max_connections=1) as client:
+        sync_results = [bench_sync(client, args.requests, n) for n in IN_FLIGHT]
+
+    async def run_async():
+        async with AsyncClient(args.address, args.port, max_connections=1) as client:
+            return [await bench_async(client, args.requests, n) for n in IN_FLIGHT]
+
+    async_results = asyncio.run(run_async())
+    for n, sync_ops, async_ops in zip(IN_FLIGHT, sync_results, async_results):
+        print(f"{n:>10} {sync_ops:>12,.0f} {async_ops:>12,.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from pyredis.client.commands import CommandsMixin, split_evenly
+from pyredis.client.connection import ResponseError
+from pyredis.client.pipeline import AsyncPipeline, Pipeline
+from pyredis.client.pool import AsyncConnectionPool, ConnectionPool
+from pyredis.config import HOST, PORT
+
+
+class Client(CommandsMixin):
+    def __init__(
+        self, host=HOST, port=PORT, pool: ConnectionPool | None = None, **pool_kwargs
+    ):
+        self.pool = (
+            pool if pool is not None else ConnectionPool(host, port, **pool_kwargs)
+        )
+
+    def execute_command(self, *args):
+        conn = self.pool.get_connection()
+        try:
+            reply = conn.execute(*args)
+        finally:
+            self.pool.release(conn)
+        if isinstance(reply, ResponseError):
+            raise reply
+        return reply
+
+    def pipeline(self) -> Pipeline:
+        return Pipeline(self.pool)
+
+    def mget(self, keys: list) -> list:
+        """GET every key, the keys are split into one pipeline per pooled connection."""
+        return self._fan_out([("GET", key) for key in keys])
+
+    def mset(self, mapping: dict) -> bool:
+        """SET every key, the pairs are split into one pipeline per pooled connection."""
+        replies = self._fan_out([("SET", key, value) for key, value in mapping.items()])
+        return all(reply == b"OK" for reply in replies)
+
+    def _fan_out(self, commands: list[tuple]) -> list:
+        if not commands:
+            return []
+        chunks = split_evenly(commands, self.pool.max_connections)
+        if len(chunks) == 1:
+            return self._run_chunk(chunks[0])
+        with ThreadPoolExecutor(max_workers=len(chunks)) as executor:
+            results = executor.map(self._run_chunk, chunks)
+            return [reply for chunk in results for reply in chunk]
+
+    def _run_chunk(self, commands: list[tuple]) -> list:
+        pipe = self.pipeline()
+        for command in commands:
+            pipe.execute_command(*command)
+        return pipe.execute()
+
+    def close(self):
+        self.pool.disconnect()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class AsyncClient(CommandsMixin):
+    def __init__(
+        self,
+        host=HOST,
+        port=PORT,
+        pool: AsyncConnectionPool | None = None,
+        **pool_kwargs
+    ):
+        self.pool = (
+            pool if pool is not None else AsyncConnectionPool(host, port, **pool_kwargs)
+        )
+
+    async def execute_command(self, *args):
+        conn = await self.pool.get_connection()
+        try:
+            reply = await conn.execute(*args)
+        finally:
+            self.pool.release(conn)
+        if isinstance(reply, ResponseError):
+            raise reply
+        return reply
+
+    def pipeline(self) -> AsyncPipeline:
+        return AsyncPipeline(self.pool)
+
+    async def mget(self, keys: list) -> list:
+        """GET every key, the keys are split into one pipeline per pooled connection."""
+        return await self._fan_out([("GET", key) for key in keys])
+
+    async def mset(self, mapping: dict) -> bool:
+        """SET every key, the pairs are split into one pipeline per pooled connection."""
+        replies = await self._fan_out(
+            [("SET", key, value) for key, value in mapping.items()]
+        )
+        return all(reply == b"OK" for reply in replies)
+
+    async def _fan_out(self, commands: list[tuple]) -> list:
+        chunks = split_evenly(commands, self.pool.max_connections)
+        results = await asyncio.gather(*(self._run_chunk(chunk) for chunk in chunks))
+        return [reply for chunk in results for reply in chunk]
+
+    async def _run_chunk(self, commands: list[tuple]) -> list:
+        pipe = self.pipeline()
+        for command in commands:
+            pipe.execute_command(*command)
+        return await pipe.execute()
+
+    async def close(self):
+        await self.pool.disconnect()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
@@ -0,0 +1,227 @@
+class CommandsMixin:
+    """Command helpers shared by the clients and pipelines, each one defers to `execute_command`."""
+
+    def execute_command(self, *args):
+        raise NotImplementedError
+
+    def ping(self):
+        return self.execute_command("PING")
+
+    def echo(self, message):
+        return self.execute_command("ECHO", message)
+
+    def dbsize(self):
+        return self.execute_command("DBSIZE")
+
+    def swapdb(self, first: int, second: int):
+        return self.execute_command("SWAPDB", first, second)
+
+    def flushdb(self, asynchronous=False):
+        return self.execute_command("FLUSHDB", *(["ASYNC"] if asynchronous else []))
+
+    def get(self, key):
+        return self.execute_command("GET", key)
+
+    def set(self, key, value, ex: int | None = None, px: int | None = None):
+        args = ["SET", key, value]
+        if ex is not None:
+            args.extend(("EX", ex))
+        if px is not None:
+            args.extend(("PX", px))
+        return self.execute_command(*args)
+
+    def delete(self, key):
+        return self.execute_command("DEL", key)
+
+    def exists(self, key):
+        return self.execute_command("EXISTS", key)
+
+    def incr(self, key):
+        return self.execute_command("INCR", key)
+
+    def decr(self, key):
+        return self.execute_command("DECR", key)
+
+    def incrby(self, key, amount: int):
+        return self.execute_command("INCRBY", key, amount)
+
+    def decrby(self, key, amount: int):
+        return self.execute_command("DECRBY", key, amount)
+
+    def incrbyfloat(self, key, amount: float):
+        return self.execute_command("INCRBYFLOAT", key, amount)
+
+    def lpush(self, key, *values):
+        return self.execute_command("LPUSH", key, *values)
+
+    def rpush(self, key, *values):
+        return self.execute_command("RPUSH", key, *values)
+
+    def lrange(self, key, start: int, stop: int):
+        return self.execute_command("LRANGE", key, start, stop)
+
+    def lpop(self, key):
+        return self.execute_command("LPOP", key)
+
+    def rpop(self, key):
+        return self.execute_command("RPOP", key)
+
+    def lmove(self, source, destination, wherefrom="LEFT", whereto="RIGHT"):
+        return self.execute_command("LMOVE", source, destination, wherefrom, whereto)
+
+    def blpop(self, *keys, timeout: float = 0):
+        return self.execute_command("BLPOP", *keys, timeout)
+
+    def brpop(self, *keys, timeout: float = 0):
+        return self.execute_command("BRPOP", *keys, timeout)
+
+    def blmove(
+        self, source, destination, wherefrom="LEFT", whereto="RIGHT", timeout: float = 0
+    ):
+        return self.execute_command(
+            "BLMOVE", source, destination, wherefrom, whereto, timeout
+        )
+
+    def pfadd(self, key, *elements):
+        return self.execute_command("PFADD", key, *elements)
+
+    def pfcount(self, *keys):
+        return self.execute_command("PFCOUNT", *keys)
+
+    def pfmerge(self, destination, *sources):
+        return self.execute_command("PFMERGE", destination, *sources)
+
+    def setbit(self, key, offset: int, value: int):
+        return self.execute_command("SETBIT", key, offset, value)
+
+    def getbit(self, key, offset: int):
+        return self.execute_command("GETBIT", key, offset)
+
+    def bitcount(self, key, start: int | None = None, end: int | None = None):
+        args = ["BITCOUNT", key]
+        if start is not None and end is not None:
+            args.extend((start, end))
+        return self.execute_command(*args)
+
+    def bitop(self, operation: str, destination, *keys):
+        return self.execute_command("BITOP", operation, destination, *keys)
+
+    def bitpos(self, key, bit: int, start: int | None = None, end: int | None = None):
+        args = ["BITPOS", key, bit]
+        if start is not None:
+            args.append(start)
+            if end is not None:
+                args.append(end)
+        return self.execute_command(*args)
+
+    def xadd(
+        self,
+        key,
+        fields: dict,
+        id="*",
+        maxlen: int | None = None,
+        approximate=True,
+        nomkstream=False,
+    ):
+        args = ["XADD", key]
+        if nomkstream:
+            args.append("NOMKSTREAM")
+        if maxlen is not None:
+            args.extend(("MAXLEN", "~" if approximate else "=", maxlen))
+        args.append(id)
+        for field, value in fields.items():
+            args.extend((field, value))
+        return self.execute_command(*args)
+
+    def xlen(self, key):
+        return self.execute_command("XLEN", key)
+
+    def xrange(self, key, start="-", end="+", count: int | None = None):
+        args = ["XRANGE", key, start, end]
+        if count is not None:
+            args.extend(("COUNT", count))
+        return self.execute_command(*args)
+
+    def xrevrange(self, key, end="+", start="-", count: int | None = None):
+        args = ["XREVRANGE", key, end, start]
+        if count is not None:
+            args.extend(("COUNT", count))
+        return self.execute_command(*args)
+
+    def xtrim(self, key, maxlen: int, approximate=True):
+        return self.execute_command(
+            "XTRIM", key, "MAXLEN", "~" if approximate else "=", maxlen
+        )
+
+    def xread(self, streams: dict, count: int | None = None, block: int | None = None):
+        args = ["XREAD"]
+        if count is not None:
+            args.extend(("COUNT", count))
+        if block is not None:
+            args.extend(("BLOCK", block))
+        args.extend(("STREAMS", *streams.keys(), *streams.values()))
+        return self.execute_command(*args)
+
+    def xgroup_create(self, key, group, id="$", mkstream=False):
+        args = ["XGROUP", "CREATE", key, group, id]
+        if mkstream:
+            args.append("MKSTREAM")
+        return self.execute_command(*args)
+
+    def xreadgroup(
+        self,
+        group,
+        consumer,
+        streams: dict,
+        count: int | None = None,
+        block: int | None = None,
+        noack=False,
+    ):
+        args = ["XREADGROUP", "GROUP", group, consumer]
+        if count is not None:
+            args.extend(("COUNT", count))
+        if block is not None:
+            args.extend(("BLOCK", block))
+        if noack:
+            args.append("NOACK")
+        args.extend(("STREAMS", *streams.keys(), *streams.values()))
+        return self.execute_command(*args)
+
+    def xack(self, key, group, *ids):
+        return self.execute_command("XACK", key, group, *ids)
+
+    def xpending(self, key, group):
+        return self.execute_command("XPENDING", key, group)
+
+    def type(self, key):
+        return self.execute_command("TYPE", key)
+
+    def scan(self, cursor: int = 0, match: str | None = None, count: int | None = None):
+        args = ["SCAN", cursor]
+        if match is not None:
+            args.extend(("MATCH", match))
+        if count is not None:
+            args.extend(("COUNT", count))
+        return self.execute_command(*args)
+
+    def keys(self, pattern):
+        return self.execute_command("KEYS", pattern)
+
+    def delprefix(self, prefix):
+        return self.execute_command("DELPREFIX", prefix)
+
+    def memory_usage(self, key, samples: int | None = None):
+        args = ["MEMORY", "USAGE", key]
+        if samples is not None:
+            args.extend(("SAMPLES", samples))
+        return self.execute_command(*args)
+
+
+def split_evenly(items: list, parts: int) -> list[list]:
+    size, extra = divmod(len(items), parts)
+    chunks, start = [], 0
+    for i in range(parts):
+        end = start + size + (1 if i < extra else 0)
+        chunks.append(items[start:end])
+        start = end
+    return [chunk for chunk in chunks if chunk]
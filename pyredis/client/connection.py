@@ -0,0 +1,338 @@
+import asyncio
+import socket
+import time
+from typing import Callable
+
+from pyredis.config import BUFFER_SIZE, HOST, PORT
+from pyredis.protocol import (
+    Array,
+    BulkString,
+    Double,
+    Error,
+    Integer,
+    Map,
+    NilArray,
+    Null,
+    NullArray,
+    NullBulkString,
+    Push,
+    PyRedisData,
+    Set,
+    parse_frame,
+)
+
+HEALTH_CHECK_INTERVAL = 30  # seconds
+READ_SIZE = 65536
+
+
+class ConnectionError(Exception):
+    pass
+
+
+class ResponseError(Exception):
+    pass
+
+
+def encode_command(*args) -> bytes:
+    parts = []
+    for arg in args:
+        if isinstance(arg, str):
+            arg = arg.encode()
+        elif not isinstance(arg, (bytes, bytearray, memoryview)):
+            arg = str(arg).encode()
+        parts.append(BulkString(arg))
+    return Array(parts).serialize()
+
+
+def to_python(frame: PyRedisData):
+    """Convert a reply into plain python values, server errors are returned as ResponseError instances."""
+    match frame:
+        case Error():
+            return ResponseError(frame.decode())
+        case Integer():
+            return frame.data
+        case NullBulkString() | NilArray() | Null():
+            return None
+        case Double():
+            return frame.data
+        case Map():
+            return {
+                _hashable(to_python(key)): to_python(value) for key, value in frame.data
+            }
+        case Set():
+            return {_hashable(to_python(part)) for part in frame.data}
+        case NullArray():
+            return []
+        case Array():
+            return [to_python(part) for part in frame.data]
+        case _:
+            return bytes(frame.data)
+
+
+def _hashable(value):
+    return tuple(value) if isinstance(value, list) else value
+
+
+def _handshake_commands(protocol: int, client_tracking: bool, db: int) -> list[tuple]:
+    commands = []
+    if protocol != 2:
+        commands.append(("HELLO", protocol))
+    if db:
+        commands.append(("SELECT", db))
+    if client_tracking:
+        commands.append(("CLIENT", "TRACKING", "ON"))
+    return commands
+
+
+class _ReplyBuffer:
+    def __init__(self):
+        self._buffer = bytearray()
+
+    def feed(self, data: bytes):
+        self._buffer.extend(data)
+
+    def next_reply(self) -> PyRedisData | None:
+        if not self._buffer:
+            return None
+        frame, size = parse_frame(self._buffer)
+        if frame is not None:
+            del self._buffer[:size]
+        return frame
+
+    def clear(self):
+        self._buffer.clear()
+
+
+class Connection:
+    """A single server connection.
+
+    `protocol=3` negotiates RESP3 with HELLO on connect. With `client_tracking` the server remembers the keys
+    read over this connection, and invalidation pushes are handed to `push_handler` as they arrive. A `db`
+    other than 0 is selected on connect, so every pooled connection uses the same database. With
+    `unix_socket_path` it connects to the server's Unix socket instead of `host` and `port`.
+    """
+
+    def __init__(
+        self,
+        host=HOST,
+        port=PORT,
+        socket_timeout: float | None = None,
+        protocol=2,
+        client_tracking=False,
+        push_handler: Callable[[list], None] | None = None,
+        db=0,
+        unix_socket_path: str | None = None,
+    ):
+        self.host = host
+        self.port = port
+        self.unix_socket_path = unix_socket_path
+        self.address = unix_socket_path or f"{host}:{port}"
+        self.socket_timeout = socket_timeout
+        self.protocol = protocol
+        self.client_tracking = client_tracking
+        self.push_handler = push_handler
+        self.db = db
+        self.last_used = 0.0
+        self._sock: socket.socket | None = None
+        self._replies = _ReplyBuffer()
+
+    @property
+    def is_connected(self):
+        return self._sock is not None
+
+    def connect(self):
+        if self._sock is not None:
+            return
+        try:
+            if self.unix_socket_path is not None:
+                sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+                sock.settimeout(self.socket_timeout)
+                try:
+                    sock.connect(self.unix_socket_path)
+                except OSError:
+                    sock.close()
+                    raise
+            else:
+                sock = socket.create_connection(
+                    (self.host, self.port), self.socket_timeout
+                )
+                sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        except OSError as e:
+            raise ConnectionError(f"Failed to connect to {self.address}: {e}")
+        self._sock = sock
+        self.last_used = time.monotonic()
+
+        for command in _handshake_commands(
+            self.protocol, self.client_tracking, self.db
+        ):
+            reply = self.execute(*command)
+            if isinstance(reply, ResponseError):
+                self.disconnect()
+                raise ConnectionError(f"{command[0]} failed: {reply}")
+
+    def disconnect(self):
+        if self._sock is not None:
+            try:
+                self._sock.close()
+            finally:
+                self._sock = None
+                self._replies.clear()
+
+    def send_packed_command(self, data: bytes):
+        self.connect()
+        try:
+            self._sock.sendall(data)
+        except OSError as e:
+            self.disconnect()
+            raise ConnectionError(f"Failed to write to {self.address}: {e}")
+
+    def read_reply(self) -> PyRedisData:
+        while True:
+            frame = self._replies.next_reply()
+            if type(frame) is Push:
+                if self.push_handler is not None:
+                    self.push_handler(to_python(frame))
+                continue
+            if frame is not None:
+                self.last_used = time.monotonic()
+                return frame
+            try:
+                data = self._sock.recv(READ_SIZE)
+            except OSError as e:
+                self.disconnect()
+                raise ConnectionError(f"Failed to read from {self.address}: {e}")
+            if not data:
+                self.disconnect()
+                raise ConnectionError(f"Connection closed by {self.address}")
+            self._replies.feed(data)
+
+    def execute(self, *args):
+        self.send_packed_command(encode_command(*args))
+        return to_python(self.read_reply())
+
+    def check_health(self, interval=HEALTH_CHECK_INTERVAL) -> bool:
+        """PING the server if the connection has been idle for longer than `interval` seconds."""
+        if not self.is_connected:
+            return False
+        if time.monotonic() - self.last_used < interval:
+            return True
+        try:
+            return self.execute("PING") == b"PONG"
+        except ConnectionError:
+            return False
+
+
+class AsyncConnection:
+    def __init__(
+        self,
+        host=HOST,
+        port=PORT,
+        socket_timeout: float | None = None,
+        protocol=2,
+        client_tracking=False,
+        push_handler: Callable[[list], None] | None = None,
+        db=0,
+        unix_socket_path: str | None = None,
+    ):
+        self.host = host
+        self.port = port
+        self.unix_socket_path = unix_socket_path
+        self.address = unix_socket_path or f"{host}:{port}"
+        self.socket_timeout = socket_timeout
+        self.protocol = protocol
+        self.client_tracking = client_tracking
+        self.push_handler = push_handler
+        self.db = db
+        self.last_used = 0.0
+        self._reader: asyncio.StreamReader | None = None
+        self._writer: asyncio.StreamWriter | None = None
+        self._replies = _ReplyBuffer()
+
+    @property
+    def is_connected(self):
+        return self._writer is not None
+
+    async def connect(self):
+        if self._writer is not None:
+            return
+        if self.unix_socket_path is not None:
+            opening = asyncio.open_unix_connection(
+                self.unix_socket_path, limit=BUFFER_SIZE
+            )
+        else:
+            opening = asyncio.open_connection(self.host, self.port, limit=BUFFER_SIZE)
+        try:
+            self._reader, self._writer = await asyncio.wait_for(
+                opening, self.socket_timeout
+            )
+        except (OSError, asyncio.TimeoutError) as e:
+            raise ConnectionError(f"Failed to connect to {self.address}: {e}")
+        sock = self._writer.get_extra_info("socket")
+        if sock is not None and sock.family != socket.AF_UNIX:
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.last_used = time.monotonic()
+
+        for command in _handshake_commands(
+            self.protocol, self.client_tracking, self.db
+        ):
+            reply = await self.execute(*command)
+            if isinstance(reply, ResponseError):
+                await self.disconnect()
+                raise ConnectionError(f"{command[0]} failed: {reply}")
+
+    async def disconnect(self):
+        if self._writer is not None:
+            writer = self._writer
+            self._reader = self._writer = None
+            self._replies.clear()
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except OSError:
+                pass
+
+    async def send_packed_command(self, data: bytes):
+        await self.connect()
+        try:
+            self._writer.write(data)
+            await self._writer.drain()
+        except OSError as e:
+            await self.disconnect()
+            raise ConnectionError(f"Failed to write to {self.address}: {e}")
+
+    async def read_reply(self) -> PyRedisData:
+        while True:
+            frame = self._replies.next_reply()
+            if type(frame) is Push:
+                if self.push_handler is not None:
+                    self.push_handler(to_python(frame))
+                continue
+            if frame is not None:
+                self.last_used = time.monotonic()
+                return frame
+            try:
+                data = await asyncio.wait_for(
+                    self._reader.read(READ_SIZE), self.socket_timeout
+                )
+            except (OSError, asyncio.TimeoutError) as e:
+                await self.disconnect()
+                raise ConnectionError(f"Failed to read from {self.address}: {e}")
+            if not data:
+                await self.disconnect()
+                raise ConnectionError(f"Connection closed by {self.address}")
+            self._replies.feed(data)
+
+    async def execute(self, *args):
+        await self.send_packed_command(encode_command(*args))
+        return to_python(await self.read_reply())
+
+    async def check_health(self, interval=HEALTH_CHECK_INTERVAL) -> bool:
+        """PING the server if the connection has been idle for longer than `interval` seconds."""
+        if not self.is_connected:
+            return False
+        if time.monotonic() - self.last_used < interval:
+            return True
+        try:
+            return await self.execute("PING") == b"PONG"
+        except ConnectionError:
+            return False
@@ -0,0 +1,89 @@
+from pyredis.client.commands import CommandsMixin
+from pyredis.client.connection import (
+    ConnectionError,
+    ResponseError,
+    encode_command,
+    to_python,
+)
+from pyredis.client.pool import AsyncConnectionPool, ConnectionPool
+
+
+class _PipelineBase(CommandsMixin):
+    def __init__(self):
+        self._commands: list[bytes] = []
+
+    def __len__(self):
+        return len(self._commands)
+
+    def execute_command(self, *args):
+        self._commands.append(encode_command(*args))
+        return self
+
+    def reset(self):
+        self._commands.clear()
+
+    @staticmethod
+    def _check(replies: list, raise_on_error: bool) -> list:
+        if raise_on_error:
+            for reply in replies:
+                if isinstance(reply, ResponseError):
+                    raise reply
+        return replies
+
+
+class Pipeline(_PipelineBase):
+    """Queues commands and sends them in one write, the replies are read back in one pass."""
+
+    def __init__(self, pool: ConnectionPool):
+        super().__init__()
+        self.pool = pool
+
+    def execute(self, raise_on_error=True) -> list:
+        if not self._commands:
+            return []
+        conn = self.pool.get_connection()
+        try:
+            conn.send_packed_command(b"".join(self._commands))
+            replies = [to_python(conn.read_reply()) for _ in self._commands]
+        except ConnectionError:
+            conn.disconnect()
+            raise
+        finally:
+            self.pool.release(conn)
+            self.reset()
+        return self._check(replies, raise_on_error)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.reset()
+
+
+class AsyncPipeline(_PipelineBase):
+    """Queues commands and sends them in one write, the replies are read back in one pass."""
+
+    def __init__(self, pool: AsyncConnectionPool):
+        super().__init__()
+        self.pool = pool
+
+    async def execute(self, raise_on_error=True) -> list:
+        if not self._commands:
+            return []
+        conn = await self.pool.get_connection()
+        try:
+            await conn.send_packed_command(b"".join(self._commands))
+            replies = [to_python(await conn.read_reply()) for _ in self._commands]
+        except ConnectionError:
+            await conn.disconnect()
+            raise
+        finally:
+            self.pool.release(conn)
+            self.reset()
+        return self._check(replies, raise_on_error)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        self.reset()
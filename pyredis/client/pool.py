@@ -0,0 +1,142 @@
+import asyncio
+import threading
+import time
+
+from pyredis.client.connection import (
+    HEALTH_CHECK_INTERVAL,
+    AsyncConnection,
+    Connection,
+    ConnectionError,
+)
+from pyredis.config import HOST, PORT
+
+MAX_CONNECTIONS = 10
+
+
+class PoolTimeoutError(ConnectionError):
+    pass
+
+
+class ConnectionPool:
+    """A bounded, thread safe pool. Idle connections are health checked when they are handed out."""
+
+    def __init__(
+        self,
+        host=HOST,
+        port=PORT,
+        max_connections=MAX_CONNECTIONS,
+        timeout: float | None = None,
+        health_check_interval=HEALTH_CHECK_INTERVAL,
+        socket_timeout: float | None = None,
+        **connection_kwargs,
+    ):
+        self.host = host
+        self.port = port
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self.health_check_interval = health_check_interval
+        self.socket_timeout = socket_timeout
+        self.connection_kwargs = connection_kwargs
+        self._idle: list[Connection] = []
+        self._in_use: set[Connection] = set()
+        self._available = threading.Condition()
+
+    def get_connection(self) -> Connection:
+        deadline = None if self.timeout is None else time.monotonic() + self.timeout
+        with self._available:
+            while not self._idle and len(self._in_use) >= self.max_connections:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    raise PoolTimeoutError(
+                        f"No connection available after {self.timeout} seconds"
+                    )
+                self._available.wait(remaining)
+
+            conn = (
+                self._idle.pop()
+                if self._idle
+                else Connection(
+                    self.host, self.port, self.socket_timeout, **self.connection_kwargs
+                )
+            )
+            self._in_use.add(conn)
+
+        try:
+            if not conn.check_health(self.health_check_interval):
+                conn.disconnect()
+                conn.connect()
+        except ConnectionError:
+            self.release(conn)
+            raise
+        return conn
+
+    def release(self, conn: Connection):
+        with self._available:
+            self._in_use.discard(conn)
+            if conn.is_connected:
+                self._idle.append(conn)
+            self._available.notify()
+
+    def disconnect(self):
+        with self._available:
+            for conn in self._idle:
+                conn.disconnect()
+            self._idle.clear()
+
+
+class AsyncConnectionPool:
+    """A bounded pool for a single event loop. Idle connections are health checked when they are handed out."""
+
+    def __init__(
+        self,
+        host=HOST,
+        port=PORT,
+        max_connections=MAX_CONNECTIONS,
+        timeout: float | None = None,
+        health_check_interval=HEALTH_CHECK_INTERVAL,
+        socket_timeout: float | None = None,
+        **connection_kwargs,
+    ):
+        self.host = host
+        self.port = port
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self.health_check_interval = health_check_interval
+        self.socket_timeout = socket_timeout
+        self.connection_kwargs = connection_kwargs
+        self._idle: list[AsyncConnection] = []
+        self._slots = asyncio.Semaphore(max_connections)
+
+    async def get_connection(self) -> AsyncConnection:
+        try:
+            await asyncio.wait_for(self._slots.acquire(), self.timeout)
+        except asyncio.TimeoutError:
+            raise PoolTimeoutError(
+                f"No connection available after {self.timeout} seconds"
+            )
+
+        conn = (
+            self._idle.pop()
+            if self._idle
+            else AsyncConnection(
+                self.host, self.port, self.socket_timeout, **self.connection_kwargs
+            )
+        )
+        try:
+            if not await conn.check_health(self.health_check_interval):
+                await conn.disconnect()
+                await conn.connect()
+        except ConnectionError:
+            self._slots.release()
+            raise
+        return conn
+
+    def release(self, conn: AsyncConnection):
+        if conn.is_connected:
+            self._idle.append(conn)
+        self._slots.release()
+
+    async def disconnect(self):
+        for conn in self._idle:
+            await conn.disconnect()
+        self._idle.clear()
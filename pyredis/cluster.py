@@ -0,0 +1,306 @@
+import asyncio
+import secrets
+import traceback
+from dataclasses import dataclass, field
+from typing import Callable
+
+from pyredis.config import BUFFER_SIZE
+from pyredis.protocol import Array, BulkString, Error, PyRedisData, parse_frame
+from pyredis.store import KeyspaceListener
+
+CLUSTER_SLOTS = 16384
+GOSSIP_INTERVAL_SECONDS = 1
+NODE_TIMEOUT_SECONDS = 2
+
+
+def _crc16_table() -> list[int]:
+    table = []
+    for byte in range(256):
+        crc = byte << 8
+        for _ in range(8):
+            crc = ((crc << 1) ^ 0x1021) if crc & 0x8000 else crc << 1
+        table.append(crc & 0xFFFF)
+    return table
+
+
+_CRC16_TABLE = _crc16_table()
+
+
+def crc16(data: bytes) -> int:
+    """CRC16-CCITT (XMODEM), the checksum Redis Cluster uses for key slots."""
+    crc = 0
+    for byte in data:
+        crc = ((crc << 8) & 0xFFFF) ^ _CRC16_TABLE[((crc >> 8) ^ byte) & 0xFF]
+    return crc
+
+
+def key_hash_slot(key: bytes) -> int:
+    """Only the part between the first `{` and the next `}` is hashed when it is not empty."""
+    start = key.find(b"{")
+    if start != -1:
+        end = key.find(b"}", start + 1)
+        if end > start + 1:
+            key = key[start + 1 : end]
+    return crc16(key) % CLUSTER_SLOTS
+
+
+async def send_command(
+    host: str, port: int, *commands: list[bytes], timeout=NODE_TIMEOUT_SECONDS
+) -> list[PyRedisData]:
+    """Open a short lived connection to another node, pipeline the commands and return their replies."""
+    reader, writer = await asyncio.wait_for(
+        asyncio.open_connection(host, port), timeout
+    )
+    try:
+        writer.write(
+            b"".join(
+                Array([BulkString(arg) for arg in command]).serialize()
+                for command in commands
+            )
+        )
+        await writer.drain()
+
+        replies, buffer = [], bytearray()
+        while len(replies) < len(commands):
+            frame, size = parse_frame(buffer) if buffer else (None, 0)
+            if frame is not None:
+                del buffer[:size]
+                replies.append(frame)
+                continue
+            data = await asyncio.wait_for(reader.read(BUFFER_SIZE), timeout)
+            if not data:
+                raise ConnectionError(f"Connection closed by {host}:{port}")
+            buffer.extend(data)
+        return replies
+    finally:
+        writer.close()
+
+
+@dataclass(eq=False)
+class ClusterNode:
+    id: str
+    host: str
+    port: int
+    myself: bool = False
+    connected: bool = True
+    slots: set[int] = field(default_factory=set)
+    known_ids: set[str] = field(default_factory=set)
+
+    @property
+    def address(self):
+        return f"{self.host}:{self.port}"
+
+
+class ClusterState(KeyspaceListener):
+    """This node's view of the cluster: who owns every hash slot and which slots are being migrated.
+
+    Each node is the authority for its own slots. Other nodes learn the slot map by polling their peers
+    with CLUSTER NODES, which is also how a CLUSTER MEET introduces two nodes to each other.
+    """
+
+    def __init__(self, host: str, port: int):
+        self.myself = ClusterNode(secrets.token_hex(20), host, port, myself=True)
+        self.nodes: dict[str, ClusterNode] = {self.myself.id: self.myself}
+        self.slots: list[ClusterNode | None] = [None] * CLUSTER_SLOTS
+        self.migrating: dict[int, ClusterNode] = {}
+        self.importing: dict[int, ClusterNode] = {}
+        self.slot_keys: dict[int, set[str]] = {}
+        self._tasks: set[asyncio.Task] = set()
+
+    # Slot to key index, kept in step with the datastore.
+    def key_added(self, key: str):
+        self.slot_keys.setdefault(key_hash_slot(key.encode()), set()).add(key)
+
+    def key_removed(self, key: str):
+        slot = key_hash_slot(key.encode())
+        keys = self.slot_keys.get(slot)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self.slot_keys[slot]
+
+    def flushed(self):
+        self.slot_keys = {}
+
+    def count_keys_in_slot(self, slot: int) -> int:
+        return len(self.slot_keys.get(slot, ()))
+
+    def get_keys_in_slot(self, slot: int, count: int) -> list[str]:
+        keys = self.slot_keys.get(slot, ())
+        return [key for key, _ in zip(keys, range(count))]
+
+    # Slot ownership.
+    def assign_slot(self, slot: int, node: ClusterNode):
+        owner = self.slots[slot]
+        if owner is not None:
+            owner.slots.discard(slot)
+        self.slots[slot] = node
+        node.slots.add(slot)
+
+    def unassign_slot(self, slot: int):
+        owner = self.slots[slot]
+        if owner is not None:
+            owner.slots.discard(slot)
+        self.slots[slot] = None
+
+    def slot_ranges(self, node: ClusterNode) -> list[tuple[int, int]]:
+        ranges = []
+        for slot in sorted(node.slots):
+            if ranges and ranges[-1][1] == slot - 1:
+                ranges[-1] = (ranges[-1][0], slot)
+            else:
+                ranges.append((slot, slot))
+        return ranges
+
+    def redirect(
+        self, keys: list[bytes], asking: bool, exists: Callable[[str], bool]
+    ) -> Error | None:
+        """Return the MOVED/ASK/CROSSSLOT error for a command on `keys`, or None when this node serves it."""
+        if not keys:
+            return None
+
+        slot = key_hash_slot(keys[0])
+        for key in keys[1:]:
+            if key_hash_slot(key) != slot:
+                return Error(b"CROSSSLOT Keys in request don't hash to the same slot")
+
+        owner = self.slots[slot]
+        if owner is self.myself:
+            target = self.migrating.get(slot)
+            if target is not None and not all(exists(key.decode()) for key in keys):
+                return Error(f"ASK {slot} {target.address}".encode())
+            return None
+
+        if asking and slot in self.importing:
+            return None
+        if owner is None:
+            return Error(f"CLUSTERDOWN Hash slot {slot} not served".encode())
+        return Error(f"MOVED {slot} {owner.address}".encode())
+
+    def nodes_description(self) -> str:
+        lines = []
+        for node in self.nodes.values():
+            flags = "myself,master" if node.myself else "master"
+            if not node.connected:
+                flags += ",fail?"
+            slots = [
+                str(start) if start == end else f"{start}-{end}"
+                for start, end in self.slot_ranges(node)
+            ]
+            if node.myself:
+                slots.extend(
+                    f"[{slot}->-{target.id}]" for slot, target in self.migrating.items()
+                )
+                slots.extend(
+                    f"[{slot}-<-{source.id}]" for slot, source in self.importing.items()
+                )
+            link = "connected" if node.connected else "disconnected"
+            lines.append(
+                " ".join(
+                    [
+                        node.id,
+                        f"{node.address}@{node.port + 10000}",
+                        flags,
+                        "-",
+                        "0",
+                        "0",
+                        "0",
+                        link,
+                        *slots,
+                    ]
+                )
+            )
+        return "\n".join(lines) + "\n"
+
+    # Discovery of the other nodes.
+    def meet(self, host: str, port: int):
+        self._spawn(self._handshake(host, port))
+
+    def _spawn(self, coro):
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _handshake(self, host: str, port: int):
+        try:
+            node = await self._poll(host, port)
+            if node is not None and self.myself.id not in node.known_ids:
+                await send_command(
+                    host,
+                    port,
+                    [
+                        b"CLUSTER",
+                        b"MEET",
+                        self.myself.host.encode(),
+                        str(self.myself.port).encode(),
+                    ],
+                )
+        except (OSError, ConnectionError, asyncio.TimeoutError) as e:
+            print(f"Cluster meet with {host}:{port} failed: {e}")
+
+    async def _poll(self, host: str, port: int) -> ClusterNode | None:
+        [reply] = await send_command(host, port, [b"CLUSTER", b"NODES"])
+        if isinstance(reply, Error):
+            raise ConnectionError(reply.decode())
+
+        node, known_ids = None, set()
+        for line in reply.decode().splitlines():
+            parts = line.split()
+            if len(parts) < 8:
+                continue
+            node_id, address, flags = parts[0], parts[1], parts[2]
+            known_ids.add(node_id)
+            if node_id == self.myself.id:
+                continue
+
+            node_host, node_port = address.split("@")[0].rsplit(":", 1)
+            peer = self.nodes.get(node_id)
+            if peer is None:
+                peer = ClusterNode(node_id, node_host, int(node_port))
+                self.nodes[node_id] = peer
+                print(f"Cluster learned about node {node_id} at {peer.address}")
+
+            if "myself" in flags:
+                # The polled node is the authority for its own slots.
+                node = peer
+                node.host, node.port, node.connected = host, port, True
+                self._update_slots(node, parts[8:])
+
+        if node is not None:
+            node.known_ids = known_ids
+        return node
+
+    def _update_slots(self, node: ClusterNode, slot_ranges: list[str]):
+        claimed = set()
+        for slot_range in slot_ranges:
+            if slot_range.startswith("["):
+                continue
+            start, _, end = slot_range.partition("-")
+            claimed.update(range(int(start), int(end or start) + 1))
+
+        for slot in node.slots - claimed:
+            self.unassign_slot(slot)
+        for slot in claimed - node.slots:
+            if self.slots[slot] is not self.myself:
+                self.assign_slot(slot, node)
+
+    async def run_gossip(self, interval_seconds=GOSSIP_INTERVAL_SECONDS):
+        while True:
+            try:
+                for node in list(self.nodes.values()):
+                    if node.myself:
+                        continue
+                    try:
+                        await self._poll(node.host, node.port)
+                    except (OSError, ConnectionError, asyncio.TimeoutError):
+                        node.connected = False
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                print("Cluster gossip encountered an issue")
+                traceback.print_exc()
+            await asyncio.sleep(interval_seconds)
+
+    def stop(self):
+        for task in self._tasks:
+            task.cancel()
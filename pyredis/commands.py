@@ -1,25 +1,102 @@
+import asyncio
+import math
+import time
+import tracemalloc
+from dataclasses import dataclass
+from datetime import datetime, timedelta
 from enum import Enum
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Callable
 
+from pyredis.bitmap import (
+    BitOp,
+    bit_count,
+    bit_op,
+    bit_pos,
+    get_bit,
+    normalize_range,
+    set_bit,
+)
+from pyredis.cluster import CLUSTER_SLOTS, key_hash_slot, send_command
+from pyredis.config import MEMORY_USAGE_SAMPLES, STREAM_NODE_MAX_ENTRIES
+from pyredis.encoding import (
+    INTEGER_MAX,
+    INTEGER_MIN,
+    OBJ_SHARED_INTEGERS,
+    compact_string,
+    encode_string,
+    encoding_of,
+    format_float,
+    from_resp,
+    is_string,
+    parse_float,
+    parse_integer,
+    shared_integer,
+    string_bytes,
+    to_resp,
+    type_name,
+)
+from pyredis.glob import glob_match, literal_prefix
+from pyredis.hyperloglog import (
+    HLL_REGISTERS,
+    InvalidHyperLogLog,
+    add_elements,
+    cardinality,
+    estimate,
+    from_registers,
+    is_hyperloglog,
+    max_registers,
+    new_hyperloglog,
+    to_registers,
+)
+from pyredis.memory import key_usage, memory_stats
+from pyredis.prefix import cursor_key, key_cursor
+from pyredis.profiler import ProfilerMode
 from pyredis.protocol import (
     Array,
     BulkString,
     Error,
     Integer,
+    Map,
+    NilArray,
+    Null,
     NullArray,
     NullBulkString,
+    PyRedisData,
+    Set,
     SimpleString,
+    parse_frame,
+    to_resp2,
 )
+from pyredis.session import ClientClass, ClientRegistry, Session, TrackingOptions
 from pyredis.set_args_parser import (
     CommandParserException,
     ParseSetArgs,
     SetArgs,
     get_expiry_time,
+    unix_ms,
+)
+from pyredis.store import Databases, DataStoreWithLock
+from pyredis.stream import (
+    ID_MAX_PART,
+    MAX_ID,
+    MIN_ID,
+    ConsumerGroup,
+    Stream,
+    StreamError,
+    StreamID,
+    entries_to_resp,
+    format_id,
+    next_id,
+    parse_id,
+    previous_id,
 )
-from pyredis.store import DataStoreWithLock
 
 if TYPE_CHECKING:
+    from pyredis.cluster import ClusterState
+    from pyredis.monitor import Monitor
     from pyredis.persist import AOF
+    from pyredis.replication import ReplicationManager
+    from pyredis.tracking import TrackingTable
 
 
 class ActiveCommand(Enum):
@@ -33,23 +110,166 @@ class ActiveCommand(Enum):
     DEL = "DEL"
     INCR = "INCR"
     DECR = "DECR"
+    INCRBY = "INCRBY"
+    DECRBY = "DECRBY"
+    INCRBYFLOAT = "INCRBYFLOAT"
     SET = "SET"
     GET = "GET"
     LPUSH = "LPUSH"
     RPUSH = "RPUSH"
     LRANGE = "LRANGE"
+    LPOP = "LPOP"
+    RPOP = "RPOP"
+    LMOVE = "LMOVE"
+    BLPOP = "BLPOP"
+    BRPOP = "BRPOP"
+    BLMOVE = "BLMOVE"
+    APPEND = "APPEND"
+    GETRANGE = "GETRANGE"
+    SETRANGE = "SETRANGE"
+    STRLEN = "STRLEN"
+    SLOWLOG = "SLOWLOG"
+    LATENCY = "LATENCY"
+    REPLICAOF = "REPLICAOF"
+    ROLE = "ROLE"
+    CLUSTER = "CLUSTER"
+    ASKING = "ASKING"
+    MIGRATE = "MIGRATE"
+    DUMP = "DUMP"
+    RESTORE = "RESTORE"
+    HELLO = "HELLO"
+    UNLINK = "UNLINK"
+    FLUSHDB = "FLUSHDB"
+    FLUSHALL = "FLUSHALL"
+    SELECT = "SELECT"
+    SWAPDB = "SWAPDB"
+    MEMORY = "MEMORY"
+    TYPE = "TYPE"
+    SCAN = "SCAN"
+    KEYS = "KEYS"
+    DELPREFIX = "DELPREFIX"
+    OBJECT = "OBJECT"
+    DEBUG = "DEBUG"
+    CLIENT = "CLIENT"
+    PFADD = "PFADD"
+    PFCOUNT = "PFCOUNT"
+    PFMERGE = "PFMERGE"
+    SETBIT = "SETBIT"
+    GETBIT = "GETBIT"
+    BITCOUNT = "BITCOUNT"
+    BITOP = "BITOP"
+    BITPOS = "BITPOS"
+    XADD = "XADD"
+    XRANGE = "XRANGE"
+    XREVRANGE = "XREVRANGE"
+    XLEN = "XLEN"
+    XTRIM = "XTRIM"
+    XREAD = "XREAD"
+    XGROUP = "XGROUP"
+    XREADGROUP = "XREADGROUP"
+    XACK = "XACK"
+    XPENDING = "XPENDING"
+    HOTKEYS = "HOTKEYS"
+
+
+MAX_STRING_LENGTH = 512 * 1024 * 1024
+WRONG_TYPE = b"WRONGTYPE Operation against a key holding the wrong kind of value"
+INVALID_HLL = b"WRONGTYPE Key is not a valid HyperLogLog string value."
+CORRUPTED_HLL = b"INVALIDOBJ Corrupted HLL object detected"
+INVALID_STREAM_ID = b"ERR Invalid stream ID specified as stream command argument"
 
 
+_CLIENT_TYPES = {
+    "normal": ClientClass.NORMAL,
+    "replica": ClientClass.REPLICA,
+    "slave": ClientClass.REPLICA,
+}
+
 _cmd_registry = {}
+SINGLE_KEY = (1, 1, 1)
+
+
+@dataclass(frozen=True, slots=True)
+class CommandSpec:
+    """The metadata of a command, as reported by COMMAND INFO."""
+
+    name: str
+    # The number of arguments including the command name, at least -arity of them when negative.
+    arity: int
+    flags: tuple[str, ...]
+    keys: tuple[int, int, int] | Callable[[list], list] | None
+
+    @property
+    def write(self) -> bool:
+        return "write" in self.flags
+
+    def accepts(self, argc: int) -> bool:
+        return argc == self.arity if self.arity >= 0 else argc >= -self.arity
 
+    def to_resp(self) -> Array:
+        """name, arity, flags, first key, last key, step, commands with movable keys report 0 0 0."""
+        first, last, step = self.keys if isinstance(self.keys, tuple) else (0, 0, 0)
+        return Array(
+            [
+                BulkString(self.name.lower().encode()),
+                Integer(self.arity),
+                Set([SimpleString(flag.encode()) for flag in self.flags]),
+                Integer(first),
+                Integer(last),
+                Integer(step),
+            ]
+        )
+
+
+_command_specs: dict[ActiveCommand, CommandSpec] = {}
+
+
+def _streams_keys(args: list) -> list:
+    """The keys of XREAD and XREADGROUP, the first half of the arguments after STREAMS."""
+    for i, arg in enumerate(args):
+        if bytes(arg.data).upper() == b"STREAMS":
+            rest = args[i + 1 :]
+            return rest[: len(rest) // 2]
+    return []
+
+
+def select_command(db: int) -> Array:
+    return Array([BulkString(b"SELECT"), BulkString(str(db).encode())])
+
+
+def selected_db(request: Array) -> int | None:
+    """The database a SELECT switches to, None for other commands. Streams of commands applied without a
+    client, like the AOF and the replication stream, follow their SELECTs themselves."""
+    if len(request.data) != 2 or bytes(request.data[0].data).upper() != b"SELECT":
+        return None
+    return parse_integer(request.data[1].data)
+
+
+def register_command(
+    name: ActiveCommand,
+    arity: int,
+    write=False,
+    admin=False,
+    blocking=False,
+    keys: tuple[int, int, int] | Callable[[list], list] | None = None,
+):
+    """`arity` counts the command name, a negative arity is a minimum. `keys` is the (first, last, step)
+    position of the key arguments, a negative last counts from the end, or a function picking the keys out
+    of the request arguments."""
+    flags = ["write" if write else "readonly"] if not admin else ["admin"]
+    if blocking:
+        flags.append("blocking")
+    if callable(keys):
+        flags.append("movablekeys")
 
-def register_command(name: ActiveCommand):
     def decorator(func):
         async def log_request(*args, **kwargs):
-            print(f"CMD - {name}: {args[0].request.decode()}")
+            # Values such as HyperLogLogs are binary, they are logged escaped.
+            print(f"CMD - {name}: {args[0].request.decode(errors='backslashreplace')}")
             return await func(*args, **kwargs)
 
         _cmd_registry[name] = log_request
+        _command_specs[name] = CommandSpec(name.value, arity, tuple(flags), keys)
         return log_request
 
     return decorator
@@ -57,7 +277,18 @@ def register_command(name: ActiveCommand):
 
 class Command:
     def __init__(
-        self, request: Array, datastore: DataStoreWithLock, cmd_logger: AOF | None
+        self,
+        request: Array,
+        datastore: DataStoreWithLock,
+        cmd_logger: AOF | None,
+        monitor: Monitor | None = None,
+        replication: ReplicationManager | None = None,
+        replicated=False,
+        cluster: ClusterState | None = None,
+        session: Session | None = None,
+        clients: ClientRegistry | None = None,
+        tracking: TrackingTable | None = None,
+        databases: Databases | None = None,
     ):
         try:
             self.cmd = ActiveCommand(request.data[0].decode().upper())
@@ -68,93 +299,473 @@ class Command:
         self.request = request
         self.handler = _cmd_registry.get(self.cmd)
         self.datastore = datastore
+        self.monitor = monitor
+        self.replication = replication
+        self.replicated = replicated
+        self.cluster = cluster
+        self.session = session
+        self.clients = clients
+        self.tracking = tracking
+        # All the logical databases, `datastore` is the selected one.
+        self.databases = databases
+        # Time spent blocked waiting for a key, which isn't execution time for the slowlog.
+        self._blocked_ns = 0
 
     async def exec(self):
         if self.handler is None:
             return await self.not_found()
+        spec = _command_specs[self.cmd]
+        if not spec.accepts(len(self.request.data)):
+            return Error(
+                f"ERR wrong number of arguments for '{spec.name.lower()}' command".encode()
+            )
+
+        is_write = spec.write
+        if (
+            is_write
+            and not self.replicated
+            and self.replication
+            and self.replication.is_replica
+        ):
+            return Error(b"READONLY You can't write against a read only replica.")
+
+        asking = False
+        if self.session is not None:
+            asking, self.session.asking = self.session.asking, False
+        if self.cluster is not None and not self.replicated:
+            redirect = self.cluster.redirect(
+                self.keys(),
+                asking,
+                lambda key: self.datastore.get(key, touch=False) is not None,
+            )
+            if redirect is not None:
+                return redirect
+
+        self._dirty = self.datastore.dirty
+        if self.monitor is None:
+            response = await self.handler(self)
+        else:
+            hotkeys = self.monitor.hotkeys
+            if spec.keys is not None and hotkeys.sample():
+                for key in self.keys():
+                    hotkeys.add(key)
+            start = time.perf_counter_ns()
+            response = await self.handler(self)
+            self.monitor.slowlog.observe(
+                self.request, time.perf_counter_ns() - start - self._blocked_ns
+            )
+
+        # Only writes that changed the data are logged and replicated, a SET NX on an existing key or a
+        # BLPOP that timed out leaves nothing to replay. Logged once done, so a blocking command is
+        # replayed after the write that woke it up. A handler can replace the request with a
+        # deterministic form, like XADD with the ID it generated or SET with an absolute expiry.
+        if is_write and self.datastore.dirty != self._dirty:
+            if self.cmd_logger:
+                self.cmd_logger.log(self.request, self.datastore.index)
+            if self.replication:
+                self.replication.propagate(self.request, self.datastore.index)
+        if self.tracking is not None and self.tracking.active:
+            self._track(is_write)
+        return response
+
+    def _track(self, is_write: bool):
+        if is_write:
+            self.tracking.invalidate_keys(self.keys(), self.session)
+        elif self.session is not None and self.session.tracking is not None:
+            keys = self.keys()
+            if keys:
+                self.tracking.remember(self.session, keys)
+            # CLIENT CACHING only applies to the command that follows it.
+            if self.cmd is not ActiveCommand.CLIENT:
+                self.session.caching = None
+
+    def keys(self) -> list[bytes]:
+        spec = _command_specs[self.cmd].keys
+        if spec is None:
+            return []
+        if callable(spec):
+            return [part.data for part in spec(self.request.data)]
+        first, last, step = spec
+        if last < 0:
+            last = len(self.request.data) + last
+        return [part.data for part in self.request.data[first : last + 1 : step]]
+
+    def _reply(self, frame: PyRedisData) -> PyRedisData:
+        """Send RESP3 replies as is to clients that negotiated it with HELLO, downgraded otherwise."""
+        if self.session is not None and self.session.protocol == 3:
+            return frame
+        return to_resp2(frame)
+
+    def _propagate(self, request: Array):
+        """Log and replicate a write that a command performs on behalf of its caller."""
         if self.cmd_logger:
-            self.cmd_logger.log(self.request)
-        return await self.handler(self)
+            self.cmd_logger.log(request, self.datastore.index)
+        if self.replication:
+            self.replication.propagate(request, self.datastore.index)
 
     # ECHO  *2\r\n$4\r\nECHO\r\n$11\r\nhello world\r\n
-    @register_command(ActiveCommand.ECHO)
+    @register_command(ActiveCommand.ECHO, 2)
     async def echo(self):
         return self.request.data[1]
 
-    @register_command(ActiveCommand.DBSIZE)
+    @register_command(ActiveCommand.DBSIZE, 1)
     async def db_size(self):
         return Integer(str(self.datastore.size()).encode())
 
     # *1\r\n$4\r\nPING\r\n
-    @register_command(ActiveCommand.PING)
+    @register_command(ActiveCommand.PING, -1)
     async def ping(self):
         return SimpleString(b"PONG")
 
-    @register_command(ActiveCommand.NOT_FOUND)
+    @register_command(ActiveCommand.NOT_FOUND, -1)
     async def not_found(self):
         return Error(f"Command `{self.cmd}` not found".encode())
 
-    @register_command(ActiveCommand.INFO)
+    @register_command(ActiveCommand.INFO, -1)
     async def info(self):
-        return SimpleString(b"Running")
+        sections = {
+            "clients": self._info_clients,
+            "memory": self._info_memory,
+            "stats": self._info_stats,
+            "replication": self._info_replication,
+            "keyspace": self._info_keyspace,
+            "hotkeys": self._info_hotkeys,
+        }
+        requested = [arg.decode().lower() for arg in self.request.data[1:]]
+        if not requested or "all" in requested or "everything" in requested:
+            requested = list(sections)
 
-    @register_command(ActiveCommand.COMMAND)
-    async def info(self):
-        return SimpleString(b"Not Implemented")
+        lines = []
+        for name in requested:
+            if name in sections:
+                lines.append(f"# {name.capitalize()}")
+                lines.extend(f"{field}:{value}" for field, value in sections[name]())
+                lines.append("")
+        return BulkString("\r\n".join(lines).encode())
+
+    def _info_clients(self):
+        sessions = self.clients.sessions.values() if self.clients else ()
+        return [
+            ("connected_clients", len(sessions)),
+            (
+                "client_recent_max_output_buffer",
+                max((session.output_bytes for session in sessions), default=0),
+            ),
+            (
+                "client_recent_max_input_buffer",
+                max((len(session.query_buffer) for session in sessions), default=0),
+            ),
+            (
+                "blocked_clients",
+                sum(db.blocking.blocked_clients for db in self._databases()),
+            ),
+            (
+                "tracking_clients",
+                self.tracking.tracking_clients if self.tracking else 0,
+            ),
+            ("tracking_total_keys", len(self.tracking.keys) if self.tracking else 0),
+            (
+                "tracking_total_prefixes",
+                len(self.tracking.prefixes) if self.tracking else 0,
+            ),
+        ]
+
+    def _info_memory(self):
+        reclaimer = self.datastore.reclaimer
+        return [
+            ("lazyfree_pending_objects", reclaimer.pending_objects if reclaimer else 0),
+            ("lazyfreed_objects", reclaimer.freed_objects if reclaimer else 0),
+            ("lazyfree_mode", "yes" if self.datastore.lazyfree else "no"),
+            ("tracemalloc_tracing", int(tracemalloc.is_tracing())),
+            ("tracemalloc_traced_bytes", tracemalloc.get_traced_memory()[0]),
+        ]
+
+    def _info_stats(self):
+        return [
+            (
+                "client_output_buffer_limit_disconnections",
+                self.clients.output_limit_disconnections if self.clients else 0,
+            ),
+            (
+                "profiler_mode",
+                self.monitor.profiler.mode or "none" if self.monitor else "none",
+            ),
+        ]
+
+    def _info_replication(self):
+        if self.replication is None:
+            return [("role", "master")]
+
+        fields = [("role", self.replication.role)]
+        if self.replication.is_replica:
+            host, port = self.replication.leader
+            link_up = self.replication.link_state == "connected"
+            fields.extend(
+                [
+                    ("master_host", host),
+                    ("master_port", port),
+                    ("master_link_status", "up" if link_up else "down"),
+                    ("slave_repl_offset", self.replication.offset),
+                ]
+            )
+        fields.append(("connected_slaves", len(self.replication.replicas)))
+        for i, replica in enumerate(self.replication.replicas):
+            fields.append(
+                (
+                    f"slave{i}",
+                    f"ip={replica.host},port={replica.port},"
+                    f"offset={self.replication.offset - replica.pending}",
+                )
+            )
+        fields.extend(
+            [
+                ("master_replid", self.replication.replid),
+                ("master_repl_offset", self.replication.offset),
+                ("repl_backlog_size", self.replication.backlog.size),
+                (
+                    "repl_backlog_first_byte_offset",
+                    self.replication.backlog.start_offset,
+                ),
+                ("repl_backlog_histlen", self.replication.backlog.history),
+            ]
+        )
+        return fields
+
+    def _info_keyspace(self):
+        return [
+            (f"db{db.index}", f"keys={db.size()}")
+            for db in self._databases()
+            if db.size()
+        ]
+
+    def _info_hotkeys(self):
+        if self.monitor is None:
+            return []
+        hotkeys = self.monitor.hotkeys
+        return [
+            ("hotkeys_sample_rate", hotkeys.sample_rate),
+            ("hotkeys_sampled_commands", hotkeys.sampled),
+            ("hotkeys_memory", hotkeys.memory_usage()),
+        ] + [
+            (
+                f"hotkey{rank}",
+                f"key={key.decode(errors='backslashreplace')},accesses={hits}",
+            )
+            for rank, (key, hits) in enumerate(hotkeys.hottest())
+        ]
+
+    def _databases(self) -> Databases | list[DataStoreWithLock]:
+        return self.databases if self.databases is not None else [self.datastore]
+
+    # COMMAND [COUNT | LIST | INFO [command ...] | GETKEYS command [arg ...]]
+    @register_command(ActiveCommand.COMMAND, -1)
+    async def command(self):
+        specs = {
+            name.value: spec
+            for name, spec in _command_specs.items()
+            if name is not ActiveCommand.NOT_FOUND
+        }
+        args = self.request.decode()[1:]
+        match [args[0].upper(), *args[1:]] if args else []:
+            case []:
+                return self._reply(Array([spec.to_resp() for spec in specs.values()]))
+            case ["COUNT"]:
+                return Integer(len(specs))
+            case ["LIST"]:
+                return Array([BulkString(name.lower().encode()) for name in specs])
+            case ["INFO", *names]:
+                names = names or list(specs)
+                return self._reply(
+                    Array(
+                        [
+                            (
+                                specs[name.upper()].to_resp()
+                                if name.upper() in specs
+                                else Null()
+                            )
+                            for name in names
+                        ]
+                    )
+                )
+            case ["GETKEYS", name, *_]:
+                spec = specs.get(name.upper())
+                if spec is None:
+                    return Error(b"ERR Invalid command specified")
+                if not spec.accepts(len(args) - 1):
+                    return Error(
+                        b"ERR Invalid number of arguments specified for command"
+                    )
+                keys = Command(
+                    Array(self.request.data[2:]), self.datastore, None
+                ).keys()
+                if not keys:
+                    return Error(b"ERR The command has no key arguments")
+                return Array([BulkString(key) for key in keys])
+            case [subcommand, *_]:
+                return Error(
+                    f"Unknown COMMAND subcommand or wrong number of arguments `{subcommand}`".encode()
+                )
 
-    @register_command(ActiveCommand.EXISTS)
+    @register_command(ActiveCommand.EXISTS, 2, keys=SINGLE_KEY)
     async def exists(self):
         key = self.request.data[1].decode()
         if self.datastore.get(key):
             return SimpleString(b"OK")
         return NullBulkString()
 
-    @register_command(ActiveCommand.DEL)
+    @register_command(ActiveCommand.DEL, 2, write=True, keys=SINGLE_KEY)
     async def delete(self):
         key = self.request.data[1].decode()
         if self.datastore.delete(key):
             return SimpleString(b"OK")
         return NullBulkString()
 
-    @register_command(ActiveCommand.INCR)
+    @register_command(ActiveCommand.UNLINK, -2, write=True, keys=(1, -1, 1))
+    async def unlink(self):
+        return Integer(
+            sum(self.datastore.unlink(key) for key in self.request.decode()[1:])
+        )
+
+    @register_command(ActiveCommand.FLUSHDB, -1, write=True)
+    async def flush_db(self):
+        return self._flush(self.datastore)
+
+    @register_command(ActiveCommand.FLUSHALL, -1, write=True)
+    async def flush_all(self):
+        return self._flush(
+            self.databases if self.databases is not None else self.datastore
+        )
+
+    # FLUSHDB|FLUSHALL [ASYNC|SYNC]
+    def _flush(self, target: Databases | DataStoreWithLock):
+        match [arg.upper() for arg in self.request.decode()[1:]]:
+            case []:
+                target.flush()
+            case ["ASYNC"]:
+                target.flush(lazy=True)
+            case ["SYNC"]:
+                target.flush()
+            case _:
+                return Error(b"ERR syntax error")
+        # Logged even when there was nothing to flush, like Redis, FLUSHALL also empties other databases.
+        self.datastore.dirty += 1
+        return SimpleString(b"OK")
+
+    # SELECT index
+    @register_command(ActiveCommand.SELECT, 2)
+    async def select(self):
+        index = parse_integer(self.request.data[1].data)
+        if index is None:
+            return Error(b"ERR value is not an integer or out of range")
+        if self.cluster is not None and index != 0:
+            return Error(b"ERR SELECT is not allowed in cluster mode")
+        if not 0 <= index < len(self._databases()):
+            return Error(b"ERR DB index is out of range")
+        if self.session is not None:
+            self.session.db = index
+        return SimpleString(b"OK")
+
+    # SWAPDB index1 index2
+    @register_command(ActiveCommand.SWAPDB, 3, write=True)
+    async def swap_db(self):
+        if self.cluster is not None:
+            return Error(b"ERR SWAPDB is not allowed in cluster mode")
+        first = parse_integer(self.request.data[1].data)
+        if first is None:
+            return Error(b"ERR invalid first DB index")
+        second = parse_integer(self.request.data[2].data)
+        if second is None:
+            return Error(b"ERR invalid second DB index")
+        count = len(self._databases())
+        if not (0 <= first < count and 0 <= second < count):
+            return Error(b"ERR DB index is out of range")
+        if self.databases is not None:
+            self.databases.swap(first, second)
+        # The selected database can be neither of the two.
+        self.datastore.dirty += 1
+        return SimpleString(b"OK")
+
+    @register_command(ActiveCommand.INCR, 2, write=True, keys=SINGLE_KEY)
     async def incr(self):
+        return await self._incr_by(1)
+
+    @register_command(ActiveCommand.DECR, 2, write=True, keys=SINGLE_KEY)
+    async def decr(self):
+        return await self._incr_by(-1)
+
+    @register_command(ActiveCommand.INCRBY, 3, write=True, keys=SINGLE_KEY)
+    async def incr_by(self):
+        increment = parse_integer(self.request.data[2].data)
+        if increment is None:
+            return Error(b"ERR value is not an integer or out of range")
+        return await self._incr_by(increment)
+
+    @register_command(ActiveCommand.DECRBY, 3, write=True, keys=SINGLE_KEY)
+    async def decr_by(self):
+        decrement = parse_integer(self.request.data[2].data)
+        if decrement is None or decrement == INTEGER_MIN:
+            return Error(b"ERR value is not an integer or out of range")
+        return await self._incr_by(-decrement)
+
+    async def _incr_by(self, increment: int) -> PyRedisData:
+        """Add to the integer value of a key, the result is stored as an int and a missing key counts as 0."""
         key = self.request.data[1].decode()
         async with self.datastore.atomic():
-            result = self.datastore.get(key)
-            if result and isinstance(result.value, Integer):
-                new_value = Integer(str(result.value.decode() + 1).encode())
-                if self.datastore.set(key, new_value, result.expiry):
-                    return new_value
+            record = self.datastore.get(key)
+            if record is None:
+                current = 0
+            elif isinstance(record.value, int):
+                current = record.value
+            elif not is_string(record.value):
+                return Error(WRONG_TYPE)
+            else:
+                current = parse_integer(record.value)
+                if current is None:
+                    return Error(b"ERR value is not an integer or out of range")
 
-            return NullBulkString()
+            value = current + increment
+            if not INTEGER_MIN <= value <= INTEGER_MAX:
+                return Error(b"ERR increment or decrement would overflow")
+            self.datastore.set(
+                key, shared_integer(value), record.expiry if record else None
+            )
+            return Integer(value)
+
+    @register_command(ActiveCommand.INCRBYFLOAT, 3, write=True, keys=SINGLE_KEY)
+    async def incr_by_float(self):
+        increment = parse_float(self.request.data[2].data)
+        if increment is None:
+            return Error(b"ERR value is not a valid float")
 
-    @register_command(ActiveCommand.DECR)
-    async def decr(self):
         key = self.request.data[1].decode()
         async with self.datastore.atomic():
-            result = self.datastore.get(key)
-            if result and isinstance(result.value, Integer):
-                new_value = Integer(str(result.value.decode() - 1).encode())
-                if self.datastore.set(key, new_value, result.expiry):
-                    return new_value
+            record = self.datastore.get(key)
+            if record is None:
+                current = 0.0
+            elif not is_string(record.value):
+                return Error(WRONG_TYPE)
+            else:
+                current = parse_float(string_bytes(record.value))
+                if current is None:
+                    return Error(b"ERR value is not a valid float")
 
-            return NullBulkString()
+            value = current + increment
+            if not math.isfinite(value):
+                return Error(b"ERR increment would produce NaN or Infinity")
+            # Stored as a string like Redis does, an integral result is not turned back into an int.
+            result = format_float(value)
+            self.datastore.set(
+                key, compact_string(result), record.expiry if record else None
+            )
+            return BulkString(result)
 
     # *3\r\n$3\r\nSET\r\n$5\r\nmykey\r\n$7\r\nmyvalue\r\n
-    @register_command(ActiveCommand.SET)
+    @register_command(ActiveCommand.SET, -3, write=True, keys=SINGLE_KEY)
     async def set_key(self):
-        if len(self.request.data) < 3:
-            return Error(b"Wrong number of arguments for `set` command")
-
         expiry = None
         old_record = None
         key = self.request.data[1].decode()
-        value = self.request.data[2]
-
-        try:
-            value = Integer(value.decode().encode())
-        except ValueError:
-            pass
+        value = encode_string(self.request.data[2].data)
 
         try:
             parser = ParseSetArgs(self.request).parse_set_args()
@@ -167,90 +778,188 @@ class Command:
                 return Error(f"Key {key} already exists and NX sent".encode())
             elif parser.set_flag == SetArgs.XX and old_record is None:
                 return Error(f"Key {key} does not exist and XX sent".encode())
+            # Checked before the write, a SET GET on another type leaves the key as it was.
+            if (
+                parser.get_flag
+                and old_record is not None
+                and not is_string(old_record.value)
+            ):
+                return Error(WRONG_TYPE)
 
         if parser.expiry_opt:
             expiry = get_expiry_time(parser.expiry_opt)
 
         is_set = self.datastore.set(key, value, expiry)
+        if parser.opts_exist():
+            # Logged and replicated as the plain write it came down to, with an absolute expiry: EX or PX
+            # replayed later would push the expiry back.
+            args = self.request.data[1:3]
+            if expiry is not None:
+                args += [BulkString(b"PXAT"), BulkString(str(unix_ms(expiry)).encode())]
+            self._rewrite(ActiveCommand.SET, args)
 
         if parser.get_flag:
             if old_record is None:
                 return NullBulkString()
-            if not isinstance(old_record.value, BulkString):
-                return Error(
-                    f"ERR old key {old_record.value.decode()} is not string".encode()
-                )
-            else:
-                return old_record.value
+            return to_resp(old_record.value)
 
         return SimpleString(b"OK") if is_set else Error(b"Failed to set key:value")
 
     # *2\r\n$3\r\nGET\r\n$5\r\nmykey\r\n
-    @register_command(ActiveCommand.GET)
+    @register_command(ActiveCommand.GET, 2, keys=SINGLE_KEY)
     async def get_key(self):
-        if len(self.request.data) != 2:
-            return Error(b"GET does not require more than one argument")
         key = self.request.data[1].decode()
         result = self.datastore.get(key)
         if result is None:
             return NullBulkString()
 
-        if isinstance(result.value, Integer):
-            return BulkString(str(result.value.decode()).encode())
-        return result.value
+        if not is_string(result.value):
+            return Error(WRONG_TYPE)
+        return to_resp(result.value)
+
+    def _string_buffer(self, key: str) -> tuple[bytearray | None, Error | None]:
+        """The raw buffer of a string value, int and embstr values are converted once."""
+        record = self.datastore.get(key)
+        if record is None:
+            return None, None
+        if isinstance(record.value, bytearray):
+            return record.value, None
+        if not is_string(record.value):
+            return None, Error(WRONG_TYPE)
+        buffer = bytearray(string_bytes(record.value))
+        self.datastore.set(key, buffer, record.expiry)
+        return buffer, None
+
+    def _touch(self, key: str):
+        """Mark an in place change of a value as a write."""
+        record = self.datastore.get(key, touch=False)
+        self.datastore.set(key, record.value, record.expiry)
+
+    @register_command(ActiveCommand.APPEND, 3, write=True, keys=SINGLE_KEY)
+    async def append(self):
+        key = self.request.data[1].decode()
+        value = self.request.data[2].data
+
+        buffer, error = self._string_buffer(key)
+        if error:
+            return error
+        if buffer is None:
+            self.datastore.set(key, bytearray(value))
+            return Integer(len(value))
+        if len(buffer) + len(value) > MAX_STRING_LENGTH:
+            return Error(b"ERR string exceeds maximum allowed size")
+
+        buffer.extend(value)
+        self._touch(key)
+        return Integer(len(buffer))
+
+    @register_command(ActiveCommand.SETRANGE, 4, write=True, keys=SINGLE_KEY)
+    async def set_range(self):
+        key = self.request.data[1].decode()
+        value = self.request.data[3].data
+        try:
+            offset = int(self.request.data[2].data)
+        except ValueError:
+            return Error(b"ERR value is not an integer or out of range")
+        if offset < 0:
+            return Error(b"ERR offset is out of range")
+        if offset + len(value) > MAX_STRING_LENGTH:
+            return Error(b"ERR string exceeds maximum allowed size")
+
+        buffer, error = self._string_buffer(key)
+        if error:
+            return error
+        if buffer is None:
+            if not value:
+                return Integer(0)
+            buffer = bytearray()
+            self.datastore.set(key, buffer)
+        if not value:
+            return Integer(len(buffer))
+
+        if offset > len(buffer):
+            buffer.extend(bytes(offset - len(buffer)))
+        buffer[offset : offset + len(value)] = value
+        self._touch(key)
+        return Integer(len(buffer))
+
+    @register_command(ActiveCommand.GETRANGE, 4, keys=SINGLE_KEY)
+    async def get_range(self):
+        try:
+            start = int(self.request.data[2].data)
+            end = int(self.request.data[3].data)
+        except ValueError:
+            return Error(b"ERR value is not an integer or out of range")
+
+        record = self.datastore.get(self.request.data[1].decode())
+        if record is None:
+            return BulkString(b"")
+        if not is_string(record.value):
+            return Error(WRONG_TYPE)
+        value = string_bytes(record.value)
 
-    @register_command(ActiveCommand.LPUSH)
+        length = len(value)
+        start = max(start + length if start < 0 else start, 0)
+        end = min(end + length if end < 0 else end, length - 1)
+        if start > end:
+            return BulkString(b"")
+        # Only the requested range is copied out of the value.
+        with memoryview(value) as view:
+            return BulkString(bytes(view[start : end + 1]))
+
+    @register_command(ActiveCommand.STRLEN, 2, keys=SINGLE_KEY)
+    async def str_len(self):
+        record = self.datastore.get(self.request.data[1].decode())
+        if record is None:
+            return Integer(0)
+        if not is_string(record.value):
+            return Error(WRONG_TYPE)
+        return Integer(len(string_bytes(record.value)))
+
+    @register_command(ActiveCommand.LPUSH, -3, write=True, keys=SINGLE_KEY)
     async def l_push(self):
-        if len(self.request.data) < 3:
-            return Error(b"Wrong number of arguments for `lpush` command")
         key = self.request.data[1].decode()
-        values = self.request.data[2:]
+        values = [
+            compact_string(value.data) for value in reversed(self.request.data[2:])
+        ]
         async with self.datastore.atomic():
             current = self.datastore.get(key)
-            new_value = Array(list(reversed(values)))
             if current:
-                if not isinstance(current.value, Array):
-                    return Error(
-                        f"Value at this key is not an array: {current.value.decode()}".encode()
-                    )
-                new_value.data.extend(current.value.data)
+                if not isinstance(current.value, list):
+                    return Error(WRONG_TYPE)
+                current.value[:0] = values
+                new_value = current.value
+            else:
+                new_value = values
 
             if self.datastore.set(key, new_value, current.expiry if current else None):
-                return Integer(str(len(new_value.data)).encode())
+                self.datastore.blocking.signal(key, len(values))
+                return Integer(len(new_value))
             else:
                 return Error(b"Failed to set new list at key")
 
-    @register_command(ActiveCommand.RPUSH)
+    @register_command(ActiveCommand.RPUSH, -3, write=True, keys=SINGLE_KEY)
     async def r_push(self):
-        if len(self.request.data) < 3:
-            return Error(b"Wrong number of arguments for `lpush` command")
         key = self.request.data[1].decode()
-        values = self.request.data[2:]
+        values = [compact_string(value.data) for value in self.request.data[2:]]
         async with self.datastore.atomic():
             current = self.datastore.get(key)
             if current:
-                if not isinstance(current.value, Array):
-                    return Error(
-                        f"Value at this key is not an array: {current.value.decode()}".encode()
-                    )
-                current.value.data.extend(values)
+                if not isinstance(current.value, list):
+                    return Error(WRONG_TYPE)
+                current.value.extend(values)
                 new_value = current.value
             else:
-                new_value = Array(values)
+                new_value = values
 
             if self.datastore.set(key, new_value, current.expiry if current else None):
-                return Integer(str(len(new_value.data)).encode())
+                self.datastore.blocking.signal(key, len(values))
+                return Integer(len(new_value))
             else:
                 return Error(b"Failed to set new list at key")
 
-    @register_command(ActiveCommand.LRANGE)
+    @register_command(ActiveCommand.LRANGE, 4, keys=SINGLE_KEY)
     async def l_range(self):
-        req_len = len(self.request.data)
-        if req_len != 4:
-            return Error(
-                f"The cmd lrange requires 4 arguments, {req_len} given".encode()
-            )
-
         key = self.request.data[1].decode()
         try:
             start = int(self.request.data[2].decode())
@@ -259,16 +968,2009 @@ class Command:
             return Error(b"Slice indices must be ints")
 
         current = self.datastore.get(key)
-        if not current or not isinstance(current.value, Array):
+        if not current or not isinstance(current.value, list):
             return NullArray()
 
-        if start >= len(current.value.data):
+        if start >= len(current.value):
             return NullArray()
 
-        if start < 0 and start + len(current.value.data) < 0:
+        if start < 0 and start + len(current.value) < 0:
             return NullArray
 
-        if stop > len(current.value.data):
-            return Array(current.value.data[start:])
+        if stop > len(current.value):
+            return Array([BulkString(item) for item in current.value[start:]])
+
+        return Array([BulkString(item) for item in current.value[start:stop]])
+
+    async def _block(self, keys: list[str], timeout: float | None, ready):
+        """Wait up to `timeout` seconds, or forever with None, for `ready(key)` to give a result once one of
+        keys is signalled.
+
+        Replayed and replicated commands have no client to block, they get None right away.
+        """
+        if self.session is None:
+            return None
+        # The writes of other clients while blocked are not changes of this command, only the ones of
+        # `ready` count.
+        waited = self.datastore.dirty
+
+        def retry(key: str):
+            nonlocal waited
+            self._dirty += self.datastore.dirty - waited
+            result = ready(key)
+            waited = self.datastore.dirty
+            return result
+
+        self.session.blocked = True
+        start = time.perf_counter_ns()
+        try:
+            return await self.datastore.blocking.wait(keys, timeout, retry)
+        finally:
+            self._blocked_ns += time.perf_counter_ns() - start
+            self._dirty += self.datastore.dirty - waited
+            self.session.blocked = False
+
+    @staticmethod
+    def _timeout(data: bytes) -> float | None | Error:
+        """The timeout of a blocking list command in seconds, None for 0 which blocks forever."""
+        timeout = parse_float(data)
+        if timeout is None:
+            return Error(b"ERR timeout is not a float or out of range")
+        if timeout < 0:
+            return Error(b"ERR timeout is negative")
+        return timeout or None
+
+    @staticmethod
+    def _direction(data: bytes) -> bool | Error:
+        """True for LEFT, False for RIGHT."""
+        direction = bytes(data).upper()
+        if direction not in (b"LEFT", b"RIGHT"):
+            return Error(b"ERR syntax error")
+        return direction == b"LEFT"
+
+    def _pop(self, key: str, left: bool) -> bytes | bytearray | Error | None:
+        """Pop an element from the list at key, the key goes away with its last element."""
+        record = self.datastore.get(key)
+        if record is None:
+            return None
+        if not isinstance(record.value, list):
+            return Error(WRONG_TYPE)
+        value = record.value.pop(0 if left else -1)
+        if record.value:
+            self._touch(key)
+        else:
+            self.datastore.delete(key)
+        return value
+
+    def _move(
+        self, source: str, destination: str, from_left: bool, to_left: bool
+    ) -> bytes | bytearray | Error | None:
+        """Pop an element from source and push it to destination, which wakes the clients blocked on it."""
+        record = self.datastore.get(source)
+        if record is None:
+            return None
+        target = self.datastore.get(destination, touch=False)
+        if not isinstance(record.value, list) or (
+            target is not None and not isinstance(target.value, list)
+        ):
+            return Error(WRONG_TYPE)
+
+        value = self._pop(source, from_left)
+        target = self.datastore.get(destination)
+        if target is None:
+            self.datastore.set(destination, [value])
+        else:
+            target.value.insert(0 if to_left else len(target.value), value)
+            self._touch(destination)
+        self.datastore.blocking.signal(destination, 1)
+        return value
+
+    @register_command(ActiveCommand.LPOP, 2, write=True, keys=SINGLE_KEY)
+    async def l_pop(self):
+        return self._pop_command(left=True)
+
+    @register_command(ActiveCommand.RPOP, 2, write=True, keys=SINGLE_KEY)
+    async def r_pop(self):
+        return self._pop_command(left=False)
+
+    def _pop_command(self, left: bool):
+        value = self._pop(self.request.data[1].decode(), left)
+        if value is None:
+            return NullBulkString()
+        return value if isinstance(value, Error) else BulkString(value)
+
+    # LMOVE source destination LEFT|RIGHT LEFT|RIGHT
+    @register_command(ActiveCommand.LMOVE, 5, write=True, keys=(1, 2, 1))
+    async def l_move(self):
+        return await self._move_command(timeout=None, block=False)
+
+    # BLMOVE source destination LEFT|RIGHT LEFT|RIGHT timeout
+    @register_command(
+        ActiveCommand.BLMOVE, 6, write=True, blocking=True, keys=(1, 2, 1)
+    )
+    async def bl_move(self):
+        timeout = self._timeout(self.request.data[5].data)
+        if isinstance(timeout, Error):
+            return timeout
+        return await self._move_command(timeout, block=True)
+
+    async def _move_command(self, timeout: float | None, block: bool):
+        source, destination = (part.decode() for part in self.request.data[1:3])
+        from_left, to_left = (
+            self._direction(part.data) for part in self.request.data[3:5]
+        )
+        for direction in (from_left, to_left):
+            if isinstance(direction, Error):
+                return direction
+
+        value = self._move(source, destination, from_left, to_left)
+        if value is None and block:
+            value = await self._block(
+                [source],
+                timeout,
+                lambda key: self._move(source, destination, from_left, to_left),
+            )
+        if value is None:
+            return NullBulkString()
+        if isinstance(value, Error):
+            return value
+        if block:
+            # Logged and replicated as the move it came down to, like Redis.
+            self._rewrite(ActiveCommand.LMOVE, self.request.data[1:5])
+        return BulkString(value)
+
+    # BLPOP key [key ...] timeout
+    @register_command(
+        ActiveCommand.BLPOP, -3, write=True, blocking=True, keys=(1, -2, 1)
+    )
+    async def bl_pop(self):
+        return await self._blocking_pop(left=True)
+
+    # BRPOP key [key ...] timeout
+    @register_command(
+        ActiveCommand.BRPOP, -3, write=True, blocking=True, keys=(1, -2, 1)
+    )
+    async def br_pop(self):
+        return await self._blocking_pop(left=False)
+
+    async def _blocking_pop(self, left: bool):
+        keys = [part.decode() for part in self.request.data[1:-1]]
+        timeout = self._timeout(self.request.data[-1].data)
+        if isinstance(timeout, Error):
+            return timeout
+
+        def pop(candidates: list[str]):
+            for key in candidates:
+                value = self._pop(key, left)
+                if value is not None:
+                    return value if isinstance(value, Error) else (key, value)
+            return None
+
+        served = pop(keys)
+        if served is None:
+            # Once blocked, a client is served from the key that woke it up first.
+            served = await self._block(keys, timeout, lambda key: pop([key, *keys]))
+        if served is None:
+            return NullArray()
+        if isinstance(served, Error):
+            return served
+        key, value = served
+        # Logged and replicated as the pop it came down to, like Redis.
+        self._rewrite(
+            ActiveCommand.LPOP if left else ActiveCommand.RPOP,
+            [BulkString(key.encode())],
+        )
+        return Array([BulkString(key.encode()), BulkString(value)])
+
+    def _rewrite(self, command: ActiveCommand, args: list):
+        """Log, replicate and track the command as `command args`, a deterministic equivalent."""
+        self.cmd = command
+        self.request = Array([BulkString(command.value.encode()), *args])
+
+    def _hyperloglog(self, key: str) -> tuple[bytes | bytearray | None, Error | None]:
+        """The HyperLogLog string at key, an error when the key holds any other value."""
+        record = self.datastore.get(key)
+        if record is None:
+            return None, None
+        if isinstance(record.value, (bytes, bytearray)) and is_hyperloglog(
+            record.value
+        ):
+            return record.value, None
+        return None, Error(INVALID_HLL if is_string(record.value) else WRONG_TYPE)
+
+    @register_command(ActiveCommand.PFADD, -2, write=True, keys=SINGLE_KEY)
+    async def pf_add(self):
+        key = self.request.data[1].decode()
+        elements = [element.data for element in self.request.data[2:]]
+
+        hll, error = self._hyperloglog(key)
+        if error:
+            return error
+        if hll is None:
+            hll, _ = add_elements(new_hyperloglog(), elements)
+            self.datastore.set(key, hll)
+            return Integer(1)
+
+        expiry = self.datastore.get(key, touch=False).expiry
+        # Values loaded with SET are immutable bytes, registers are updated in a mutable copy.
+        buffer = hll if isinstance(hll, bytearray) else bytearray(hll)
+        try:
+            updated, changed = add_elements(buffer, elements)
+        except InvalidHyperLogLog:
+            return Error(CORRUPTED_HLL)
+        if changed or updated is not hll:
+            self.datastore.set(key, updated, expiry)
+        return Integer(int(changed))
+
+    @register_command(ActiveCommand.PFCOUNT, -2, keys=(1, -1, 1))
+    async def pf_count(self):
+        keys = self.request.decode()[1:]
+
+        hlls = []
+        for key in keys:
+            hll, error = self._hyperloglog(key)
+            if error:
+                return error
+            if hll is not None:
+                hlls.append(hll)
+        try:
+            if len(keys) == 1:
+                # A single key caches its cardinality in the header.
+                return Integer(cardinality(hlls[0]) if hlls else 0)
+            return Integer(estimate(self._union(hlls)))
+        except InvalidHyperLogLog:
+            return Error(CORRUPTED_HLL)
+
+    @register_command(ActiveCommand.PFMERGE, -2, write=True, keys=(1, -1, 1))
+    async def pf_merge(self):
+        destination, *sources = self.request.decode()[1:]
+
+        hlls = []
+        for key in [destination, *sources]:
+            hll, error = self._hyperloglog(key)
+            if error:
+                return error
+            if hll is not None:
+                hlls.append(hll)
+        try:
+            merged = from_registers(self._union(hlls))
+        except InvalidHyperLogLog:
+            return Error(CORRUPTED_HLL)
+
+        current = self.datastore.get(destination, touch=False)
+        self.datastore.set(destination, merged, current.expiry if current else None)
+        return SimpleString(b"OK")
+
+    @staticmethod
+    def _union(hlls: list[bytes | bytearray]) -> bytes | bytearray:
+        registers = bytearray(HLL_REGISTERS)
+        for hll in hlls:
+            registers = max_registers(registers, to_registers(hll))
+        return registers
+
+    def _string_data(self, key: str) -> tuple[bytes | bytearray, Error | None]:
+        """The bytes of a string value for reading, empty when the key does not exist."""
+        record = self.datastore.get(key)
+        if record is None:
+            return b"", None
+        if not is_string(record.value):
+            return b"", Error(WRONG_TYPE)
+        return string_bytes(record.value), None
+
+    def _bit_offset(self, arg: BulkString) -> int | None:
+        try:
+            offset = int(arg.data)
+        except ValueError:
+            return None
+        return offset if 0 <= offset < MAX_STRING_LENGTH * 8 else None
+
+    @register_command(ActiveCommand.GETBIT, 3, keys=SINGLE_KEY)
+    async def getbit(self):
+        offset = self._bit_offset(self.request.data[2])
+        if offset is None:
+            return Error(b"ERR bit offset is not an integer or out of range")
+
+        data, error = self._string_data(self.request.data[1].decode())
+        if error:
+            return error
+        return Integer(get_bit(data, offset))
+
+    @register_command(ActiveCommand.SETBIT, 4, write=True, keys=SINGLE_KEY)
+    async def setbit(self):
+        key = self.request.data[1].decode()
+        offset = self._bit_offset(self.request.data[2])
+        if offset is None:
+            return Error(b"ERR bit offset is not an integer or out of range")
+        if self.request.data[3].data not in (b"0", b"1"):
+            return Error(b"ERR bit is not an integer or out of range")
+        bit = int(self.request.data[3].data)
+
+        buffer, error = self._string_buffer(key)
+        if error:
+            return error
+        if buffer is None:
+            buffer = bytearray()
+            set_bit(buffer, offset, bit)
+            self.datastore.set(key, buffer)
+            return Integer(0)
+
+        previous = set_bit(buffer, offset, bit)
+        self._touch(key)
+        return Integer(previous)
+
+    def _bit_range(
+        self, data: bytes | bytearray, args: list[str]
+    ) -> tuple[int, int] | None | Error:
+        """The inclusive bit range of `start end [BYTE|BIT]` arguments, None when it is empty."""
+        match [arg.upper() for arg in args]:
+            case [start, end]:
+                unit = "BYTE"
+            case [start, end, "BYTE" | "BIT" as unit]:
+                pass
+            case _:
+                return Error(b"ERR syntax error")
+        try:
+            start, end = int(start), int(end)
+        except ValueError:
+            return Error(b"ERR value is not an integer or out of range")
+
+        if unit == "BIT":
+            return normalize_range(start, end, len(data) * 8)
+        bytes_range = normalize_range(start, end, len(data))
+        if bytes_range is None:
+            return None
+        return bytes_range[0] * 8, bytes_range[1] * 8 + 7
+
+    @register_command(ActiveCommand.BITCOUNT, -2, keys=SINGLE_KEY)
+    async def bitcount(self):
+        data, error = self._string_data(self.request.data[1].decode())
+        if error:
+            return error
+
+        args = self.request.decode()[2:]
+        bits = self._bit_range(data, args) if args else (0, len(data) * 8 - 1)
+        if isinstance(bits, Error):
+            return bits
+        return Integer(bit_count(data, *bits) if bits else 0)
+
+    @register_command(ActiveCommand.BITPOS, -3, keys=SINGLE_KEY)
+    async def bitpos(self):
+        if len(self.request.data) > 6:
+            return Error(b"ERR syntax error")
+        if self.request.data[2].data not in (b"0", b"1"):
+            return Error(b"ERR The bit argument must be 1 or 0.")
+        bit = int(self.request.data[2].data)
+        data, error = self._string_data(self.request.data[1].decode())
+        if error:
+            return error
+
+        args = self.request.decode()[3:]
+        end_given = len(args) > 1
+        if len(args) == 1:
+            args.append("-1")
+        bits = self._bit_range(data, args) if args else (0, len(data) * 8 - 1)
+        if isinstance(bits, Error):
+            return bits
+        if bits is None:
+            return Integer(0 if bit == 0 and not data else -1)
+
+        position = bit_pos(data, bit, *bits)
+        # Without an explicit end, the string counts as padded with clear bits on the right.
+        if position == -1 and bit == 0 and not end_given:
+            return Integer(bits[1] + 1)
+        return Integer(position)
+
+    @register_command(ActiveCommand.BITOP, -4, write=True, keys=(2, -1, 1))
+    async def bitop(self):
+        op, destination, *sources = self.request.decode()[1:]
+        op = op.upper()
+        if op not in (BitOp.AND, BitOp.OR, BitOp.XOR, BitOp.NOT):
+            return Error(b"ERR syntax error")
+        if op == BitOp.NOT and len(sources) != 1:
+            return Error(b"ERR BITOP NOT must be called with a single source key.")
+
+        values = []
+        for key in sources:
+            data, error = self._string_data(key)
+            if error:
+                return error
+            values.append(data)
+        result = bit_op(op, values)
+
+        if not result:
+            self.datastore.delete(destination)
+            return Integer(0)
+        self.datastore.set(destination, result)
+        return Integer(len(result))
+
+    def _stream(self, key: str, touch=True) -> tuple[Stream | None, Error | None]:
+        record = self.datastore.get(key, touch)
+        if record is None:
+            return None, None
+        if not isinstance(record.value, Stream):
+            return None, Error(WRONG_TYPE)
+        return record.value, None
+
+    def _group(self, key: str, group: str, command: str):
+        """The stream at key and its consumer group, or a NOGROUP error."""
+        stream, error = self._stream(key)
+        if error:
+            return None, None, error
+        if stream is None or group not in stream.groups:
+            return (
+                None,
+                None,
+                Error(
+                    f"NOGROUP No such key '{key}' or consumer group '{group}'{command}".encode()
+                ),
+            )
+        return stream, stream.groups[group], None
+
+    @staticmethod
+    def _range_bound(text: str, start: bool) -> StreamID | Error:
+        """An XRANGE bound: `-`, `+`, an ID completed to include the whole millisecond, or `(` exclusive."""
+        if text == "-":
+            return MIN_ID
+        if text == "+":
+            return MAX_ID
+        exclusive = text.startswith("(")
+        stream_id = parse_id(text.removeprefix("("), 0 if start else ID_MAX_PART)
+        if stream_id is None:
+            return Error(INVALID_STREAM_ID)
+        if exclusive:
+            stream_id = next_id(stream_id) if start else previous_id(stream_id)
+            if stream_id is None:
+                return Error(
+                    f"ERR invalid {'start' if start else 'end'} ID for the interval".encode()
+                )
+        return stream_id
+
+    @staticmethod
+    def _parse_trim(args: list[bytes], i: int) -> tuple[dict, int] | Error:
+        """`MAXLEN|MINID [=|~] threshold [LIMIT count]` starting at args[i], and the position after it."""
+        strategy = args[i].upper()
+        i += 1
+        approximate = False
+        if i < len(args) and args[i] in (b"=", b"~"):
+            approximate = args[i] == b"~"
+            i += 1
+        if i >= len(args):
+            return Error(b"ERR syntax error")
+        threshold = args[i].decode()
+        i += 1
+        limit = None
+        if i + 1 < len(args) and args[i].upper() == b"LIMIT":
+            if not args[i + 1].isdigit():
+                return Error(b"ERR value is not an integer or out of range")
+            if not approximate:
+                return Error(
+                    b"ERR syntax error, LIMIT cannot be used without the special ~ option"
+                )
+            limit = int(args[i + 1])
+            i += 2
+
+        options = {"approximate": approximate}
+        if approximate:
+            # Like Redis, approximate trims go 100 chunks at a time by default, LIMIT 0 removes the cap.
+            options["limit"] = (
+                100 * STREAM_NODE_MAX_ENTRIES if limit is None else limit or None
+            )
+        if strategy == b"MAXLEN":
+            if not threshold.isdigit():
+                return Error(b"ERR The MAXLEN argument must be >= 0.")
+            options["maxlen"] = int(threshold)
+        else:
+            options["minid"] = parse_id(threshold)
+            if options["minid"] is None:
+                return Error(INVALID_STREAM_ID)
+        return options, i
+
+    # XADD key [NOMKSTREAM] [MAXLEN|MINID [=|~] threshold [LIMIT count]] *|id field value [field value ...]
+    @register_command(ActiveCommand.XADD, -5, write=True, keys=SINGLE_KEY)
+    async def xadd(self):
+        args = [part.data for part in self.request.data]
+        key = args[1].decode()
+
+        i, create, trim = 2, True, None
+        while i < len(args):
+            option = bytes(args[i]).upper()
+            if option == b"NOMKSTREAM":
+                create = False
+                i += 1
+            elif option in (b"MAXLEN", b"MINID"):
+                parsed = self._parse_trim(args, i)
+                if isinstance(parsed, Error):
+                    return parsed
+                trim, i = parsed
+            else:
+                break
+        fields = [compact_string(field) for field in args[i + 1 :]]
+        if not fields or len(fields) % 2:
+            return Error(b"ERR wrong number of arguments for 'xadd' command")
+
+        stream, error = self._stream(key)
+        if error:
+            return error
+        if stream is None and not create:
+            return NullBulkString()
+        new = stream is None
+        if new:
+            stream = Stream()
+
+        id_text = args[i].decode()
+        try:
+            if id_text == "*" or id_text.endswith("-*"):
+                ms = None if id_text == "*" else parse_id(id_text[:-2])
+                if ms is not None:
+                    ms = ms[0]
+                elif id_text != "*":
+                    return Error(INVALID_STREAM_ID)
+                stream_id = stream.auto_id(int(time.time() * 1000), ms)
+            else:
+                stream_id = parse_id(id_text)
+                if stream_id is None:
+                    return Error(INVALID_STREAM_ID)
+                if stream_id == MIN_ID:
+                    return Error(
+                        b"ERR The ID specified in XADD must be greater than 0-0"
+                    )
+            stream.add(stream_id, fields)
+        except StreamError as e:
+            return Error(f"ERR {e}".encode())
+        if trim is not None:
+            stream.trim(**trim)
+
+        if new:
+            self.datastore.set(key, stream)
+        else:
+            self._touch(key)
+        self.datastore.blocking.signal(key)
+        # The AOF and replicas get the generated ID, replaying * would make up a new one.
+        id_arg = BulkString(format_id(stream_id))
+        self.request = Array(
+            [*self.request.data[:i], id_arg, *self.request.data[i + 1 :]]
+        )
+        return id_arg
+
+    @register_command(ActiveCommand.XRANGE, -4, keys=SINGLE_KEY)
+    async def xrange(self):
+        return self._xrange(reverse=False)
+
+    @register_command(ActiveCommand.XREVRANGE, -4, keys=SINGLE_KEY)
+    async def xrevrange(self):
+        return self._xrange(reverse=True)
+
+    def _xrange(self, reverse: bool):
+        args = self.request.decode()
+        # Only COUNT n can follow the range.
+        if len(args) not in (4, 6):
+            return Error(b"ERR syntax error")
+        key, first, second = args[1:4]
+        if reverse:
+            first, second = second, first
+        start, end = self._range_bound(first, True), self._range_bound(second, False)
+        for bound in (start, end):
+            if isinstance(bound, Error):
+                return bound
+        count = None
+        if len(args) == 6:
+            if args[4].upper() != "COUNT":
+                return Error(b"ERR syntax error")
+            try:
+                count = max(int(args[5]), 0)
+            except ValueError:
+                return Error(b"ERR value is not an integer or out of range")
+
+        stream, error = self._stream(key)
+        if error:
+            return error
+        if stream is None:
+            return Array([])
+        return entries_to_resp(stream.range(start, end, count, reverse))
+
+    @register_command(ActiveCommand.XLEN, 2, keys=SINGLE_KEY)
+    async def xlen(self):
+        stream, error = self._stream(self.request.data[1].decode())
+        if error:
+            return error
+        return Integer(len(stream) if stream is not None else 0)
+
+    # XTRIM key MAXLEN|MINID [=|~] threshold [LIMIT count]
+    @register_command(ActiveCommand.XTRIM, -4, write=True, keys=SINGLE_KEY)
+    async def xtrim(self):
+        args = [part.data for part in self.request.data]
+        if bytes(args[2]).upper() not in (b"MAXLEN", b"MINID"):
+            return Error(b"ERR syntax error")
+        parsed = self._parse_trim(args, 2)
+        if isinstance(parsed, Error):
+            return parsed
+        trim, end = parsed
+        if end != len(args):
+            return Error(b"ERR syntax error")
+
+        key = args[1].decode()
+        stream, error = self._stream(key)
+        if error:
+            return error
+        if stream is None:
+            return Integer(0)
+        removed = stream.trim(**trim)
+        if removed:
+            self._touch(key)
+        return Integer(removed)
+
+    def _parse_read(
+        self, args: list[str], options: set[str]
+    ) -> tuple[dict, list[str], list[str]] | Error:
+        """The options of XREAD and XREADGROUP, then their keys and IDs."""
+        parsed, i = {"COUNT": None, "BLOCK": None, "NOACK": False}, 0
+        while i < len(args):
+            option = args[i].upper()
+            if option == "STREAMS":
+                i += 1
+                break
+            if option == "NOACK" and option in options:
+                parsed[option] = True
+                i += 1
+                continue
+            if option not in options or i + 1 >= len(args):
+                return Error(b"ERR syntax error")
+            try:
+                parsed[option] = int(args[i + 1])
+            except ValueError:
+                return Error(b"ERR value is not an integer or out of range")
+            if parsed[option] < 0:
+                return Error(b"ERR timeout is negative")
+            i += 2
+        else:
+            return Error(b"ERR syntax error")
+
+        rest = args[i:]
+        if not rest or len(rest) % 2:
+            return Error(
+                b"ERR Unbalanced XREAD list of streams: for each stream key an ID or '$' must be specified."
+            )
+        return parsed, rest[: len(rest) // 2], rest[len(rest) // 2 :]
+
+    def _streams_reply(self, results: list[tuple[str, list]]) -> PyRedisData:
+        resp3 = self.session is not None and self.session.protocol == 3
+        if not results:
+            return Null() if resp3 else NilArray()
+        if resp3:
+            return Map(
+                [
+                    (BulkString(key.encode()), entries_to_resp(entries))
+                    for key, entries in results
+                ]
+            )
+        return Array(
+            [
+                Array([BulkString(key.encode()), entries_to_resp(entries)])
+                for key, entries in results
+            ]
+        )
+
+    async def _read_streams(
+        self, keys: list[str], block: int | None, read
+    ) -> PyRedisData:
+        """Reply with `read()` once it has entries, waiting up to `block` ms for one of keys to get some."""
+        results = read()
+        if not results and block is not None:
+            results = await self._block(
+                keys, block / 1000 if block else None, lambda key: read() or None
+            )
+        if isinstance(results, Error):
+            return results
+        return self._streams_reply(results)
+
+    # XREAD [COUNT count] [BLOCK milliseconds] STREAMS key [key ...] id [id ...]
+    @register_command(ActiveCommand.XREAD, -4, blocking=True, keys=_streams_keys)
+    async def xread(self):
+        parsed = self._parse_read(self.request.decode()[1:], {"COUNT", "BLOCK"})
+        if isinstance(parsed, Error):
+            return parsed
+        options, keys, ids = parsed
+
+        # IDs are resolved once: entries added while blocked are what `$` waits for.
+        after = []
+        for key, id_text in zip(keys, ids):
+            stream, error = self._stream(key)
+            if error:
+                return error
+            if id_text == "$":
+                after.append(stream.last_id if stream is not None else MIN_ID)
+                continue
+            stream_id = parse_id(id_text)
+            if stream_id is None:
+                return Error(INVALID_STREAM_ID)
+            after.append(stream_id)
+
+        def read():
+            results = []
+            for key, last in zip(keys, after):
+                stream, error = self._stream(key)
+                if error:
+                    return error
+                start = next_id(last)
+                if stream is None or start is None:
+                    continue
+                entries = stream.range(start, MAX_ID, options["COUNT"])
+                if entries:
+                    results.append((key, entries))
+            return results
+
+        return await self._read_streams(keys, options["BLOCK"], read)
+
+    # XGROUP CREATE key group id|$ [MKSTREAM] [ENTRIESREAD n] | SETID key group id|$ [ENTRIESREAD n]
+    #      | DESTROY key group | CREATECONSUMER key group consumer | DELCONSUMER key group consumer
+    @register_command(ActiveCommand.XGROUP, -2, write=True, keys=(2, 2, 1))
+    async def xgroup(self):
+        args = self.request.decode()[1:]
+        subcommand = args[0].upper()
+        match [subcommand, *args[1:]]:
+            case ["CREATE" | "SETID", key, group, id_text, *options]:
+                pass
+            case ["DESTROY", key, group]:
+                pass
+            case ["CREATECONSUMER" | "DELCONSUMER", key, group, consumer]:
+                pass
+            case _:
+                return Error(
+                    f"Unknown XGROUP subcommand or wrong number of arguments `{args[0]}`".encode()
+                )
+
+        # Checked before MKSTREAM creates the key, so a bad command leaves nothing behind.
+        mkstream, entries_read = False, None
+        if subcommand in ("CREATE", "SETID"):
+            if id_text != "$" and parse_id(id_text) is None:
+                return Error(INVALID_STREAM_ID)
+            i = 0
+            while i < len(options):
+                option = options[i].upper()
+                if option == "MKSTREAM" and subcommand == "CREATE":
+                    mkstream = True
+                    i += 1
+                elif option == "ENTRIESREAD" and i + 1 < len(options):
+                    count = options[i + 1]
+                    if not count.lstrip("-").isdigit() or int(count) < -1:
+                        return Error(
+                            b"ERR value for ENTRIESREAD must be positive or -1"
+                        )
+                    entries_read = int(count)
+                    i += 2
+                else:
+                    return Error(b"ERR syntax error")
+
+        stream, error = self._stream(key)
+        if error:
+            return error
+        if stream is None:
+            if not mkstream:
+                return Error(
+                    b"ERR The XGROUP subcommand requires the key to exist. Note that for CREATE you may "
+                    b"want to use the MKSTREAM option to create an empty stream automatically."
+                )
+            stream = Stream()
+            self.datastore.set(key, stream)
+        if subcommand != "CREATE" and group not in stream.groups:
+            return Error(
+                f"NOGROUP No such consumer group '{group}' for key name '{key}'".encode()
+            )
+
+        now = int(time.time() * 1000)
+        match subcommand:
+            case "CREATE" | "SETID":
+                last_id = stream.last_id if id_text == "$" else parse_id(id_text)
+                if entries_read is None:
+                    entries_read = stream.entries_added if id_text == "$" else -1
+                if subcommand == "SETID":
+                    group_state = stream.groups[group]
+                    group_state.last_id, group_state.entries_read = (
+                        last_id,
+                        entries_read,
+                    )
+                elif group in stream.groups:
+                    return Error(b"BUSYGROUP Consumer Group name already exists")
+                else:
+                    stream.groups[group] = ConsumerGroup(last_id, entries_read)
+                self._touch(key)
+                return SimpleString(b"OK")
+            case "DESTROY":
+                del stream.groups[group]
+                self._touch(key)
+                return Integer(1)
+            case "CREATECONSUMER":
+                if consumer in stream.groups[group].consumers:
+                    return Integer(0)
+                stream.groups[group].consumer(consumer, now)
+                self._touch(key)
+                return Integer(1)
+            case "DELCONSUMER":
+                pending = stream.groups[group].delete_consumer(consumer)
+                self._touch(key)
+                return Integer(pending)
+
+    # XREADGROUP GROUP group consumer [COUNT count] [BLOCK milliseconds] [NOACK] STREAMS key [key ...] id [id ...]
+    @register_command(
+        ActiveCommand.XREADGROUP, -7, write=True, blocking=True, keys=_streams_keys
+    )
+    async def xreadgroup(self):
+        args = self.request.decode()[1:]
+        if args[0].upper() != "GROUP":
+            return Error(b"ERR Missing GROUP option for XREADGROUP")
+        group_name, consumer_name = args[1], args[2]
+        parsed = self._parse_read(args[3:], {"COUNT", "BLOCK", "NOACK"})
+        if isinstance(parsed, Error):
+            return parsed
+        options, keys, ids = parsed
+
+        after: list[StreamID | None] = (
+            []
+        )  # None for new entries, an ID to read the consumer's pending ones
+        for key, id_text in zip(keys, ids):
+            _, _, error = self._group(
+                key, group_name, " in XREADGROUP with GROUP option"
+            )
+            if error:
+                return error
+            if id_text == ">":
+                after.append(None)
+                continue
+            stream_id = parse_id(id_text)
+            if stream_id is None:
+                return Error(INVALID_STREAM_ID)
+            after.append(stream_id)
+
+        def read():
+            now = int(time.time() * 1000)
+            results = []
+            for key, last in zip(keys, after):
+                stream, group, error = self._group(
+                    key, group_name, " in XREADGROUP with GROUP option"
+                )
+                if error:
+                    return error
+                if consumer_name not in group.consumers:
+                    # Creating the consumer is a change to replay, even without entries to deliver.
+                    self._touch(key)
+                consumer = group.consumer(consumer_name, now)
+                if last is not None:
+                    # The consumer's history: entries delivered to it and not acknowledged yet.
+                    history = [
+                        stream_id for stream_id in consumer.pending if stream_id > last
+                    ]
+                    history = sorted(history)[: options["COUNT"]]
+                    for stream_id in history:
+                        entry = consumer.pending[stream_id]
+                        entry.delivered = now
+                        entry.deliveries += 1
+                    if history:
+                        self._touch(key)
+                    results.append(
+                        (
+                            key,
+                            [
+                                (stream_id, stream.get(stream_id))
+                                for stream_id in history
+                            ],
+                        )
+                    )
+                    continue
+
+                start = next_id(group.last_id)
+                entries = stream.range(start, MAX_ID, options["COUNT"]) if start else []
+                if not entries:
+                    continue
+                group.last_id = entries[-1][0]
+                if group.entries_read != -1:
+                    group.entries_read += len(entries)
+                if not options["NOACK"]:
+                    group.deliver(
+                        consumer, [stream_id for stream_id, _ in entries], now
+                    )
+                self._touch(key)
+                results.append((key, entries))
+            return results
+
+        # Only new entries are waited for, reading the history replies right away.
+        block = options["BLOCK"] if all(last is None for last in after) else None
+        return await self._read_streams(keys, block, read)
+
+    @register_command(ActiveCommand.XACK, -4, write=True, keys=SINGLE_KEY)
+    async def xack(self):
+        args = self.request.decode()[1:]
+        key, group_name, *id_texts = args
+        ids = [parse_id(text) for text in id_texts]
+        if None in ids:
+            return Error(INVALID_STREAM_ID)
+
+        stream, error = self._stream(key)
+        if error:
+            return error
+        if stream is None or group_name not in stream.groups:
+            return Integer(0)
+        acked = stream.groups[group_name].ack(ids)
+        if acked:
+            self._touch(key)
+        return Integer(acked)
+
+    # XPENDING key group [[IDLE min-idle-time] start end count [consumer]]
+    @register_command(ActiveCommand.XPENDING, -3, keys=SINGLE_KEY)
+    async def xpending(self):
+        args = self.request.decode()[1:]
+        key, group_name, *extended = args
+        _, group, error = self._group(key, group_name, "")
+        if error:
+            return error
+
+        if not extended:
+            if not group.pending:
+                return Array(
+                    [Integer(0), NullBulkString(), NullBulkString(), NullBulkString()]
+                )
+            ids = sorted(group.pending)
+            owners = [
+                Array(
+                    [
+                        BulkString(name.encode()),
+                        BulkString(b"%i" % len(consumer.pending)),
+                    ]
+                )
+                for name, consumer in group.consumers.items()
+                if consumer.pending
+            ]
+            return Array(
+                [
+                    Integer(len(ids)),
+                    BulkString(format_id(ids[0])),
+                    BulkString(format_id(ids[-1])),
+                    Array(owners),
+                ]
+            )
+
+        min_idle = 0
+        if extended[0].upper() == "IDLE":
+            if len(extended) < 2 or not extended[1].isdigit():
+                return Error(b"ERR value is not an integer or out of range")
+            min_idle, extended = int(extended[1]), extended[2:]
+        if len(extended) not in (3, 4):
+            return Error(b"ERR syntax error")
+        start = self._range_bound(extended[0], True)
+        end = self._range_bound(extended[1], False)
+        for bound in (start, end):
+            if isinstance(bound, Error):
+                return bound
+        try:
+            count = max(int(extended[2]), 0)
+        except ValueError:
+            return Error(b"ERR value is not an integer or out of range")
+        consumer = extended[3] if len(extended) == 4 else None
+
+        now = int(time.time() * 1000)
+        return Array(
+            [
+                Array(
+                    [
+                        BulkString(format_id(stream_id)),
+                        BulkString(entry.consumer.encode()),
+                        Integer(b"%i" % (now - entry.delivered)),
+                        Integer(b"%i" % entry.deliveries),
+                    ]
+                )
+                for stream_id, entry in group.pending_range(
+                    start, end, count, consumer, min_idle, now
+                )
+            ]
+        )
+
+    @register_command(ActiveCommand.SLOWLOG, -2, admin=True)
+    async def slowlog(self):
+        if self.monitor is None:
+            return Error(b"SLOWLOG is not available")
+
+        slowlog = self.monitor.slowlog
+        match self.request.data[1].decode().upper():
+            case "GET":
+                count = 10
+                if len(self.request.data) > 2:
+                    try:
+                        count = int(self.request.data[2].decode())
+                    except ValueError:
+                        return Error(b"SLOWLOG GET count must be an int")
+                return Array(
+                    [
+                        Array(
+                            [
+                                Integer(entry.id),
+                                Integer(entry.timestamp),
+                                Integer(entry.duration),
+                                Array([BulkString(arg) for arg in entry.args]),
+                            ]
+                        )
+                        for entry in slowlog.get(count)
+                    ]
+                )
+            case "LEN":
+                return Integer(len(slowlog))
+            case "RESET":
+                slowlog.reset()
+                return SimpleString(b"OK")
+            case subcommand:
+                return Error(f"Unknown SLOWLOG subcommand `{subcommand}`".encode())
+
+    # HOTKEYS [COUNT count] | HOTKEYS RESET
+    @register_command(ActiveCommand.HOTKEYS, -1, admin=True)
+    async def hotkeys(self):
+        if self.monitor is None:
+            return Error(b"HOTKEYS is not available")
+
+        hotkeys = self.monitor.hotkeys
+        match [arg.upper() for arg in self.request.decode()[1:]]:
+            case []:
+                count = hotkeys.top
+            case ["COUNT", value]:
+                count = parse_integer(value.encode())
+                if count is None or count < 0:
+                    return Error(b"ERR value is out of range, must be positive")
+            case ["RESET"]:
+                hotkeys.reset()
+                return SimpleString(b"OK")
+            case [subcommand, *_]:
+                return Error(
+                    f"Unknown HOTKEYS subcommand or wrong number of arguments `{subcommand}`".encode()
+                )
+        return self._reply(
+            Map(
+                [
+                    (BulkString(key), Integer(hits))
+                    for key, hits in hotkeys.hottest(count)
+                ]
+            )
+        )
+
+    @register_command(ActiveCommand.LATENCY, -2, admin=True)
+    async def latency(self):
+        if self.monitor is None:
+            return Error(b"LATENCY is not available")
+
+        latency = self.monitor.latency
+        match self.request.data[1].decode().upper():
+            case "LATEST":
+                return Array(
+                    [
+                        Array(
+                            [
+                                BulkString(event.encode()),
+                                Integer(sample.timestamp),
+                                Integer(sample.latency),
+                                Integer(max_latency),
+                            ]
+                        )
+                        for event, sample, max_latency in latency.latest()
+                    ]
+                )
+            case "HISTORY":
+                if len(self.request.data) != 3:
+                    return Error(b"LATENCY HISTORY requires an event name")
+                event = self.request.data[2].decode()
+                return Array(
+                    [
+                        Array([Integer(sample.timestamp), Integer(sample.latency)])
+                        for sample in latency.history(event)
+                    ]
+                )
+            case "RESET":
+                events = [arg.decode() for arg in self.request.data[2:]]
+                return Integer(latency.reset(*events))
+            case subcommand:
+                return Error(f"Unknown LATENCY subcommand `{subcommand}`".encode())
+
+    @register_command(ActiveCommand.DEBUG, -3, admin=True)
+    async def debug(self):
+        if self.monitor is None:
+            return Error(b"DEBUG is not available")
+
+        args = [arg.upper() for arg in self.request.decode()[1:]]
+        match args[:2]:
+            case ["PROFILE", subcommand]:
+                return self._debug_profile(subcommand, args[2:])
+            case ["TRACEMALLOC", subcommand]:
+                return self._debug_tracemalloc(subcommand, args[2:])
+            case [subcommand, *_]:
+                return Error(f"Unknown DEBUG subcommand `{subcommand}`".encode())
+
+    @staticmethod
+    def _parse_options(args: list[str], **defaults) -> dict | None:
+        """`NAME value` pairs and bare flags, keyed by lower case name. None when an option is unknown."""
+        options = dict(defaults)
+        i = 0
+        while i < len(args):
+            name = args[i].lower()
+            if name not in options:
+                return None
+            if isinstance(options[name], bool):
+                options[name] = True
+                i += 1
+                continue
+            if i + 1 == len(args):
+                return None
+            options[name] = args[i + 1]
+            i += 2
+        return options
+
+    # DEBUG PROFILE START [CPROFILE|SAMPLE] [SECONDS n] | STOP [COUNT n] [SORT SELF|TOTAL] | RESULT ...
+    def _debug_profile(self, subcommand: str, args: list[str]):
+        profiler = self.monitor.profiler
+        match subcommand:
+            case "START":
+                options = self._parse_options(
+                    args, cprofile=False, sample=False, seconds="0"
+                )
+                if options is None or (options["cprofile"] and options["sample"]):
+                    return Error(b"ERR syntax error")
+                try:
+                    seconds = float(options["seconds"])
+                except ValueError:
+                    return Error(b"ERR SECONDS must be a number")
+                mode = (
+                    ProfilerMode.CPROFILE
+                    if options["cprofile"]
+                    else ProfilerMode.SAMPLE
+                )
+                try:
+                    profiler.start(mode, seconds)
+                except ValueError as e:
+                    return Error(f"ERR {e}".encode())
+                return SimpleString(b"OK")
+            case "STOP" | "RESULT":
+                options = self._parse_options(args, count="20", sort="SELF")
+                if options is None or options["sort"] not in ("SELF", "TOTAL"):
+                    return Error(b"ERR syntax error")
+                if subcommand == "STOP":
+                    if not profiler.running:
+                        return Error(b"ERR the profiler is not running")
+                    profiler.stop()
+                elif profiler.running:
+                    return Error(b"ERR the profiler is still running")
+                try:
+                    count = int(options["count"])
+                except ValueError:
+                    return Error(b"ERR value is not an integer or out of range")
+                return Array(
+                    [
+                        Array(
+                            [
+                                BulkString(stats.function.encode()),
+                                Integer(stats.calls),
+                                Integer(stats.own_us),
+                                Integer(stats.total_us),
+                            ]
+                        )
+                        for stats in profiler.top(count, options["sort"] == "TOTAL")
+                    ]
+                )
+            case _:
+                return Error(
+                    f"Unknown DEBUG PROFILE subcommand `{subcommand}`".encode()
+                )
+
+    # DEBUG TRACEMALLOC START [FRAMES n] | STOP | SNAPSHOT | TOP|DIFF [COUNT n] [GROUPBY lineno|filename|traceback]
+    def _debug_tracemalloc(self, subcommand: str, args: list[str]):
+        allocations = self.monitor.allocations
+        if subcommand not in ("START", "STOP") and not allocations.tracing:
+            return Error(b"ERR tracemalloc is not tracing, use DEBUG TRACEMALLOC START")
+
+        match subcommand:
+            case "START":
+                options = self._parse_options(args, frames="1")
+                if options is None:
+                    return Error(b"ERR syntax error")
+                try:
+                    frames = int(options["frames"])
+                except ValueError:
+                    frames = 0
+                if frames < 1:
+                    return Error(b"ERR FRAMES must be a positive integer")
+                allocations.start(frames)
+                return SimpleString(b"OK")
+            case "STOP":
+                allocations.stop()
+                return SimpleString(b"OK")
+            case "SNAPSHOT":
+                return Integer(allocations.save_baseline())
+            case "TOP" | "DIFF":
+                options = self._parse_options(args, count="10", groupby="LINENO")
+                group_by = options["groupby"].lower() if options else None
+                if group_by not in allocations.GROUP_BY:
+                    return Error(b"ERR syntax error")
+                try:
+                    count = int(options["count"])
+                except ValueError:
+                    return Error(b"ERR value is not an integer or out of range")
+                if subcommand == "TOP":
+                    return Array(
+                        [
+                            Array(
+                                [
+                                    BulkString(stats.location.encode()),
+                                    Integer(stats.size),
+                                    Integer(stats.count),
+                                ]
+                            )
+                            for stats in allocations.top(count, group_by)
+                        ]
+                    )
+                if allocations.baseline is None:
+                    return Error(
+                        b"ERR no snapshot to diff against, use DEBUG TRACEMALLOC SNAPSHOT"
+                    )
+                return Array(
+                    [
+                        Array(
+                            [
+                                BulkString(stats.location.encode()),
+                                Integer(stats.size),
+                                Integer(stats.count),
+                                Integer(stats.size_diff),
+                                Integer(stats.count_diff),
+                            ]
+                        )
+                        for stats in allocations.diff(count, group_by)
+                    ]
+                )
+            case _:
+                return Error(
+                    f"Unknown DEBUG TRACEMALLOC subcommand `{subcommand}`".encode()
+                )
+
+    @register_command(ActiveCommand.REPLICAOF, 3, admin=True)
+    async def replica_of(self):
+        if self.replication is None:
+            return Error(b"REPLICAOF is not available")
+
+        host, port = self.request.data[1].decode(), self.request.data[2].decode()
+        if host.upper() == "NO" and port.upper() == "ONE":
+            self.replication.stop_replication()
+            return SimpleString(b"OK")
+
+        try:
+            port = int(port)
+        except ValueError:
+            return Error(b"REPLICAOF port must be an int")
+        if self.replication.leader != (host, port):
+            self.replication.replicate_from(host, port)
+        return SimpleString(b"OK")
+
+    @register_command(ActiveCommand.ROLE, 1)
+    async def role(self):
+        if self.replication is None or not self.replication.is_replica:
+            offset = self.replication.offset if self.replication else 0
+            replicas = self.replication.replicas if self.replication else ()
+            return Array(
+                [
+                    BulkString(b"master"),
+                    Integer(offset),
+                    Array(
+                        [
+                            Array(
+                                [
+                                    BulkString(replica.host.encode()),
+                                    BulkString(str(replica.port).encode()),
+                                    BulkString(str(offset - replica.pending).encode()),
+                                ]
+                            )
+                            for replica in replicas
+                        ]
+                    ),
+                ]
+            )
+
+        host, port = self.replication.leader
+        return Array(
+            [
+                BulkString(b"slave"),
+                BulkString(host.encode()),
+                Integer(port),
+                BulkString(self.replication.link_state.encode()),
+                Integer(self.replication.offset),
+            ]
+        )
+
+    @register_command(ActiveCommand.ASKING, 1)
+    async def asking(self):
+        if self.session is None:
+            return Error(b"ASKING is not available")
+        self.session.asking = True
+        return SimpleString(b"OK")
+
+    @register_command(ActiveCommand.CLUSTER, -2, admin=True)
+    async def cluster_cmd(self):
+        if self.cluster is None:
+            return Error(b"ERR This instance has cluster support disabled")
+
+        args = self.request.decode()[1:]
+        try:
+            match [args[0].upper(), *args[1:]]:
+                case ["MYID"]:
+                    return BulkString(self.cluster.myself.id.encode())
+                case ["KEYSLOT", key]:
+                    return Integer(key_hash_slot(self.request.data[2].data))
+                case ["NODES"]:
+                    return BulkString(self.cluster.nodes_description().encode())
+                case ["SLOTS"]:
+                    return self._cluster_slots()
+                case ["INFO"]:
+                    return self._cluster_info()
+                case ["MEET", host, port]:
+                    self.cluster.meet(host, int(port))
+                    return SimpleString(b"OK")
+                case ["ADDSLOTS", *slots] if slots:
+                    return self._cluster_add_slots([int(slot) for slot in slots])
+                case ["ADDSLOTSRANGE", *ranges] if ranges and len(ranges) % 2 == 0:
+                    slots = []
+                    for start, end in zip(ranges[::2], ranges[1::2]):
+                        slots.extend(range(int(start), int(end) + 1))
+                    return self._cluster_add_slots(slots)
+                case ["DELSLOTS", *slots] if slots:
+                    for slot in map(int, slots):
+                        self._check_slot(slot)
+                        self.cluster.unassign_slot(slot)
+                    return SimpleString(b"OK")
+                case ["SETSLOT", slot, *state]:
+                    return self._cluster_set_slot(int(slot), state)
+                case ["COUNTKEYSINSLOT", slot]:
+                    return Integer(
+                        self.cluster.count_keys_in_slot(self._check_slot(int(slot)))
+                    )
+                case ["GETKEYSINSLOT", slot, count]:
+                    keys = self.cluster.get_keys_in_slot(
+                        self._check_slot(int(slot)), int(count)
+                    )
+                    return Array([BulkString(key.encode()) for key in keys])
+                case [subcommand, *_]:
+                    return Error(
+                        f"Unknown CLUSTER subcommand or wrong number of arguments `{subcommand}`".encode()
+                    )
+        except ValueError as e:
+            return Error(f"ERR Invalid CLUSTER arguments: {e}".encode())
+
+    def _check_slot(self, slot: int) -> int:
+        if not 0 <= slot < CLUSTER_SLOTS:
+            raise ValueError(f"slot {slot} is out of range")
+        return slot
+
+    def _cluster_add_slots(self, slots: list[int]):
+        for slot in slots:
+            self._check_slot(slot)
+            if self.cluster.slots[slot] is not None:
+                return Error(f"ERR Slot {slot} is already busy".encode())
+        for slot in slots:
+            self.cluster.assign_slot(slot, self.cluster.myself)
+        return SimpleString(b"OK")
+
+    def _cluster_set_slot(self, slot: int, state: list[str]):
+        self._check_slot(slot)
+        match [state[0].upper(), *state[1:]] if state else []:
+            case ["MIGRATING", node_id]:
+                if self.cluster.slots[slot] is not self.cluster.myself:
+                    return Error(f"ERR I'm not the owner of hash slot {slot}".encode())
+                target = self.cluster.nodes.get(node_id)
+                if target is None:
+                    return Error(f"ERR I don't know about node {node_id}".encode())
+                self.cluster.migrating[slot] = target
+            case ["IMPORTING", node_id]:
+                if self.cluster.slots[slot] is self.cluster.myself:
+                    return Error(
+                        f"ERR I'm already the owner of hash slot {slot}".encode()
+                    )
+                source = self.cluster.nodes.get(node_id)
+                if source is None:
+                    return Error(f"ERR I don't know about node {node_id}".encode())
+                self.cluster.importing[slot] = source
+            case ["STABLE"]:
+                self.cluster.migrating.pop(slot, None)
+                self.cluster.importing.pop(slot, None)
+            case ["NODE", node_id]:
+                node = self.cluster.nodes.get(node_id)
+                if node is None:
+                    return Error(f"ERR I don't know about node {node_id}".encode())
+                if (
+                    self.cluster.slots[slot] is self.cluster.myself
+                    and node is not self.cluster.myself
+                    and self.cluster.count_keys_in_slot(slot)
+                ):
+                    return Error(
+                        f"ERR Can't assign hashslot {slot} to a different node while I still hold keys for this hash slot".encode()
+                    )
+                self.cluster.migrating.pop(slot, None)
+                self.cluster.importing.pop(slot, None)
+                self.cluster.assign_slot(slot, node)
+            case _:
+                return Error(
+                    b"ERR Invalid CLUSTER SETSLOT action or number of arguments"
+                )
+        return SimpleString(b"OK")
+
+    def _cluster_slots(self):
+        replies = []
+        for node in self.cluster.nodes.values():
+            for start, end in self.cluster.slot_ranges(node):
+                replies.append(
+                    Array(
+                        [
+                            Integer(start),
+                            Integer(end),
+                            Array(
+                                [
+                                    BulkString(node.host.encode()),
+                                    Integer(node.port),
+                                    BulkString(node.id.encode()),
+                                ]
+                            ),
+                        ]
+                    )
+                )
+        return Array(replies)
+
+    def _cluster_info(self):
+        assigned = sum(1 for owner in self.cluster.slots if owner is not None)
+        fields = [
+            ("cluster_enabled", 1),
+            ("cluster_state", "ok" if assigned == CLUSTER_SLOTS else "fail"),
+            ("cluster_slots_assigned", assigned),
+            ("cluster_known_nodes", len(self.cluster.nodes)),
+            (
+                "cluster_size",
+                sum(1 for node in self.cluster.nodes.values() if node.slots),
+            ),
+        ]
+        return BulkString(
+            "\r\n".join(f"{field}:{value}" for field, value in fields).encode()
+            + b"\r\n"
+        )
+
+    @register_command(ActiveCommand.DUMP, 2, keys=SINGLE_KEY)
+    async def dump(self):
+        record = self.datastore.get(self.request.data[1].decode())
+        if record is None:
+            return NullBulkString()
+        return BulkString(to_resp(record.value).serialize())
+
+    # RESTORE key ttl serialized-value [REPLACE] [ABSTTL]
+    @register_command(ActiveCommand.RESTORE, -4, write=True, keys=SINGLE_KEY)
+    async def restore(self):
+        key = self.request.data[1].decode()
+        options = {arg.upper() for arg in self.request.decode()[4:]}
+        try:
+            ttl = int(self.request.data[2].decode())
+        except ValueError:
+            return Error(b"ERR Invalid TTL value, must be >= 0")
+        value, size = parse_frame(self.request.data[3].data)
+        if value is None or size != len(self.request.data[3].data) or ttl < 0:
+            return Error(b"ERR DUMP payload version or checksum are wrong")
+        if (
+            "REPLACE" not in options
+            and self.datastore.get(key, touch=False) is not None
+        ):
+            return Error(b"BUSYKEY Target key name already exists.")
+
+        expiry = None
+        if ttl and "ABSTTL" in options:
+            expiry = datetime.fromtimestamp(ttl / 1000)
+        elif ttl:
+            expiry = datetime.now() + timedelta(milliseconds=ttl)
+            self.request = Array(
+                [
+                    *self.request.data[:2],
+                    BulkString(str(unix_ms(expiry)).encode()),
+                    *self.request.data[3:],
+                    BulkString(b"ABSTTL"),
+                ]
+            )
+        self.datastore.set(key, from_resp(value), expiry)
+        return SimpleString(b"OK")
+
+    # MIGRATE host port key|"" destination-db timeout [COPY] [REPLACE] [KEYS key [key ...]]
+    @register_command(ActiveCommand.MIGRATE, -6, admin=True)
+    async def migrate(self):
+        if self.cluster is None:
+            return Error(b"ERR This instance has cluster support disabled")
+
+        args = self.request.decode()
+        try:
+            host, port, timeout = args[1], int(args[2]), int(args[5]) / 1000
+        except ValueError:
+            return Error(b"ERR MIGRATE port and timeout must be ints")
+
+        options = [arg.upper() for arg in args[6:]]
+        copy, replace = "COPY" in options, "REPLACE" in options
+        keys = [args[3]] if args[3] else []
+        if "KEYS" in options:
+            if keys:
+                return Error(
+                    b"ERR When using MIGRATE KEYS option, the key argument must be set to the empty string"
+                )
+            keys = args[6 + options.index("KEYS") + 1 :]
+
+        records = {}
+        for key in keys:
+            record = self.datastore.get(key)
+            if record is not None:
+                records[key] = record
+        if not records:
+            return SimpleString(b"NOKEY")
+
+        commands = []
+        for key, record in records.items():
+            restore = [
+                b"RESTORE",
+                key.encode(),
+                str(
+                    int(record.expiry.timestamp() * 1000) if record.expiry else 0
+                ).encode(),
+                to_resp(record.value).serialize(),
+                b"ABSTTL",
+            ]
+            if replace:
+                restore.append(b"REPLACE")
+            commands.extend([[b"ASKING"], restore])
+
+        try:
+            replies = await send_command(host, port, *commands, timeout=timeout)
+        except (OSError, ConnectionError, asyncio.TimeoutError) as e:
+            return Error(
+                f"IOERR error or timeout writing to target instance: {e}".encode()
+            )
+
+        for reply in replies:
+            if isinstance(reply, Error):
+                return Error(b"ERR Target instance replied with error: " + reply.data)
+
+        if not copy:
+            for key, record in records.items():
+                # Writes that landed while the target was busy stay here rather than being lost.
+                if self.datastore.get(
+                    key, touch=False
+                ) is record and self.datastore.delete(key):
+                    self._propagate(
+                        Array([BulkString(b"DEL"), BulkString(key.encode())])
+                    )
+        return SimpleString(b"OK")
+
+    # HELLO [protover [AUTH username password] [SETNAME clientname]]
+    @register_command(ActiveCommand.HELLO, -1)
+    async def hello(self):
+        if self.session is None:
+            return Error(b"HELLO is not available")
+
+        args = self.request.decode()[1:]
+        protocol = self.session.protocol
+        if args:
+            try:
+                protocol = int(args[0])
+            except ValueError:
+                return Error(b"ERR Protocol version is not an integer or out of range")
+            if protocol not in (2, 3):
+                return Error(b"NOPROTO unsupported protocol version")
+
+        name = self.session.name
+        options = [arg.upper() for arg in args]
+        i = 1
+        while i < len(args):
+            match options[i]:
+                # There are no users or passwords, any credentials are accepted.
+                case "AUTH" if i + 2 < len(args):
+                    i += 3
+                case "SETNAME" if i + 1 < len(args):
+                    name = self.request.data[i + 2].data
+                    i += 2
+                case option:
+                    return Error(
+                        f"ERR Syntax error in HELLO option `{option}`".encode()
+                    )
+
+        self.session.protocol = protocol
+        self.session.name = name
+        role = self.replication.role if self.replication else "master"
+        return self._reply(
+            Map(
+                [
+                    (BulkString(b"server"), BulkString(b"pyredis")),
+                    (BulkString(b"version"), BulkString(b"0.1.0")),
+                    (BulkString(b"proto"), Integer(protocol)),
+                    (BulkString(b"id"), Integer(self.session.id)),
+                    (
+                        BulkString(b"mode"),
+                        BulkString(b"cluster" if self.cluster else b"standalone"),
+                    ),
+                    (BulkString(b"role"), BulkString(role.encode())),
+                    (BulkString(b"modules"), Array([])),
+                ]
+            )
+        )
+
+    @register_command(ActiveCommand.CLIENT, -2, admin=True)
+    async def client(self):
+        if self.session is None:
+            return Error(b"CLIENT is not available")
+
+        args = self.request.decode()[1:]
+        match [args[0].upper(), *args[1:]]:
+            case ["ID"]:
+                return Integer(self.session.id)
+            case ["SETNAME", _]:
+                name = self.request.data[2].data
+                if b" " in name:
+                    return Error(b"ERR Client names cannot contain spaces")
+                self.session.name = bytes(name) or None
+                return SimpleString(b"OK")
+            case ["GETNAME"]:
+                if self.session.name is None:
+                    return NullBulkString()
+                return BulkString(self.session.name)
+            case ["LIST", *filters]:
+                return self._client_list(filters)
+            case ["INFO"]:
+                return BulkString(f"{self.session.describe()}\n".encode())
+            case ["KILL", address]:
+                targets = self._clients_matching(["ADDR", address, "SKIPME", "no"])
+                if not isinstance(targets, list):
+                    return targets
+                if not targets:
+                    return Error(b"ERR No such client")
+                self._kill_clients(targets)
+                return SimpleString(b"OK")
+            case ["KILL", *filters] if filters:
+                targets = self._clients_matching(filters)
+                if not isinstance(targets, list):
+                    return targets
+                return Integer(self._kill_clients(targets))
+            case ["TRACKING", state, *options]:
+                return self._client_tracking(state.upper(), options)
+            case ["CACHING", value]:
+                return self._client_caching(value.upper())
+            case ["GETREDIR"]:
+                tracking = self.session.tracking
+                if tracking is None:
+                    return Integer(-1)
+                return Integer(tracking.redirect or 0)
+            case ["TRACKINGINFO"]:
+                return self._client_tracking_info()
+            case [subcommand, *_]:
+                return Error(
+                    f"Unknown CLIENT subcommand or wrong number of arguments `{subcommand}`".encode()
+                )
+
+    # CLIENT LIST [TYPE normal|replica] [ID client-id ...]
+    def _client_list(self, filters: list[str]):
+        if self.clients is None:
+            return Error(b"CLIENT LIST is not available")
+        sessions = list(self.clients.sessions.values())
+        match [arg.upper() for arg in filters[:1]] + filters[1:]:
+            case []:
+                pass
+            case ["TYPE", client_type]:
+                client_type = _CLIENT_TYPES.get(client_type.lower())
+                if client_type is None:
+                    return Error(b"ERR Unknown client type")
+                sessions = [s for s in sessions if s.client_class == client_type]
+            case ["ID", *ids] if ids:
+                try:
+                    wanted = {int(client_id) for client_id in ids}
+                except ValueError:
+                    return Error(b"ERR Invalid client ID")
+                sessions = [s for s in sessions if s.id in wanted]
+            case _:
+                return Error(b"ERR syntax error")
+        return BulkString("".join(f"{s.describe()}\n" for s in sessions).encode())
+
+    # CLIENT KILL [ID client-id] [TYPE normal|replica] [ADDR ip:port] [LADDR ip:port] [SKIPME yes|no] [MAXAGE seconds]
+    def _clients_matching(self, filters: list[str]) -> list[Session] | Error:
+        if self.clients is None:
+            return Error(b"CLIENT KILL is not available")
+        if len(filters) % 2:
+            return Error(b"ERR syntax error")
+
+        checks, skip_me = [], True
+        for name, value in zip(filters[::2], filters[1::2]):
+            match name.upper():
+                case "ID":
+                    try:
+                        client_id = int(value)
+                    except ValueError:
+                        return Error(b"ERR client-id should be greater than 0")
+                    checks.append(lambda s, client_id=client_id: s.id == client_id)
+                case "TYPE":
+                    client_type = _CLIENT_TYPES.get(value.lower())
+                    if client_type is None:
+                        return Error(f"ERR Unknown client type '{value}'".encode())
+                    checks.append(lambda s, t=client_type: s.client_class == t)
+                case "ADDR":
+                    checks.append(lambda s, addr=value: s.address == addr)
+                case "LADDR":
+                    checks.append(lambda s, addr=value: s.local_address == addr)
+                case "SKIPME" if value.lower() in ("yes", "no"):
+                    skip_me = value.lower() == "yes"
+                case "MAXAGE":
+                    try:
+                        max_age = int(value)
+                    except ValueError:
+                        return Error(b"ERR MAXAGE should be an int")
+                    now = time.monotonic()
+                    checks.append(lambda s, age=max_age: now - s.created >= age)
+                case _:
+                    return Error(b"ERR syntax error")
+
+        return [
+            session
+            for session in self.clients.sessions.values()
+            if all(check(session) for check in checks)
+            and not (skip_me and session is self.session)
+        ]
+
+    def _kill_clients(self, targets: list[Session]) -> int:
+        for session in targets:
+            if session is self.session:
+                # The reply to CLIENT KILL still goes out before the connection closes.
+                session.close_after_reply = True
+            else:
+                session.kill()
+        return len(targets)
+
+    # CLIENT TRACKING ON|OFF [REDIRECT client-id] [PREFIX prefix ...] [BCAST] [OPTIN] [OPTOUT] [NOLOOP]
+    def _client_tracking(self, state: str, args: list[str]):
+        if self.tracking is None:
+            return Error(b"CLIENT TRACKING is not available")
+        if state == "OFF":
+            self.tracking.disable(self.session)
+            return SimpleString(b"OK")
+        if state != "ON":
+            return Error(b"ERR syntax error")
+
+        options = TrackingOptions()
+        i = 0
+        while i < len(args):
+            match args[i].upper():
+                case "REDIRECT" if i + 1 < len(args):
+                    try:
+                        options.redirect = int(args[i + 1])
+                    except ValueError:
+                        return Error(b"ERR REDIRECT client id must be an int")
+                    i += 1
+                case "PREFIX" if i + 1 < len(args):
+                    options.prefixes.append(bytes(self.request.data[i + 4].data))
+                    i += 1
+                case "BCAST":
+                    options.bcast = True
+                case "OPTIN":
+                    options.optin = True
+                case "OPTOUT":
+                    options.optout = True
+                case "NOLOOP":
+                    options.noloop = True
+                case _:
+                    return Error(b"ERR syntax error")
+            i += 1
+
+        if options.prefixes and not options.bcast:
+            return Error(b"ERR PREFIX option requires BCAST mode to be enabled")
+        if options.optin and options.optout:
+            return Error(
+                b"ERR You can't use both OPTIN and OPTOUT, they are mutually exclusive"
+            )
+        if options.bcast and (options.optin or options.optout):
+            return Error(b"ERR OPTIN and OPTOUT are not compatible with BCAST")
+        if options.redirect is not None and options.redirect != self.session.id:
+            if self.clients is None or self.clients.get(options.redirect) is None:
+                return Error(b"ERR The client ID you want redirect to does not exist")
+        elif options.redirect == self.session.id:
+            options.redirect = None
+
+        self.tracking.enable(self.session, options)
+        return SimpleString(b"OK")
+
+    def _client_caching(self, value: str):
+        tracking = self.session.tracking
+        if value not in ("YES", "NO"):
+            return Error(b"ERR syntax error")
+        if tracking is None:
+            return Error(
+                b"ERR CLIENT CACHING can be called only when the client is in tracking mode with OPTIN or OPTOUT mode enabled"
+            )
+        if value == "YES" and not tracking.optin:
+            return Error(
+                b"ERR CLIENT CACHING YES is only valid when tracking is enabled in OPTIN mode."
+            )
+        if value == "NO" and not tracking.optout:
+            return Error(
+                b"ERR CLIENT CACHING NO is only valid when tracking is enabled in OPTOUT mode."
+            )
+        self.session.caching = value == "YES"
+        return SimpleString(b"OK")
+
+    def _client_tracking_info(self):
+        tracking = self.session.tracking
+        if tracking is None:
+            flags, redirect, prefixes = [b"off"], -1, []
+        else:
+            flags = [b"on"]
+            flags += [b"bcast"] if tracking.bcast else []
+            flags += [b"optin"] if tracking.optin else []
+            flags += [b"optout"] if tracking.optout else []
+            flags += [b"noloop"] if tracking.noloop else []
+            if tracking.optin and self.session.caching:
+                flags.append(b"caching-yes")
+            if tracking.optout and self.session.caching is False:
+                flags.append(b"caching-no")
+            if (
+                tracking.redirect is not None
+                and self.clients.get(tracking.redirect) is None
+            ):
+                flags.append(b"broken_redirect")
+            redirect = tracking.redirect or 0
+            prefixes = tracking.prefixes if tracking.bcast else []
+
+        return self._reply(
+            Map(
+                [
+                    (BulkString(b"flags"), Set([BulkString(flag) for flag in flags])),
+                    (BulkString(b"redirect"), Integer(redirect)),
+                    (
+                        BulkString(b"prefixes"),
+                        Array([BulkString(prefix) for prefix in prefixes]),
+                    ),
+                ]
+            )
+        )
+
+    @register_command(ActiveCommand.TYPE, 2, keys=SINGLE_KEY)
+    async def type(self):
+        record = self.datastore.get(self.request.data[1].decode(), touch=False)
+        if record is None:
+            return SimpleString(b"none")
+        return SimpleString(type_name(record.value).encode())
+
+    # SCAN cursor [MATCH pattern] [COUNT count] [TYPE type]
+    @register_command(ActiveCommand.SCAN, -2)
+    async def scan(self):
+        # The options come in pairs after the cursor.
+        if len(self.request.data) % 2:
+            return Error(b"ERR syntax error")
+
+        args = self.request.decode()
+        try:
+            cursor = int(args[1])
+        except ValueError:
+            return Error(b"ERR invalid cursor")
+        if cursor < 0:
+            return Error(b"ERR invalid cursor")
+
+        pattern, count, key_type = None, 10, None
+        for option, value in zip(args[2::2], args[3::2]):
+            match option.upper():
+                case "MATCH":
+                    pattern = value
+                case "COUNT":
+                    try:
+                        count = int(value)
+                    except ValueError:
+                        return Error(b"ERR value is not an integer or out of range")
+                    if count < 1:
+                        return Error(b"ERR syntax error")
+                case "TYPE":
+                    key_type = value.lower()
+                case _:
+                    return Error(b"ERR syntax error")
+
+        prefix = literal_prefix(pattern) if pattern is not None else ""
+        if prefix and self.datastore.prefix_index is not None:
+            # Sorted keys resume after the last key returned, whatever changed in between.
+            after = None
+            if cursor:
+                after = cursor_key(cursor)
+                if after is None:
+                    return Error(b"ERR invalid cursor")
+            keys = self.datastore.prefix_index.keys(prefix, after, count)
+            cursor = key_cursor(keys[-1]) if len(keys) == count else 0
+        else:
+            cursor, keys = self.datastore.scan(cursor, count)
+        matches = []
+        for key in keys:
+            if pattern is not None and not glob_match(pattern, key):
+                continue
+            record = self.datastore.get(key, touch=False)
+            if record is None:
+                continue
+            if key_type is not None and type_name(record.value) != key_type:
+                continue
+            matches.append(BulkString(key.encode()))
+        return Array([BulkString(str(cursor).encode()), Array(matches)])
+
+    # KEYS pattern
+    @register_command(ActiveCommand.KEYS, 2)
+    async def keys_command(self):
+        pattern = self.request.data[1].decode()
+        matches = []
+        for key in self.datastore.keys(literal_prefix(pattern)):
+            if glob_match(pattern, key) and self.datastore.get(key, touch=False):
+                matches.append(BulkString(key.encode()))
+        return Array(matches)
+
+    # DELPREFIX prefix
+    @register_command(ActiveCommand.DELPREFIX, 2, write=True)
+    async def delete_prefix(self):
+        prefix = self.request.data[1].decode()
+        if not prefix:
+            return Error(b"ERR empty prefix, use FLUSHDB to delete every key")
+        deleted = 0
+        for key in self.datastore.keys(prefix):
+            if self.datastore.get(key, touch=False) is not None:
+                deleted += self.datastore.delete(key)
+        return Integer(deleted)
 
-        return Array(current.value.data[start:stop])
+    @register_command(ActiveCommand.MEMORY, -2, keys=(2, 2, 1))
+    async def memory(self):
+        args = self.request.decode()[1:]
+        match [args[0].upper(), *args[1:]]:
+            # MEMORY USAGE key [SAMPLES count]
+            case ["USAGE", key]:
+                samples = MEMORY_USAGE_SAMPLES
+            case ["USAGE", key, option, count] if option.upper() == "SAMPLES":
+                try:
+                    samples = int(count)
+                except ValueError:
+                    return Error(b"ERR value is not an integer or out of range")
+            case ["STATS"]:
+                return self._reply(
+                    Map(
+                        [
+                            (BulkString(name.encode()), Integer(value))
+                            for name, value in memory_stats(
+                                self.datastore,
+                                self.clients,
+                                self.replication,
+                                self.cmd_logger,
+                                self.tracking,
+                            )
+                        ]
+                    )
+                )
+            case [subcommand, *_]:
+                return Error(
+                    f"Unknown MEMORY subcommand or wrong number of arguments `{subcommand}`".encode()
+                )
+
+        record = self.datastore.get(key, touch=False)
+        if record is None:
+            return NullBulkString()
+        return Integer(key_usage(key, record, samples))
+
+    @register_command(ActiveCommand.OBJECT, -2, keys=(2, 2, 1))
+    async def object(self):
+        args = self.request.decode()[1:]
+        match [args[0].upper(), *args[1:]]:
+            case ["ENCODING" | "FREQ" | "IDLETIME" | "REFCOUNT" as subcommand, key]:
+                pass
+            case [subcommand, *_]:
+                return Error(
+                    f"Unknown OBJECT subcommand or wrong number of arguments `{subcommand}`".encode()
+                )
+
+        # Introspection does not count as an access.
+        record = self.datastore.get(key, touch=False)
+        if record is None:
+            return NullBulkString()
+        match subcommand:
+            case "ENCODING":
+                return BulkString(encoding_of(record.value).encode())
+            case "FREQ":
+                return Integer(record.decayed_freq(self.datastore.clock))
+            case "IDLETIME":
+                return Integer(self.datastore.clock - record.accessed)
+            case "REFCOUNT":
+                # Like Redis, values from the shared integer pool report INT_MAX references.
+                shared = (
+                    isinstance(record.value, int)
+                    and 0 <= record.value < OBJ_SHARED_INTEGERS
+                )
+                return Integer(2**31 - 1 if shared else 1)
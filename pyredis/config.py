@@ -1,4 +1,48 @@
 PORT = 6379  # Redis Port
 BUFFER_SIZE = 4096
+PROTO_MAX_BULK_LEN = 512 * 1024 * 1024  # bytes of a bulk string in a request
+PROTO_MAX_MULTIBULK_LEN = 1024 * 1024  # arguments of a request
 HOST = "localhost"
+TCP_BACKLOG = 511  # pending connections queued by the listening sockets
+TCP_KEEPALIVE = 300  # seconds of idle time before keepalive probes of a client connection, 0 disables
+MAX_ACCEPTS_PER_CALL = 1000  # connections accepted per wake up of a listening socket
 AOF_NAME = "dump.aof"
+DATABASES = 16  # logical databases, numbered from 0 for SELECT
+SLOWLOG_LOG_SLOWER_THAN = 10000  # microseconds
+SLOWLOG_MAX_LEN = 128
+LATENCY_MONITOR_THRESHOLD = 100  # milliseconds, 0 disables
+LATENCY_HISTORY_LEN = 160
+REPL_BACKLOG_SIZE = 1024 * 1024  # bytes
+# Unsent output a client may hold before it is disconnected: (hard bytes, soft bytes, soft seconds), 0 disables.
+CLIENT_OUTPUT_BUFFER_LIMITS = {
+    "normal": (128 * 1024 * 1024, 32 * 1024 * 1024, 30),
+    "replica": (256 * 1024 * 1024, 64 * 1024 * 1024, 60),
+}
+CLIENT_READ_THROTTLE = (
+    1024 * 1024
+)  # bytes of unsent output after which a client's requests are not read
+TRACKING_TABLE_MAX_KEYS = 1_000_000  # keys remembered for CLIENT TRACKING
+LAZYFREE_THRESHOLD = 64  # elements, smaller lists are freed inline
+LAZYFREE_BLOB_THRESHOLD = 1024 * 1024  # bytes, smaller strings are freed inline
+LAZYFREE_CHUNK_SIZE = 1024  # elements freed per step of the background reclaimer
+MEMORY_USAGE_SAMPLES = (
+    5  # elements of a list sized by MEMORY USAGE, 0 sizes all of them
+)
+MEMORY_STATS_SAMPLES = (
+    1000  # keys sized to estimate the whole keyspace for MEMORY STATS
+)
+LFU_LOG_FACTOR = 10  # higher values need more hits to grow OBJECT FREQ
+LFU_DECAY_TIME = 1  # minutes without access that decrement OBJECT FREQ by one
+PROFILER_SAMPLE_INTERVAL = 1  # milliseconds between stack samples of the profiler
+HLL_SPARSE_MAX_BYTES = 3000  # size of a sparse HyperLogLog converted to dense
+STREAM_NODE_MAX_ENTRIES = (
+    100  # entries of a stream chunk, approximate trims drop whole chunks
+)
+PREFIX_INDEX_CHUNK_SIZE = 1000  # keys per sorted chunk of the prefix index
+HOTKEYS_TOP = 16  # hottest keys kept by HOTKEYS
+HOTKEYS_WIDTH = 4096  # counters per row of the hot key sketch, a power of two
+HOTKEYS_DEPTH = 4  # rows of the hot key sketch
+HOTKEYS_SAMPLE_RATE = (
+    8  # the hot key sketch counts one command in this many, on average
+)
+HOTKEYS_DECAY_SECONDS = 10  # seconds between halvings of the hot key counts, 0 disables
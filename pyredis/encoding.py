@@ -0,0 +1,136 @@
+import math
+from decimal import Decimal
+
+from pyredis.protocol import Array, BulkString, Integer, Map, PyRedisData
+from pyredis.stream import Stream
+
+# Stored values are plain python objects, RESP types are only built for replies, DUMP and replication:
+#  - int for strings holding a canonical 64 bit integer, values below OBJ_SHARED_INTEGERS share one object
+#  - bytes for short strings, immutable and without the spare capacity of a bytearray
+#  - bytearray for long strings and strings changed in place by APPEND and SETRANGE
+#  - list of bytes | bytearray elements for lists
+#  - Stream for streams
+OBJ_SHARED_INTEGERS = 10000
+EMBSTR_SIZE_LIMIT = 44
+MAX_INTEGER_LENGTH = 20  # len(str(-(2**63)))
+INTEGER_MIN, INTEGER_MAX = -(2**63), 2**63 - 1
+
+StringValue = int | bytes | bytearray
+Value = StringValue | list | Stream
+
+# Python only caches the ints below 257, parsing "1000" twice gives two objects.
+_SHARED_INTEGERS = tuple(range(OBJ_SHARED_INTEGERS))
+
+
+class Encoding:
+    INT = "int"
+    EMBSTR = "embstr"
+    RAW = "raw"
+    QUICKLIST = "quicklist"
+    STREAM = "stream"
+
+
+def shared_integer(value: int) -> int:
+    return _SHARED_INTEGERS[value] if 0 <= value < OBJ_SHARED_INTEGERS else value
+
+
+def parse_integer(data: bytes | bytearray) -> int | None:
+    """The value of a canonical decimal string in the 64 bit range, long or non numeric values are rejected
+    without decoding."""
+    if not 0 < len(data) <= MAX_INTEGER_LENGTH:
+        return None
+    digits = data[1:] if data[:1] == b"-" else data
+    if not digits.isdigit() or (digits[:1] == b"0" and len(data) > 1):
+        return None
+    value = int(data)
+    return value if INTEGER_MIN <= value <= INTEGER_MAX else None
+
+
+def encode_string(data: bytes | bytearray) -> StringValue:
+    """The most compact encoding of a string received from a client, long values keep their buffer."""
+    value = parse_integer(data)
+    if value is not None:
+        return shared_integer(value)
+    return compact_string(data)
+
+
+def compact_string(data: bytes | bytearray) -> bytes | bytearray:
+    """A string that is never read as an integer, such as a list element, only long ones keep their buffer."""
+    if len(data) <= EMBSTR_SIZE_LIMIT:
+        return bytes(data)
+    return data if isinstance(data, bytearray) else bytearray(data)
+
+
+def parse_float(data: bytes | bytearray) -> float | None:
+    """A finite float, without the surrounding spaces and `_` separators that float() accepts."""
+    if not data or data[:1].isspace() or data[-1:].isspace() or b"_" in data:
+        return None
+    try:
+        value = float(data)
+    except ValueError:
+        return None
+    return value if math.isfinite(value) else None
+
+
+def format_float(value: float) -> bytes:
+    """The shortest form that reads back as the same float, without exponent or trailing `.0`."""
+    text = repr(value + 0.0)  # -0.0 + 0.0 is 0.0
+    if "e" in text:
+        text = format(Decimal(text), "f")
+    return text.removesuffix(".0").encode()
+
+
+def is_string(value: Value) -> bool:
+    return isinstance(value, (int, bytes, bytearray))
+
+
+def string_bytes(value: StringValue) -> bytes | bytearray:
+    return b"%i" % value if isinstance(value, int) else value
+
+
+def encoding_of(value: Value) -> str:
+    match value:
+        case int():
+            return Encoding.INT
+        case bytes():
+            return Encoding.EMBSTR
+        case bytearray():
+            return Encoding.RAW
+        case Stream():
+            return Encoding.STREAM
+        case _:
+            return Encoding.QUICKLIST
+
+
+def type_name(value: Value) -> str:
+    """The Redis type reported by TYPE for a stored value."""
+    match value:
+        case list():
+            return "list"
+        case Stream():
+            return "stream"
+        case _:
+            return "string"
+
+
+def to_resp(value: Value) -> PyRedisData:
+    match value:
+        case list():
+            return Array([BulkString(item) for item in value])
+        case Stream():
+            return value.to_resp()
+        case _:
+            return BulkString(string_bytes(value))
+
+
+def from_resp(frame: PyRedisData) -> Value:
+    """The stored form of a value serialized by `to_resp`, older dumps hold integers as RESP integers."""
+    match frame:
+        case Array():
+            return [compact_string(item.data) for item in frame.data]
+        case Map():
+            return Stream.from_resp(frame)
+        case Integer():
+            return shared_integer(frame.data)
+        case _:
+            return encode_string(frame.data)
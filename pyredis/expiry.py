@@ -1,26 +1,36 @@
 import asyncio
 import math
+import time
 import traceback
 
-from pyredis.store import DataStoreWithLock
+from pyredis.monitor import LatencyEvent, LatencyMonitor
+from pyredis.store import Databases
 
 SAMPLE_SIZE = float(".2")
 INTERVAL_SECONDS = 300
 
 
 async def run_cleanup_in_background(
-    datastore: DataStoreWithLock, interval_seconds=INTERVAL_SECONDS
+    databases: Databases,
+    interval_seconds=INTERVAL_SECONDS,
+    latency: LatencyMonitor | None = None,
 ):
-    """Get 20% of the random keys, if the key expired, datastore will cull it automatically"""
+    """Get 20% of the random keys of every database, if the key expired, datastore will cull it automatically"""
     print(f"Expiry Interval: {interval_seconds} seconds")
     while True:
         try:
-            size = datastore.size()
-            if size:
-                count = math.ceil(size * SAMPLE_SIZE)
-                for _ in range(count):
-                    key = datastore.get_random_key()
-                    datastore.get(key)
+            start = time.perf_counter_ns()
+            for datastore in databases:
+                size = datastore.size()
+                if size:
+                    count = math.ceil(size * SAMPLE_SIZE)
+                    for _ in range(count):
+                        key = datastore.get_random_key()
+                        datastore.get(key, touch=False)
+            if latency:
+                latency.add_sample(
+                    LatencyEvent.EXPIRE_CYCLE, time.perf_counter_ns() - start
+                )
 
         except asyncio.CancelledError:
             print("Cleanup task cancelled")
@@ -0,0 +1,61 @@
+import re
+from functools import lru_cache
+
+
+@lru_cache(maxsize=256)
+def _compile(pattern: str) -> re.Pattern:
+    """Translate a Redis glob: `*`, `?`, `[abc]`, `[^a-z]` and `\\` escapes."""
+    parts, i = [], 0
+    while i < len(pattern):
+        char = pattern[i]
+        if char == "*":
+            parts.append(".*")
+        elif char == "?":
+            parts.append(".")
+        elif char == "\\" and i + 1 < len(pattern):
+            i += 1
+            parts.append(re.escape(pattern[i]))
+        elif char == "[":
+            end = i + 1
+            negate = end < len(pattern) and pattern[end] == "^"
+            if negate:
+                end += 1
+            members = []
+            while end < len(pattern) and pattern[end] != "]":
+                if pattern[end] == "\\" and end + 1 < len(pattern):
+                    end += 1
+                    members.append(re.escape(pattern[end]))
+                elif pattern[end] == "-" and members and end + 1 < len(pattern):
+                    members.append("-")
+                else:
+                    members.append(re.escape(pattern[end]))
+                end += 1
+            # An unterminated class runs to the end of the pattern, like in Redis.
+            if members:
+                parts.append(f"[{'^' if negate else ''}{''.join(members)}]")
+            else:
+                parts.append("." if negate else "(?!)")
+            i = end
+        else:
+            parts.append(re.escape(char))
+        i += 1
+    return re.compile("".join(parts), re.DOTALL)
+
+
+def glob_match(pattern: str, key: str) -> bool:
+    return _compile(pattern).fullmatch(key) is not None
+
+
+def literal_prefix(pattern: str) -> str:
+    """The characters every match starts with, the pattern up to its first wildcard."""
+    prefix, i = [], 0
+    while i < len(pattern):
+        char = pattern[i]
+        if char in "*?[":
+            break
+        if char == "\\" and i + 1 < len(pattern):
+            i += 1
+            char = pattern[i]
+        prefix.append(char)
+        i += 1
+    return "".join(prefix)
@@ -0,0 +1,135 @@
+import asyncio
+import random
+import sys
+from zlib import crc32
+
+from pyredis.config import (
+    HOTKEYS_DECAY_SECONDS,
+    HOTKEYS_DEPTH,
+    HOTKEYS_SAMPLE_RATE,
+    HOTKEYS_TOP,
+    HOTKEYS_WIDTH,
+)
+
+
+class HotKeys:
+    """The most accessed keys, counted in a count-min sketch with a small table of the top ones.
+
+    An access adds one to a counter in each of `depth` rows of `width` counters, at positions derived from
+    one CRC32 of the key. The estimate of a key is the smallest of its counters: collisions only ever make
+    it too big, by about accesses * e / width at worst on most keys. A key whose estimate beats the
+    smallest count of the top table takes its place. The sketch and the table have a fixed size, whatever
+    the number of keys.
+
+    Only one command in `sample_rate` on average is counted, after a random number of commands so a
+    periodic pattern of requests can't hide a key. Counts are scaled back up when reported. Every
+    `decay_seconds` all the counts are halved, so keys that stop being accessed make room for the ones
+    hot now.
+    """
+
+    def __init__(
+        self,
+        top=HOTKEYS_TOP,
+        width=HOTKEYS_WIDTH,
+        depth=HOTKEYS_DEPTH,
+        sample_rate=HOTKEYS_SAMPLE_RATE,
+        decay_seconds=HOTKEYS_DECAY_SECONDS,
+    ):
+        if width < 1 or width & (width - 1):
+            raise ValueError("The width of the sketch must be a power of two")
+        self.top = top
+        self.width = width
+        self.depth = depth
+        self.sample_rate = sample_rate
+        self.decay_seconds = decay_seconds
+        self._mask = width - 1
+        # Lists rather than arrays: reading an array item allocates an int, a list holds small ones shared.
+        self._rows = [[0] * width for _ in range(depth)]
+        self._top: dict[bytes, int] = {}
+        # No key below this count can enter the full top table. It can lag behind the smallest count
+        # of the table, and is brought up to it when a key is turned away.
+        self._floor = 0
+        self._countdown = 1
+        self.sampled = 0
+
+    def sample(self) -> bool:
+        """Whether to count the keys of the current command, True once every `sample_rate` calls on average."""
+        self._countdown -= 1
+        if self._countdown:
+            return False
+        self._countdown = 1 + int(random.random() * (2 * self.sample_rate - 1))
+        self.sampled += 1
+        return True
+
+    def add(self, key: bytes | bytearray) -> int:
+        """Count an access to key, returns its estimated count in the sketch."""
+        # Double hashing: row i uses h + i * step, both halves come from the same CRC.
+        h = crc32(key)
+        step = (h >> 16) | 1
+        mask = self._mask
+        estimate = 0xFFFFFFFF
+        for row in self._rows:
+            i = h & mask
+            count = row[i] + 1
+            row[i] = count
+            if count < estimate:
+                estimate = count
+            h += step
+        if estimate > self._floor:
+            self._promote(bytes(key), estimate)
+        return estimate
+
+    def _promote(self, key: bytes, estimate: int):
+        top = self._top
+        if key in top or len(top) < self.top:
+            top[key] = estimate
+            return
+        coldest = min(top, key=top.get)
+        if estimate > top[coldest]:
+            del top[coldest]
+            top[key] = estimate
+        self._floor = min(top.values())
+
+    def estimate(self, key: bytes | bytearray) -> int:
+        """The estimated accesses to key since the counts were last halved."""
+        h = crc32(key)
+        step = (h >> 16) | 1
+        estimate = 0xFFFFFFFF
+        for row in self._rows:
+            estimate = min(estimate, row[h & self._mask])
+            h += step
+        return estimate * self.sample_rate
+
+    def hottest(self, count: int | None = None) -> list[tuple[bytes, int]]:
+        """The top keys with their estimated accesses, hottest first."""
+        ranked = sorted(self._top.items(), key=lambda item: item[1], reverse=True)
+        return [(key, hits * self.sample_rate) for key, hits in ranked[:count]]
+
+    def decay(self):
+        """Halve every count, the keys left with none leave the top table."""
+        self._rows = [[count >> 1 for count in row] for row in self._rows]
+        self._top = {key: count >> 1 for key, count in self._top.items() if count > 1}
+        self._floor = min(self._top.values()) if len(self._top) >= self.top else 0
+
+    def reset(self):
+        self._rows = [[0] * self.width for _ in range(self.depth)]
+        self._top.clear()
+        self._floor = 0
+        self.sampled = 0
+
+    def memory_usage(self) -> int:
+        # Counts up to 256 are cached small ints, only bigger ones are objects of their own.
+        big = sum(count > 256 for row in self._rows for count in row)
+        return (
+            sum(sys.getsizeof(row) for row in self._rows)
+            + big * sys.getsizeof(2**20)
+            + sys.getsizeof(self._top)
+            + sum(sys.getsizeof(key) for key in self._top)
+        )
+
+    async def run_decay(self):
+        if self.decay_seconds <= 0:
+            return
+        while True:
+            await asyncio.sleep(self.decay_seconds)
+            self.decay()
@@ -0,0 +1,322 @@
+import math
+from hashlib import blake2b
+
+from pyredis.config import HLL_SPARSE_MAX_BYTES
+
+# The layout of a Redis HyperLogLog string:
+#   "HYLL" | encoding (0 dense, 1 sparse) | 3 unused bytes | 8 bytes cached cardinality, little endian
+# followed by the registers. The top bit of the last cardinality byte marks the cache as stale.
+# Dense registers are 6 bits each, packed from the least significant bit of every byte: 4 registers
+# for every 3 bytes. Sparse registers are run length encoded with three opcodes:
+#   00xxxxxx           xxxxxx + 1 registers set to 0
+#   01xxxxxx yyyyyyyy  xxxxxxyyyyyyyy + 1 registers set to 0
+#   1vvvvvxx           xx + 1 registers set to vvvvv + 1
+# Elements are hashed with a 64 bit BLAKE2b rather than Redis' MurmurHash64A.
+HLL_P = 14
+HLL_Q = 64 - HLL_P
+HLL_REGISTERS = 1 << HLL_P
+HLL_BITS = 6
+HLL_REGISTER_MAX = (1 << HLL_BITS) - 1
+HLL_HDR_SIZE = 16
+HLL_DENSE_SIZE = HLL_HDR_SIZE + HLL_REGISTERS * HLL_BITS // 8
+HLL_DENSE = 0
+HLL_SPARSE = 1
+HLL_SPARSE_VAL_MAX = 32
+HLL_SPARSE_VAL_RUN = 4
+HLL_SPARSE_ZERO_RUN = 64
+HLL_SPARSE_XZERO_RUN = 16384
+HLL_ALPHA_INF = 0.721347520444481703680
+
+_MAGIC = b"HYLL"
+_STALE = 0x80
+
+# Byte lanes for SWAR: one register per byte of a big int, so whole register arrays are shifted, masked and
+# compared with a handful of big int operations instead of a python loop per register.
+_GROUPS = HLL_REGISTERS // 4
+_LANES_03 = int.from_bytes(b"\x03" * _GROUPS, "little")
+_LANES_0F = int.from_bytes(b"\x0f" * _GROUPS, "little")
+_LANES_80 = int.from_bytes(b"\x80" * HLL_REGISTERS, "little")
+_LANES_FF = int.from_bytes(b"\xff" * HLL_REGISTERS, "little")
+_AND_3F = bytes(value & 0x3F for value in range(256))
+_SHR_2 = bytes(value >> 2 for value in range(256))
+
+
+class InvalidHyperLogLog(ValueError):
+    pass
+
+
+def _header(encoding: int) -> bytearray:
+    header = bytearray(_MAGIC + bytes([encoding]) + bytes(11))
+    header[15] = _STALE
+    return header
+
+
+def is_hyperloglog(value: bytes | bytearray) -> bool:
+    if len(value) < HLL_HDR_SIZE or value[:4] != _MAGIC:
+        return False
+    if value[4] == HLL_DENSE:
+        return len(value) == HLL_DENSE_SIZE
+    return value[4] == HLL_SPARSE
+
+
+def encoding(value: bytes | bytearray) -> str:
+    return "dense" if value[4] == HLL_DENSE else "sparse"
+
+
+def new_hyperloglog() -> bytearray:
+    """An empty HyperLogLog, sparse: a single run of zero registers."""
+    return _header(HLL_SPARSE) + _sparse_zeros(HLL_REGISTERS)
+
+
+def hash_element(element: bytes | bytearray) -> tuple[int, int]:
+    """The register of an element and its run of trailing zeros plus one, in 1..HLL_Q + 1."""
+    value = int.from_bytes(blake2b(element, digest_size=8).digest(), "little")
+    index = value & (HLL_REGISTERS - 1)
+    value = (value >> HLL_P) | (1 << HLL_Q)
+    return index, (value & -value).bit_length()
+
+
+# Dense registers.
+def unpack_registers(dense: bytes | bytearray) -> bytearray:
+    """One byte per register, from the packed 6 bit registers of a dense HyperLogLog."""
+    packed = memoryview(dense)[HLL_HDR_SIZE:]
+    b0, b1, b2 = bytes(packed[0::3]), bytes(packed[1::3]), bytes(packed[2::3])
+    x1 = int.from_bytes(b1, "little")
+    r1 = ((int.from_bytes(b0, "little") >> 6) & _LANES_03) | ((x1 & _LANES_0F) << 2)
+    r2 = ((x1 >> 4) & _LANES_0F) | ((int.from_bytes(b2, "little") & _LANES_03) << 4)
+
+    registers = bytearray(HLL_REGISTERS)
+    registers[0::4] = b0.translate(_AND_3F)
+    registers[1::4] = r1.to_bytes(_GROUPS, "little")
+    registers[2::4] = r2.to_bytes(_GROUPS, "little")
+    registers[3::4] = b2.translate(_SHR_2)
+    return registers
+
+
+def pack_registers(registers: bytes | bytearray) -> bytearray:
+    """A dense HyperLogLog from one byte per register."""
+    r0, r1, r2, r3 = (int.from_bytes(registers[lane::4], "little") for lane in range(4))
+    b0 = r0 | ((r1 & _LANES_03) << 6)
+    # Right shifts pull the low bits of the next lane in, hence the masks.
+    b1 = ((r1 >> 2) & _LANES_0F) | ((r2 & _LANES_0F) << 4)
+    b2 = ((r2 >> 4) & _LANES_03) | (r3 << 2)
+
+    packed = bytearray(HLL_REGISTERS * HLL_BITS // 8)
+    packed[0::3] = b0.to_bytes(_GROUPS, "little")
+    packed[1::3] = b1.to_bytes(_GROUPS, "little")
+    packed[2::3] = b2.to_bytes(_GROUPS, "little")
+    return _header(HLL_DENSE) + packed
+
+
+def max_registers(a: bytes | bytearray, b: bytes | bytearray) -> bytes:
+    """The register wise maximum, the union of two HyperLogLogs."""
+    x, y = int.from_bytes(a, "little"), int.from_bytes(b, "little")
+    # Registers are below 64, so (x | 0x80) - y never borrows from the next byte and keeps 0x80 when x >= y.
+    x_wins = (((x | _LANES_80) - y) & _LANES_80) >> 7
+    select = x_wins * 0xFF
+    merged = (x & select) | (y & (select ^ _LANES_FF))
+    return merged.to_bytes(HLL_REGISTERS, "little")
+
+
+def _dense_set(dense: bytearray, updates: dict[int, int]) -> bool:
+    changed = False
+    last = len(dense) - 1
+    for index, count in updates.items():
+        bit = index * HLL_BITS
+        pos, shift = HLL_HDR_SIZE + bit // 8, bit & 7
+        b1 = dense[pos + 1] if pos < last else 0
+        current = ((dense[pos] >> shift) | (b1 << (8 - shift))) & HLL_REGISTER_MAX
+        if count <= current:
+            continue
+        dense[pos] = (dense[pos] & ~(HLL_REGISTER_MAX << shift) & 0xFF) | (
+            (count << shift) & 0xFF
+        )
+        if shift > 8 - HLL_BITS:
+            dense[pos + 1] = (b1 & ~(HLL_REGISTER_MAX >> (8 - shift))) | (
+                count >> (8 - shift)
+            )
+        changed = True
+    return changed
+
+
+# Sparse registers.
+def _sparse_zeros(run: int) -> bytearray:
+    ops = bytearray()
+    while run:
+        if run > HLL_SPARSE_ZERO_RUN:
+            length = min(run, HLL_SPARSE_XZERO_RUN)
+            ops += bytes([0x40 | ((length - 1) >> 8), (length - 1) & 0xFF])
+        else:
+            length = run
+            ops.append(length - 1)
+        run -= length
+    return ops
+
+
+def sparse_registers(sparse: bytes | bytearray) -> dict[int, int]:
+    """The non zero registers of a sparse HyperLogLog."""
+    registers, index, pos, end = {}, 0, HLL_HDR_SIZE, len(sparse)
+    while pos < end:
+        op = sparse[pos]
+        if op & 0x80:
+            value, run = ((op >> 2) & 0x1F) + 1, (op & 0x03) + 1
+            for i in range(index, index + run):
+                registers[i] = value
+            index, pos = index + run, pos + 1
+        elif op & 0x40:
+            if pos + 1 >= end:
+                raise InvalidHyperLogLog("truncated sparse opcode")
+            index, pos = index + (((op & 0x3F) << 8) | sparse[pos + 1]) + 1, pos + 2
+        else:
+            index, pos = index + (op & 0x3F) + 1, pos + 1
+    if index != HLL_REGISTERS:
+        raise InvalidHyperLogLog("sparse registers do not add up")
+    return registers
+
+
+def _sparse_encode(registers: dict[int, int]) -> bytearray:
+    ops, index = bytearray(), 0
+    items = sorted(registers.items())
+    i = 0
+    while i < len(items):
+        start, value = items[i]
+        if start > index:
+            ops += _sparse_zeros(start - index)
+        run = 1
+        while (
+            run < HLL_SPARSE_VAL_RUN
+            and i + run < len(items)
+            and items[i + run] == (start + run, value)
+        ):
+            run += 1
+        ops.append(0x80 | ((value - 1) << 2) | (run - 1))
+        index, i = start + run, i + run
+    if index < HLL_REGISTERS:
+        ops += _sparse_zeros(HLL_REGISTERS - index)
+    return ops
+
+
+def _unpack_sparse(registers: dict[int, int]) -> bytearray:
+    unpacked = bytearray(HLL_REGISTERS)
+    for index, value in registers.items():
+        unpacked[index] = value
+    return unpacked
+
+
+def _fit_sparse(registers: dict[int, int], sparse_max_bytes: int) -> bytearray | None:
+    """The sparse opcodes for the registers, None when they do not fit in `sparse_max_bytes`."""
+    # Every VAL opcode covers at most 4 registers, skip encoding when that alone is too big.
+    if len(registers) > (sparse_max_bytes - HLL_HDR_SIZE) * HLL_SPARSE_VAL_RUN:
+        return None
+    if registers and max(registers.values()) > HLL_SPARSE_VAL_MAX:
+        return None
+    ops = _sparse_encode(registers)
+    return ops if HLL_HDR_SIZE + len(ops) <= sparse_max_bytes else None
+
+
+def to_registers(hll: bytes | bytearray) -> bytearray:
+    """One byte per register, whatever the encoding."""
+    if hll[4] == HLL_DENSE:
+        return unpack_registers(hll)
+    return _unpack_sparse(sparse_registers(hll))
+
+
+def from_registers(
+    registers: bytes | bytearray, sparse_max_bytes=HLL_SPARSE_MAX_BYTES
+) -> bytearray:
+    """A HyperLogLog from one byte per register, sparse when it fits in `sparse_max_bytes`."""
+    if HLL_REGISTERS - registers.count(0) <= sparse_max_bytes * HLL_SPARSE_VAL_RUN:
+        ops = _fit_sparse(
+            {index: value for index, value in enumerate(registers) if value},
+            sparse_max_bytes,
+        )
+        if ops is not None:
+            return _header(HLL_SPARSE) + ops
+    return pack_registers(registers)
+
+
+def add_elements(
+    hll: bytearray, elements: list[bytes], sparse_max_bytes=HLL_SPARSE_MAX_BYTES
+) -> tuple[bytearray, bool]:
+    """Add elements, returns the HyperLogLog, converted to dense when the sparse form got too big or a
+    count does not fit in it, and whether any register changed."""
+    updates: dict[int, int] = {}
+    for element in elements:
+        index, count = hash_element(element)
+        if count > updates.get(index, 0):
+            updates[index] = count
+    if not updates:
+        return hll, False
+
+    if hll[4] == HLL_SPARSE:
+        registers = sparse_registers(hll)
+        changed = False
+        for index, count in updates.items():
+            if count > registers.get(index, 0):
+                registers[index] = count
+                changed = True
+        if not changed:
+            return hll, False
+        ops = _fit_sparse(registers, sparse_max_bytes)
+        if ops is None:
+            return pack_registers(_unpack_sparse(registers)), True
+        hll[HLL_HDR_SIZE:] = ops
+        invalidate(hll)
+        return hll, True
+
+    if _dense_set(hll, updates):
+        invalidate(hll)
+        return hll, True
+    return hll, False
+
+
+def invalidate(hll: bytearray):
+    hll[15] |= _STALE
+
+
+# Cardinality, the estimator of Ertl's "New cardinality estimation algorithms for HyperLogLog sketches".
+def _tau(x: float) -> float:
+    if x == 0.0 or x == 1.0:
+        return 0.0
+    y, z = 1.0, 1 - x
+    while True:
+        x = math.sqrt(x)
+        previous = z
+        y *= 0.5
+        z -= (1 - x) ** 2 * y
+        if previous == z:
+            return z / 3
+
+
+def _sigma(x: float) -> float:
+    if x == 1.0:
+        return math.inf
+    y, z = 1.0, x
+    while True:
+        x *= x
+        previous = z
+        z += x * y
+        y += y
+        if previous == z:
+            return z
+
+
+def estimate(registers: bytes | bytearray) -> int:
+    m = HLL_REGISTERS
+    histogram = [registers.count(value) for value in range(HLL_Q + 2)]
+    z = m * _tau((m - histogram[HLL_Q + 1]) / m)
+    for j in range(HLL_Q, 0, -1):
+        z += histogram[j]
+        z *= 0.5
+    z += m * _sigma(histogram[0] / m)
+    return round(HLL_ALPHA_INF * m * m / z)
+
+
+def cardinality(hll: bytes | bytearray) -> int:
+    """The estimated cardinality, cached in the header of mutable values until the next change."""
+    if not hll[15] & _STALE:
+        return int.from_bytes(hll[8:16], "little")
+    estimated = estimate(to_registers(hll))
+    if isinstance(hll, bytearray):
+        hll[8:16] = estimated.to_bytes(8, "little")
+    return estimated
@@ -0,0 +1,73 @@
+import asyncio
+from collections import deque
+
+from pyredis.config import (
+    LAZYFREE_BLOB_THRESHOLD,
+    LAZYFREE_CHUNK_SIZE,
+    LAZYFREE_THRESHOLD,
+)
+from pyredis.store import Record
+from pyredis.stream import Stream
+
+
+class Reclaimer:
+    """Frees values that were detached from the keyspace in the background, a bounded chunk per loop turn.
+
+    Dropping the last reference to a big list frees every element before the call returns, which stalls
+    every client. Queued values must no longer be reachable from the keyspace, they are emptied in place.
+    """
+
+    def __init__(self, chunk_size=LAZYFREE_CHUNK_SIZE):
+        self.chunk_size = chunk_size
+        self.freed_objects = 0
+        self._pending: deque[list | dict | bytes | bytearray] = deque()
+        self._wakeup = asyncio.Event()
+
+    @property
+    def pending_objects(self):
+        return len(self._pending)
+
+    def free(self, value) -> bool:
+        """Queue a detached value when freeing it would be slow, return False when it is cheap to free inline."""
+        match value:
+            case list() | dict() if len(value) > LAZYFREE_THRESHOLD:
+                self._enqueue(value)
+            case bytes() | bytearray() if len(value) > LAZYFREE_BLOB_THRESHOLD:
+                self._enqueue(value)
+            case Stream() if len(value) > LAZYFREE_THRESHOLD:
+                self._enqueue(value.chunks)
+            case _:
+                return False
+        return True
+
+    def _enqueue(self, obj):
+        self._pending.append(obj)
+        self._wakeup.set()
+
+    def step(self):
+        """Free up to `chunk_size` elements of the oldest pending object."""
+        obj = self._pending[0]
+        match obj:
+            case list():
+                del obj[-self.chunk_size :]
+                done = not obj
+            case dict():
+                for _ in range(min(self.chunk_size, len(obj))):
+                    _, value = obj.popitem()
+                    # The records of a flushed keyspace can hold big values of their own.
+                    if isinstance(value, Record):
+                        self.free(value.value)
+                done = not obj
+            case _:
+                done = True
+        if done:
+            self._pending.popleft()
+            self.freed_objects += 1
+
+    async def run_worker(self):
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            while self._pending:
+                self.step()
+                await asyncio.sleep(0)
@@ -1,9 +1,20 @@
 import argparse
 import asyncio
 
-from pyredis.config import AOF_NAME, BUFFER_SIZE, HOST, PORT
+from pyredis.config import (
+    AOF_NAME,
+    BUFFER_SIZE,
+    DATABASES,
+    HOST,
+    LATENCY_MONITOR_THRESHOLD,
+    PORT,
+    SLOWLOG_LOG_SLOWER_THAN,
+    SLOWLOG_MAX_LEN,
+    TCP_KEEPALIVE,
+)
 from pyredis.expiry import INTERVAL_SECONDS
 from pyredis.server import server
+from pyredis.session import OutputBufferLimit, default_output_limits
 
 
 def main():
@@ -27,6 +38,27 @@ def main():
         default=PORT,
         required=False,
     )
+    parser.add_argument(
+        "--unixsocket",
+        type=str,
+        help="Also listen on a Unix domain socket at this path, for clients on the same host.",
+        default=None,
+        required=False,
+    )
+    parser.add_argument(
+        "--unixsocketperm",
+        type=lambda value: int(value, 8),
+        help="The permissions of the Unix socket file in octal, like 770.",
+        default=None,
+        required=False,
+    )
+    parser.add_argument(
+        "--tcp_keepalive",
+        type=int,
+        help="Seconds of idle time before keepalive probes are sent to TCP clients, 0 disables them.",
+        default=TCP_KEEPALIVE,
+        required=False,
+    )
     parser.add_argument(
         "-b",
         "--buffer_size",
@@ -61,11 +93,115 @@ def main():
         required=False,
     )
 
+    parser.add_argument(
+        "--slowlog_log_slower_than",
+        type=int,
+        help="Log commands slower than this many microseconds to the SLOWLOG, "
+        "a negative value disables it.",
+        default=SLOWLOG_LOG_SLOWER_THAN,
+        required=False,
+    )
+
+    parser.add_argument(
+        "--slowlog_max_len",
+        type=int,
+        help="The number of entries kept in the SLOWLOG.",
+        default=SLOWLOG_MAX_LEN,
+        required=False,
+    )
+
+    parser.add_argument(
+        "--latency_monitor_threshold",
+        type=int,
+        help="Record internal events slower than this many milliseconds for LATENCY, "
+        "0 disables it.",
+        default=LATENCY_MONITOR_THRESHOLD,
+        required=False,
+    )
+
+    parser.add_argument(
+        "--replicaof",
+        nargs=2,
+        metavar=("HOST", "PORT"),
+        help="Start as a read only replica of the leader at HOST PORT.",
+        default=None,
+        required=False,
+    )
+
+    parser.add_argument(
+        "--cluster_enabled",
+        action="store_true",
+        help="Run as a cluster node that only serves the hash slots it owns.",
+        required=False,
+    )
+
+    parser.add_argument(
+        "--lazyfree",
+        action="store_true",
+        help="Free big values in the background on DEL, overwrite, expiry and FLUSHALL, "
+        "like UNLINK and FLUSHALL ASYNC.",
+        required=False,
+    )
+
+    parser.add_argument(
+        "--client_output_buffer_limit",
+        nargs=4,
+        action="append",
+        metavar=("CLASS", "HARD", "SOFT", "SECONDS"),
+        help="Disconnect clients of CLASS (normal or replica) holding HARD bytes of unsent replies, "
+        "or SOFT bytes for more than SECONDS. 0 disables a limit, can be repeated.",
+        default=[],
+        required=False,
+    )
+
+    parser.add_argument(
+        "--prefix_index",
+        action="store_true",
+        help="Keep the keys sorted, so KEYS, SCAN MATCH and DELPREFIX with a literal prefix "
+        "only visit the keys starting with it.",
+        required=False,
+    )
+
+    parser.add_argument(
+        "--databases",
+        type=int,
+        help="The number of logical databases, numbered from 0 for SELECT.",
+        default=DATABASES,
+        required=False,
+    )
+
     args = parser.parse_args()
+    output_limits = default_output_limits()
+    for client_class, hard, soft, seconds in args.client_output_buffer_limit:
+        if client_class not in output_limits:
+            parser.error(f"Unknown client class `{client_class}`")
+        output_limits[client_class] = OutputBufferLimit(
+            int(hard), int(soft), int(seconds)
+        )
+    if args.databases < 1:
+        parser.error("--databases must be at least 1")
+    replicaof = (args.replicaof[0], int(args.replicaof[1])) if args.replicaof else None
     try:
         asyncio.run(
             server(
-                args.address, args.port, args.buffer_size, args.cmd_log_name, args.load
+                args.address,
+                args.port,
+                args.buffer_size,
+                args.cmd_log_name,
+                args.load,
+                args.expiry_interval,
+                args.slowlog_log_slower_than,
+                args.slowlog_max_len,
+                args.latency_monitor_threshold,
+                replicaof,
+                args.cluster_enabled,
+                args.lazyfree,
+                output_limits,
+                args.databases,
+                args.prefix_index,
+                args.unixsocket,
+                args.unixsocketperm,
+                args.tcp_keepalive,
             )
         )
     except KeyboardInterrupt:
@@ -0,0 +1,124 @@
+import sys
+from datetime import datetime
+from typing import TYPE_CHECKING
+
+from pyredis.config import MEMORY_STATS_SAMPLES, MEMORY_USAGE_SAMPLES
+from pyredis.encoding import Value
+from pyredis.session import ClientClass
+from pyredis.store import DataStoreWithLock, Record
+from pyredis.stream import PendingEntry, Stream
+
+if TYPE_CHECKING:
+    from pyredis.persist import AOF
+    from pyredis.replication import ReplicationManager
+    from pyredis.session import ClientRegistry
+    from pyredis.tracking import TrackingTable
+
+_DATETIME_SIZE = sys.getsizeof(datetime.now())
+# A dict slot holds the hash, key and value pointers, tables are kept at most 2/3 full.
+_DICT_ENTRY_SIZE = 3 * 8 * 3 // 2
+# The entry and its key in the group and consumer lists: an ID tuple and its two ints.
+_PENDING_ENTRY_SIZE = (
+    sys.getsizeof(PendingEntry("", 0)) + sys.getsizeof((0, 0)) + 2 * 32
+)
+
+
+def _stream_usage(stream: Stream, samples: int) -> int:
+    """Chunks are extrapolated from the first `samples` entries, the pending entries are counted whole."""
+    size = sys.getsizeof(stream.chunks) + sys.getsizeof(stream.index)
+    sampled = entries = 0
+    for chunk in stream.chunks:
+        if samples > 0 and entries >= samples:
+            break
+        sampled += sys.getsizeof(chunk.ids) + sys.getsizeof(chunk.same_fields)
+        sampled += sys.getsizeof(chunk.entries) + sum(
+            sys.getsizeof(entry) + sum(map(sys.getsizeof, entry))
+            for entry in chunk.entries
+        )
+        entries += len(chunk)
+    if entries:
+        size += sampled * len(stream) // entries
+    for group in stream.groups.values():
+        size += sys.getsizeof(group.pending) + len(group.pending) * (
+            _PENDING_ENTRY_SIZE + _DICT_ENTRY_SIZE
+        )
+    return size
+
+
+def value_usage(value: Value, samples=MEMORY_USAGE_SAMPLES) -> int:
+    """Estimated bytes held by a value, big lists are extrapolated from their first `samples` elements."""
+    size = sys.getsizeof(value)
+    if isinstance(value, Stream):
+        return size + _stream_usage(value, samples)
+    if isinstance(value, list) and value:
+        sampled = value if samples <= 0 else value[:samples]
+        size += (
+            sum(sys.getsizeof(item) for item in sampled) * len(value) // len(sampled)
+        )
+    return size
+
+
+def key_usage(key: str, record: Record, samples=MEMORY_USAGE_SAMPLES) -> int:
+    """Estimated bytes of a key, its record, expiry and value, plus its slot in the keyspace."""
+    size = sys.getsizeof(key) + sys.getsizeof(record) + _DICT_ENTRY_SIZE
+    if record.expiry is not None:
+        size += _DATETIME_SIZE
+    return size + value_usage(record.value, samples)
+
+
+def memory_stats(
+    datastore: DataStoreWithLock,
+    clients: ClientRegistry | None = None,
+    replication: ReplicationManager | None = None,
+    cmd_logger: AOF | None = None,
+    tracking: TrackingTable | None = None,
+    samples=MEMORY_STATS_SAMPLES,
+) -> list[tuple[str, int]]:
+    """Estimated memory by area. The keyspace is extrapolated from a random sample of keys."""
+    keys = datastore.size()
+    sampled = datastore.sample(samples)
+    dataset = volatile = 0
+    if sampled:
+        dataset = sum(key_usage(key, record) for key, record in sampled)
+        dataset = dataset * keys // len(sampled)
+        volatile = sum(record.expiry is not None for _, record in sampled)
+        volatile = volatile * keys // len(sampled)
+
+    sessions = clients.sessions.values() if clients else ()
+    normal = sum(
+        len(session.query_buffer) + session.output_bytes
+        for session in sessions
+        if session.client_class == ClientClass.NORMAL
+    )
+    replicas = (
+        sum(replica.pending for replica in replication.replicas) if replication else 0
+    )
+
+    overhead = [
+        ("keyspace.table", datastore.table_usage()),
+        ("keyspace.index", datastore.index_usage()),
+        ("keyspace.prefix_index", datastore.prefix_index_usage()),
+        ("expires.bytes", volatile * _DATETIME_SIZE),
+        ("clients.normal", normal),
+        ("clients.replicas", replicas),
+        ("replication.backlog", replication.backlog.size if replication else 0),
+        ("aof.buffer", cmd_logger.pending_bytes if cmd_logger else 0),
+        (
+            "tracking.table",
+            (
+                sys.getsizeof(tracking.keys) + len(tracking.keys) * _DICT_ENTRY_SIZE
+                if tracking
+                else 0
+            ),
+        ),
+    ]
+    overhead_total = sum(size for _, size in overhead)
+    return [
+        ("keys.count", keys),
+        ("expires.count", volatile),
+        ("dataset.bytes", dataset),
+        ("keys.bytes-per-key", dataset // keys if keys else 0),
+        *overhead,
+        ("overhead.total", overhead_total),
+        ("total.estimated", dataset + overhead_total),
+    ]
@@ -0,0 +1,165 @@
+import asyncio
+import time
+from collections import deque
+from dataclasses import dataclass
+
+from pyredis.config import (
+    LATENCY_HISTORY_LEN,
+    LATENCY_MONITOR_THRESHOLD,
+    SLOWLOG_LOG_SLOWER_THAN,
+    SLOWLOG_MAX_LEN,
+)
+from pyredis.hotkeys import HotKeys
+from pyredis.profiler import AllocationTracer, Profiler
+from pyredis.protocol import Array
+
+SLOWLOG_MAX_ARGC = 32
+SLOWLOG_MAX_ARG_LEN = 128
+LOOP_LAG_INTERVAL_SECONDS = 0.1
+
+
+class LatencyEvent:
+    EXPIRE_CYCLE = "expire-cycle"
+    AOF_WRITE = "aof-write"
+    EVENTLOOP_LAG = "eventloop-lag"
+
+
+@dataclass(frozen=True)
+class SlowLogEntry:
+    id: int
+    timestamp: int
+    duration: int  # microseconds
+    args: list[bytes]
+
+
+class SlowLog:
+    """Bounded ring buffer of commands that ran for longer than `log_slower_than` microseconds.
+
+    A negative threshold disables the log, zero logs every command.
+    """
+
+    def __init__(
+        self, log_slower_than=SLOWLOG_LOG_SLOWER_THAN, max_len=SLOWLOG_MAX_LEN
+    ):
+        self.log_slower_than = log_slower_than
+        self._entries: deque[SlowLogEntry] = deque(maxlen=max_len)
+        self._next_id = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def observe(self, request: Array, duration_ns: int):
+        # The comparison is the only work done for fast commands, entries are only built when slow.
+        if self.log_slower_than < 0 or duration_ns < self.log_slower_than * 1000:
+            return
+        self._record(request, duration_ns // 1000)
+
+    def _record(self, request: Array, duration_us: int):
+        args = [part.data for part in request.data[:SLOWLOG_MAX_ARGC]]
+        if len(request.data) > SLOWLOG_MAX_ARGC:
+            remaining = len(request.data) - SLOWLOG_MAX_ARGC + 1
+            args[-1] = f"... ({remaining} more arguments)".encode()
+
+        for i, arg in enumerate(args):
+            if isinstance(arg, (bytes, bytearray)) and len(arg) > SLOWLOG_MAX_ARG_LEN:
+                extra = len(arg) - SLOWLOG_MAX_ARG_LEN
+                args[i] = bytes(arg[:SLOWLOG_MAX_ARG_LEN]) + (
+                    f"... ({extra} more bytes)".encode()
+                )
+            elif isinstance(arg, bytearray):
+                args[i] = bytes(arg)
+            elif not isinstance(arg, bytes):
+                args[i] = str(arg).encode()
+
+        self._entries.appendleft(
+            SlowLogEntry(self._next_id, int(time.time()), duration_us, args)
+        )
+        self._next_id += 1
+
+    def get(self, count: int = 10) -> list[SlowLogEntry]:
+        if count < 0:
+            return list(self._entries)
+        return list(self._entries)[:count]
+
+    def reset(self):
+        self._entries.clear()
+
+
+@dataclass
+class LatencySample:
+    timestamp: int
+    latency: int  # milliseconds
+
+
+class LatencyMonitor:
+    """Keeps the latest and max latency of internal events that took at least `threshold` milliseconds.
+
+    A threshold of zero disables sampling.
+    """
+
+    def __init__(
+        self, threshold=LATENCY_MONITOR_THRESHOLD, history_len=LATENCY_HISTORY_LEN
+    ):
+        self.threshold = threshold
+        self.history_len = history_len
+        self._history: dict[str, deque[LatencySample]] = {}
+        self._max: dict[str, int] = {}
+
+    def add_sample(self, event: str, duration_ns: int):
+        if self.threshold <= 0 or duration_ns < self.threshold * 1_000_000:
+            return
+
+        latency = duration_ns // 1_000_000
+        history = self._history.get(event)
+        if history is None:
+            history = self._history[event] = deque(maxlen=self.history_len)
+
+        history.append(LatencySample(int(time.time()), latency))
+        self._max[event] = max(self._max.get(event, 0), latency)
+
+    def latest(self) -> list[tuple[str, LatencySample, int]]:
+        return [
+            (event, history[-1], self._max[event])
+            for event, history in self._history.items()
+            if history
+        ]
+
+    def history(self, event: str) -> list[LatencySample]:
+        return list(self._history.get(event, ()))
+
+    def reset(self, *events: str) -> int:
+        targets = events or tuple(self._history)
+        count = 0
+        for event in targets:
+            if self._history.pop(event, None) is not None:
+                self._max.pop(event, None)
+                count += 1
+        return count
+
+    async def run_loop_lag_monitor(self, interval_seconds=LOOP_LAG_INTERVAL_SECONDS):
+        """Sleep for a fixed interval and record how late the loop woke us up compared with the schedule."""
+        loop = asyncio.get_running_loop()
+        while True:
+            scheduled = loop.time() + interval_seconds
+            await asyncio.sleep(interval_seconds)
+            lag = loop.time() - scheduled
+            if lag > 0:
+                self.add_sample(LatencyEvent.EVENTLOOP_LAG, int(lag * 1_000_000_000))
+
+
+class Monitor:
+    def __init__(
+        self,
+        slowlog: SlowLog | None = None,
+        latency: LatencyMonitor | None = None,
+        profiler: Profiler | None = None,
+        allocations: AllocationTracer | None = None,
+        hotkeys: HotKeys | None = None,
+    ):
+        self.slowlog = slowlog if slowlog is not None else SlowLog()
+        self.latency = latency if latency is not None else LatencyMonitor()
+        self.profiler = profiler if profiler is not None else Profiler()
+        self.allocations = (
+            allocations if allocations is not None else AllocationTracer()
+        )
+        self.hotkeys = hotkeys if hotkeys is not None else HotKeys()
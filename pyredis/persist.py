@@ -1,22 +1,94 @@
 import asyncio
 import os.path
+import time
 import traceback
+from typing import BinaryIO, Iterator
 
-from pyredis.commands import Command
+from pyredis.commands import Command, select_command, selected_db
 from pyredis.config import BUFFER_SIZE
-from pyredis.protocol import Array, parse_frame
-from pyredis.store import DataStoreWithLock
+from pyredis.encoding import string_bytes, to_resp
+from pyredis.monitor import LatencyEvent, LatencyMonitor
+from pyredis.protocol import Array, BulkString, parse_frame
+from pyredis.store import Databases, DataStoreWithLock
+from pyredis.stream import Stream
+
+
+def iter_frames(f: BinaryIO) -> Iterator[Array]:
+    """Yield every complete frame from a file of serialized commands."""
+    frame_buffer = bytearray()
+    while True:
+        buffer = f.read(BUFFER_SIZE)
+        if not buffer:
+            return
+        frame_buffer.extend(buffer)
+        while frame_buffer:
+            frame, size = parse_frame(frame_buffer)
+            if frame is None:
+                break
+            del frame_buffer[:size]
+            yield frame
+
+
+def dump_commands(datastore: DataStoreWithLock) -> Iterator[Array]:
+    """Yield the commands that rebuild the live keys of the datastore, expiries are absolute."""
+    for key, record in datastore.items():
+        expiry_ms = (
+            int(record.expiry.timestamp() * 1000) if record.expiry is not None else None
+        )
+        if isinstance(record.value, Stream):
+            # Consumer groups have no command that rebuilds them as they are, streams are restored whole.
+            command = [
+                BulkString(b"RESTORE"),
+                BulkString(key.encode()),
+                BulkString(str(expiry_ms or 0).encode()),
+                BulkString(to_resp(record.value).serialize()),
+                BulkString(b"REPLACE"),
+            ]
+            if expiry_ms is not None:
+                command.append(BulkString(b"ABSTTL"))
+            yield Array(command)
+            continue
+
+        if isinstance(record.value, list):
+            command = [BulkString(b"RPUSH"), BulkString(key.encode())]
+            command.extend(BulkString(item) for item in record.value)
+        else:
+            command = [
+                BulkString(b"SET"),
+                BulkString(key.encode()),
+                BulkString(string_bytes(record.value)),
+            ]
+        if expiry_ms is not None:
+            command.extend([BulkString(b"PXAT"), BulkString(str(expiry_ms).encode())])
+        yield Array(command)
+
+
+def dump_databases(databases: Databases) -> Iterator[Array]:
+    """Yield the commands that rebuild every database, each one preceded by its SELECT."""
+    for db in databases:
+        if db.size():
+            yield select_command(db.index)
+            yield from dump_commands(db)
 
 
 class AOF:
-    def __init__(self, filename: str, datastore: DataStoreWithLock):
-        self._queue: asyncio.Queue[Array] = asyncio.Queue()
+    def __init__(
+        self,
+        filename: str,
+        databases: Databases,
+        latency: LatencyMonitor | None = None,
+    ):
+        self._queue: asyncio.Queue[bytes] = asyncio.Queue()
+        self.pending_bytes = 0
         self.filename = filename
-        self.datastore = datastore
+        self.databases = databases
+        self.latency = latency
+        # The database of the last command written. Unknown at first, the file may be appended to.
+        self._db: int | None = None
 
-    def _write_line(self, value: Array):
+    def _write_line(self, value: bytes):
         with open(self.filename, "ab") as f:
-            f.write(value.serialize())
+            f.write(value)
             f.flush()
 
     async def run_worker(self):
@@ -24,27 +96,38 @@ class AOF:
         while True:
             value = await self._queue.get()
             try:
+                start = time.perf_counter_ns()
                 await asyncio.to_thread(self._write_line, value)
+                if self.latency:
+                    self.latency.add_sample(
+                        LatencyEvent.AOF_WRITE, time.perf_counter_ns() - start
+                    )
 
             except Exception:
-                print(f"Task error: {value.decode() if value else ''}")
+                print(f"Task error: {value.decode(errors='replace') if value else ''}")
                 traceback.print_exc()
             finally:
+                self.pending_bytes -= len(value)
                 self._queue.task_done()
 
-    def log(self, value: Array):
-        self._queue.put_nowait(value)
+    def log(self, value: Array, db=0):
+        # Serialized right away, string values can be changed in place by later commands.
+        data = value.serialize()
+        if db != self._db:
+            data = select_command(db).serialize() + data
+            self._db = db
+        self.pending_bytes += len(data)
+        self._queue.put_nowait(data)
 
     async def replay(self):
         if os.path.exists(self.filename):
+            db = 0
             with open(self.filename, "rb") as f:
-                frame_buffer = bytearray()
-                while True:
-                    buffer = f.read(BUFFER_SIZE)
-                    if not buffer:
-                        return
-                    frame_buffer.extend(buffer)
-                    frame, size = parse_frame(frame_buffer)
-                    if frame:
-                        del frame_buffer[:size]
-                        await Command(frame, self.datastore, None).exec()
+                for frame in iter_frames(f):
+                    index = selected_db(frame)
+                    if index is not None:
+                        db = index
+                        continue
+                    await Command(
+                        frame, self.databases[db], None, databases=self.databases
+                    ).exec()
@@ -0,0 +1,118 @@
+import sys
+from bisect import bisect_left, bisect_right, insort
+from itertools import islice
+from typing import Iterator
+
+from pyredis.config import PREFIX_INDEX_CHUNK_SIZE
+
+# Longer keys are cut in SCAN cursors, a resumed scan may then return a few keys again.
+CURSOR_KEY_BYTES = 1024
+
+
+class PrefixIndex:
+    """The keys in sorted order, so the keys starting with a prefix are one run that KEYS, SCAN MATCH and
+    DELPREFIX visit without looking at the others.
+
+    Keys are kept in sorted chunks of up to 2 * chunk_size keys, with the last key of each chunk in `_maxes`,
+    like the lists of sortedcontainers. An insert or delete bisects `_maxes`, then moves at most a chunk of
+    pointers, where a single sorted list would move half the keyspace. A trie would spend a node per character.
+    """
+
+    def __init__(self, chunk_size=PREFIX_INDEX_CHUNK_SIZE):
+        self.chunk_size = chunk_size
+        self._chunks: list[list[str]] = []
+        self._maxes: list[str] = []
+        self._len = 0
+
+    def __len__(self) -> int:
+        return self._len
+
+    def add(self, key: str):
+        if not self._chunks:
+            self._chunks.append([key])
+            self._maxes.append(key)
+        else:
+            i = bisect_left(self._maxes, key)
+            if i == len(self._maxes):
+                i -= 1
+                self._chunks[i].append(key)
+                self._maxes[i] = key
+            else:
+                insort(self._chunks[i], key)
+            if len(self._chunks[i]) > 2 * self.chunk_size:
+                self._split(i)
+        self._len += 1
+
+    def discard(self, key: str):
+        i = bisect_left(self._maxes, key)
+        if i == len(self._maxes):
+            return
+        chunk = self._chunks[i]
+        j = bisect_left(chunk, key)
+        if chunk[j] != key:
+            return
+        del chunk[j]
+        self._len -= 1
+        if not chunk:
+            del self._chunks[i]
+            del self._maxes[i]
+            return
+        self._maxes[i] = chunk[-1]
+        if len(chunk) < self.chunk_size // 2 and len(self._chunks) > 1:
+            self._merge(i if i + 1 < len(self._chunks) else i - 1)
+
+    def iter(self, prefix: str, after: str | None = None) -> Iterator[str]:
+        """The keys starting with `prefix` in order, only those above `after` when given. The index must
+        not change while iterating."""
+        if after is not None and after >= prefix:
+            i = bisect_right(self._maxes, after)
+            j = bisect_right(self._chunks[i], after) if i < len(self._chunks) else 0
+        else:
+            i = bisect_left(self._maxes, prefix)
+            j = bisect_left(self._chunks[i], prefix) if i < len(self._chunks) else 0
+        for chunk in islice(self._chunks, i, None):
+            for key in islice(chunk, j, None):
+                if not key.startswith(prefix):
+                    return
+                yield key
+            j = 0
+
+    def keys(
+        self, prefix: str, after: str | None = None, count: int | None = None
+    ) -> list[str]:
+        return list(islice(self.iter(prefix, after), count))
+
+    def memory_usage(self) -> int:
+        # The key strings are shared with the keyspace.
+        return (
+            sys.getsizeof(self._chunks)
+            + sys.getsizeof(self._maxes)
+            + sum(sys.getsizeof(chunk) for chunk in self._chunks)
+        )
+
+    def _split(self, i: int):
+        chunk = self._chunks[i]
+        half = len(chunk) // 2
+        self._chunks[i : i + 1] = [chunk[:half], chunk[half:]]
+        self._maxes[i : i + 1] = [chunk[half - 1], chunk[-1]]
+
+    def _merge(self, i: int):
+        """Merge chunk i with the next one, split again when too big."""
+        self._chunks[i : i + 2] = [self._chunks[i] + self._chunks[i + 1]]
+        del self._maxes[i]
+        if len(self._chunks[i]) > 2 * self.chunk_size:
+            self._split(i)
+
+
+def key_cursor(key: str) -> int:
+    """A SCAN cursor that resumes after `key`, its bytes behind a leading 1 so it is never 0."""
+    return int.from_bytes(b"\x01" + key.encode()[:CURSOR_KEY_BYTES], "big")
+
+
+def cursor_key(cursor: int) -> str | None:
+    """The key a cursor of `key_cursor` resumes after, None for a cursor it did not make."""
+    data = cursor.to_bytes((cursor.bit_length() + 7) // 8, "big")
+    if data[:1] != b"\x01":
+        return None
+    # A key cut in the middle of a character resumes a little early.
+    return data[1:].decode(errors="ignore")
@@ -0,0 +1,234 @@
+import asyncio
+import cProfile
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from dataclasses import dataclass
+
+from pyredis.config import PROFILER_SAMPLE_INTERVAL
+
+_PACKAGE_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_STDLIB_ROOT = os.path.dirname(os.path.abspath(os.__file__))
+# Allocations of the tracer and the import machinery are noise in a snapshot.
+_TRACE_FILTERS = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+)
+
+
+def _short_path(filename: str) -> str:
+    for root in (_PACKAGE_ROOT, _STDLIB_ROOT):
+        if filename.startswith(root + os.sep):
+            return filename[len(root) + 1 :]
+    return filename
+
+
+def _function_name(filename: str, line: int, name: str) -> str:
+    if filename == "~":  # built in functions in cProfile stats
+        return name
+    return f"{_short_path(filename)}:{line}({name})"
+
+
+class ProfilerMode:
+    CPROFILE = "cprofile"
+    SAMPLE = "sample"
+
+
+@dataclass(frozen=True)
+class FunctionStats:
+    function: str
+    calls: int  # calls with cProfile, samples the function was on the stack with the sampler
+    own_us: int
+    total_us: int
+
+
+class Profiler:
+    """Profiles the event loop thread on demand, nothing is installed while it is stopped.
+
+    cProfile records every call with its exact count, at a high cost per call. The sampler reads the
+    loop's stack from another thread every `sample_interval` seconds, which is cheap enough for
+    production but only estimates the time spent in each function.
+    """
+
+    def __init__(self, sample_interval=PROFILER_SAMPLE_INTERVAL / 1000):
+        self.sample_interval = sample_interval
+        self.mode: str | None = None
+        self.results: list[FunctionStats] = []
+        self._profile: cProfile.Profile | None = None
+        self._sampler: threading.Thread | None = None
+        self._stop_sampling = threading.Event()
+        self._own: Counter = Counter()
+        self._total: Counter = Counter()
+        self._timer: asyncio.TimerHandle | None = None
+        self._started = 0.0
+
+    @property
+    def running(self) -> bool:
+        return self.mode is not None
+
+    def start(self, mode=ProfilerMode.SAMPLE, seconds: float | None = None):
+        """Profile until `stop`, or for `seconds`. Raises ValueError when another profiler is active."""
+        if self.running:
+            raise ValueError("the profiler is already running")
+        if mode == ProfilerMode.CPROFILE:
+            profile = cProfile.Profile()
+            profile.enable()
+            self._profile = profile
+        else:
+            self._own, self._total = Counter(), Counter()
+            self._stop_sampling.clear()
+            self._sampler = threading.Thread(
+                target=self._sample,
+                args=(threading.get_ident(),),
+                name="pyredis-profiler",
+                daemon=True,
+            )
+            self._sampler.start()
+        self.mode = mode
+        self._started = time.perf_counter()
+        if seconds:
+            self._timer = asyncio.get_running_loop().call_later(seconds, self.stop)
+
+    def stop(self) -> list[FunctionStats]:
+        if not self.running:
+            return self.results
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        if self.mode == ProfilerMode.CPROFILE:
+            self._profile.disable()
+            self.results = self._cprofile_results(self._profile)
+            self._profile = None
+        else:
+            self._stop_sampling.set()
+            self._sampler.join()
+            self._sampler = None
+            self.results = self._sample_results()
+        print(
+            f"Profiler: {self.mode} stopped after {time.perf_counter() - self._started:.1f}s"
+        )
+        self.mode = None
+        return self.results
+
+    def top(self, count=20, by_total=False) -> list[FunctionStats]:
+        key = (
+            (lambda stats: stats.total_us) if by_total else (lambda stats: stats.own_us)
+        )
+        return sorted(self.results, key=key, reverse=True)[:count]
+
+    @staticmethod
+    def _cprofile_results(profile: cProfile.Profile) -> list[FunctionStats]:
+        stats = pstats.Stats(profile).stats
+        return [
+            FunctionStats(
+                _function_name(*function),
+                calls,
+                int(own * 1_000_000),
+                int(total * 1_000_000),
+            )
+            for function, (_, calls, own, total, _) in stats.items()
+        ]
+
+    def _sample(self, thread_id: int):
+        while not self._stop_sampling.wait(self.sample_interval):
+            frame = sys._current_frames().get(thread_id)
+            if frame is None:
+                return
+            own_recorded, seen = False, set()
+            while frame is not None:
+                code = frame.f_code
+                function = (code.co_filename, code.co_firstlineno, code.co_name)
+                if not own_recorded:
+                    self._own[function] += 1
+                    own_recorded = True
+                # Recursive functions are counted once per sample.
+                if function not in seen:
+                    seen.add(function)
+                    self._total[function] += 1
+                frame = frame.f_back
+
+    def _sample_results(self) -> list[FunctionStats]:
+        interval_us = int(self.sample_interval * 1_000_000)
+        return [
+            FunctionStats(
+                _function_name(*function),
+                samples,
+                self._own[function] * interval_us,
+                samples * interval_us,
+            )
+            for function, samples in self._total.items()
+        ]
+
+
+@dataclass(frozen=True)
+class AllocationStats:
+    location: str
+    size: int
+    count: int
+    size_diff: int = 0
+    count_diff: int = 0
+
+
+class AllocationTracer:
+    """tracemalloc on demand: a snapshot taken as a baseline, and the top allocation sites now or since it.
+
+    Tracing slows every allocation down and keeps a trace per live block, it is off unless started.
+    """
+
+    GROUP_BY = ("lineno", "filename", "traceback")
+
+    def __init__(self):
+        self.baseline: tracemalloc.Snapshot | None = None
+
+    @property
+    def tracing(self) -> bool:
+        return tracemalloc.is_tracing()
+
+    def start(self, frames=1):
+        tracemalloc.start(frames)
+
+    def stop(self):
+        tracemalloc.stop()
+        self.baseline = None
+
+    def take_snapshot(self) -> tracemalloc.Snapshot:
+        return tracemalloc.take_snapshot().filter_traces(_TRACE_FILTERS)
+
+    def save_baseline(self) -> int:
+        """Keep a snapshot to diff against, return the number of traced blocks."""
+        self.baseline = self.take_snapshot()
+        return len(self.baseline.traces)
+
+    def top(self, count=10, group_by="lineno") -> list[AllocationStats]:
+        return [
+            AllocationStats(self._location(stat.traceback), stat.size, stat.count)
+            for stat in self.take_snapshot().statistics(group_by)[:count]
+        ]
+
+    def diff(self, count=10, group_by="lineno") -> list[AllocationStats]:
+        """The allocation sites that grew the most since the baseline."""
+        return [
+            AllocationStats(
+                self._location(stat.traceback),
+                stat.size,
+                stat.count,
+                stat.size_diff,
+                stat.count_diff,
+            )
+            for stat in self.take_snapshot().compare_to(self.baseline, group_by)[:count]
+        ]
+
+    @staticmethod
+    def _location(traceback: tracemalloc.Traceback) -> str:
+        # Most recent frame first, the callers follow.
+        return " < ".join(
+            f"{_short_path(frame.filename)}:{frame.lineno}"
+            for frame in reversed(traceback)
+        )
@@ -1,6 +1,8 @@
 from dataclasses import InitVar, dataclass, field
 from typing import ClassVar, Optional, Tuple, TypeAlias
 
+from pyredis.config import PROTO_MAX_BULK_LEN, PROTO_MAX_MULTIBULK_LEN
+
 CRLF = b"\r\n"
 
 
@@ -8,13 +10,10 @@ class PyRedisType:
     prefix: ClassVar[str]
     data: bytes
 
-    def decode(self, encoding="utf-8"):
-        return self.data.decode()
+    def decode(self, encoding="utf-8", errors="strict"):
+        return self.data.decode(encoding, errors)
 
     def serialize(self):
-        if isinstance(self, Array) and not isinstance(self, NullArray):
-            return self.prefix.encode() + self._serialize_data()
-
         return self.prefix.encode() + self._serialize_data() + CRLF
 
     def _serialize_data(self):
@@ -42,7 +41,7 @@ class Integer(PyRedisType):
     init_data: InitVar[bytes]
     data: int = field(init=False)
 
-    def decode(self, encoding="utf-8"):
+    def decode(self, encoding="utf-8", errors="strict"):
         return self.data
 
     def _serialize_data(self):
@@ -61,12 +60,9 @@ class BulkString(PyRedisType):
     prefix = "$"
     data: bytes
 
-    def _serialize_data(self):
-        return b"%(len)i%(CRLF)s%(data)s" % {
-            b"len": len(self.data),
-            b"CRLF": CRLF,
-            b"data": self.data,
-        }
+    def serialize(self):
+        # Joining the parts copies large values once, instead of once per concatenation.
+        return b"".join((b"$%i\r\n" % len(self.data), self.data, CRLF))
 
 
 # Null BulkString "$0\r\n\r\n"
@@ -74,8 +70,8 @@ class BulkString(PyRedisType):
 class NullBulkString(BulkString):
     data: bytes = field(init=False, default=b"")
 
-    def _serialize_data(self):
-        return b"-1"
+    def serialize(self):
+        return b"$-1\r\n"
 
 
 # Arrays "*2\r\n:1\r\n:2\r\n"
@@ -84,26 +80,33 @@ class Array(PyRedisType):
     prefix = "*"
     data: list["PyRedisData"]
 
-    def decode(self, encoding="utf-8"):
-        return [val.decode(encoding) for val in self.data]
+    def decode(self, encoding="utf-8", errors="strict"):
+        return [val.decode(encoding, errors) for val in self.data]
 
-    def _serialize_data(self):
-        res = b""
-        for part in self.data:
-            res += part.serialize()
-        return b"%(len)i%(CRLF)s%(data)s" % {
-            b"len": len(self.data),
-            b"CRLF": CRLF,
-            b"data": res,
-        }
+    def serialize(self):
+        parts = [b"%s%i\r\n" % (self.prefix.encode(), len(self.data))]
+        parts.extend(part.serialize() for part in self.data)
+        return b"".join(parts)
 
 
 @dataclass(frozen=True)
 class NullArray(Array):
     data: list = field(init=False, default_factory=lambda: [])
 
-    def _serialize_data(self):
-        return b"0"
+    def serialize(self):
+        return b"*0\r\n"
+
+
+# Null Array "*-1\r\n", the RESP2 null of commands that reply with an array
+@dataclass(frozen=True)
+class NilArray(Array):
+    data: list = field(init=False, default_factory=lambda: [])
+
+    def decode(self, encoding="utf-8", errors="strict"):
+        return None
+
+    def serialize(self):
+        return b"*-1\r\n"
 
 
 # Null b'_\r\n'
@@ -112,74 +115,222 @@ class Null(PyRedisType):
     prefix = "_"
     data = None
 
-    def decode(self, encoding="utf-8"):
+    def decode(self, encoding="utf-8", errors="strict"):
         return ""
 
     def _serialize_data(self):
         return bytes()
 
 
-PyRedisData: TypeAlias = SimpleString | Error | Integer | BulkString | Array | Null
+# Double ",3.14\r\n", RESP3 only
+@dataclass(frozen=True)
+class Double(PyRedisType):
+    prefix = ","
+    data: float
+
+    def decode(self, encoding="utf-8", errors="strict"):
+        return self.data
+
+    def _serialize_data(self):
+        # repr gives the shortest round tripping form, and "inf", "-inf" and "nan" as RESP3 spells them.
+        return repr(float(self.data)).encode()
+
+
+# Map "%1\r\n+key\r\n:1\r\n", RESP3 only
+@dataclass(frozen=True)
+class Map(PyRedisType):
+    prefix = "%"
+    data: list[tuple["PyRedisData", "PyRedisData"]]
+
+    def decode(self, encoding="utf-8", errors="strict"):
+        return {
+            key.decode(encoding, errors): value.decode(encoding, errors)
+            for key, value in self.data
+        }
+
+    def serialize(self):
+        parts = [b"%%%i\r\n" % len(self.data)]
+        for key, value in self.data:
+            parts.append(key.serialize())
+            parts.append(value.serialize())
+        return b"".join(parts)
+
+
+# Set "~2\r\n:1\r\n:2\r\n", RESP3 only
+@dataclass(frozen=True)
+class Set(Array):
+    prefix = "~"
+
+
+# Push ">2\r\n+invalidate\r\n*1\r\n$3\r\nkey\r\n", RESP3 only, out of band data sent by the server
+@dataclass(frozen=True)
+class Push(Array):
+    prefix = ">"
+
+
+PyRedisData: TypeAlias = (
+    SimpleString | Error | Integer | BulkString | Array | Null | Double | Map
+)
 ParseResult = Tuple[Optional[PyRedisData], int]
 
 
+# Incomplete frames report the buffer length they need at least, invalid frames report INVALID.
+INVALID = -1
+
+
+class ProtocolError(ValueError):
+    pass
+
+
+def _length(buffer: bytes, pos: int, delim: int, limit: int | None, what: str) -> int:
+    """The length in the header of a bulk string or an aggregate, -1 for a null one."""
+    try:
+        length = int(buffer[pos + 1 : delim])
+    except ValueError:
+        raise ProtocolError(f"invalid {what} length") from None
+    if length < -1 or (limit is not None and length > limit):
+        raise ProtocolError(f"invalid {what} length")
+    return length
+
+
 def parse_bulk_string(
-    buffer: bytes, offset: int
+    buffer: bytes, pos: int, delim: int, max_bulk_len: int | None = None
 ) -> Tuple[BulkString | NullBulkString | None, int]:
-    length = int(buffer[0:offset])
+    length = _length(buffer, pos, delim, max_bulk_len, "bulk")
     if length == -1:
-        return NullBulkString(), 5
+        return NullBulkString(), delim + len(CRLF)
 
-    if buffer.rfind(CRLF) <= offset:
-        return None, 0
-
-    content_start = offset + len(CRLF)
+    content_start = delim + len(CRLF)
     content_end = content_start + length
-    if length != 0:
-        content = buffer[content_start:content_end]
-        return BulkString(content), offset + len(CRLF) + length + len(CRLF) + 1
-
-    return BulkString(b""), 6
+    if len(buffer) < content_end + len(CRLF):
+        return None, content_end + len(CRLF)
 
+    # The only copy of the payload, slicing the receive buffer gives an owned bytearray for large values.
+    return BulkString(buffer[content_start:content_end]), content_end + len(CRLF)
 
-def parse_array(buffer: bytes, offset: int) -> Tuple[Array | NullArray | None, int]:
-    count = int(buffer[0:offset])
 
-    if buffer[offset + 1 :].count(CRLF) < count:
-        return None, 0
+def parse_array(
+    buffer: bytes, pos: int, delim: int, limits: tuple[int, int] | None = None
+) -> Tuple[Array | NullArray | NilArray | None, int]:
+    count = _length(buffer, pos, delim, limits and limits[1], "multibulk")
+    end = delim + len(CRLF)
+    if count == -1:
+        return NilArray(), end
+    if count <= 0:
+        return NullArray(), end
 
-    size = offset + 1
     res = []
-
-    if count == 0:
-        return NullArray(), size + 1
-
-    for _ in range(0, count):
-        data, current_size = parse_frame(buffer[size:])
+    for _ in range(count):
+        data, end = _parse(buffer, end, limits)
+        if data is None:
+            return None, end
         res.append(data)
-        size += current_size
 
-    return Array(res), size + 1
+    return Array(res), end
 
 
-def parse_frame(buffer: bytes) -> ParseResult:
-    delim = buffer.find(CRLF)
+def parse_map(
+    buffer: bytes, pos: int, delim: int, limits: tuple[int, int] | None = None
+) -> Tuple[Map | None, int]:
+    count = _length(buffer, pos, delim, limits and limits[1], "multibulk")
+    end = delim + len(CRLF)
+
+    res = []
+    for _ in range(count):
+        key, end = _parse(buffer, end, limits)
+        if key is None:
+            return None, end
+        value, end = _parse(buffer, end, limits)
+        if value is None:
+            return None, end
+        res.append((key, value))
+
+    return Map(res), end
+
+
+def _parse_aggregate(
+    buffer: bytes, pos: int, delim: int, cls, limits: tuple[int, int] | None
+) -> ParseResult:
+    array, end = parse_array(buffer, pos, delim, limits)
+    if array is None:
+        return None, end
+    return cls(array.data), end
+
+
+def _parse(
+    buffer: bytes, pos: int, limits: tuple[int, int] | None = None
+) -> ParseResult:
+    """Parse the frame at pos. limits caps the length of bulk strings and the element count of aggregates,
+    lengths out of them or malformed raise a ProtocolError."""
+    delim = buffer.find(CRLF, pos)
     if delim == -1:
-        return None, 0
+        return None, len(buffer) + 1
 
-    size = delim + 2
-    match chr(buffer[0]):
+    end = delim + len(CRLF)
+    match chr(buffer[pos]):
         case SimpleString.prefix:
-            return SimpleString(buffer[1:delim]), size
+            return SimpleString(buffer[pos + 1 : delim]), end
         case Error.prefix:
-            return Error(buffer[1:delim]), size
+            return Error(buffer[pos + 1 : delim]), end
         case Integer.prefix:
-            return Integer(buffer[1:delim]), size
+            return Integer(buffer[pos + 1 : delim]), end
         case BulkString.prefix:
-            return parse_bulk_string(buffer[1:], delim - 1)
+            return parse_bulk_string(buffer, pos, delim, limits and limits[0])
         case Array.prefix:
-            return parse_array(buffer[1:], delim)
+            return parse_array(buffer, pos, delim, limits)
         case Null.prefix:
-            return Null(), 3
+            return Null(), end
+        case Double.prefix:
+            return Double(float(buffer[pos + 1 : delim])), end
+        case Map.prefix:
+            return parse_map(buffer, pos, delim, limits)
+        case Set.prefix:
+            return _parse_aggregate(buffer, pos, delim, Set, limits)
+        case Push.prefix:
+            return _parse_aggregate(buffer, pos, delim, Push, limits)
+        case _:
+            return None, INVALID
+
+
+def parse_frame(buffer: bytes) -> ParseResult:
+    frame, size = _parse(buffer, 0)
+    if frame is None:
+        return None, 0
+    return frame, size
+
+
+def parse_frame_with_hint(
+    buffer: bytes,
+    max_bulk_len=PROTO_MAX_BULK_LEN,
+    max_multibulk_len=PROTO_MAX_MULTIBULK_LEN,
+) -> Tuple[Optional[PyRedisData], int, int]:
+    """Like parse_frame, but an incomplete frame also returns the buffer length it needs at least.
+
+    The hint lets a reader skip parsing until enough bytes arrived and receive large payloads in one go.
+    Lengths are checked against the limits before the hint asks for that much memory.
+    """
+    frame, size = _parse(buffer, 0, (max_bulk_len, max_multibulk_len))
+    if frame is None:
+        return None, 0, size
+    return frame, size, 0
+
+
+def to_resp2(frame: PyRedisData) -> PyRedisData:
+    """Downgrade a RESP3 reply for a RESP2 client: maps flatten to arrays, doubles become bulk strings."""
+    match frame:
+        case Map():
+            flat = []
+            for key, value in frame.data:
+                flat.append(to_resp2(key))
+                flat.append(to_resp2(value))
+            return Array(flat)
+        case NilArray():
+            return frame
+        case Array():
+            return Array([to_resp2(item) for item in frame.data])
+        case Double():
+            return BulkString(repr(float(frame.data)).encode())
+        case Null():
+            return NullBulkString()
         case _:
-            return None, 0
+            return frame
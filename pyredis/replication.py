@@ -0,0 +1,342 @@
+import asyncio
+import io
+import secrets
+import socket
+import time
+import traceback
+from dataclasses import dataclass, field
+
+from pyredis.commands import Command, select_command, selected_db
+from pyredis.config import BUFFER_SIZE, REPL_BACKLOG_SIZE
+from pyredis.persist import AOF, dump_databases, iter_frames
+from pyredis.protocol import (
+    Array,
+    BulkString,
+    Error,
+    PyRedisData,
+    SimpleString,
+    parse_frame,
+)
+from pyredis.session import ClientClass, OutputBufferLimit, default_output_limits
+from pyredis.store import Databases
+from pyredis.tracking import TrackingTable
+
+RECONNECT_DELAY_SECONDS = 1
+
+
+class ReplicationBacklog:
+    """Fixed size ring buffer of the replication stream, addressed by absolute stream offset."""
+
+    def __init__(self, size=REPL_BACKLOG_SIZE):
+        self.size = size
+        self.offset = 0
+        self.history = 0
+        self._buffer = bytearray(size)
+        self._pos = 0
+
+    @property
+    def start_offset(self):
+        return self.offset - self.history
+
+    def feed(self, data: bytes):
+        length = len(data)
+        if length >= self.size:
+            self._buffer[:] = data[-self.size :]
+            self._pos = 0
+        else:
+            end = self._pos + length
+            if end <= self.size:
+                self._buffer[self._pos : end] = data
+            else:
+                split = self.size - self._pos
+                self._buffer[self._pos :] = data[:split]
+                self._buffer[: length - split] = data[split:]
+            self._pos = end % self.size
+
+        self.offset += length
+        self.history = min(self.history + length, self.size)
+
+    def reset(self, offset: int):
+        self.offset = offset
+        self.history = 0
+        self._pos = 0
+
+    def read_from(self, offset: int) -> bytes | None:
+        """Everything fed after `offset`, or None when it has already been overwritten."""
+        if offset < self.start_offset or offset > self.offset:
+            return None
+
+        length = self.offset - offset
+        start = (self._pos - length) % self.size
+        if start + length <= self.size:
+            return bytes(self._buffer[start : start + length])
+        return bytes(self._buffer[start:]) + bytes(
+            self._buffer[: length - (self.size - start)]
+        )
+
+
+@dataclass(eq=False)
+class Replica:
+    client: socket.socket
+    host: str
+    port: int
+    queue: asyncio.Queue = field(default_factory=asyncio.Queue)
+    pending: int = 0
+    soft_limit_since: float | None = None
+
+    @property
+    def address(self):
+        return f"{self.host}:{self.port}"
+
+    def send(self, data: bytes):
+        self.queue.put_nowait(data)
+        self.pending += len(data)
+
+
+class ReplicationRole:
+    MASTER = "master"
+    SLAVE = "slave"
+
+
+class ReplicationManager:
+    """Tracks the replication role of the server.
+
+    As a leader, write commands are fed into the backlog and streamed to every attached replica.
+    As a follower, a background task keeps a link to the leader, applying its snapshot and stream.
+    """
+
+    def __init__(
+        self,
+        databases: Databases,
+        cmd_logger: AOF | None = None,
+        backlog_size=REPL_BACKLOG_SIZE,
+        output_limit: OutputBufferLimit | None = None,
+        tracking: TrackingTable | None = None,
+    ):
+        self.databases = databases
+        self.cmd_logger = cmd_logger
+        self.tracking = tracking
+        self.replid = secrets.token_hex(20)
+        self.backlog = ReplicationBacklog(backlog_size)
+        self.output_limit = (
+            output_limit
+            if output_limit is not None
+            else default_output_limits()[ClientClass.REPLICA]
+        )
+        self.replicas: set[Replica] = set()
+        # The database of the last command in the stream, None when the next one must SELECT.
+        self.selected_db: int | None = None
+
+        self.leader: tuple[str, int] | None = None
+        self.link_state = "none"
+        self._follower_task: asyncio.Task | None = None
+
+    @property
+    def role(self):
+        return ReplicationRole.SLAVE if self.leader else ReplicationRole.MASTER
+
+    @property
+    def is_replica(self):
+        return self.leader is not None
+
+    @property
+    def offset(self):
+        return self.backlog.offset
+
+    def propagate(self, request: Array, db=0):
+        data = request.serialize()
+        if db != self.selected_db:
+            data = select_command(db).serialize() + data
+            self.selected_db = db
+        self._feed(data)
+
+    def _feed(self, data: bytes):
+        self.backlog.feed(data)
+        now = time.monotonic()
+        for replica in list(self.replicas):
+            reached, replica.soft_limit_since = self.output_limit.reached(
+                replica.pending + len(data), replica.soft_limit_since, now
+            )
+            if reached:
+                print(f"Replica {replica.address} exceeded the output limit, dropping")
+                self._drop_replica(replica)
+                continue
+            replica.send(data)
+
+    def _drop_replica(self, replica: Replica):
+        self.replicas.discard(replica)
+        replica.client.close()
+
+    async def serve_replica(self, client: socket.socket, request: Array):
+        """Take over a client connection that sent PSYNC and stream the replication feed to it."""
+        loop = asyncio.get_running_loop()
+        args = request.decode()
+        try:
+            replid, offset = (args[1], int(args[2])) if len(args) == 3 else ("?", -1)
+        except ValueError:
+            error = Error(b"ERR value is not an integer or out of range")
+            await loop.sock_sendall(client, error.serialize())
+            return
+
+        if client.family == socket.AF_UNIX:
+            host, port = client.getsockname(), 0
+        else:
+            host, port = client.getpeername()[:2]
+        replica = Replica(client, host, port)
+
+        backlog = self.backlog.read_from(offset) if replid == self.replid else None
+        if backlog is not None:
+            print(f"Partial resync of replica {replica.address} from offset {offset}")
+            header = SimpleString(b"CONTINUE").serialize()
+            replica.send(header + backlog)
+        else:
+            print(f"Full resync of replica {replica.address}")
+            header = SimpleString(f"FULLRESYNC {self.replid} {self.offset}".encode())
+            snapshot = b"".join(
+                command.serialize() for command in dump_databases(self.databases)
+            )
+            replica.send(header.serialize() + BulkString(snapshot).serialize())
+            # The replica applied the snapshot in whichever database it ended with.
+            self.selected_db = None
+
+        # The snapshot and the registration happen without yielding, so no write can fall in between.
+        self.replicas.add(replica)
+        try:
+            while True:
+                data = await replica.queue.get()
+                replica.pending -= len(data)
+                if replica.pending < self.output_limit.soft:
+                    replica.soft_limit_since = None
+                await loop.sock_sendall(client, data)
+        except (ConnectionResetError, BrokenPipeError, OSError):
+            pass
+        finally:
+            self.replicas.discard(replica)
+            print(f"Replica {replica.address} disconnected")
+
+    def replicate_from(self, host: str, port: int):
+        self.stop_replication()
+        self.leader = (host, port)
+        self.link_state = "connect"
+        self._follower_task = asyncio.create_task(self._run_follower(host, port))
+
+    def stop_replication(self):
+        if self._follower_task is not None:
+            self._follower_task.cancel()
+            self._follower_task = None
+        if self.leader is not None:
+            # Promoted replicas start a new history, their own replicas need a full resync.
+            self.replid = secrets.token_hex(20)
+        self.leader = None
+        self.link_state = "none"
+
+    async def _run_follower(self, host: str, port: int):
+        synced = False
+        while True:
+            try:
+                reader, writer = await asyncio.open_connection(host, port)
+            except OSError as e:
+                print(f"Failed to connect to leader {host}:{port}: {e}")
+                await asyncio.sleep(RECONNECT_DELAY_SECONDS)
+                continue
+
+            try:
+                await self._sync_with_leader(reader, writer, synced)
+            except (ConnectionError, OSError, EOFError) as e:
+                print(f"Lost link with leader {host}:{port}: {e}")
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                print("Replication link encountered an issue")
+                traceback.print_exc()
+            finally:
+                synced = self.link_state == "connected" or synced
+                self.link_state = "connect"
+                writer.close()
+            await asyncio.sleep(RECONNECT_DELAY_SECONDS)
+
+    async def _sync_with_leader(self, reader, writer, synced: bool):
+        buffer = bytearray()
+
+        async def read_frame() -> tuple[PyRedisData, bytes]:
+            """The next frame from the leader, with its bytes as received."""
+            while True:
+                if buffer:
+                    frame, size = parse_frame(buffer)
+                    if frame is not None:
+                        data = bytes(buffer[:size])
+                        del buffer[:size]
+                        return frame, data
+                data = await reader.read(BUFFER_SIZE)
+                if not data:
+                    raise EOFError("connection closed by leader")
+                buffer.extend(data)
+
+        # A follower that has been in sync asks to continue from the last offset it applied.
+        replid, offset = (self.replid, self.offset) if synced else ("?", -1)
+        self.link_state = "sync"
+        writer.write(
+            Array([BulkString(b"PING")]).serialize()
+            + Array(
+                [
+                    BulkString(b"PSYNC"),
+                    BulkString(replid.encode()),
+                    BulkString(str(offset).encode()),
+                ]
+            ).serialize()
+        )
+        await writer.drain()
+
+        pong, _ = await read_frame()
+        if isinstance(pong, Error):
+            raise ConnectionError(pong.decode())
+
+        reply, _ = await read_frame()
+        match reply.decode().split():
+            case ["FULLRESYNC", new_replid, new_offset]:
+                snapshot, _ = await read_frame()
+                self.databases.flush(lazy=True)
+                # The snapshot is logged after the old data, without the flush a restart would bring it back.
+                if self.cmd_logger:
+                    self.cmd_logger.log(Array([BulkString(b"FLUSHALL")]))
+                db = 0
+                for frame in iter_frames(io.BytesIO(snapshot.data)):
+                    index = selected_db(frame)
+                    if index is not None:
+                        db = index
+                        continue
+                    await Command(
+                        frame,
+                        self.databases[db],
+                        self.cmd_logger,
+                        replicated=True,
+                        databases=self.databases,
+                    ).exec()
+                # The follower takes over the leader's history so its own replicas can resync partially.
+                self.replid = new_replid
+                self.backlog.reset(int(new_offset))
+                self.selected_db = None
+                print(f"Full resync with leader done, {self.databases.size()} keys")
+            case ["CONTINUE"]:
+                print(f"Partial resync with leader from offset {offset}")
+            case _:
+                raise ConnectionError(f"Unexpected PSYNC reply {reply.decode()}")
+
+        self.link_state = "connected"
+        while True:
+            frame, data = await read_frame()
+            # Every frame is passed on as received, whether or not it changes anything here, so the stream
+            # and its offsets stay the same as the leader's.
+            self._feed(data)
+            index = selected_db(frame)
+            if index is not None:
+                self.selected_db = index
+                continue
+            await Command(
+                frame,
+                self.databases[self.selected_db or 0],
+                self.cmd_logger,
+                replicated=True,
+                tracking=self.tracking,
+                databases=self.databases,
+            ).exec()
@@ -1,38 +1,158 @@
 import asyncio
+import contextlib
+import os
 import socket
 import traceback
+from typing import Callable
 
+from pyredis.cluster import ClusterState
 from pyredis.commands import Command
-from pyredis.config import AOF_NAME, BUFFER_SIZE, HOST, PORT
-from pyredis.expiry import run_cleanup_in_background
+from pyredis.config import (
+    AOF_NAME,
+    BUFFER_SIZE,
+    CLIENT_READ_THROTTLE,
+    DATABASES,
+    HOST,
+    LATENCY_MONITOR_THRESHOLD,
+    MAX_ACCEPTS_PER_CALL,
+    PORT,
+    SLOWLOG_LOG_SLOWER_THAN,
+    SLOWLOG_MAX_LEN,
+    TCP_BACKLOG,
+    TCP_KEEPALIVE,
+)
+from pyredis.expiry import INTERVAL_SECONDS, run_cleanup_in_background
+from pyredis.lazyfree import Reclaimer
+from pyredis.monitor import LatencyMonitor, Monitor, SlowLog
 from pyredis.persist import AOF
-from pyredis.protocol import Error, parse_frame
-from pyredis.store import DataStoreWithLock
+from pyredis.protocol import (
+    INVALID,
+    Array,
+    BulkString,
+    Error,
+    Null,
+    NullBulkString,
+    ProtocolError,
+    parse_frame_with_hint,
+)
+from pyredis.replication import ReplicationManager
+from pyredis.session import ClientClass, ClientRegistry, OutputBufferLimit
+from pyredis.store import Databases
+from pyredis.tracking import TrackingTable
 
 
-async def handle_connection(client, datastore, buffer_size, cmd_logger):
+async def receive_payload(loop, client, frame_buffer: bytearray, needed: int) -> bool:
+    """Grow the buffer to `needed` bytes and receive straight into it, rather than in small chunks."""
+    filled = len(frame_buffer)
+    frame_buffer.extend(bytes(needed - filled))
+    with memoryview(frame_buffer) as view:
+        while filled < needed:
+            chunk = view[filled:needed]
+            try:
+                received = await loop.sock_recv_into(client, chunk)
+            finally:
+                chunk.release()
+            if not received:
+                return False
+            filled += received
+    return True
+
+
+def is_request(frame) -> bool:
+    """Clients send their commands as a non empty array of bulk strings."""
+    return (
+        type(frame) is Array
+        and len(frame.data) > 0
+        and all(type(arg) is BulkString for arg in frame.data)
+    )
+
+
+async def handle_connection(
+    client,
+    databases,
+    buffer_size,
+    cmd_logger,
+    monitor,
+    replication,
+    cluster,
+    clients,
+    tracking,
+    read_throttle=CLIENT_READ_THROTTLE,
+):
     loop = asyncio.get_running_loop()
     frame_buffer = bytearray()
+    needed = 0
+    session = clients.create(
+        client, task=asyncio.current_task(), query_buffer=frame_buffer
+    )
     try:
         while True:
-            msg = await loop.sock_recv(client, buffer_size)
-            if not msg:
-                break
+            if needed - len(frame_buffer) > buffer_size:
+                if not await receive_payload(loop, client, frame_buffer, needed):
+                    break
+            else:
+                msg = await loop.sock_recv(client, buffer_size)
+                if not msg:
+                    break
+                frame_buffer.extend(msg)
+                if len(frame_buffer) < needed:
+                    continue
 
-            frame_buffer.extend(msg)
             while len(frame_buffer) > 0:
-                frame, size = parse_frame(frame_buffer)
+                try:
+                    frame, size, needed = parse_frame_with_hint(frame_buffer)
+                except ProtocolError as e:
+                    # Rejected on the header, before a huge length gets the buffer grown for it.
+                    session.write(
+                        Error(f"ERR Protocol error: {e}".encode()).serialize()
+                    )
+                    await session.drain()
+                    return
                 if frame is not None:
                     del frame_buffer[:size]
+                    if not is_request(frame):
+                        session.write(Error(b"ERR Protocol error").serialize())
+                        await session.drain()
+                        return
+                    session.touch(frame)
+                    if frame.data[0].data.upper() in (b"PSYNC", b"SYNC"):
+                        # The connection now belongs to a replica and only carries the replication stream.
+                        session.client_class = ClientClass.REPLICA
+                        await replication.serve_replica(client, frame)
+                        return
+
                     try:
-                        response = await Command(frame, datastore, cmd_logger).exec()
+                        response = await Command(
+                            frame,
+                            databases[session.db],
+                            cmd_logger,
+                            monitor,
+                            replication,
+                            cluster=cluster,
+                            session=session,
+                            clients=clients,
+                            tracking=tracking,
+                            databases=databases,
+                        ).exec()
                     except:
                         print("Unhandled error: ", traceback.format_exc())
-                        error = Error(f"Server error".encode())
-                        await loop.sock_sendall(client, error.serialize())
+                        session.write(Error(f"Server error".encode()).serialize())
+                        await session.drain()
                         return
 
-                    await loop.sock_sendall(client, response.serialize())
+                    if session.protocol == 3 and type(response) is NullBulkString:
+                        response = Null()
+                    session.write(response.serialize())
+                    if session.closing or session.close_after_reply:
+                        await session.drain()
+                        return
+                    # A client that doesn't read its replies stops being read from, rather than piling up output.
+                    if session.output_bytes > read_throttle:
+                        await session.drain()
+                elif needed == INVALID:
+                    session.write(Error(b"ERR Protocol error").serialize())
+                    await session.drain()
+                    return
                 else:
                     break
     except (ConnectionResetError, BrokenPipeError):
@@ -40,57 +160,197 @@ async def handle_connection(client, datastore, buffer_size, cmd_logger):
     except asyncio.CancelledError:
         raise
     finally:
+        tracking.disable(session)
+        clients.remove(session)
+        session.kill()
         client.close()
 
 
+def tcp_listener(host: str, port: int, backlog=TCP_BACKLOG) -> socket.socket:
+    listener = socket.socket(family=socket.AF_INET, type=socket.SOCK_STREAM)
+    listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    listener.bind((host, port))
+    listener.listen(backlog)
+    listener.setblocking(False)
+    return listener
+
+
+def unix_listener(
+    path: str, perm: int | None = None, backlog=TCP_BACKLOG
+) -> socket.socket:
+    # A socket file left by a server that did not shut down cleanly would fail the bind.
+    with contextlib.suppress(FileNotFoundError):
+        os.unlink(path)
+    listener = socket.socket(family=socket.AF_UNIX, type=socket.SOCK_STREAM)
+    listener.bind(path)
+    if perm is not None:
+        os.chmod(path, perm)
+    listener.listen(backlog)
+    listener.setblocking(False)
+    return listener
+
+
+def configure_client(client: socket.socket, keepalive=TCP_KEEPALIVE):
+    """Make an accepted socket non blocking. TCP clients get their small replies sent right away rather than
+    held back by Nagle's algorithm, and keepalive probes to detect dead peers."""
+    client.setblocking(False)
+    if client.family not in (socket.AF_INET, socket.AF_INET6):
+        return
+    client.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    if keepalive:
+        client.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+        # Linux only, elsewhere the system defaults apply.
+        if hasattr(socket, "TCP_KEEPIDLE"):
+            client.setsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPIDLE, keepalive)
+            client.setsockopt(
+                socket.IPPROTO_TCP, socket.TCP_KEEPINTVL, max(keepalive // 3, 1)
+            )
+            client.setsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPCNT, 3)
+
+
+def accept_clients(
+    listener: socket.socket,
+    start_client: Callable[[socket.socket], None],
+    keepalive=TCP_KEEPALIVE,
+    limit=MAX_ACCEPTS_PER_CALL,
+) -> int:
+    """Accept the pending connections of a readable listener, up to `limit` per call so a connection storm
+    can't starve the clients already connected. Returns the number of connections accepted.
+    """
+    for accepted in range(limit):
+        try:
+            client, _ = listener.accept()
+        except (BlockingIOError, InterruptedError):
+            return accepted
+        except OSError as e:
+            # Out of file descriptors and the like, the connection is tried again on the next wake up.
+            print(f"Accepting a connection failed: {e}")
+            return accepted
+        configure_client(client, keepalive)
+        start_client(client)
+    return limit
+
+
 async def server(
-    host=HOST, port=PORT, buffer_size=BUFFER_SIZE, aof_name=AOF_NAME, load=False
+    host=HOST,
+    port=PORT,
+    buffer_size=BUFFER_SIZE,
+    aof_name=AOF_NAME,
+    load=False,
+    expiry_interval=INTERVAL_SECONDS,
+    slowlog_log_slower_than=SLOWLOG_LOG_SLOWER_THAN,
+    slowlog_max_len=SLOWLOG_MAX_LEN,
+    latency_monitor_threshold=LATENCY_MONITOR_THRESHOLD,
+    replicaof: tuple[str, int] | None = None,
+    cluster_enabled=False,
+    lazyfree=False,
+    client_output_buffer_limits: dict[str, OutputBufferLimit] | None = None,
+    database_count=DATABASES,
+    prefix_index=False,
+    unixsocket: str | None = None,
+    unixsocketperm: int | None = None,
+    tcp_keepalive=TCP_KEEPALIVE,
 ):
-    datastore = DataStoreWithLock()
-    cmd_logger = AOF(aof_name, datastore)
+    reclaimer = Reclaimer()
+    databases = Databases(database_count, reclaimer, lazyfree, prefix_index)
+    monitor = Monitor(
+        SlowLog(slowlog_log_slower_than, slowlog_max_len),
+        LatencyMonitor(latency_monitor_threshold),
+    )
+    cmd_logger = AOF(aof_name, databases, monitor.latency)
+    clients = ClientRegistry(client_output_buffer_limits)
+    tracking = TrackingTable(clients)
+    databases.add_listener(tracking)
+    replication = ReplicationManager(
+        databases,
+        cmd_logger,
+        output_limit=clients.output_limits[ClientClass.REPLICA],
+        tracking=tracking,
+    )
+    cluster = ClusterState(host, port) if cluster_enabled else None
+    if cluster:
+        # A cluster node only has database 0.
+        databases[0].add_listener(cluster)
 
-    datastore_worker = datastore.start()
-    cull_worker = asyncio.create_task(run_cleanup_in_background(datastore))
+    datastore_worker = databases.start()
+    cull_worker = asyncio.create_task(
+        run_cleanup_in_background(databases, expiry_interval, monitor.latency)
+    )
     cmd_logger_worker = asyncio.create_task(cmd_logger.run_worker())
+    loop_lag_worker = asyncio.create_task(monitor.latency.run_loop_lag_monitor())
+    hotkeys_worker = asyncio.create_task(monitor.hotkeys.run_decay())
+    reclaimer_worker = asyncio.create_task(reclaimer.run_worker())
+    clients_worker = asyncio.create_task(clients.run_cron())
+    workers = [
+        datastore_worker,
+        cull_worker,
+        cmd_logger_worker,
+        loop_lag_worker,
+        hotkeys_worker,
+        reclaimer_worker,
+        clients_worker,
+    ]
+    if cluster:
+        workers.append(asyncio.create_task(cluster.run_gossip()))
 
     if load:
         await cmd_logger.replay()
+    if replicaof:
+        replication.replicate_from(*replicaof)
 
     loop = asyncio.get_running_loop()
     conns = set()
 
-    with socket.socket(family=socket.AF_INET, type=socket.SOCK_STREAM) as s:
-        s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-        s.bind((host, port))
-        s.listen()
-        s.setblocking(False)
+    def start_client(client: socket.socket):
+        task = asyncio.create_task(
+            handle_connection(
+                client,
+                databases,
+                buffer_size,
+                cmd_logger,
+                monitor,
+                replication,
+                cluster,
+                clients,
+                tracking,
+            )
+        )
+        conns.add(task)
+        task.add_done_callback(conns.discard)
 
-        print(f"Server Listening: {host}:{port}...")
-        while True:
-            try:
-                client, address = await loop.sock_accept(s)
-                # print(f"Handling connection from {address}")
-                task = asyncio.create_task(
-                    handle_connection(client, datastore, buffer_size, cmd_logger)
-                )
-                conns.add(task)
-                task.add_done_callback(conns.discard)
-
-            except (KeyboardInterrupt, SystemExit, asyncio.CancelledError):
-                print(f"Shutting Down")
-                for c in conns:
-                    c.cancel()
-
-                datastore_worker.cancel()
-                cull_worker.cancel()
-                cmd_logger_worker.cancel()
-
-                if conns:
-                    await asyncio.gather(*conns, return_exceptions=True)
-                await asyncio.gather(
-                    datastore_worker,
-                    cull_worker,
-                    cmd_logger_worker,
-                    return_exceptions=True,
-                )
-                raise
+    listeners = [tcp_listener(host, port)]
+    if unixsocket:
+        listeners.append(unix_listener(unixsocket, unixsocketperm))
+    for listener in listeners:
+        loop.add_reader(
+            listener.fileno(), accept_clients, listener, start_client, tcp_keepalive
+        )
+
+    print(f"Server Listening: {host}:{port}...")
+    if unixsocket:
+        print(f"Server Listening: {unixsocket}...")
+    try:
+        # Connections are accepted by the reader callbacks, until the server is cancelled.
+        await loop.create_future()
+    except (KeyboardInterrupt, SystemExit, asyncio.CancelledError):
+        print(f"Shutting Down")
+        for c in conns:
+            c.cancel()
+
+        for worker in workers:
+            worker.cancel()
+        replication.stop_replication()
+        if cluster:
+            cluster.stop()
+
+        if conns:
+            await asyncio.gather(*conns, return_exceptions=True)
+        await asyncio.gather(*workers, return_exceptions=True)
+        raise
+    finally:
+        for listener in listeners:
+            loop.remove_reader(listener.fileno())
+            listener.close()
+        if unixsocket:
+            with contextlib.suppress(FileNotFoundError):
+                os.unlink(unixsocket)
@@ -0,0 +1,253 @@
+import asyncio
+import itertools
+import socket
+import time
+from dataclasses import dataclass, field
+
+from pyredis.config import CLIENT_OUTPUT_BUFFER_LIMITS
+from pyredis.protocol import Array, PyRedisData
+
+_client_ids = itertools.count(1)
+CLIENTS_CRON_INTERVAL_SECONDS = 1
+
+
+class ClientClass:
+    NORMAL = "normal"
+    REPLICA = "replica"
+
+
+@dataclass(frozen=True)
+class OutputBufferLimit:
+    """A client is disconnected once its unsent output reaches `hard` bytes, or stays at `soft` bytes or more
+    for longer than `soft_seconds`. A zero limit disables that check."""
+
+    hard: int = 0
+    soft: int = 0
+    soft_seconds: int = 0
+
+    def reached(
+        self, size: int, soft_since: float | None, now: float
+    ) -> tuple[bool, float | None]:
+        """Whether `size` pending bytes break the limit, and since when the soft limit has been exceeded."""
+        if self.hard and size >= self.hard:
+            return True, soft_since
+        if not self.soft or size < self.soft:
+            return False, None
+        if soft_since is None:
+            return False, now
+        return now - soft_since > self.soft_seconds, soft_since
+
+
+def _format_address(address) -> str:
+    if isinstance(address, tuple):
+        return f"{address[0]}:{address[1]}"
+    # A Unix socket path, shown with port 0 like in Redis.
+    return f"{address}:0" if address else ""
+
+
+def default_output_limits() -> dict[str, OutputBufferLimit]:
+    return {
+        client_class: OutputBufferLimit(*limit)
+        for client_class, limit in CLIENT_OUTPUT_BUFFER_LIMITS.items()
+    }
+
+
+@dataclass
+class TrackingOptions:
+    redirect: int | None = None
+    bcast: bool = False
+    prefixes: list[bytes] = field(default_factory=list)
+    optin: bool = False
+    optout: bool = False
+    noloop: bool = False
+
+
+@dataclass(eq=False)
+class Session:
+    """Per connection state that outlives a single command.
+
+    Replies are written straight to the socket when nothing is pending, the rest is kept in an output
+    buffer that a writer task drains. The buffer is accounted against the client class output limit.
+    """
+
+    client: socket.socket | None = None
+    id: int = field(default_factory=lambda: next(_client_ids))
+    protocol: int = 2
+    name: bytes | None = None
+    asking: bool = False
+    tracking: TrackingOptions | None = None
+    caching: bool | None = None
+    blocked: bool = False
+    db: int = 0
+
+    client_class: str = ClientClass.NORMAL
+    output_limit: OutputBufferLimit = field(default_factory=OutputBufferLimit)
+    task: asyncio.Task | None = field(default=None, repr=False)
+    query_buffer: bytearray = field(default_factory=bytearray, repr=False)
+    created: float = field(default_factory=time.monotonic)
+    last_interaction: float = field(default_factory=time.monotonic)
+    last_command: bytes = b"NULL"
+    output_bytes: int = 0
+    output_limit_reached: bool = False
+    close_after_reply: bool = False
+    closing: bool = False
+    address: str = field(init=False, default="")
+    local_address: str = field(init=False, default="")
+
+    _output: list[bytes | memoryview] = field(default_factory=list, repr=False)
+    _writer: asyncio.Task | None = field(default=None, repr=False)
+    _soft_limit_since: float | None = field(default=None, repr=False)
+
+    def __post_init__(self):
+        if self.client is not None:
+            try:
+                self.local_address = _format_address(self.client.getsockname())
+                # Clients of the Unix socket are unnamed, they show the path they connected to.
+                self.address = (
+                    _format_address(self.client.getpeername()) or self.local_address
+                )
+            except OSError:
+                pass
+
+    def describe(self) -> str:
+        """One line of CLIENT LIST."""
+        now = time.monotonic()
+        flags = "S" if self.client_class == ClientClass.REPLICA else ""
+        if self.tracking is not None:
+            flags += "tB" if self.tracking.bcast else "t"
+        if self.blocked:
+            flags += "b"
+        if self.closing or self.close_after_reply:
+            flags += "A"
+        fields = [
+            ("id", self.id),
+            ("addr", self.address),
+            ("laddr", self.local_address),
+            ("fd", self.client.fileno() if self.client else -1),
+            ("name", (self.name or b"").decode()),
+            ("age", int(now - self.created)),
+            ("idle", int(now - self.last_interaction)),
+            ("flags", flags or "N"),
+            ("db", self.db),
+            ("qbuf", len(self.query_buffer)),
+            ("oll", len(self._output)),
+            ("omem", self.output_bytes),
+            ("tot-mem", len(self.query_buffer) + self.output_bytes),
+            ("events", "rw" if self._writer is not None else "r"),
+            ("cmd", bytes(self.last_command).decode(errors="replace").lower()),
+            ("resp", self.protocol),
+        ]
+        return " ".join(f"{name}={value}" for name, value in fields)
+
+    def touch(self, request: Array):
+        self.last_interaction = time.monotonic()
+        self.last_command = request.data[0].data
+
+    def write(self, data: bytes):
+        if self.closing:
+            return
+        if self._writer is None and self.client is not None:
+            try:
+                sent = self.client.send(data)
+            except BlockingIOError:
+                sent = 0
+            except OSError:
+                self.kill()
+                return
+            if sent == len(data):
+                return
+            data = memoryview(data)[sent:]
+
+        self._output.append(data)
+        self.output_bytes += len(data)
+        if not self.check_output_limit(time.monotonic()):
+            if self._writer is None and self.client is not None:
+                self._writer = asyncio.create_task(self._write_pending())
+
+    def check_output_limit(self, now: float) -> bool:
+        """Kill the connection when its pending output broke the limit."""
+        reached, self._soft_limit_since = self.output_limit.reached(
+            self.output_bytes, self._soft_limit_since, now
+        )
+        if reached:
+            print(
+                f"Client id={self.id} closed for exceeding its output buffer limit, "
+                f"{self.output_bytes} bytes pending"
+            )
+            self.output_limit_reached = True
+            self.kill()
+        return reached
+
+    def push(self, frame: PyRedisData):
+        """Out of band data, written in order with the replies."""
+        self.write(frame.serialize())
+
+    async def _write_pending(self):
+        loop = asyncio.get_running_loop()
+        try:
+            while self._output:
+                chunks, self._output = self._output, []
+                data = chunks[0] if len(chunks) == 1 else b"".join(chunks)
+                await loop.sock_sendall(self.client, data)
+                self.output_bytes -= len(data)
+                if self.output_bytes < self.output_limit.soft:
+                    self._soft_limit_since = None
+        except OSError:
+            self.kill()
+        finally:
+            self._writer = None
+
+    async def drain(self):
+        """Wait until the output buffer has been written."""
+        if self._writer is not None:
+            await asyncio.wait([self._writer])
+
+    def kill(self):
+        """Drop the pending output and stop the connection, a connection can kill itself after its reply."""
+        self.closing = True
+        self._output.clear()
+        self.output_bytes = 0
+        if self._writer is not None and self._writer is not asyncio.current_task():
+            self._writer.cancel()
+        if self.task is not None and self.task is not asyncio.current_task():
+            self.task.cancel()
+
+
+class ClientRegistry:
+    """Every open client connection, by client id."""
+
+    def __init__(self, output_limits: dict[str, OutputBufferLimit] | None = None):
+        self.sessions: dict[int, Session] = {}
+        self.output_limits = (
+            output_limits if output_limits is not None else default_output_limits()
+        )
+        self.output_limit_disconnections = 0
+
+    def __len__(self):
+        return len(self.sessions)
+
+    def create(self, client: socket.socket, **kwargs) -> Session:
+        session = Session(
+            client, output_limit=self.output_limits[ClientClass.NORMAL], **kwargs
+        )
+        self.add(session)
+        return session
+
+    def add(self, session: Session):
+        self.sessions[session.id] = session
+
+    def remove(self, session: Session):
+        if self.sessions.pop(session.id, None) and session.output_limit_reached:
+            self.output_limit_disconnections += 1
+
+    def get(self, client_id: int) -> Session | None:
+        return self.sessions.get(client_id)
+
+    async def run_cron(self, interval_seconds=CLIENTS_CRON_INTERVAL_SECONDS):
+        """A stalled reader gets no new replies, so its soft limit is also checked periodically."""
+        while True:
+            await asyncio.sleep(interval_seconds)
+            now = time.monotonic()
+            for session in list(self.sessions.values()):
+                if session.output_bytes:
+                    session.check_output_limit(now)
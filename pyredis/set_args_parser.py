@@ -43,7 +43,7 @@ def get_expiry_time(opts: ExpiryOptions):
             case SetArgs.EXAT:
                 return datetime.fromtimestamp(opts.value)
             case SetArgs.PXAT:
-                return datetime.fromtimestamp(opts.value // 1000)
+                return datetime.fromtimestamp(opts.value / 1000)
             case _:
                 raise ValueError(f"No valid expiry argument given `{opts.expiry_type}`")
     except Exception as e:
@@ -52,9 +52,15 @@ def get_expiry_time(opts: ExpiryOptions):
         )
 
 
+def unix_ms(expiry: datetime) -> int:
+    """An expiry as the Unix time in milliseconds that PXAT takes."""
+    return int(expiry.timestamp() * 1000)
+
+
 class ParseSetArgs:
     def __init__(self, request: Array):
-        self.args: list = request.decode()[3:]
+        # Only the options are text, the value can be binary.
+        self.args: list = [arg.decode() for arg in request.data[3:]]
         self.commands = []
         self.get_flag = False
         self.set_flag = None
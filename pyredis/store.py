@@ -1,19 +1,50 @@
 import asyncio
 import contextlib
 import random
+import sys
+import time
 from asyncio import Future
 from dataclasses import dataclass
 from datetime import datetime
 from enum import Enum
-from typing import Dict, Optional, Tuple
+from typing import TYPE_CHECKING, Dict, Iterator, Optional, Tuple
 
-from pyredis.protocol import Integer, NullBulkString, PyRedisData, SimpleString
+from pyredis.blocking import BlockingKeys
+from pyredis.config import DATABASES, LFU_DECAY_TIME, LFU_LOG_FACTOR
+from pyredis.encoding import Value
+from pyredis.prefix import PrefixIndex
+from pyredis.protocol import SimpleString
 
+if TYPE_CHECKING:
+    from pyredis.lazyfree import Reclaimer
 
-@dataclass
+LFU_INIT_VAL = 5
+LFU_MAX = 255
+
+
+@dataclass(slots=True)
 class Record:
-    value: PyRedisData
+    value: Value
     expiry: Optional[datetime]
+    accessed: int = 0  # seconds on the datastore clock
+    freq: int = LFU_INIT_VAL  # logarithmic access counter
+
+    def decayed_freq(self, now: int) -> int:
+        """The access counter minus one for every LFU_DECAY_TIME minutes since the last access."""
+        if not LFU_DECAY_TIME:
+            return self.freq
+        periods = (now - self.accessed) // 60 // LFU_DECAY_TIME
+        return max(self.freq - periods, 0)
+
+    def touch(self, now: int):
+        """Count an access, the counter grows with probability 1 / ((freq - LFU_INIT_VAL) * LFU_LOG_FACTOR + 1)."""
+        freq = self.decayed_freq(now)
+        if freq < LFU_MAX:
+            base = max(freq - LFU_INIT_VAL, 0)
+            if random.random() < 1.0 / (base * LFU_LOG_FACTOR + 1):
+                freq += 1
+        self.freq = freq
+        self.accessed = now
 
 
 class DataStoreCommands(Enum):
@@ -56,27 +87,115 @@ class KeyIndexStore:
         random_index = random.randint(0, len(self._keys) - 1)
         return self._keys[random_index]
 
+    def scan(self, cursor: int, count: int) -> tuple[int, list[str]]:
+        """Walk the keys from the end of the index, a cursor of 0 starts and ends a full iteration.
+
+        A delete moves the last key into the freed slot. Walking backwards, that key was either already
+        returned or sits ahead of the cursor, so keys present for the whole iteration are never missed.
+        """
+        end = len(self._keys) if cursor == 0 else min(cursor, len(self._keys))
+        start = max(end - count, 0)
+        return start, self._keys[start:end]
+
+    def memory_usage(self) -> int:
+        # The key strings are shared with the keyspace, only the containers and positions are extra.
+        # Positions below 257 are cached small ints.
+        positions = max(len(self._keys) - 257, 0) * sys.getsizeof(2**20)
+        return sys.getsizeof(self._keys) + sys.getsizeof(self._indices) + positions
+
+
+class KeyspaceListener:
+    """Hooks for structures that mirror the keyspace, called after the datastore changes."""
+
+    def key_added(self, key: str):
+        pass
+
+    def key_removed(self, key: str):
+        pass
+
+    def flushed(self):
+        pass
+
 
 class DataStoreWithLock:
-    def __init__(self):
+    def __init__(
+        self,
+        reclaimer: Reclaimer | None = None,
+        lazyfree=False,
+        index: int = 0,
+        prefix_index=False,
+    ):
+        # The number of the logical database, as given to SELECT.
+        self.index = index
         self._data: Dict[str, Record] = {}
         self._key_index: KeyIndexStore = KeyIndexStore()
+        # Sorted keys for KEYS, SCAN MATCH and DELPREFIX with a literal prefix, kept only when enabled.
+        self.prefix_index: PrefixIndex | None = PrefixIndex() if prefix_index else None
         self._lock = asyncio.Lock()
         self._now_cache = datetime.now()
+        self.clock = int(time.monotonic())
+        self._listeners: list[KeyspaceListener] = []
+        # With lazyfree, deletes, overwrites, expiry and flushes hand big values to the reclaimer.
+        self.reclaimer = reclaimer
+        self.lazyfree = lazyfree
+        # Clients blocked until a key receives data, like XREAD BLOCK.
+        self.blocking = BlockingKeys()
+        # Counts the changes to the keyspace, like Redis' server.dirty. A command that leaves it as it
+        # was changed nothing, it is neither logged nor replicated.
+        self.dirty = 0
+
+    def add_listener(self, listener: KeyspaceListener):
+        self._listeners.append(listener)
 
     def start(self):
         print("Data Store With Lock: ready")
 
         async def update_time():
             while True:
-                self._now_cache = datetime.now()
+                self.tick(datetime.now(), int(time.monotonic()))
                 await asyncio.sleep(0.1)
 
         return asyncio.create_task(update_time())
 
+    def tick(self, now: datetime, clock: int):
+        """Advance the cached time that expiry and the access clock read."""
+        self._now_cache = now
+        self.clock = clock
+
     def get_random_key(self):
         return self._key_index.get_random_key()
 
+    def scan(self, cursor: int, count: int) -> tuple[int, list[str]]:
+        return self._key_index.scan(cursor, count)
+
+    def sample(self, count: int) -> list[tuple[str, Record]]:
+        """Up to `count` random live records, the same key can be picked more than once."""
+        records = []
+        for _ in range(min(count, len(self._data))):
+            key = self.get_random_key()
+            record = self.get(key, touch=False)
+            if record is not None:
+                records.append((key, record))
+        return records
+
+    def table_usage(self) -> int:
+        return sys.getsizeof(self._data)
+
+    def index_usage(self) -> int:
+        return self._key_index.memory_usage()
+
+    def prefix_index_usage(self) -> int:
+        return self.prefix_index.memory_usage() if self.prefix_index is not None else 0
+
+    def keys(self, prefix="") -> list[str]:
+        """The keys starting with `prefix`, expired ones included. The prefix index only visits the matching
+        keys, otherwise every key is checked."""
+        if not prefix:
+            return list(self._data)
+        if self.prefix_index is not None:
+            return self.prefix_index.keys(prefix)
+        return [key for key in self._data if key.startswith(prefix)]
+
     @contextlib.asynccontextmanager
     async def atomic(self):
         await self._lock.acquire()
@@ -88,28 +207,164 @@ class DataStoreWithLock:
     def size(self) -> int:
         return len(self._data)
 
-    def set(self, key: str, value: PyRedisData, expiry=None) -> bool:
-        self._data[key] = Record(value, expiry)
-        self._key_index.append(key)
+    def items(self) -> Iterator[Tuple[str, Record]]:
+        """Iterate over a copy of the live records, expired keys are skipped."""
+        for key, record in list(self._data.items()):
+            if record.expiry and record.expiry < self._now_cache:
+                continue
+            yield key, record
+
+    def flush(self, lazy=False):
+        """Swap in an empty keyspace, the old one is freed in the background when `lazy`."""
+        data, key_index, prefix_index = self._data, self._key_index, self.prefix_index
+        self.dirty += len(data)
+        self._data = {}
+        self._key_index = KeyIndexStore()
+        if prefix_index is not None:
+            self.prefix_index = PrefixIndex(prefix_index.chunk_size)
+        for listener in self._listeners:
+            listener.flushed()
+        if lazy or self.lazyfree:
+            self._free(data)
+            self._free(key_index._keys)
+            self._free(key_index._indices)
+            if prefix_index is not None:
+                self._free(prefix_index._chunks)
+
+    def swap(self, other: "DataStoreWithLock"):
+        """Exchange keyspaces with another database in O(1), like SWAPDB.
+
+        Blocked clients stay with their database number, they are woken to retry against the keys they
+        now find there.
+        """
+        self._data, other._data = other._data, self._data
+        self.dirty += 1
+        other.dirty += 1
+        self._key_index, other._key_index = other._key_index, self._key_index
+        self.prefix_index, other.prefix_index = other.prefix_index, self.prefix_index
+        for listener in dict.fromkeys(self._listeners + other._listeners):
+            listener.flushed()
+        for db in (self, other):
+            for key in db.blocking.keys():
+                if key in db._data:
+                    db.blocking.signal(key)
+
+    def set(self, key: str, value: Value, expiry=None) -> bool:
+        """Store a value, an overwritten key keeps its access counter."""
+        old = self._data.get(key)
+        self.dirty += 1
+        if old is None:
+            self._data[key] = Record(value, expiry, self.clock)
+            self._key_index.append(key)
+            if self.prefix_index is not None:
+                self.prefix_index.add(key)
+            for listener in self._listeners:
+                listener.key_added(key)
+        else:
+            self._data[key] = Record(
+                value, expiry, self.clock, old.decayed_freq(self.clock)
+            )
+            if self.lazyfree and old.value is not value:
+                self._free(old.value)
         return True
 
-    def get(self, key: str) -> Record | None:
+    def get(self, key: str, touch=True) -> Record | None:
+        """The live record of a key, reads that are not client accesses pass `touch=False`."""
         result = self._data.get(key)
         if result and result.expiry and result.expiry < self._now_cache:
-            del self._data[key]
-            self._key_index.delete(key)
+            self._remove(key)
+            if self.lazyfree:
+                self._free(result.value)
             print(
                 f'Deleted key `{key}` after expiry {result.expiry.strftime("%Y-%m-%d %H:%M:%S")}'
             )
             return None
+        if result is not None and touch:
+            result.touch(self.clock)
         return result
 
-    def delete(self, key) -> bool:
-        if key in self._data:
-            del self._data[key]
-            self._key_index.delete(key)
-            return True
-        return False
+    def delete(self, key, lazy: bool | None = None) -> bool:
+        record = self._data.get(key)
+        if record is None:
+            return False
+        self._remove(key)
+        if self.lazyfree if lazy is None else lazy:
+            self._free(record.value)
+        return True
+
+    def unlink(self, key) -> bool:
+        """Remove the key in O(1), a big value is freed later by the reclaimer."""
+        return self.delete(key, lazy=True)
+
+    def _free(self, value):
+        if self.reclaimer is not None:
+            self.reclaimer.free(value)
+
+    def _remove(self, key: str):
+        del self._data[key]
+        self.dirty += 1
+        self._key_index.delete(key)
+        if self.prefix_index is not None:
+            self.prefix_index.discard(key)
+        for listener in self._listeners:
+            listener.key_removed(key)
+
+
+class Databases:
+    """The logical databases of the server, numbered from 0.
+
+    Connections pick theirs with SELECT. Numbers are stable, SWAPDB exchanges the contents of two
+    databases rather than the databases themselves.
+    """
+
+    def __init__(
+        self,
+        count=DATABASES,
+        reclaimer: Reclaimer | None = None,
+        lazyfree=False,
+        prefix_index=False,
+    ):
+        self._dbs = [
+            DataStoreWithLock(reclaimer, lazyfree, index, prefix_index)
+            for index in range(count)
+        ]
+
+    def __getitem__(self, index: int) -> DataStoreWithLock:
+        return self._dbs[index]
+
+    def __len__(self) -> int:
+        return len(self._dbs)
+
+    def __iter__(self) -> Iterator[DataStoreWithLock]:
+        return iter(self._dbs)
+
+    def add_listener(self, listener: KeyspaceListener):
+        for db in self._dbs:
+            db.add_listener(listener)
+
+    def start(self):
+        print(f"Data Store With Lock: ready, {len(self._dbs)} databases")
+
+        # One clock for all the databases, rather than a task each.
+        async def update_time():
+            while True:
+                now, clock = datetime.now(), int(time.monotonic())
+                for db in self._dbs:
+                    db.tick(now, clock)
+                await asyncio.sleep(0.1)
+
+        return asyncio.create_task(update_time())
+
+    def swap(self, first: int, second: int):
+        if first != second:
+            self._dbs[first].swap(self._dbs[second])
+
+    def flush(self, lazy=False):
+        for db in self._dbs:
+            db.flush(lazy)
+
+    def size(self) -> int:
+        return sum(db.size() for db in self._dbs)
 
 
 class DataStoreWithQueue:
@@ -120,7 +375,7 @@ class DataStoreWithQueue:
             Tuple[
                 DataStoreCommands,
                 str | None,
-                PyRedisData | None,
+                Value | None,
                 datetime | None,
                 Future,
             ]
@@ -0,0 +1,400 @@
+from array import array
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass, field
+from itertools import islice
+
+from pyredis.config import STREAM_NODE_MAX_ENTRIES
+from pyredis.protocol import Array, BulkString, Integer, Map, NullArray
+
+StreamID = tuple[int, int]  # milliseconds, sequence
+
+ID_MAX_PART = 2**64 - 1
+MIN_ID: StreamID = (0, 0)
+MAX_ID: StreamID = (ID_MAX_PART, ID_MAX_PART)
+
+
+class StreamError(ValueError):
+    pass
+
+
+def parse_id(text: str, missing_sequence=0) -> StreamID | None:
+    """`ms-seq`, or `ms` completed with `missing_sequence`, None when it is not a valid ID."""
+    ms, _, sequence = text.partition("-")
+    if not ms.isdigit() or (_ and not sequence.isdigit()):
+        return None
+    stream_id = (int(ms), int(sequence) if _ else missing_sequence)
+    return stream_id if max(stream_id) <= ID_MAX_PART else None
+
+
+def format_id(stream_id: StreamID) -> bytes:
+    return b"%i-%i" % stream_id
+
+
+def next_id(stream_id: StreamID) -> StreamID | None:
+    ms, sequence = stream_id
+    if sequence < ID_MAX_PART:
+        return ms, sequence + 1
+    return (ms + 1, 0) if ms < ID_MAX_PART else None
+
+
+def previous_id(stream_id: StreamID) -> StreamID | None:
+    ms, sequence = stream_id
+    if sequence > 0:
+        return ms, sequence - 1
+    return (ms - 1, ID_MAX_PART) if ms > 0 else None
+
+
+class StreamChunk:
+    """Up to STREAM_NODE_MAX_ENTRIES consecutive entries, in the spirit of a Redis listpack node.
+
+    IDs are packed in an array of unsigned 64 bit ints. Entries with the field names of the first entry
+    of the chunk, the usual case, only keep their values.
+    """
+
+    __slots__ = ("ids", "master", "same_fields", "entries")
+
+    def __init__(self, fields: list[bytes]):
+        self.ids = array("Q")  # ms and sequence of every entry, interleaved
+        self.master = tuple(fields[::2])
+        self.same_fields = bytearray()
+        self.entries: list[tuple[bytes, ...]] = []
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def id_at(self, index: int) -> StreamID:
+        return self.ids[2 * index], self.ids[2 * index + 1]
+
+    def fields_at(self, index: int) -> list[bytes]:
+        entry = self.entries[index]
+        if not self.same_fields[index]:
+            return list(entry)
+        fields = [b""] * (2 * len(entry))
+        fields[::2], fields[1::2] = self.master, entry
+        return fields
+
+    def append(self, stream_id: StreamID, fields: list[bytes]):
+        self.ids.extend(stream_id)
+        same = tuple(fields[::2]) == self.master
+        self.same_fields.append(same)
+        self.entries.append(tuple(fields[1::2]) if same else tuple(fields))
+
+    def bisect_left(self, stream_id: StreamID) -> int:
+        return bisect_left(range(len(self)), stream_id, key=self.id_at)
+
+    def bisect_right(self, stream_id: StreamID) -> int:
+        return bisect_right(range(len(self)), stream_id, key=self.id_at)
+
+    def drop_front(self, count: int):
+        del self.ids[: 2 * count]
+        del self.same_fields[:count]
+        del self.entries[:count]
+
+
+@dataclass(slots=True)
+class PendingEntry:
+    consumer: str
+    delivered: int  # unix time in milliseconds of the last delivery
+    deliveries: int = 1
+
+
+@dataclass(slots=True)
+class Consumer:
+    name: str
+    seen: int  # unix time in milliseconds of the last read
+    pending: dict[StreamID, PendingEntry] = field(default_factory=dict)
+
+
+@dataclass(slots=True)
+class ConsumerGroup:
+    """A consumer group and its pending entries list: entries delivered but not acknowledged yet.
+
+    The group and consumer lists share the same PendingEntry objects. New deliveries have growing IDs,
+    so the lists stay sorted unless SETID moves the group back.
+    """
+
+    last_id: StreamID
+    entries_read: int = -1  # -1 when unknown
+    pending: dict[StreamID, PendingEntry] = field(default_factory=dict)
+    consumers: dict[str, Consumer] = field(default_factory=dict)
+
+    def consumer(self, name: str, now: int) -> Consumer:
+        consumer = self.consumers.get(name)
+        if consumer is None:
+            consumer = self.consumers[name] = Consumer(name, now)
+        consumer.seen = now
+        return consumer
+
+    def deliver(self, consumer: Consumer, ids: list[StreamID], now: int):
+        for stream_id in ids:
+            entry = self.pending.get(stream_id)
+            if entry is None:
+                entry = self.pending[stream_id] = PendingEntry(consumer.name, now)
+            else:
+                # Moved back by SETID: the entry changes hands.
+                self.consumers[entry.consumer].pending.pop(stream_id, None)
+                entry.consumer, entry.delivered = consumer.name, now
+                entry.deliveries += 1
+            consumer.pending[stream_id] = entry
+
+    def ack(self, ids: list[StreamID]) -> int:
+        acked = 0
+        for stream_id in ids:
+            entry = self.pending.pop(stream_id, None)
+            if entry is not None:
+                del self.consumers[entry.consumer].pending[stream_id]
+                acked += 1
+        return acked
+
+    def delete_consumer(self, name: str) -> int:
+        consumer = self.consumers.pop(name, None)
+        if consumer is None:
+            return 0
+        for stream_id in consumer.pending:
+            del self.pending[stream_id]
+        return len(consumer.pending)
+
+    def pending_range(
+        self,
+        start: StreamID,
+        end: StreamID,
+        count: int,
+        consumer: str | None = None,
+        min_idle: int = 0,
+        now: int = 0,
+    ) -> list[tuple[StreamID, PendingEntry]]:
+        """Up to count pending entries between start and end, of a consumer, idle for min_idle ms."""
+        pending = self.pending
+        if consumer is not None:
+            owner = self.consumers.get(consumer)
+            pending = owner.pending if owner is not None else {}
+        ids = sorted(pending)
+        entries = (
+            (stream_id, pending[stream_id])
+            for stream_id in ids[bisect_left(ids, start) : bisect_right(ids, end)]
+        )
+        if min_idle:
+            entries = (
+                (stream_id, entry)
+                for stream_id, entry in entries
+                if now - entry.delivered >= min_idle
+            )
+        return list(islice(entries, count))
+
+
+class Stream:
+    """An append only log of entries with growing IDs, split in chunks indexed by their first ID.
+
+    Seeking an ID is a bisection of the chunk index, then of the chunk. Trimming drops whole chunks from
+    the front, and only cuts into the first chunk when the trim is exact.
+    """
+
+    __slots__ = ("chunks", "index", "length", "last_id", "entries_added", "groups")
+
+    def __init__(self):
+        self.chunks: list[StreamChunk] = []
+        self.index: list[StreamID] = []  # the first ID of every chunk
+        self.length = 0
+        self.last_id: StreamID = MIN_ID
+        self.entries_added = 0
+        self.groups: dict[str, ConsumerGroup] = {}
+
+    def __len__(self) -> int:
+        return self.length
+
+    @property
+    def first_id(self) -> StreamID | None:
+        return self.index[0] if self.index else None
+
+    def auto_id(self, now_ms: int, ms: int | None = None) -> StreamID:
+        """The ID of an entry added at `now_ms`, or the next sequence of a given `ms`."""
+        last_ms, last_sequence = self.last_id
+        if ms is None:
+            ms = max(now_ms, last_ms)
+        if ms > last_ms:
+            return ms, 0
+        if ms < last_ms or last_sequence == ID_MAX_PART:
+            raise StreamError(
+                "The ID specified in XADD is equal or smaller than the target stream top item"
+            )
+        return ms, last_sequence + 1
+
+    def add(self, stream_id: StreamID, fields: list[bytes]):
+        if stream_id <= self.last_id:
+            raise StreamError(
+                "The ID specified in XADD is equal or smaller than the target stream top item"
+            )
+        if not self.chunks or len(self.chunks[-1]) >= STREAM_NODE_MAX_ENTRIES:
+            self.chunks.append(StreamChunk(fields))
+            self.index.append(stream_id)
+        self.chunks[-1].append(stream_id, fields)
+        self.length += 1
+        self.last_id = stream_id
+        self.entries_added += 1
+
+    def range(
+        self, start: StreamID, end: StreamID, count: int | None = None, reverse=False
+    ) -> list[tuple[StreamID, list[bytes]]]:
+        """The entries with IDs between start and end included, from the end with `reverse`."""
+        entries = []
+        if start > end or count == 0:
+            return entries
+        if reverse:
+            chunk_index = bisect_right(self.index, end) - 1
+            if chunk_index < 0:
+                return entries
+            position = self.chunks[chunk_index].bisect_right(end) - 1
+            while chunk_index >= 0:
+                chunk = self.chunks[chunk_index]
+                for i in range(position, -1, -1):
+                    stream_id = chunk.id_at(i)
+                    if stream_id < start or len(entries) == count:
+                        return entries
+                    entries.append((stream_id, chunk.fields_at(i)))
+                chunk_index -= 1
+                if chunk_index >= 0:
+                    position = len(self.chunks[chunk_index]) - 1
+            return entries
+
+        chunk_index = max(bisect_right(self.index, start) - 1, 0)
+        position = self.chunks[chunk_index].bisect_left(start) if self.chunks else 0
+        for chunk in self.chunks[chunk_index:]:
+            for i in range(position, len(chunk)):
+                stream_id = chunk.id_at(i)
+                if stream_id > end or len(entries) == count:
+                    return entries
+                entries.append((stream_id, chunk.fields_at(i)))
+            position = 0
+        return entries
+
+    def get(self, stream_id: StreamID) -> list[bytes] | None:
+        found = self.range(stream_id, stream_id, 1)
+        return found[0][1] if found else None
+
+    def trim(
+        self,
+        maxlen: int | None = None,
+        minid: StreamID | None = None,
+        approximate=False,
+        limit: int | None = None,
+    ) -> int:
+        """Remove entries from the front down to `maxlen` entries, or below `minid`.
+
+        An approximate trim only drops whole chunks, at most `limit` entries worth of them, and can leave
+        a few more entries than asked for. Returns the number of entries removed.
+        """
+
+        def excess(chunk: StreamChunk) -> int:
+            """How many entries from the front of chunk have to go."""
+            if maxlen is not None:
+                return max(self.length - maxlen, 0)
+            return chunk.bisect_left(minid)
+
+        removed = 0
+        while self.chunks:
+            chunk = self.chunks[0]
+            if excess(chunk) < len(chunk):
+                break
+            if limit is not None and removed + len(chunk) > limit:
+                return removed
+            del self.chunks[0], self.index[0]
+            self.length -= len(chunk)
+            removed += len(chunk)
+
+        if not approximate and self.chunks:
+            drop = excess(self.chunks[0])
+            if drop > 0:
+                self.chunks[0].drop_front(drop)
+                self.index[0] = self.chunks[0].id_at(0)
+                self.length -= drop
+                removed += drop
+        return removed
+
+    def to_resp(self) -> Map:
+        """The entries, groups and pending entries lists, for DUMP, RESTORE and snapshots."""
+        groups = []
+        for name, group in self.groups.items():
+            consumers = [
+                Array([BulkString(consumer.name.encode()), _integer(consumer.seen)])
+                for consumer in group.consumers.values()
+            ]
+            pending = [
+                Array(
+                    [
+                        BulkString(format_id(stream_id)),
+                        BulkString(entry.consumer.encode()),
+                        _integer(entry.delivered),
+                        _integer(entry.deliveries),
+                    ]
+                )
+                for stream_id, entry in group.pending.items()
+            ]
+            groups.append(
+                Array(
+                    [
+                        BulkString(name.encode()),
+                        BulkString(format_id(group.last_id)),
+                        _integer(group.entries_read),
+                        Array(consumers),
+                        Array(pending),
+                    ]
+                )
+            )
+        return Map(
+            [
+                (BulkString(b"entries"), entries_to_resp(self.range(MIN_ID, MAX_ID))),
+                (BulkString(b"last-id"), BulkString(format_id(self.last_id))),
+                (BulkString(b"entries-added"), _integer(self.entries_added)),
+                (BulkString(b"groups"), Array(groups)),
+            ]
+        )
+
+    @classmethod
+    def from_resp(cls, frame: Map) -> "Stream":
+        fields = {key.data: value for key, value in frame.data}
+        stream = cls()
+        for entry in fields[b"entries"].data:
+            stream_id, values = entry.data
+            stream.add(
+                parse_id(stream_id.data.decode()),
+                [bytes(value.data) for value in values.data],
+            )
+        stream.last_id = parse_id(fields[b"last-id"].data.decode())
+        stream.entries_added = fields[b"entries-added"].data
+
+        for group_frame in fields[b"groups"].data:
+            name, last_id, entries_read, consumers, pending = group_frame.data
+            group = ConsumerGroup(parse_id(last_id.data.decode()), entries_read.data)
+            for consumer in consumers.data:
+                consumer_name, seen = consumer.data
+                consumer_name = consumer_name.data.decode()
+                group.consumers[consumer_name] = Consumer(consumer_name, seen.data)
+            for entry in pending.data:
+                stream_id, owner, delivered, deliveries = entry.data
+                stream_id = parse_id(stream_id.data.decode())
+                owner = group.consumers[owner.data.decode()]
+                group.pending[stream_id] = owner.pending[stream_id] = PendingEntry(
+                    owner.name, delivered.data, deliveries.data
+                )
+            stream.groups[name.data.decode()] = group
+        return stream
+
+
+def _integer(value: int) -> Integer:
+    return Integer(b"%i" % value)
+
+
+def entry_to_resp(stream_id: StreamID, fields: list[bytes] | None) -> Array:
+    """An entry as returned by XRANGE and XREAD, an entry missing from the stream has no fields."""
+    if fields is None:
+        return Array([BulkString(format_id(stream_id)), NullArray()])
+    return Array(
+        [
+            BulkString(format_id(stream_id)),
+            Array([BulkString(item) for item in fields]),
+        ]
+    )
+
+
+def entries_to_resp(entries: list[tuple[StreamID, list[bytes] | None]]) -> Array:
+    return Array([entry_to_resp(stream_id, fields) for stream_id, fields in entries])
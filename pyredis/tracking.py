@@ -0,0 +1,147 @@
+import asyncio
+
+from pyredis.config import TRACKING_TABLE_MAX_KEYS
+from pyredis.protocol import Array, BulkString, Integer, Null, NullBulkString, Push
+from pyredis.session import ClientRegistry, Session, TrackingOptions
+from pyredis.store import KeyspaceListener
+
+INVALIDATE_CHANNEL = b"__redis__:invalidate"
+
+
+class TrackingTable(KeyspaceListener):
+    """Server assisted client side caching.
+
+    In the default mode the table remembers which clients read a key, and tells them once when it changes.
+    In broadcasting mode clients subscribe to key prefixes instead and hear about every change under them.
+    Invalidations are RESP3 pushes, or pub/sub style messages for RESP2 clients that redirect them.
+    """
+
+    def __init__(self, clients: ClientRegistry, max_keys=TRACKING_TABLE_MAX_KEYS):
+        self.clients = clients
+        self.max_keys = max_keys
+        self.keys: dict[str, set[int]] = {}
+        self.prefixes: dict[bytes, set[int]] = {}
+        self.tracking_clients = 0
+        self._removed: list[str] = []
+        self._drain_scheduled = False
+
+    @property
+    def active(self):
+        return self.tracking_clients > 0
+
+    def enable(self, session: Session, options: TrackingOptions):
+        if session.tracking is None:
+            self.tracking_clients += 1
+        else:
+            self._unsubscribe(session)
+        session.tracking = options
+        session.caching = None
+        if options.bcast:
+            for prefix in options.prefixes or [b""]:
+                self.prefixes.setdefault(prefix, set()).add(session.id)
+
+    def disable(self, session: Session):
+        if session.tracking is None:
+            return
+        self._unsubscribe(session)
+        self.tracking_clients -= 1
+        session.tracking = None
+        session.caching = None
+
+    def _unsubscribe(self, session: Session):
+        for prefix in session.tracking.prefixes or [b""]:
+            ids = self.prefixes.get(prefix)
+            if ids is not None:
+                ids.discard(session.id)
+                if not ids:
+                    del self.prefixes[prefix]
+
+    def remember(self, session: Session, keys: list[bytes]):
+        """Called after `session` read `keys`, the client may now cache them."""
+        options = session.tracking
+        if options.bcast:
+            return
+        if options.optin and session.caching is not True:
+            return
+        if options.optout and session.caching is False:
+            return
+
+        for key in keys:
+            self.keys.setdefault(key.decode(), set()).add(session.id)
+        # Past the limit the oldest keys are invalidated, clients must stop caching them.
+        while len(self.keys) > self.max_keys:
+            self.invalidate(next(iter(self.keys)))
+
+    def invalidate(self, key: str, origin: Session | None = None):
+        targets = self.keys.pop(key, None) or set()
+        if self.prefixes:
+            encoded = key.encode()
+            for prefix, ids in self.prefixes.items():
+                if encoded.startswith(prefix):
+                    targets |= ids
+
+        for client_id in targets:
+            session = self.clients.get(client_id)
+            if session is None or session.tracking is None:
+                continue
+            if session is origin and session.tracking.noloop:
+                continue
+            self._notify(session, [key])
+
+    def invalidate_keys(self, keys: list[bytes], origin: Session | None = None):
+        for key in keys:
+            self.invalidate(key.decode(), origin)
+
+    # Keys deleted by commands or expired, the writing command invalidates first so NOLOOP is honoured.
+    def key_removed(self, key: str):
+        if not self.active:
+            return
+        self._removed.append(key)
+        if not self._drain_scheduled:
+            self._drain_scheduled = True
+            asyncio.get_running_loop().call_soon(self._drain)
+
+    def _drain(self):
+        removed, self._removed = self._removed, []
+        self._drain_scheduled = False
+        for key in removed:
+            self.invalidate(key)
+
+    def flushed(self):
+        self.keys = {}
+        for session in list(self.clients.sessions.values()):
+            if session.tracking is not None:
+                self._notify(session, None)
+
+    def _notify(self, session: Session, keys: list[str] | None):
+        target = session
+        if session.tracking.redirect is not None:
+            target = self.clients.get(session.tracking.redirect)
+            if target is None:
+                if session.protocol == 3:
+                    session.push(
+                        Push(
+                            [
+                                BulkString(b"tracking-redir-broken"),
+                                Integer(session.tracking.redirect),
+                            ]
+                        )
+                    )
+                return
+
+        if keys is None:
+            payload = Null() if target.protocol == 3 else NullBulkString()
+        else:
+            payload = Array([BulkString(key.encode()) for key in keys])
+        if target.protocol == 3:
+            target.push(Push([BulkString(b"invalidate"), payload]))
+        elif target is not session:
+            target.push(
+                Array(
+                    [
+                        BulkString(b"message"),
+                        BulkString(INVALIDATE_CHANNEL),
+                        payload,
+                    ]
+                )
+            )
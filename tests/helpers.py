@@ -0,0 +1,67 @@
+import asyncio
+import socket
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterator
+
+from pyredis.commands import Command
+from pyredis.protocol import Array, BulkString
+from pyredis.server import server
+from pyredis.store import DataStoreWithLock
+
+
+def request(*args: str | bytes) -> Array:
+    """A command as a client sends it."""
+    return Array(
+        [BulkString(arg.encode() if isinstance(arg, str) else arg) for arg in args]
+    )
+
+
+def run(datastore: DataStoreWithLock, *args: str | bytes):
+    """Execute a command on datastore, outside of any client connection."""
+    return asyncio.run(Command(request(*args), datastore, None).exec())
+
+
+@contextmanager
+def running_server(**kwargs) -> Iterator[int]:
+    """Run a server on a free localhost port in a background thread, for as long as the context lasts."""
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        port = probe.getsockname()[1]
+
+    loop = asyncio.new_event_loop()
+    task = loop.create_task(server("127.0.0.1", port, **kwargs))
+
+    def serve():
+        try:
+            loop.run_until_complete(task)
+        except asyncio.CancelledError:
+            pass
+        finally:
+            loop.close()
+
+    thread = threading.Thread(target=serve, daemon=True)
+    thread.start()
+    deadline = time.monotonic() + 5
+    while True:
+        try:
+            socket.create_connection(("127.0.0.1", port), 0.1).close()
+            break
+        except OSError:
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(0.01)
+    try:
+        yield port
+    finally:
+        loop.call_soon_threadsafe(task.cancel)
+        thread.join(5)
+
+
+def wait_for(condition, timeout=5.0):
+    """Poll condition until it holds, failing the test when it doesn't within timeout seconds."""
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "condition not met in time"
+        time.sleep(0.02)
@@ -0,0 +1,44 @@
+import os
+
+import pytest
+
+from pyredis.benchmarks import micro
+from pyredis.protocol import parse_frame
+
+BASELINE = micro.load_baseline()
+TOLERANCE = float(
+    os.environ.get("PYREDIS_BENCHMARK_TOLERANCE", micro.DEFAULT_TOLERANCE)
+)
+
+
+def test_sample_frames_round_trip():
+    for frame in micro.sample_frames().values():
+        data = frame.serialize()
+        assert parse_frame(data) == (frame, len(data))
+
+
+def test_regressions_are_relative_to_the_machine_speed():
+    baseline = {"calibration_ns": 100.0, "results": {"get": 50.0}}
+    assert micro.regression("get", 74.0, baseline, 100.0) is None
+    assert micro.regression("get", 76.0, baseline, 100.0) is not None
+    # Twice as slow a machine, twice as slow a benchmark.
+    assert micro.regression("get", 140.0, baseline, 200.0) is None
+
+
+@pytest.fixture(scope="module")
+def calibration() -> float:
+    return micro.calibrate()
+
+
+@pytest.mark.skipif(
+    not os.environ.get("PYREDIS_BENCHMARKS"),
+    reason="set PYREDIS_BENCHMARKS=1 to check the micro-benchmarks against their baseline",
+)
+@pytest.mark.parametrize(
+    "benchmark",
+    [b for b in micro.all_benchmarks() if b.name in BASELINE["results"]],
+    ids=lambda benchmark: benchmark.name,
+)
+def test_no_regression(benchmark, calibration):
+    _, found = micro.compare(benchmark, BASELINE, calibration, TOLERANCE)
+    assert found is None, found
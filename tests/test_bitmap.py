@@ -0,0 +1,71 @@
+import random
+
+import pytest
+
+from pyredis import bitmap
+from pyredis.bitmap import (
+    BitOp,
+    bit_count,
+    bit_op,
+    bit_pos,
+    get_bit,
+    normalize_range,
+    set_bit,
+)
+
+
+def bits_of(data: bytes) -> list[int]:
+    return [(data[i >> 3] >> (7 - (i & 7))) & 1 for i in range(len(data) * 8)]
+
+
+@pytest.fixture
+def small_chunks(monkeypatch):
+    # Ranges then span several chunks, and ends fall inside them.
+    monkeypatch.setattr(bitmap, "BITMAP_CHUNK_BYTES", 3)
+
+
+def test_count_and_pos_match_a_bit_by_bit_scan(small_chunks):
+    rng = random.Random(0)
+    for _ in range(500):
+        data = bytes(
+            rng.choice([0, 255, rng.randrange(256)])
+            for _ in range(rng.randrange(1, 20))
+        )
+        bits = bits_of(data)
+        first, last = sorted(rng.sample(range(len(bits)), 2))
+
+        assert bit_count(data, first, last) == sum(bits[first : last + 1])
+        for bit in (0, 1):
+            expected = next((i for i in range(first, last + 1) if bits[i] == bit), -1)
+            assert bit_pos(data, bit, first, last) == expected
+
+
+def test_set_bit_grows_the_buffer_and_returns_the_previous_bit():
+    buffer = bytearray()
+    assert set_bit(buffer, 17, 1) == 0
+    assert buffer == b"\x00\x00\x40"
+    assert set_bit(buffer, 17, 0) == 1
+    assert get_bit(buffer, 17) == 0
+    assert get_bit(buffer, 1000) == 0
+
+
+@pytest.mark.parametrize(
+    "op, values, result",
+    [
+        (BitOp.AND, [b"\x0f\xf0", b"\xff"], b"\x0f\x00"),
+        (BitOp.OR, [b"\x0f\xf0", b"\xff"], b"\xff\xf0"),
+        (BitOp.XOR, [b"\x0f\xf0", b"\xff"], b"\xf0\xf0"),
+        (BitOp.NOT, [b"\x0f\xf0"], b"\xf0\x0f"),
+        (BitOp.AND, [b"", b""], b""),
+    ],
+)
+def test_bit_op_pads_shorter_values_with_zeros(op, values, result):
+    assert bit_op(op, values) == result
+
+
+@pytest.mark.parametrize(
+    "start, end, length, expected",
+    [(0, -1, 10, (0, 9)), (-100, 100, 10, (0, 9)), (5, 2, 10, None), (0, -1, 0, None)],
+)
+def test_normalize_range(start, end, length, expected):
+    assert normalize_range(start, end, length) == expected
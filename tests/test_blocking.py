@@ -0,0 +1,151 @@
+import asyncio
+
+from pyredis.blocking import BlockingKeys
+from pyredis.commands import Command
+from pyredis.monitor import Monitor, SlowLog
+from pyredis.protocol import Array, BulkString, NullArray
+from pyredis.session import Session
+from pyredis.store import DataStoreWithLock
+from tests.helpers import request
+
+
+def test_blocked_clients_are_woken_in_order_or_time_out():
+    async def scenario():
+        blocking = BlockingKeys()
+        woken = []
+
+        async def client(name, keys, timeout):
+            woken.append((name, await blocking.wait(keys, timeout, lambda key: key)))
+
+        tasks = [
+            asyncio.create_task(client("first", ["a"], None)),
+            asyncio.create_task(client("second", ["b", "a"], 5)),
+            asyncio.create_task(client("late", ["c"], 0.01)),
+        ]
+        await asyncio.sleep(0)
+        assert blocking.blocked_clients == 3
+
+        blocking.signal("a")
+        await asyncio.gather(*tasks)
+        assert woken == [("first", "a"), ("second", "a"), ("late", None)]
+        assert blocking.blocked_clients == 0
+        assert "a" not in blocking and "b" not in blocking
+
+    asyncio.run(scenario())
+
+
+def test_clients_woken_for_nothing_keep_their_place():
+    async def scenario():
+        blocking, items, served = BlockingKeys(), [], []
+
+        def take(key):
+            return items.pop(0) if items else None
+
+        async def client(name):
+            served.append((name, await blocking.wait(["jobs"], None, take)))
+
+        tasks = [asyncio.create_task(client(name)) for name in ("a", "b", "c")]
+        await asyncio.sleep(0)
+
+        # A client that did not block takes the job before the woken one runs.
+        items.append(1)
+        blocking.signal("jobs", 1)
+        items.pop()
+        await asyncio.sleep(0)
+        assert served == []
+
+        items.extend([2, 3])
+        blocking.signal("jobs", 2)
+        await asyncio.sleep(0)
+        assert served == [("a", 2), ("b", 3)]
+
+        items.append(4)
+        blocking.signal("jobs", 1)
+        await asyncio.gather(*tasks)
+        assert served[-1] == ("c", 4)
+
+    asyncio.run(scenario())
+
+
+def test_a_client_that_gives_up_passes_its_wake_up_on():
+    async def scenario():
+        blocking, items = BlockingKeys(), []
+        take = lambda key: items.pop(0) if items else None
+        first = asyncio.create_task(blocking.wait(["jobs"], None, take))
+        second = asyncio.create_task(blocking.wait(["jobs"], None, take))
+        await asyncio.sleep(0)
+
+        items.append(1)
+        blocking.signal("jobs", 1)
+        first.cancel()
+        assert await second == 1
+
+    asyncio.run(scenario())
+
+
+def test_blpop_is_served_by_a_later_push():
+    async def scenario():
+        datastore = DataStoreWithLock()
+        blpop = Command(
+            request("BLPOP", "empty", "jobs", "0"), datastore, None, session=Session()
+        )
+        pending = asyncio.create_task(blpop.exec())
+        await asyncio.sleep(0)
+        assert datastore.blocking.blocked_clients == 1
+
+        await Command(request("RPUSH", "jobs", "a", "b"), datastore, None).exec()
+        assert await pending == Array([BulkString(b"jobs"), BulkString(b"a")])
+        # Logged as the pop it came down to.
+        assert blpop.request == request("LPOP", "jobs")
+
+        timed_out = Command(
+            request("BRPOP", "empty", "0.01"), datastore, None, session=Session()
+        )
+        assert await timed_out.exec() == NullArray()
+
+        # Replayed commands never block.
+        replayed = Command(request("BLPOP", "empty", "0"), datastore, None)
+        assert await replayed.exec() == NullArray()
+
+    asyncio.run(scenario())
+
+
+def test_blmove_wakes_the_clients_blocked_on_its_destination():
+    async def scenario():
+        datastore = DataStoreWithLock()
+        waiting = asyncio.create_task(
+            Command(
+                request("BLPOP", "done", "1"), datastore, None, session=Session()
+            ).exec()
+        )
+        await asyncio.sleep(0)
+
+        await Command(request("RPUSH", "todo", "job"), datastore, None).exec()
+        moved = await Command(
+            request("BLMOVE", "todo", "done", "LEFT", "RIGHT", "1"),
+            datastore,
+            None,
+            session=Session(),
+        ).exec()
+        assert moved == BulkString(b"job")
+        assert await waiting == Array([BulkString(b"done"), BulkString(b"job")])
+        assert datastore.size() == 0
+
+    asyncio.run(scenario())
+
+
+def test_time_spent_blocked_is_not_slow_execution():
+    async def scenario():
+        datastore, monitor = DataStoreWithLock(), Monitor(SlowLog(log_slower_than=0))
+        timed_out = Command(
+            request("BRPOP", "empty", "0.05"),
+            datastore,
+            None,
+            monitor,
+            session=Session(),
+        )
+        assert await timed_out.exec() == NullArray()
+        (entry,) = monitor.slowlog.get()
+        assert entry.duration < 10_000
+
+    asyncio.run(scenario())
@@ -0,0 +1,198 @@
+import asyncio
+import threading
+
+import pytest
+
+from pyredis.client import (
+    AsyncClient,
+    AsyncConnectionPool,
+    Client,
+    ConnectionPool,
+    PoolTimeoutError,
+)
+from pyredis.client.commands import split_evenly
+from pyredis.client.connection import ResponseError, encode_command, to_python
+from pyredis.protocol import (
+    Array,
+    BulkString,
+    Error,
+    Integer,
+    NilArray,
+    NullArray,
+    NullBulkString,
+    SimpleString,
+    parse_frame,
+)
+from tests.helpers import running_server, wait_for
+
+
+def test_encode_command():
+    assert encode_command("SET", b"key", 10) == (
+        b"*3\r\n$3\r\nSET\r\n$3\r\nkey\r\n$2\r\n10\r\n"
+    )
+
+
+def test_encode_command_round_trips_through_parser():
+    frame, size = parse_frame(encode_command("ECHO", b"a\r\nb"))
+    assert frame == Array([BulkString(b"ECHO"), BulkString(b"a\r\nb")])
+
+
+@pytest.mark.parametrize(
+    "frame, expected",
+    [
+        (SimpleString(b"OK"), b"OK"),
+        (Integer(b"5"), 5),
+        (BulkString(b"value"), b"value"),
+        (NullBulkString(), None),
+        (NullArray(), []),
+        (NilArray(), None),
+        (Array([Integer(b"1"), BulkString(b"a")]), [1, b"a"]),
+    ],
+)
+def test_to_python(frame, expected):
+    assert to_python(frame) == expected
+
+
+def test_to_python_returns_errors():
+    reply = to_python(Error(b"ERR bad"))
+    assert isinstance(reply, ResponseError)
+    assert str(reply) == "ERR bad"
+
+
+@pytest.mark.parametrize(
+    "items, parts, expected",
+    [
+        ([1, 2, 3, 4, 5], 2, [[1, 2, 3], [4, 5]]),
+        ([1, 2], 4, [[1], [2]]),
+        ([], 3, []),
+    ],
+)
+def test_split_evenly(items, parts, expected):
+    assert split_evenly(items, parts) == expected
+
+
+@pytest.fixture(scope="module")
+def port(tmp_path_factory):
+    aof_name = str(tmp_path_factory.mktemp("client") / "client.aof")
+    with running_server(aof_name=aof_name) as port:
+        yield port
+
+
+class CountingPool(ConnectionPool):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.checkouts = 0
+
+    def get_connection(self):
+        self.checkouts += 1
+        return super().get_connection()
+
+
+class AsyncCountingPool(AsyncConnectionPool):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.checkouts = 0
+
+    async def get_connection(self):
+        self.checkouts += 1
+        return await super().get_connection()
+
+
+def test_pool_waits_for_a_free_connection_then_times_out(port):
+    pool = ConnectionPool("127.0.0.1", port, max_connections=1, timeout=0.05)
+    conn = pool.get_connection()
+    with pytest.raises(PoolTimeoutError):
+        pool.get_connection()
+
+    released = threading.Timer(0.01, pool.release, [conn])
+    released.start()
+    pool.timeout = 5
+    assert pool.get_connection() is conn
+    pool.release(conn)
+    pool.disconnect()
+
+
+def test_async_pool_times_out(port):
+    async def scenario():
+        pool = AsyncConnectionPool("127.0.0.1", port, max_connections=1, timeout=0.05)
+        conn = await pool.get_connection()
+        with pytest.raises(PoolTimeoutError):
+            await pool.get_connection()
+        pool.release(conn)
+        assert await pool.get_connection() is conn
+        pool.release(conn)
+        await pool.disconnect()
+
+    asyncio.run(scenario())
+
+
+def test_pool_replaces_a_dead_connection_on_checkout(port):
+    pool = ConnectionPool("127.0.0.1", port, health_check_interval=0)
+    client = Client(pool=pool)
+    killed = client.execute_command("CLIENT", "ID")
+
+    with Client("127.0.0.1", port) as admin:
+        assert admin.execute_command("CLIENT", "KILL", "ID", killed) == 1
+        wait_for(
+            lambda: f"id={killed} "
+            not in admin.execute_command("CLIENT", "LIST").decode()
+        )
+
+    # The closed connection fails the PING on checkout and is reconnected, the command never sees it.
+    assert client.ping() == b"PONG"
+    assert client.execute_command("CLIENT", "ID") != killed
+    client.close()
+
+
+def test_pipeline_sends_queued_commands_in_one_go(port):
+    with Client("127.0.0.1", port) as client:
+        with client.pipeline() as pipe:
+            pipe.set("pipe:a", 1).incr("pipe:a").get("pipe:a")
+            pipe.rpush("pipe:list", "x").incr("pipe:list")
+            assert len(pipe) == 5
+            replies = pipe.execute(raise_on_error=False)
+            assert len(pipe) == 0
+        assert replies[:4] == [b"OK", 2, b"2", 1]
+        assert isinstance(replies[4], ResponseError)
+
+        pipe = client.pipeline()
+        pipe.get("pipe:list")
+        with pytest.raises(ResponseError):
+            pipe.execute()
+
+
+def test_async_pipeline(port):
+    async def scenario():
+        async with AsyncClient("127.0.0.1", port) as client:
+            async with client.pipeline() as pipe:
+                pipe.set("apipe:a", "v").get("apipe:a").get("apipe:missing")
+                assert await pipe.execute() == [b"OK", b"v", None]
+
+    asyncio.run(scenario())
+
+
+def test_mset_and_mget_fan_out_over_the_pool(port):
+    pool = CountingPool("127.0.0.1", port, max_connections=3)
+    mapping = {f"fan:{i}": str(i).encode() for i in range(10)}
+    with Client(pool=pool) as client:
+        assert client.mset(mapping)
+        assert pool.checkouts == 3
+
+        keys = [*mapping, "fan:missing"]
+        assert client.mget(keys) == [*mapping.values(), None]
+        assert pool.checkouts == 6
+
+
+def test_async_mset_and_mget_fan_out_over_the_pool(port):
+    async def scenario():
+        pool = AsyncCountingPool("127.0.0.1", port, max_connections=3)
+        mapping = {f"afan:{i}": str(i).encode() for i in range(10)}
+        async with AsyncClient(pool=pool) as client:
+            assert await client.mset(mapping)
+            assert pool.checkouts == 3
+            assert len(pool._idle) == 3
+
+            keys = [*mapping, "afan:missing"]
+            assert await client.mget(keys) == [*mapping.values(), None]
+
+    asyncio.run(scenario())
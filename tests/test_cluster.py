@@ -0,0 +1,151 @@
+import pytest
+
+from pyredis.client import Connection
+from pyredis.cluster import ClusterNode, ClusterState, crc16, key_hash_slot
+from pyredis.protocol import Error
+from tests.helpers import running_server, wait_for
+
+
+def test_crc16():
+    assert crc16(b"123456789") == 0x31C3
+
+
+@pytest.mark.parametrize(
+    "key, slot",
+    [
+        (b"foo", 12182),
+        (b"bar", 5061),
+        (b"{user1000}.following", key_hash_slot(b"user1000")),
+        (b"{user1000}.followers", key_hash_slot(b"user1000")),
+        (b"foo{}{bar}", key_hash_slot(b"foo{}{bar}")),
+        (b"foo{{bar}}zap", key_hash_slot(b"{bar")),
+    ],
+)
+def test_key_hash_slot(key, slot):
+    assert key_hash_slot(key) == slot
+
+
+@pytest.fixture
+def cluster():
+    state = ClusterState("localhost", 7001)
+    other = ClusterNode("other", "localhost", 7002)
+    state.nodes[other.id] = other
+    state.assign_slot(key_hash_slot(b"foo"), state.myself)
+    state.assign_slot(key_hash_slot(b"bar"), other)
+    return state
+
+
+def exists(key):
+    return key == "foo"
+
+
+def test_redirect_serves_own_slots(cluster):
+    assert cluster.redirect([b"foo"], False, exists) is None
+
+
+def test_redirect_moved(cluster):
+    assert cluster.redirect([b"bar"], False, exists) == Error(
+        b"MOVED 5061 localhost:7002"
+    )
+
+
+def test_redirect_crossslot(cluster):
+    error = cluster.redirect([b"foo", b"bar"], False, exists)
+    assert error.data.startswith(b"CROSSSLOT")
+
+
+def test_redirect_unassigned_slot(cluster):
+    error = cluster.redirect([b"baz"], False, exists)
+    assert error.data.startswith(b"CLUSTERDOWN")
+
+
+def test_redirect_ask_for_missing_keys_while_migrating(cluster):
+    slot = key_hash_slot(b"{foo}missing")
+    cluster.migrating[slot] = cluster.nodes["other"]
+
+    assert cluster.redirect([b"foo"], False, exists) is None
+    assert cluster.redirect([b"{foo}missing"], False, exists) == Error(
+        f"ASK {slot} localhost:7002".encode()
+    )
+
+
+def test_redirect_importing_requires_asking(cluster):
+    slot = key_hash_slot(b"bar")
+    cluster.importing[slot] = cluster.nodes["other"]
+
+    assert cluster.redirect([b"bar"], True, exists) is None
+    assert cluster.redirect([b"bar"], False, exists).data.startswith(b"MOVED")
+
+
+def test_slot_key_index(cluster):
+    cluster.key_added("foo")
+    cluster.key_added("{foo}x")
+    assert cluster.count_keys_in_slot(12182) == 2
+
+    cluster.key_removed("foo")
+    assert cluster.get_keys_in_slot(12182, 10) == ["{foo}x"]
+
+    cluster.flushed()
+    assert cluster.count_keys_in_slot(12182) == 0
+
+
+def test_slot_migration_between_two_nodes(tmp_path):
+    slot = key_hash_slot(b"user")
+    with (
+        running_server(aof_name=str(tmp_path / "a.aof"), cluster_enabled=True) as a,
+        running_server(aof_name=str(tmp_path / "b.aof"), cluster_enabled=True) as b,
+    ):
+        source, target = Connection("127.0.0.1", a), Connection("127.0.0.1", b)
+        source_id = source.execute("CLUSTER", "MYID").decode()
+        target_id = target.execute("CLUSTER", "MYID").decode()
+        assert source.execute("CLUSTER", "ADDSLOTS", slot) == b"OK"
+        assert source.execute("CLUSTER", "MEET", "127.0.0.1", b) == b"OK"
+        wait_for(
+            lambda: f"{source_id} 127.0.0.1:{a}"
+            in target.execute("CLUSTER", "NODES").decode()
+            and f"{target_id} 127.0.0.1:{b}"
+            in source.execute("CLUSTER", "NODES").decode()
+        )
+        wait_for(
+            lambda: str(target.execute("GET", "{user}1"))
+            == f"MOVED {slot} 127.0.0.1:{a}"
+        )
+
+        for i in range(3):
+            assert source.execute("SET", f"{{user}}{i}", i) == b"OK"
+        assert (
+            target.execute("CLUSTER", "SETSLOT", slot, "IMPORTING", source_id) == b"OK"
+        )
+        assert (
+            source.execute("CLUSTER", "SETSLOT", slot, "MIGRATING", target_id) == b"OK"
+        )
+
+        # The source still serves the keys it has, the others may already be on the target.
+        assert source.execute("GET", "{user}0") == b"0"
+        assert str(source.execute("GET", "{user}new")) == f"ASK {slot} 127.0.0.1:{b}"
+        # The target only serves the slot to a client that was sent there by an ASK.
+        assert str(target.execute("GET", "{user}new")).startswith("MOVED")
+        assert target.execute("ASKING") == b"OK"
+        assert target.execute("SET", "{user}new", "n") == b"OK"
+
+        assert source.execute("MIGRATE", "127.0.0.1", b, "{user}0", 0, 5000) == b"OK"
+        assert str(source.execute("GET", "{user}0")).startswith("ASK")
+        target.execute("ASKING")
+        assert target.execute("GET", "{user}0") == b"0"
+
+        keys = source.execute("CLUSTER", "GETKEYSINSLOT", slot, 10)
+        assert sorted(keys) == [b"{user}1", b"{user}2"]
+        assert (
+            source.execute("MIGRATE", "127.0.0.1", b, "", 0, 5000, "KEYS", *keys)
+            == b"OK"
+        )
+        assert source.execute("CLUSTER", "COUNTKEYSINSLOT", slot) == 0
+        assert target.execute("CLUSTER", "COUNTKEYSINSLOT", slot) == 4
+
+        assert target.execute("CLUSTER", "SETSLOT", slot, "NODE", target_id) == b"OK"
+        assert source.execute("CLUSTER", "SETSLOT", slot, "NODE", target_id) == b"OK"
+        assert str(source.execute("GET", "{user}1")) == f"MOVED {slot} 127.0.0.1:{b}"
+        assert target.execute("GET", "{user}1") == b"1"
+        assert target.execute("GET", "{user}new") == b"n"
+        source.disconnect()
+        target.disconnect()
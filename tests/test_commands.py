@@ -0,0 +1,106 @@
+import asyncio
+import time
+
+from pyredis.commands import Command
+from pyredis.persist import AOF, iter_frames
+from pyredis.protocol import Array, BulkString, Error, Integer, NullBulkString
+from pyredis.session import Session
+from pyredis.store import Databases, DataStoreWithLock
+from tests.helpers import request, run
+
+
+def test_command_info_and_getkeys():
+    datastore = DataStoreWithLock()
+    info = run(datastore, "COMMAND", "INFO", "get", "blpop", "nope")
+    get, blpop, missing = info.data
+    assert get.data[:2] == [BulkString(b"get"), Integer(2)]
+    assert [flag.data for flag in get.data[2].data] == [b"readonly"]
+    assert blpop.data[1] == Integer(-3)
+    assert [flag.data for flag in blpop.data[2].data] == [b"write", b"blocking"]
+    assert blpop.data[3:] == [Integer(1), Integer(-2), Integer(1)]
+    assert missing == NullBulkString()
+
+    assert run(datastore, "COMMAND", "COUNT").data == len(
+        run(datastore, "COMMAND").data
+    )
+    keys = run(datastore, "COMMAND", "GETKEYS", "BLPOP", "a", "b", "0")
+    assert keys == Array([BulkString(b"a"), BulkString(b"b")])
+
+
+def test_arity_is_checked_before_the_handler():
+    reply = run(DataStoreWithLock(), "ECHO")
+    assert reply == Error(b"ERR wrong number of arguments for 'echo' command")
+    reply = run(DataStoreWithLock(), "GET", "a", "b")
+    assert reply == Error(b"ERR wrong number of arguments for 'get' command")
+
+
+def test_aof_gets_only_effective_writes_with_absolute_expiries(tmp_path):
+    async def scenario():
+        filename = str(tmp_path / "dump.aof")
+        databases, session = Databases(1), Session()
+        aof = AOF(filename, databases)
+        worker = asyncio.create_task(aof.run_worker())
+        for args in [
+            ("SET", "a", "one", "EX", "100"),
+            ("SET", "a", "two", "NX"),
+            ("GET", "a"),
+            ("DEL", "missing"),
+            ("BLPOP", "list", "0.01"),
+            ("RESTORE", "b", "5000", "$1\r\nx\r\n"),
+            ("PING",),
+        ]:
+            await Command(request(*args), databases[0], aof, session=session).exec()
+        await aof._queue.join()
+        worker.cancel()
+
+        with open(filename, "rb") as f:
+            frames = [frame.decode() for frame in iter_frames(f)]
+        assert [frame[0] for frame in frames] == ["SELECT", "SET", "RESTORE"]
+        _, key, value, option, pxat = frames[1]
+        assert (key, value, option) == ("a", "one", "PXAT")
+        assert abs(int(pxat) - (time.time() + 100) * 1000) < 1000
+        assert frames[2][-1] == "ABSTTL"
+
+        # Replayed later, the keys still expire when they would have.
+        replayed = Databases(1)
+        await AOF(filename, replayed).replay()
+        for key in ("a", "b"):
+            drift = replayed[0].get(key).expiry - databases[0].get(key).expiry
+            assert abs(drift.total_seconds()) < 0.001
+
+    asyncio.run(scenario())
+
+
+def test_set_get_on_another_type_leaves_the_key_alone():
+    datastore = DataStoreWithLock()
+    run(datastore, "RPUSH", "list", "a")
+    reply = run(datastore, "SET", "list", "value", "GET")
+    assert reply.data.startswith(b"WRONGTYPE")
+    assert run(datastore, "LRANGE", "list", "0", "0") == Array([BulkString(b"a")])
+
+
+def test_xread_without_entries_replies_with_a_null_array():
+    datastore = DataStoreWithLock()
+    assert run(datastore, "XREAD", "STREAMS", "s", "0").serialize() == b"*-1\r\n"
+    reply = run(datastore, "XREAD", "BLOCK", "10", "STREAMS", "s", "$")
+    assert reply.serialize() == b"*-1\r\n"
+
+    session = Session()
+    session.protocol = 3
+    reply = asyncio.run(
+        Command(
+            request("XREAD", "STREAMS", "s", "0"), datastore, None, session=session
+        ).exec()
+    )
+    assert reply.serialize() == b"_\r\n"
+
+
+def test_xgroup_create_with_a_bad_id_does_not_make_the_stream():
+    datastore = DataStoreWithLock()
+    for options in (["bad", "MKSTREAM"], ["0", "MKSTREAM", "ENTRIESREAD", "-5"]):
+        reply = run(datastore, "XGROUP", "CREATE", "s", "g", *options)
+        assert isinstance(reply, Error)
+    assert datastore.get("s") is None and datastore.dirty == 0
+
+    assert run(datastore, "XGROUP", "CREATE", "s", "g", "$", "MKSTREAM").data == b"OK"
+    assert run(datastore, "XLEN", "s") == Integer(0)
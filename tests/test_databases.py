@@ -0,0 +1,119 @@
+import asyncio
+
+from pyredis.commands import Command
+from pyredis.persist import AOF, dump_databases, iter_frames
+from pyredis.protocol import Array, BulkString, Error, SimpleString
+from pyredis.replication import ReplicationManager
+from pyredis.session import Session
+from pyredis.store import Databases
+from tests.helpers import request
+
+
+async def run(databases: Databases, session: Session, *args: str, cmd_logger=None):
+    return await Command(
+        request(*args),
+        databases[session.db],
+        cmd_logger,
+        session=session,
+        databases=databases,
+    ).exec()
+
+
+def test_select_and_swapdb():
+    async def scenario():
+        databases, session = Databases(4), Session()
+        await run(databases, session, "SET", "key", "zero")
+        assert await run(databases, session, "SELECT", "2") == SimpleString(b"OK")
+        assert session.db == 2
+        await run(databases, session, "SET", "key", "two")
+        assert isinstance(await run(databases, session, "SELECT", "4"), Error)
+
+        keyspace = databases[2]._data
+        assert await run(databases, session, "SWAPDB", "0", "2") == SimpleString(b"OK")
+        # The keyspaces trade places, nothing is copied.
+        assert databases[0]._data is keyspace
+        assert databases[0].get("key").value == b"two"
+        assert databases[2].get("key").value == b"zero"
+
+        await run(databases, session, "FLUSHDB")
+        assert (databases[0].size(), databases[2].size()) == (1, 0)
+        await run(databases, session, "FLUSHALL")
+        assert databases.size() == 0
+
+    asyncio.run(scenario())
+
+
+def test_swapdb_wakes_clients_blocked_on_the_database():
+    async def scenario():
+        databases = Databases(2)
+        databases[1].set("jobs", [b"a"])
+        waiting = asyncio.create_task(run(databases, Session(), "BLPOP", "jobs", "1"))
+        await asyncio.sleep(0)
+
+        databases.swap(0, 1)
+        assert await waiting == Array([BulkString(b"jobs"), BulkString(b"a")])
+
+    asyncio.run(scenario())
+
+
+def test_aof_replays_into_the_selected_databases(tmp_path):
+    async def scenario():
+        filename = str(tmp_path / "dump.aof")
+        databases, session = Databases(4), Session()
+        aof = AOF(filename, databases)
+        worker = asyncio.create_task(aof.run_worker())
+        for args in [
+            ("SET", "a", "zero"),
+            ("SELECT", "3"),
+            ("SET", "b", "3"),
+            ("SET", "c", "3"),
+            ("SELECT", "0"),
+            ("SWAPDB", "0", "3"),
+        ]:
+            await run(databases, session, *args, cmd_logger=aof)
+        await aof._queue.join()
+        worker.cancel()
+
+        with open(filename, "rb") as f:
+            commands = [frame.decode()[0] for frame in iter_frames(f)]
+        # Every switch is logged once, the clients' own SELECTs are not.
+        assert commands == ["SELECT", "SET", "SELECT", "SET", "SET", "SELECT", "SWAPDB"]
+
+        replayed = Databases(4)
+        await AOF(filename, replayed).replay()
+        assert (replayed[0].size(), replayed[3].size()) == (2, 1)
+        assert replayed[3].get("a").value == b"zero"
+
+    asyncio.run(scenario())
+
+
+def test_replication_stream_selects_on_change():
+    databases = Databases(2)
+    replication = ReplicationManager(databases)
+    replication.propagate(request("SET", "a", "1"), 1)
+    replication.propagate(request("SET", "b", "1"), 1)
+    replication.propagate(request("SET", "c", "0"), 0)
+
+    stream = replication.backlog.read_from(0)
+    assert stream == b"".join(
+        frame.serialize()
+        for frame in [
+            request("SELECT", "1"),
+            request("SET", "a", "1"),
+            request("SET", "b", "1"),
+            request("SELECT", "0"),
+            request("SET", "c", "0"),
+        ]
+    )
+
+
+def test_snapshot_selects_every_database():
+    databases = Databases(3)
+    databases[0].set("a", b"1")
+    databases[2].set("b", b"2")
+    assert [command.decode() for command in dump_databases(databases)] == [
+        ["SELECT", "0"],
+        ["SET", "a", "1"],
+        ["SELECT", "2"],
+        ["SET", "b", "2"],
+    ]
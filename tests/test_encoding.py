@@ -0,0 +1,73 @@
+import pytest
+
+from pyredis.encoding import (
+    Encoding,
+    encode_string,
+    encoding_of,
+    format_float,
+    from_resp,
+    parse_float,
+    parse_integer,
+    to_resp,
+)
+from pyredis.protocol import Array, BulkString, Integer
+from pyredis.store import LFU_INIT_VAL, Record
+
+
+@pytest.mark.parametrize(
+    "data, encoding",
+    [
+        (b"42", Encoding.INT),
+        (b"-9223372036854775808", Encoding.INT),
+        (b"9223372036854775808", Encoding.EMBSTR),
+        (b"042", Encoding.EMBSTR),
+        (b"-0", Encoding.EMBSTR),
+        (b"hello", Encoding.EMBSTR),
+        (bytearray(b"x" * 45), Encoding.RAW),
+    ],
+)
+def test_strings_get_the_most_compact_encoding(data, encoding):
+    value = encode_string(data)
+    assert encoding_of(value) == encoding
+    assert to_resp(value) == BulkString(data)
+
+
+def test_small_integers_are_shared():
+    assert encode_string(b"5000") is encode_string(bytearray(b"5000"))
+    assert parse_integer(b"10000") == 10000
+
+
+def test_long_strings_keep_the_parsed_buffer():
+    data = bytearray(b"x" * 100)
+    assert encode_string(data) is data
+
+
+def test_values_round_trip_through_resp():
+    assert from_resp(to_resp([b"a", b"b"])) == [b"a", b"b"]
+    assert from_resp(to_resp(12)) == 12
+    assert from_resp(Integer(b"12")) == 12
+    assert to_resp([b"a"]) == Array([BulkString(b"a")])
+
+
+@pytest.mark.parametrize(
+    "value, text",
+    [(10.6, b"10.6"), (5.0, b"5"), (-0.0, b"0"), (3e20, b"300000000000000000000")],
+)
+def test_format_float(value, text):
+    assert format_float(value) == text
+
+
+@pytest.mark.parametrize("data", [b"", b"abc", b" 1", b"1_0", b"inf", b"nan"])
+def test_parse_float_rejects(data):
+    assert parse_float(data) is None
+
+
+def test_access_counter_grows_logarithmically_and_decays():
+    record = Record(b"value", None)
+    for _ in range(100):
+        record.touch(0)
+    assert LFU_INIT_VAL < record.freq < 100
+
+    freq = record.freq
+    assert record.decayed_freq(60 * 3) == freq - 3
+    assert record.decayed_freq(60 * 1000) == 0
@@ -0,0 +1,69 @@
+import asyncio
+import random
+
+from pyredis.commands import Command
+from pyredis.hotkeys import HotKeys
+from pyredis.monitor import Monitor
+from pyredis.protocol import Array, BulkString, Integer
+from pyredis.store import DataStoreWithLock
+from tests.helpers import request
+
+
+def test_sketch_finds_the_hot_keys_among_many():
+    rng = random.Random(3)
+    hotkeys = HotKeys(top=4, width=1024, sample_rate=1)
+    accesses = [f"user:{rng.randrange(50_000)}".encode() for _ in range(50_000)]
+    accesses += [f"hot:{i % 3}".encode() for i in range(6000)]
+    rng.shuffle(accesses)
+    for key in accesses:
+        hotkeys.add(bytearray(key))
+
+    hottest = hotkeys.hottest()
+    assert sorted(key for key, _ in hottest[:3]) == [b"hot:0", b"hot:1", b"hot:2"]
+    # Collisions only ever add to a count.
+    assert all(hits >= 2000 for _, hits in hottest[:3])
+    assert hotkeys.estimate(b"hot:0") >= 2000
+
+
+def test_decay_halves_the_counts_and_drops_cold_keys():
+    hotkeys = HotKeys(top=2, width=64, sample_rate=1)
+    for _ in range(10):
+        hotkeys.add(b"warm")
+    hotkeys.add(b"cold")
+    hotkeys.decay()
+    assert hotkeys.hottest() == [(b"warm", 5)]
+    assert hotkeys.estimate(b"warm") == 5
+
+
+def test_sampling_scales_the_counts_back_up():
+    hotkeys = HotKeys(sample_rate=8)
+    sampled = 0
+    for _ in range(8000):
+        if hotkeys.sample():
+            hotkeys.add(b"key")
+            sampled += 1
+    assert 800 < sampled < 1200
+    assert hotkeys.hottest() == [(b"key", sampled * 8)]
+
+
+def test_hotkeys_command_counts_client_commands():
+    async def scenario():
+        datastore = DataStoreWithLock()
+        monitor = Monitor(hotkeys=HotKeys(sample_rate=1))
+        for key in ["a", "b", "a", "a", "c", "b"]:
+            await Command(request("GET", key), datastore, None, monitor).exec()
+        await Command(request("PING"), datastore, None, monitor).exec()
+
+        reply = await Command(
+            request("HOTKEYS", "COUNT", "2"), datastore, None, monitor
+        ).exec()
+        assert reply == Array(
+            [BulkString(b"a"), Integer(3), BulkString(b"b"), Integer(2)]
+        )
+        info = await Command(
+            request("INFO", "hotkeys"), datastore, None, monitor
+        ).exec()
+        assert b"hotkey0:key=a,accesses=3" in info.data
+        assert b"hotkeys_sampled_commands:6" in info.data
+
+    asyncio.run(scenario())
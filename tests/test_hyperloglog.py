@@ -0,0 +1,96 @@
+import random
+
+import pytest
+
+from pyredis.hyperloglog import (
+    HLL_DENSE_SIZE,
+    HLL_REGISTERS,
+    InvalidHyperLogLog,
+    add_elements,
+    cardinality,
+    encoding,
+    from_registers,
+    is_hyperloglog,
+    max_registers,
+    new_hyperloglog,
+    pack_registers,
+    to_registers,
+    unpack_registers,
+)
+
+
+def members(count: int, prefix="member") -> list[bytes]:
+    return [f"{prefix}:{i}".encode() for i in range(count)]
+
+
+def random_registers(seed: int) -> bytearray:
+    rng = random.Random(seed)
+    return bytearray(rng.randrange(64) for _ in range(HLL_REGISTERS))
+
+
+def test_registers_round_trip_through_the_dense_encoding():
+    registers = random_registers(1)
+    dense = pack_registers(registers)
+    assert len(dense) == HLL_DENSE_SIZE
+    assert unpack_registers(dense) == registers
+
+
+def test_max_registers_is_the_register_wise_maximum():
+    a, b = random_registers(1), random_registers(2)
+    assert max_registers(a, b) == bytes(map(max, a, b))
+
+
+@pytest.mark.parametrize("count", [0, 1, 100, 1000, 50_000])
+def test_estimates_are_within_two_percent(count):
+    hll, _ = add_elements(new_hyperloglog(), members(count))
+    assert abs(cardinality(hll) - count) <= max(1, count * 0.02)
+
+
+def test_small_counts_stay_sparse_and_big_ones_go_dense():
+    hll, _ = add_elements(new_hyperloglog(), members(100))
+    assert encoding(hll) == "sparse" and len(hll) < 500
+
+    hll, _ = add_elements(hll, members(20_000))
+    assert encoding(hll) == "dense" and len(hll) == HLL_DENSE_SIZE
+
+
+def test_adding_changes_registers_only_for_new_elements():
+    hll, changed = add_elements(new_hyperloglog(), [b"a", b"b"])
+    assert changed
+    hll, changed = add_elements(hll, [b"a"])
+    assert not changed
+
+    dense, _ = add_elements(hll, members(20_000))
+    before = bytes(dense)
+    dense, changed = add_elements(dense, members(20_000))
+    assert not changed and dense == before
+
+
+def test_cardinality_is_cached_until_the_next_change():
+    hll, _ = add_elements(new_hyperloglog(), members(10))
+    assert cardinality(hll) == 10
+    assert cardinality(bytes(hll)) == 10  # served from the header
+
+    hll, _ = add_elements(hll, [b"new"])
+    assert cardinality(hll) == 11
+
+
+def test_merge_is_the_union():
+    left, _ = add_elements(new_hyperloglog(), members(30_000, "left"))
+    right, _ = add_elements(new_hyperloglog(), members(300, "right"))
+    merged = from_registers(max_registers(to_registers(left), to_registers(right)))
+    assert abs(cardinality(merged) - 30_300) <= 30_300 * 0.02
+
+    small = from_registers(max_registers(to_registers(right), to_registers(right)))
+    assert encoding(small) == "sparse"
+    assert to_registers(small) == to_registers(right)
+
+
+def test_invalid_values_are_rejected():
+    assert is_hyperloglog(new_hyperloglog())
+    assert not is_hyperloglog(b"HYLL")
+    assert not is_hyperloglog(b"hello world, this is no HyperLogLog")
+
+    truncated = new_hyperloglog()[:-1]
+    with pytest.raises(InvalidHyperLogLog):
+        to_registers(truncated)
@@ -0,0 +1,74 @@
+from pyredis.lazyfree import Reclaimer
+from pyredis.store import DataStoreWithLock
+
+
+def big_list(size=5000) -> list[bytes]:
+    return [b"%i" % i for i in range(size)]
+
+
+def drain(reclaimer: Reclaimer) -> int:
+    steps = 0
+    while reclaimer.pending_objects:
+        reclaimer.step()
+        steps += 1
+    return steps
+
+
+def test_small_values_are_freed_inline():
+    reclaimer = Reclaimer()
+    assert not reclaimer.free(1)
+    assert not reclaimer.free([b"a"])
+    assert reclaimer.pending_objects == 0
+
+
+def test_big_list_is_freed_in_chunks():
+    reclaimer = Reclaimer(chunk_size=1000)
+    value = big_list()
+
+    assert reclaimer.free(value)
+    reclaimer.step()
+    assert len(value) == 4000
+    assert drain(reclaimer) == 4
+    assert reclaimer.freed_objects == 1
+
+
+def test_unlink_detaches_the_key_immediately():
+    reclaimer = Reclaimer()
+    datastore = DataStoreWithLock(reclaimer)
+    datastore.set("list", big_list())
+
+    assert datastore.unlink("list")
+    assert datastore.get("list") is None
+    assert reclaimer.pending_objects == 1
+    assert not datastore.unlink("list")
+
+
+def test_lazyfree_mode_frees_overwritten_values_but_not_in_place_updates():
+    reclaimer = Reclaimer()
+    datastore = DataStoreWithLock(reclaimer, lazyfree=True)
+    value = big_list()
+    datastore.set("list", value)
+
+    value.append(b"more")
+    datastore.set("list", value)
+    assert reclaimer.pending_objects == 0
+
+    datastore.set("list", b"small")
+    assert reclaimer.pending_objects == 1
+
+
+def test_flush_async_swaps_the_keyspace():
+    reclaimer = Reclaimer(chunk_size=100)
+    datastore = DataStoreWithLock(reclaimer)
+    for i in range(500):
+        datastore.set(f"key{i}", b"value")
+    datastore.set("list", big_list())
+
+    datastore.flush(lazy=True)
+    assert datastore.size() == 0
+    assert datastore.get_random_key() is None
+    assert reclaimer.pending_objects == 3
+
+    drain(reclaimer)
+    # The big list inside the flushed keyspace went through the reclaimer as well.
+    assert reclaimer.freed_objects == 4
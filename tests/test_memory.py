@@ -0,0 +1,106 @@
+from pyredis.bigkeys import Report, key_prefix, replay_aof
+from pyredis.glob import glob_match
+from pyredis.memory import key_usage, memory_stats, value_usage
+from pyredis.store import DataStoreWithLock
+from tests.helpers import request
+
+
+def scan_all(datastore: DataStoreWithLock, count: int, on_batch=None) -> list[str]:
+    cursor, seen = 0, []
+    while True:
+        cursor, keys = datastore.scan(cursor, count)
+        seen.extend(keys)
+        if on_batch is not None:
+            on_batch()
+        if cursor == 0:
+            return seen
+
+
+def test_big_lists_are_sized_from_a_sample():
+    value = [b"x" * 10 for _ in range(1000)]
+
+    sampled = value_usage(value, samples=5)
+    assert sampled == value_usage(value, samples=0)
+    assert value_usage([]) < sampled
+
+
+def test_key_usage_counts_the_key_and_value():
+    datastore = DataStoreWithLock()
+    datastore.set("small", b"x")
+    datastore.set("big", bytearray(b"x" * 10_000))
+
+    small = key_usage("small", datastore.get("small"))
+    assert key_usage("big", datastore.get("big")) - small >= 9_990
+
+
+def test_memory_stats_extrapolates_the_dataset():
+    datastore = DataStoreWithLock()
+    for i in range(100):
+        datastore.set(f"key:{i}", bytearray(b"x" * 100))
+
+    stats = dict(memory_stats(datastore, samples=10))
+    assert stats["keys.count"] == 100
+    assert stats["dataset.bytes"] // 100 == stats["keys.bytes-per-key"]
+    assert stats["total.estimated"] == stats["dataset.bytes"] + stats["overhead.total"]
+
+
+def test_scan_returns_keys_present_for_the_whole_iteration():
+    datastore = DataStoreWithLock()
+    for i in range(100):
+        datastore.set(f"key:{i}", 1)
+    assert sorted(scan_all(datastore, 7)) == sorted(f"key:{i}" for i in range(100))
+
+    deleted = iter(range(0, 100, 3))
+
+    def delete_one():
+        key = f"key:{next(deleted, 0)}"
+        datastore.delete(key)
+
+    seen = scan_all(datastore, 7, delete_one)
+    remaining = {key for key, _ in datastore.items()}
+    assert remaining <= set(seen)
+
+
+def test_glob_patterns():
+    assert glob_match("user:*", "user:1")
+    assert not glob_match("user:*", "session:1")
+    assert glob_match("h?llo", "hello")
+    assert glob_match("h[ae]llo", "hallo")
+    assert not glob_match("h[^e]llo", "hello")
+    assert glob_match("h[a-c]llo", "hbllo")
+    assert glob_match("a\\*b", "a*b")
+    assert not glob_match("a\\*b", "axb")
+
+
+def test_bigkeys_replays_an_aof_without_values():
+    keys = replay_aof(
+        [
+            request(b"SET", b"user:1", b"hello"),
+            request(b"APPEND", b"user:1", b"world"),
+            request(b"RPUSH", b"queue:1", b"a", b"bb"),
+            request(b"LPUSH", b"queue:1", b"ccc"),
+            request(b"SET", b"tmp", b"x"),
+            request(b"DEL", b"tmp"),
+        ]
+    )
+
+    assert set(keys) == {"user:1", "queue:1"}
+    assert (keys["user:1"].type, keys["user:1"].size) == ("string", 10)
+    assert (keys["queue:1"].length, keys["queue:1"].size) == (3, 6)
+
+    assert replay_aof([request(b"SET", b"a", b"1"), request(b"FLUSHALL")]) == {}
+
+
+def test_bigkeys_report_keeps_the_biggest_keys_per_type():
+    report = Report(top=2, delimiter=":", depth=1)
+    for key, stats in replay_aof(
+        [request(b"SET", f"user:{i}".encode(), b"x" * i) for i in range(10)]
+    ).items():
+        report.add(key, stats)
+
+    assert [key for _, key, _ in sorted(report.biggest["string"])] == [
+        "user:8",
+        "user:9",
+    ]
+    assert report.prefixes["user:*"] == [10, 45]
+    assert key_prefix("nodelimiter", ":", 1) == "(other)"
@@ -0,0 +1,74 @@
+from pyredis.monitor import LatencyMonitor, SlowLog
+from tests.helpers import request
+
+
+def test_slowlog_ignores_fast_commands():
+    slowlog = SlowLog(log_slower_than=100)
+    slowlog.observe(request(b"GET", b"key"), 99_000)
+    assert len(slowlog) == 0
+
+
+def test_slowlog_records_slow_commands_newest_first():
+    slowlog = SlowLog(log_slower_than=100)
+    slowlog.observe(request(b"GET", b"a"), 100_000)
+    slowlog.observe(request(b"GET", b"b"), 250_000)
+
+    entries = slowlog.get()
+    assert [entry.id for entry in entries] == [1, 0]
+    assert entries[0].duration == 250
+    assert entries[0].args == [b"GET", b"b"]
+
+
+def test_slowlog_is_bounded():
+    slowlog = SlowLog(log_slower_than=0, max_len=2)
+    for i in range(5):
+        slowlog.observe(request(b"GET", str(i).encode()), 1)
+
+    assert len(slowlog) == 2
+    assert [entry.id for entry in slowlog.get(-1)] == [4, 3]
+
+
+def test_slowlog_disabled_with_negative_threshold():
+    slowlog = SlowLog(log_slower_than=-1)
+    slowlog.observe(request(b"GET", b"key"), 10**12)
+    assert len(slowlog) == 0
+
+
+def test_slowlog_truncates_long_arguments():
+    slowlog = SlowLog(log_slower_than=0)
+    slowlog.observe(request(b"SET", b"key", b"x" * 200), 1)
+
+    value = slowlog.get()[0].args[2]
+    assert value.startswith(b"x" * 128)
+    assert value.endswith(b"... (72 more bytes)")
+
+
+def test_slowlog_reset():
+    slowlog = SlowLog(log_slower_than=0)
+    slowlog.observe(request(b"PING"), 1)
+    slowlog.reset()
+    assert len(slowlog) == 0
+
+
+def test_latency_monitor_records_above_threshold():
+    latency = LatencyMonitor(threshold=10)
+    latency.add_sample("expire-cycle", 5_000_000)
+    latency.add_sample("expire-cycle", 20_000_000)
+    latency.add_sample("expire-cycle", 15_000_000)
+
+    [(event, sample, max_latency)] = latency.latest()
+    assert event == "expire-cycle"
+    assert sample.latency == 15
+    assert max_latency == 20
+    assert [s.latency for s in latency.history("expire-cycle")] == [20, 15]
+
+
+def test_latency_monitor_reset():
+    latency = LatencyMonitor(threshold=1)
+    latency.add_sample("aof-write", 2_000_000)
+    latency.add_sample("expire-cycle", 2_000_000)
+
+    assert latency.reset("aof-write") == 1
+    assert latency.history("aof-write") == []
+    assert latency.reset() == 1
+    assert latency.latest() == []
@@ -0,0 +1,90 @@
+import random
+
+import pytest
+
+from pyredis.glob import literal_prefix
+from pyredis.prefix import PrefixIndex, cursor_key, key_cursor
+from pyredis.protocol import Array, Integer
+from pyredis.store import DataStoreWithLock
+from tests.helpers import run
+
+
+def test_literal_prefix():
+    assert literal_prefix("user:*") == "user:"
+    assert literal_prefix("user:1?:session") == "user:1"
+    assert literal_prefix("user:[ab]*") == "user:"
+    assert literal_prefix(r"a\*b*") == "a*b"
+    assert literal_prefix("*:session") == ""
+    assert literal_prefix("exact") == "exact"
+
+
+def test_index_stays_sorted_through_splits_and_merges():
+    rng = random.Random(7)
+    index, expected = PrefixIndex(chunk_size=8), set()
+    for _ in range(3000):
+        key = f"k:{rng.randrange(500)}"
+        if rng.random() < 0.6:
+            if key not in expected:
+                index.add(key)
+                expected.add(key)
+        else:
+            index.discard(key)
+            expected.discard(key)
+        assert len(index) == len(expected)
+    assert index.keys("") == sorted(expected)
+    assert index.keys("k:1") == sorted(k for k in expected if k.startswith("k:1"))
+    assert all(len(chunk) <= 16 for chunk in index._chunks)
+
+
+def test_index_resumes_after_a_key():
+    index = PrefixIndex(chunk_size=2)
+    for key in ["a:1", "a:2", "a:3", "b:1", "c:1"]:
+        index.add(key)
+    assert index.keys("a:", after="a:1") == ["a:2", "a:3"]
+    assert index.keys("a:", after="a:10", count=1) == ["a:2"]
+    assert index.keys("a:", after="a:3") == []
+    assert index.keys("b", after="a:9") == ["b:1"]
+
+
+def test_cursors_round_trip():
+    assert cursor_key(key_cursor("user:é:1")) == "user:é:1"
+    assert cursor_key(12345) is None
+
+
+@pytest.mark.parametrize("prefix_index", [True, False])
+def test_keys_and_delprefix(prefix_index):
+    datastore = DataStoreWithLock(prefix_index=prefix_index)
+    for i in range(50):
+        datastore.set(f"user:{i}:session", b"s")
+        datastore.set(f"order:{i}", b"o")
+
+    keys = run(datastore, "KEYS", "user:1*:session")
+    assert sorted(key.decode() for key in keys.data) == sorted(
+        [f"user:{i}:session" for i in [1, *range(10, 20)]]
+    )
+    assert run(datastore, "DELPREFIX", "user:") == Integer(50)
+    assert datastore.size() == 50
+    assert run(datastore, "KEYS", "user:*") == Array([])
+
+
+def test_scan_match_visits_only_the_prefix_and_survives_changes():
+    datastore = DataStoreWithLock(prefix_index=True)
+    for i in range(100):
+        datastore.set(f"user:{i:03}", b"u")
+        datastore.set(f"other:{i:03}", b"o")
+
+    seen, cursor, calls = [], "0", 0
+    while True:
+        reply = run(datastore, "SCAN", cursor, "MATCH", "user:*", "COUNT", "10")
+        cursor = reply.data[0].decode()
+        seen.extend(key.decode() for key in reply.data[1].data)
+        calls += 1
+        if calls == 3:
+            # Deleting returned keys and adding others does not make the scan skip any.
+            for key in seen:
+                datastore.delete(key)
+            datastore.set("user:000a", b"u")
+        if cursor == "0":
+            break
+    assert calls == 11
+    assert sorted(seen) == [f"user:{i:03}" for i in range(100)]
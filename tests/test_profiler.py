@@ -0,0 +1,62 @@
+import asyncio
+import time
+
+import pytest
+
+from pyredis.profiler import AllocationTracer, Profiler, ProfilerMode
+
+
+def busy_loop(seconds: float):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+def profile(mode: str) -> Profiler:
+    profiler = Profiler(sample_interval=0.001)
+
+    async def run():
+        profiler.start(mode)
+        with pytest.raises(ValueError):
+            profiler.start(mode)
+        busy_loop(0.1)
+        profiler.stop()
+
+    asyncio.run(run())
+    return profiler
+
+
+@pytest.mark.parametrize("mode", [ProfilerMode.CPROFILE, ProfilerMode.SAMPLE])
+def test_profiler_reports_the_busy_function(mode):
+    profiler = profile(mode)
+
+    assert not profiler.running
+    names = [stats.function for stats in profiler.top(3)]
+    assert any("busy_loop" in name for name in names)
+
+
+def test_profiler_stops_after_the_given_seconds():
+    profiler = Profiler(sample_interval=0.001)
+
+    async def run():
+        profiler.start(ProfilerMode.SAMPLE, seconds=0.05)
+        await asyncio.sleep(0.1)
+
+    asyncio.run(run())
+    assert not profiler.running
+    assert profiler.results
+
+
+def test_allocation_diff_points_at_the_allocating_line():
+    tracer = AllocationTracer()
+    tracer.start()
+    try:
+        tracer.save_baseline()
+        kept = [bytearray(1000) for _ in range(100)]
+        [top] = tracer.diff(1)
+    finally:
+        tracer.stop()
+
+    assert "test_profiler.py" in top.location
+    assert top.size_diff >= 100 * 1000
+    assert len(kept) == 100
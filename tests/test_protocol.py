@@ -4,13 +4,21 @@ from pyredis.protocol import (
     CRLF,
     Array,
     BulkString,
+    Double,
     Error,
     Integer,
+    Map,
+    NilArray,
     Null,
     NullArray,
     NullBulkString,
+    ProtocolError,
+    Push,
+    Set,
     SimpleString,
     parse_frame,
+    parse_frame_with_hint,
+    to_resp2,
 )
 
 
@@ -32,8 +40,11 @@ from pyredis.protocol import (
         (b"$0\r\n\r\n", (BulkString(b""), 6)),
         (b"$5\r\nredis\r\n$4\r\npart", (BulkString(b"redis"), 11)),
         (b"$-1\r\n", (NullBulkString(), 5)),
+        (b"$10\r\nred\r\nis", (None, 0)),
+        (b"$7\r\nred\r\nis\r\n", (BulkString(b"red\r\nis"), 13)),
         (b"*2\r\n:1\r\n:2", (None, 0)),
         (b"*2\r\n:1\r\n:2\r\n", (Array([Integer(b"1"), Integer(b"2")]), 12)),
+        (b"*2\r\n$3\r\nfoo\r\n$3\r\nba\r\n", (None, 0)),
         (b"*2\r\n:1\r\n:2\r\n*2\r\n:3", (Array([Integer(b"1"), Integer(b"2")]), 12)),
         (
             b"*3\r\n:1\r\n:2\r\n*1\r\n+full\r\n",
@@ -41,6 +52,7 @@ from pyredis.protocol import (
         ),
         (b"*1\r\n$4\r\nPING\r\n", (Array([BulkString(b"PING")]), 14)),
         (b"*0\r\n", (NullArray(), 4)),
+        (b"*-1\r\n", (NilArray(), 5)),
         (b"_\r\n", (Null(), 3)),
     ],
 )
@@ -136,5 +148,118 @@ def test_null_array_serialize():
     assert NullArray().serialize() == b"*0%(CRLF)s" % {b"CRLF": CRLF}
 
 
+def test_nil_array_serialize():
+    assert NilArray().serialize() == b"*-1%(CRLF)s" % {b"CRLF": CRLF}
+    assert to_resp2(Array([NilArray()])) == Array([NilArray()])
+
+
 def test_null_serialize():
     assert Null().serialize() == b"_%(CRLF)s" % {b"CRLF": CRLF}
+
+
+@pytest.mark.parametrize(
+    "buffer, expected",
+    [
+        (b"+full\r\n", (SimpleString(b"full"), 7, 0)),
+        (b"+part", (None, 0, 6)),
+        (b"$10\r\nred", (None, 0, 17)),
+        (b"*2\r\n$3\r\nfoo\r\n$100\r\nba", (None, 0, 121)),
+        (b"none\r\n", (None, 0, -1)),
+    ],
+)
+def test_parse_frame_with_hint(buffer, expected):
+    assert parse_frame_with_hint(buffer) == expected
+
+
+@pytest.mark.parametrize(
+    "buffer, message",
+    [
+        (b"*1\r\n$4000000000\r\n", "invalid bulk length"),
+        (b"$-2\r\n", "invalid bulk length"),
+        (b"$abc\r\n", "invalid bulk length"),
+        (b"*2000000\r\n", "invalid multibulk length"),
+        (b"*-5\r\n", "invalid multibulk length"),
+    ],
+)
+def test_parse_frame_with_hint_rejects_bad_lengths(buffer, message):
+    with pytest.raises(ProtocolError, match=message):
+        parse_frame_with_hint(buffer)
+
+
+def test_only_requests_are_held_to_the_length_limits():
+    assert parse_frame_with_hint(b"$5\r\nhello\r\n", max_bulk_len=5)[0] == BulkString(
+        b"hello"
+    )
+    with pytest.raises(ProtocolError):
+        parse_frame_with_hint(b"$5\r\nhello\r\n", max_bulk_len=4)
+    assert parse_frame(b"$5\r\nhello\r\n") == (BulkString(b"hello"), 11)
+
+
+def test_parse_large_bulk_string_into_bytearray():
+    payload = b"x" * 100_000
+    buffer = bytearray(b"$100000\r\n" + payload + b"\r\n")
+    frame, size = parse_frame(buffer)
+
+    assert size == len(buffer)
+    assert isinstance(frame.data, bytearray)
+    del buffer[:size]
+    assert frame.data == payload
+
+
+def test_large_bulk_string_serialize():
+    payload = bytearray(b"x" * 100_000)
+    assert BulkString(payload).serialize() == b"$100000\r\n" + payload + b"\r\n"
+
+
+@pytest.mark.parametrize(
+    "buffer, expected",
+    [
+        (b",3.5\r\n", (Double(3.5), 6)),
+        (b",-inf\r\n", (Double(float("-inf")), 7)),
+        (
+            b"%1\r\n+key\r\n:1\r\n",
+            (Map([(SimpleString(b"key"), Integer(1))]), 14),
+        ),
+        (b"%1\r\n+key\r\n", (None, 0)),
+        (b"~2\r\n:1\r\n:2\r\n", (Set([Integer(1), Integer(2)]), 12)),
+        (
+            b">2\r\n+invalidate\r\n_\r\n",
+            (Push([SimpleString(b"invalidate"), Null()]), 20),
+        ),
+    ],
+)
+def test_parse_resp3_frame(buffer, expected):
+    assert parse_frame(buffer) == expected
+
+
+def test_resp3_serialize():
+    assert Double(1.5).serialize() == b",1.5\r\n"
+    assert Double(float("inf")).serialize() == b",inf\r\n"
+    assert (
+        Map([(BulkString(b"a"), Integer(1))]).serialize() == b"%1\r\n$1\r\na\r\n:1\r\n"
+    )
+    assert Set([Integer(1)]).serialize() == b"~1\r\n:1\r\n"
+    assert Push([BulkString(b"a")]).serialize() == b">1\r\n$1\r\na\r\n"
+
+
+def test_to_resp2():
+    frame = Map(
+        [
+            (BulkString(b"proto"), Integer(2)),
+            (BulkString(b"flags"), Set([BulkString(b"on")])),
+            (BulkString(b"score"), Double(0.5)),
+            (BulkString(b"missing"), Null()),
+        ]
+    )
+    assert to_resp2(frame) == Array(
+        [
+            BulkString(b"proto"),
+            Integer(2),
+            BulkString(b"flags"),
+            Array([BulkString(b"on")]),
+            BulkString(b"score"),
+            BulkString(b"0.5"),
+            BulkString(b"missing"),
+            NullBulkString(),
+        ]
+    )
@@ -0,0 +1,201 @@
+import asyncio
+import socket
+import time
+
+from pyredis.client import Connection
+from pyredis.commands import Command
+from pyredis.persist import AOF
+from pyredis.protocol import BulkString
+from pyredis.replication import ReplicationBacklog, ReplicationManager
+from pyredis.store import Databases
+from tests.helpers import request, running_server, wait_for
+
+
+def test_backlog_reads_from_offset():
+    backlog = ReplicationBacklog(size=16)
+    backlog.feed(b"hello")
+    backlog.feed(b"world")
+
+    assert backlog.offset == 10
+    assert backlog.read_from(0) == b"helloworld"
+    assert backlog.read_from(5) == b"world"
+    assert backlog.read_from(10) == b""
+
+
+def test_backlog_wraps_around():
+    backlog = ReplicationBacklog(size=8)
+    backlog.feed(b"abcdef")
+    backlog.feed(b"ghij")
+
+    assert backlog.start_offset == 2
+    assert backlog.read_from(2) == b"cdefghij"
+    assert backlog.read_from(7) == b"hij"
+
+
+def test_backlog_rejects_overwritten_or_future_offsets():
+    backlog = ReplicationBacklog(size=4)
+    backlog.feed(b"abcdef")
+
+    assert backlog.read_from(1) is None
+    assert backlog.read_from(7) is None
+    assert backlog.read_from(2) == b"cdef"
+
+
+def test_backlog_reset_drops_history():
+    backlog = ReplicationBacklog(size=8)
+    backlog.feed(b"abc")
+    backlog.reset(100)
+
+    assert backlog.read_from(0) is None
+    assert backlog.read_from(100) == b""
+    backlog.feed(b"xy")
+    assert backlog.read_from(100) == b"xy"
+
+
+def test_psync_with_a_bad_offset_gets_an_error():
+    async def scenario():
+        server, peer = socket.socketpair()
+        server.setblocking(False)
+        psync = request("PSYNC", "?", "abc")
+        await ReplicationManager(Databases(1)).serve_replica(server, psync)
+        assert peer.recv(1024) == b"-ERR value is not an integer or out of range\r\n"
+        server.close()
+        peer.close()
+
+    asyncio.run(scenario())
+
+
+class Writer:
+    def write(self, data: bytes):
+        pass
+
+    async def drain(self):
+        pass
+
+
+def test_full_resync_drops_the_old_data_from_the_aof(tmp_path):
+    async def scenario():
+        filename = str(tmp_path / "replica.aof")
+        databases = Databases(1)
+        aof = AOF(filename, databases)
+        worker = asyncio.create_task(aof.run_worker())
+        aof.log(request("SET", "stale", "1"))
+
+        snapshot = request("SET", "fresh", "new")
+        reader = asyncio.StreamReader()
+        reader.feed_data(
+            b"+PONG\r\n+FULLRESYNC "
+            + b"0" * 40
+            + b" 0\r\n"
+            + BulkString(snapshot.serialize()).serialize()
+        )
+        reader.feed_eof()
+        replication = ReplicationManager(databases, aof)
+        try:
+            await replication._sync_with_leader(reader, Writer(), synced=False)
+        except EOFError:
+            pass
+        await aof._queue.join()
+        worker.cancel()
+
+        restarted = Databases(1)
+        await AOF(filename, restarted).replay()
+        assert restarted[0].get("stale") is None
+        assert restarted[0].get("fresh").value == b"new"
+
+    asyncio.run(scenario())
+
+
+def test_follower_keeps_the_leader_offsets_through_writes_that_change_nothing():
+    async def scenario():
+        leader_dbs = Databases(1)
+        leader = ReplicationManager(leader_dbs)
+        leader_dbs[0].set("gone", b"1")
+        # The follower never had the key, deleting it there changes nothing.
+        await Command(
+            request("DEL", "gone"), leader_dbs[0], None, replication=leader
+        ).exec()
+        await Command(
+            request("SET", "k", "v"), leader_dbs[0], None, replication=leader
+        ).exec()
+        stream = leader.backlog.read_from(0)
+
+        reader = asyncio.StreamReader()
+        reader.feed_data(
+            b"+PONG\r\n+FULLRESYNC "
+            + leader.replid.encode()
+            + b" 0\r\n"
+            + BulkString(b"").serialize()
+            + stream
+        )
+        reader.feed_eof()
+        follower = ReplicationManager(Databases(1))
+        try:
+            await follower._sync_with_leader(reader, Writer(), synced=False)
+        except EOFError:
+            pass
+
+        assert follower.offset == leader.offset == len(stream)
+        assert follower.backlog.read_from(0) == stream
+        assert follower.databases[0].get("k").value == b"v"
+
+    asyncio.run(scenario())
+
+
+def replication_info(conn: Connection) -> dict[str, str]:
+    text = conn.execute("INFO", "replication").decode()
+    return dict(line.split(":", 1) for line in text.split("\r\n") if ":" in line)
+
+
+def test_leader_and_follower_over_localhost(tmp_path, capsys):
+    with running_server(aof_name=str(tmp_path / "leader.aof")) as leader_port:
+        leader = Connection("127.0.0.1", leader_port)
+        leader.execute("SET", "before", "1")
+
+        with running_server(
+            aof_name=str(tmp_path / "follower.aof"),
+            replicaof=("127.0.0.1", leader_port),
+        ) as follower_port:
+            follower = Connection("127.0.0.1", follower_port)
+
+            def in_sync():
+                leader_info, follower_info = (
+                    replication_info(leader),
+                    replication_info(follower),
+                )
+                return (
+                    follower_info["master_link_status"] == "up"
+                    and follower_info["slave_repl_offset"]
+                    == leader_info["master_repl_offset"]
+                )
+
+            # Full sync brings over what the leader had before the follower connected.
+            wait_for(in_sync)
+            assert "Full resync of replica" in capsys.readouterr().out
+            assert follower.execute("GET", "before") == b"1"
+
+            # Writes are streamed as they happen.
+            leader.execute("RPUSH", "list", "a", "b")
+            wait_for(lambda: follower.execute("LRANGE", "list", "0", "0") == [b"a"])
+
+            # The key expires on both sides, the follower culls it on this read, the leader only on the DEL,
+            # which the follower applies as a write that changes nothing.
+            leader.execute("SET", "gone", "x", "PX", "50")
+            wait_for(in_sync)
+            time.sleep(0.1)
+            assert follower.execute("GET", "gone") is None
+            leader.execute("DEL", "gone")
+            leader.execute("SET", "after", "2")
+            wait_for(lambda: follower.execute("GET", "after") == b"2")
+            wait_for(in_sync)
+
+            # After losing the link, the follower continues from its offset with what it missed.
+            assert leader.execute("CLIENT", "KILL", "TYPE", "replica") == 1
+            leader.execute("SET", "missed", "3")
+            wait_for(lambda: follower.execute("GET", "missed") == b"3")
+            wait_for(in_sync)
+            out = capsys.readouterr().out
+            assert "Partial resync of replica" in out
+            assert "Full resync of replica" not in out
+            leader.disconnect()
+            follower.disconnect()
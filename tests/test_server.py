@@ -0,0 +1,90 @@
+import asyncio
+import socket
+
+import pytest
+
+from pyredis.monitor import Monitor
+from pyredis.replication import ReplicationManager
+from pyredis.server import (
+    accept_clients,
+    configure_client,
+    handle_connection,
+    tcp_listener,
+    unix_listener,
+)
+from pyredis.session import ClientRegistry, Session
+from pyredis.store import Databases
+from pyredis.tracking import TrackingTable
+
+
+def test_accept_drains_the_backlog_in_batches():
+    with tcp_listener("127.0.0.1", 0) as listener:
+        address = listener.getsockname()
+        peers = [socket.create_connection(address) for _ in range(5)]
+        accepted = []
+
+        assert accept_clients(listener, accepted.append, limit=3) == 3
+        assert accept_clients(listener, accepted.append, limit=3) == 2
+        assert accept_clients(listener, accepted.append, limit=3) == 0
+
+        client = accepted[0]
+        assert not client.getblocking()
+        assert client.getsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY)
+        assert client.getsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE)
+        for sock in accepted + peers:
+            sock.close()
+
+
+def test_unix_listener_replaces_a_stale_socket_file(tmp_path):
+    path = str(tmp_path / "pyredis.sock")
+    unix_listener(path).close()
+
+    with unix_listener(path, perm=0o700) as listener:
+        peer = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        peer.connect(path)
+        accepted = []
+        assert accept_clients(listener, accepted.append) == 1
+
+        session = Session(accepted[0])
+        assert session.address == session.local_address == f"{path}:0"
+        peer.close()
+        accepted[0].close()
+
+
+@pytest.mark.parametrize(
+    "frame, reply",
+    [
+        (b"*0\r\n", b"-ERR Protocol error\r\n"),
+        (b"+PING\r\n", b"-ERR Protocol error\r\n"),
+        (b"*1\r\n:1\r\n", b"-ERR Protocol error\r\n"),
+        (b"*1\r\n$4000000000\r\n", b"-ERR Protocol error: invalid bulk length\r\n"),
+        (b"*1\r\n$-7\r\n", b"-ERR Protocol error: invalid bulk length\r\n"),
+        (b"*9999999\r\n", b"-ERR Protocol error: invalid multibulk length\r\n"),
+    ],
+)
+def test_frames_that_are_not_commands_get_a_protocol_error(frame, reply):
+    async def scenario():
+        server, peer = socket.socketpair()
+        configure_client(server)
+        databases, clients = Databases(1), ClientRegistry()
+        connection = asyncio.create_task(
+            handle_connection(
+                server,
+                databases,
+                4096,
+                None,
+                Monitor(),
+                ReplicationManager(databases),
+                None,
+                clients,
+                TrackingTable(clients),
+            )
+        )
+        loop = asyncio.get_running_loop()
+        await loop.sock_sendall(peer, frame)
+        await asyncio.wait_for(connection, 1)
+        peer.setblocking(True)
+        assert peer.recv(1024) == reply
+        peer.close()
+
+    asyncio.run(scenario())
@@ -0,0 +1,47 @@
+from pyredis.session import ClientRegistry, OutputBufferLimit, Session
+
+
+def test_hard_limit_is_reached_immediately():
+    limit = OutputBufferLimit(hard=100, soft=50, soft_seconds=10)
+    assert limit.reached(100, None, 0) == (True, None)
+    assert limit.reached(99, None, 0) == (False, 0)
+
+
+def test_soft_limit_needs_to_last():
+    limit = OutputBufferLimit(hard=0, soft=50, soft_seconds=10)
+    reached, since = limit.reached(60, None, 100.0)
+    assert not reached and since == 100.0
+    assert limit.reached(60, since, 105.0) == (False, 100.0)
+    assert limit.reached(60, since, 111.0) == (True, 100.0)
+    assert limit.reached(10, since, 111.0) == (False, None)
+
+
+def test_zero_limits_are_disabled():
+    assert OutputBufferLimit().reached(10**12, None, 0) == (False, None)
+
+
+def test_output_over_the_limit_kills_the_client():
+    clients = ClientRegistry()
+    session = Session(output_limit=OutputBufferLimit(hard=10))
+    clients.add(session)
+
+    session.write(b"12345")
+    assert session.output_bytes == 5 and not session.closing
+    session.write(b"67890")
+    assert session.closing and session.output_bytes == 0
+    session.write(b"dropped")
+    assert session.output_bytes == 0
+
+    clients.remove(session)
+    assert clients.output_limit_disconnections == 1
+
+
+def test_describe_reports_buffers():
+    session = Session(name=b"worker")
+    session.write(b"+OK\r\n")
+    line = session.describe()
+
+    assert f"id={session.id} " in line
+    assert " name=worker " in line
+    assert " omem=5 " in line
+    assert " flags=N " in line
@@ -0,0 +1,131 @@
+import pytest
+
+from pyredis.config import STREAM_NODE_MAX_ENTRIES
+from pyredis.encoding import from_resp, to_resp
+from pyredis.protocol import parse_frame
+from pyredis.stream import (
+    MAX_ID,
+    MIN_ID,
+    ConsumerGroup,
+    Stream,
+    StreamError,
+    next_id,
+    parse_id,
+    previous_id,
+)
+
+
+def filled(count: int) -> Stream:
+    stream = Stream()
+    for i in range(1, count + 1):
+        stream.add((i, 0), [b"n", b"%i" % i])
+    return stream
+
+
+def ids(entries) -> list[int]:
+    return [stream_id[0] for stream_id, _ in entries]
+
+
+def test_ids():
+    assert parse_id("5-3") == (5, 3)
+    assert parse_id("5", missing_sequence=7) == (5, 7)
+    assert parse_id("5-") is None and parse_id("-1") is None and parse_id("a") is None
+    assert next_id((5, 2**64 - 1)) == (6, 0)
+    assert previous_id((6, 0)) == (5, 2**64 - 1)
+    assert previous_id(MIN_ID) is None and next_id(MAX_ID) is None
+
+
+def test_ids_only_grow():
+    stream = filled(3)
+    assert stream.auto_id(now_ms=1) == (3, 1)
+    assert stream.auto_id(now_ms=10) == (10, 0)
+    assert stream.auto_id(now_ms=10, ms=3) == (3, 1)
+    with pytest.raises(StreamError):
+        stream.auto_id(now_ms=10, ms=2)
+    with pytest.raises(StreamError):
+        stream.add((3, 0), [b"n", b"again"])
+
+
+def test_ranges_span_chunks():
+    count = 3 * STREAM_NODE_MAX_ENTRIES + 5
+    stream = filled(count)
+    assert len(stream.chunks) == 4
+
+    assert ids(stream.range(MIN_ID, MAX_ID)) == list(range(1, count + 1))
+    assert ids(stream.range((99, 0), (202, 0))) == list(range(99, 203))
+    assert ids(stream.range((99, 1), MAX_ID, count=3)) == [100, 101, 102]
+    assert ids(stream.range(MIN_ID, (201, 0), count=3, reverse=True)) == [201, 200, 199]
+    assert stream.range((count + 1, 0), MAX_ID) == []
+    assert stream.get((150, 0)) == [b"n", b"150"]
+    assert stream.get((150, 1)) is None
+
+
+def test_entries_with_other_fields_keep_their_names():
+    stream = Stream()
+    stream.add((1, 0), [b"a", b"1", b"b", b"2"])
+    stream.add((2, 0), [b"a", b"3", b"b", b"4"])
+    stream.add((3, 0), [b"c", b"5"])
+    assert [fields for _, fields in stream.range(MIN_ID, MAX_ID)] == [
+        [b"a", b"1", b"b", b"2"],
+        [b"a", b"3", b"b", b"4"],
+        [b"c", b"5"],
+    ]
+
+
+def test_approximate_trims_drop_whole_chunks():
+    stream = filled(250)
+    assert stream.trim(maxlen=120, approximate=True) == 100
+    assert len(stream) == 150 and stream.first_id == (101, 0)
+
+    assert stream.trim(maxlen=120) == 30
+    assert len(stream) == 120 and stream.first_id == (131, 0)
+
+    assert stream.trim(minid=(240, 0)) == 109
+    assert ids(stream.range(MIN_ID, MAX_ID)) == list(range(240, 251))
+
+
+def test_trim_limit_caps_the_removed_entries():
+    stream = filled(500)
+    assert stream.trim(maxlen=0, approximate=True, limit=250) == 200
+    assert len(stream) == 300
+
+
+def test_consumer_groups_track_pending_entries():
+    group = ConsumerGroup(MIN_ID)
+    alice, bob = group.consumer("alice", 0), group.consumer("bob", 0)
+    group.deliver(alice, [(1, 0), (2, 0)], now=100)
+    group.deliver(bob, [(3, 0)], now=200)
+
+    assert [i for i, _ in group.pending_range(MIN_ID, MAX_ID, 10)] == [
+        (1, 0),
+        (2, 0),
+        (3, 0),
+    ]
+    assert [i for i, _ in group.pending_range(MIN_ID, MAX_ID, 10, "bob")] == [(3, 0)]
+    idle = group.pending_range(MIN_ID, MAX_ID, 10, min_idle=150, now=300)
+    assert [i for i, _ in idle] == [(1, 0), (2, 0)]
+
+    # Delivered again, the entry changes hands.
+    group.deliver(bob, [(1, 0)], now=400)
+    assert group.pending[(1, 0)].deliveries == 2
+    assert set(bob.pending) == {(1, 0), (3, 0)} and set(alice.pending) == {(2, 0)}
+
+    assert group.ack([(1, 0), (1, 0), (9, 0)]) == 1
+    assert group.delete_consumer("alice") == 1
+    assert list(group.pending) == [(3, 0)]
+
+
+def test_streams_round_trip_through_resp():
+    stream = filled(150)
+    stream.trim(maxlen=140)
+    group = stream.groups["workers"] = ConsumerGroup((12, 0), entries_read=2)
+    group.deliver(group.consumer("alice", 5), [(11, 0), (12, 0)], now=7)
+
+    frame, _ = parse_frame(to_resp(stream).serialize())
+    copy = from_resp(frame)
+    assert copy.range(MIN_ID, MAX_ID) == stream.range(MIN_ID, MAX_ID)
+    assert (copy.last_id, copy.entries_added) == ((150, 0), 150)
+    copied = copy.groups["workers"]
+    assert (copied.last_id, copied.entries_read) == ((12, 0), 2)
+    assert copied.consumers["alice"].pending[(12, 0)] is copied.pending[(12, 0)]
+    assert copied.pending[(11, 0)].delivered == 7
@@ -0,0 +1,131 @@
+import asyncio
+
+from pyredis.protocol import Array, BulkString, Null, NullBulkString, Push
+from pyredis.session import ClientRegistry, Session, TrackingOptions
+from pyredis.store import DataStoreWithLock
+from pyredis.tracking import INVALIDATE_CHANNEL, TrackingTable
+
+
+def make_table(*sessions: Session) -> TrackingTable:
+    clients = ClientRegistry()
+    for session in sessions:
+        clients.add(session)
+    return TrackingTable(clients)
+
+
+def pushed(session: Session) -> list[bytes]:
+    pushes, session._output = session._output, []
+    return pushes
+
+
+def invalidate(*keys: bytes) -> bytes:
+    return Push(
+        [BulkString(b"invalidate"), Array([BulkString(key) for key in keys])]
+    ).serialize()
+
+
+def test_invalidates_keys_read_by_a_client_once():
+    reader = Session(protocol=3)
+    table = make_table(reader)
+    table.enable(reader, TrackingOptions())
+
+    table.remember(reader, [b"foo"])
+    table.invalidate("foo")
+    table.invalidate("foo")
+
+    assert pushed(reader) == [invalidate(b"foo")]
+    assert table.keys == {}
+
+
+def test_noloop_skips_the_writing_client():
+    reader, writer = Session(protocol=3), Session(protocol=3)
+    table = make_table(reader, writer)
+    table.enable(reader, TrackingOptions())
+    table.enable(writer, TrackingOptions(noloop=True))
+
+    table.remember(reader, [b"foo"])
+    table.remember(writer, [b"foo"])
+    table.invalidate_keys([b"foo"], origin=writer)
+
+    assert pushed(reader) == [invalidate(b"foo")]
+    assert pushed(writer) == []
+
+
+def test_broadcast_matches_prefixes_without_reads():
+    session = Session(protocol=3)
+    table = make_table(session)
+    table.enable(session, TrackingOptions(bcast=True, prefixes=[b"user:"]))
+
+    table.invalidate("user:1")
+    table.invalidate("order:1")
+
+    assert pushed(session) == [invalidate(b"user:1")]
+    table.disable(session)
+    assert table.prefixes == {}
+    assert not table.active
+
+
+def test_optin_only_remembers_after_caching_yes():
+    session = Session(protocol=3)
+    table = make_table(session)
+    table.enable(session, TrackingOptions(optin=True))
+
+    table.remember(session, [b"foo"])
+    session.caching = True
+    table.remember(session, [b"bar"])
+
+    assert list(table.keys) == ["bar"]
+
+
+def test_redirect_sends_resp2_messages():
+    session, target = Session(), Session()
+    table = make_table(session, target)
+    table.enable(session, TrackingOptions(redirect=target.id))
+
+    table.remember(session, [b"foo"])
+    table.invalidate("foo")
+
+    assert pushed(session) == []
+    assert pushed(target) == [
+        Array(
+            [
+                BulkString(b"message"),
+                BulkString(INVALIDATE_CHANNEL),
+                Array([BulkString(b"foo")]),
+            ]
+        ).serialize()
+    ]
+
+
+def test_flush_and_expiry_invalidate():
+    session = Session(protocol=3)
+    table = make_table(session)
+    table.enable(session, TrackingOptions())
+    datastore = DataStoreWithLock()
+    datastore.add_listener(table)
+
+    async def delete():
+        datastore.set("foo", b"bar")
+        table.remember(session, [b"foo"])
+        datastore.delete("foo")
+        await asyncio.sleep(0)
+
+    asyncio.run(delete())
+    datastore.flush()
+
+    assert pushed(session) == [
+        invalidate(b"foo"),
+        Push([BulkString(b"invalidate"), Null()]).serialize(),
+    ]
+
+
+def test_table_is_bounded():
+    session = Session(protocol=3)
+    table = make_table(session)
+    table.max_keys = 2
+    table.enable(session, TrackingOptions())
+
+    table.remember(session, [b"a", b"b", b"c"])
+
+    assert list(table.keys) == ["b", "c"]
+    assert pushed(session) == [invalidate(b"a")]